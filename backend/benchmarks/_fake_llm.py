@@ -0,0 +1,176 @@
+"""
+Configurable fake streaming chat model for load tests.
+
+`FakeStreamingChatModel` behaves like the Gemini chat model as far as the agent
+is concerned: it streams `AIMessageChunk`s, reports `usage_metadata` on the last
+chunk and can answer with a tool call first. Timing is simulated with
+`asyncio.sleep`, so many sessions can share one event loop exactly like real
+network-bound LLM calls do.
+"""
+import re
+import json
+import uuid
+import random
+import asyncio
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = (
+    "bài báo đề xuất một phương pháp mới dựa trên transformer để cải thiện "
+    "độ chính xác trên các benchmark chuẩn với chi phí tính toán thấp hơn"
+).split()
+
+_PAPER_ID = re.compile(r"ID:\s*(\S+)")
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Args:
+        first_token_latency: Seconds before the first chunk of each model call.
+        jitter: Relative random variation applied to the latency (0.2 = +-20%).
+        tokens_per_second: Streaming rate after the first chunk.
+        answer_tokens: Number of tokens in a final answer.
+        tool_call_rate: Probability that a turn starts with a tool call.
+        tool_name: Tool requested on a tool-call turn (`read_full_paper` or `web_search`).
+        max_concurrent_calls: Upstream capacity (e.g. the Gemini quota): calls
+            beyond it wait in FIFO order for a free slot. 0 means unlimited.
+        seed: RNG seed for reproducible runs.
+        vocabulary: Words the answers are drawn from (default `WORDS`), e.g. a
+            marker to tell this model's tokens apart in a stream.
+    """
+    first_token_latency: float = 0.5
+    jitter: float = 0.2
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 200
+    tool_call_rate: float = 0.0
+    tool_name: str = "read_full_paper"
+    max_concurrent_calls: int = 0
+    seed: Optional[int] = None
+    vocabulary: Tuple[str, ...] = tuple(WORDS)
+
+    rng: Any = None
+    gate: Any = None
+    # Work accounting, to check that abandoned requests stop calling the model.
+    active_calls: int = 0
+    tokens_emitted: int = 0
+
+    def model_post_init(self, __context: Any) -> None:
+        self.rng = random.Random(self.seed)
+        if self.max_concurrent_calls > 0:
+            self.gate = asyncio.Semaphore(self.max_concurrent_calls)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FakeStreamingChatModel":
+        return self
+
+    def _latency(self) -> float:
+        return max(0.0, self.first_token_latency * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def _wants_tool(self, messages: List[BaseMessage]) -> bool:
+        # Only the first model call of a turn may request a tool; after the
+        # ToolMessage comes back the model answers.
+        if isinstance(messages[-1], ToolMessage):
+            return False
+        return self.rng.random() < self.tool_call_rate
+
+    def _tool_args(self, messages: List[BaseMessage]) -> dict:
+        if self.tool_name == "web_search":
+            return {"query": str(messages[-1].content)[:80]}
+        for message in messages:
+            match = _PAPER_ID.search(str(message.content))
+            if match:
+                return {"paper_id": match.group(1)}
+        return {"paper_id": ""}
+
+    def _tool_chunk(self, messages: List[BaseMessage]) -> AIMessageChunk:
+        return AIMessageChunk(
+            content="",
+            tool_call_chunks=[{
+                "name": self.tool_name,
+                "args": json.dumps(self._tool_args(messages)),
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "index": 0,
+            }],
+            usage_metadata={"input_tokens": 0, "output_tokens": 1, "total_tokens": 1},
+        )
+
+    def _tokens(self) -> List[str]:
+        return [f"{self.rng.choice(self.vocabulary)} " for _ in range(self.answer_tokens)]
+
+    async def _astream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any
+        ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.gate is None:
+            async for chunk in self._simulate(messages, run_manager):
+                yield chunk
+            return
+        async with self.gate:
+            async for chunk in self._simulate(messages, run_manager):
+                yield chunk
+
+    async def _simulate(
+            self,
+            messages: List[BaseMessage],
+            run_manager: Optional[AsyncCallbackManagerForLLMRun]
+        ) -> AsyncIterator[ChatGenerationChunk]:
+        self.active_calls += 1
+        try:
+            await asyncio.sleep(self._latency())
+            if self._wants_tool(messages):
+                yield ChatGenerationChunk(message=self._tool_chunk(messages))
+                return
+
+            gap = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+            tokens = self._tokens()
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(gap)
+                usage = None
+                if i == len(tokens) - 1:
+                    usage = {"input_tokens": 0, "output_tokens": len(tokens), "total_tokens": len(tokens)}
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+                self.tokens_emitted += 1
+                if run_manager:
+                    await run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+        finally:
+            self.active_calls -= 1
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any
+        ) -> ChatResult:
+        final = None
+        async for chunk in self._astream(messages, stop, run_manager, **kwargs):
+            final = chunk if final is None else final + chunk
+        message = final.message if final else AIMessageChunk(content="")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content=message.content,
+            tool_calls=message.tool_calls,
+            usage_metadata=message.usage_metadata,
+        ))])
+
+    def _stream(self, *args, **kwargs) -> Iterator[ChatGenerationChunk]:
+        raise NotImplementedError("FakeStreamingChatModel is async-only.")
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any
+        ) -> ChatResult:
+        raise NotImplementedError("FakeStreamingChatModel is async-only.")
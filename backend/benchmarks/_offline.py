@@ -0,0 +1,242 @@
+"""
+Local stand-ins shared by the offline benchmarks:
+
+- `SyntheticArxivFeed` / `FeedServer`: a deterministic arXiv Atom API served over
+  HTTP on localhost, paginated like the real `export.arxiv.org/api/query`.
+- `ZipfText`: synthetic prose with a natural-language word distribution.
+- `init_offline_stores`: Beanie on a local MongoDB (`--mongo-uri`) or on the
+  in-memory `mongomock_motor` stand-in, plus Qdrant in local in-memory mode or
+  the embedded mmap vector store.
+"""
+import random
+import shutil
+import string
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+from beanie import init_beanie
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import VectorParams, Distance
+
+from src import database
+from src.database import VECTOR_COLLECTION
+from src.mmap_store import MmapVectorStore
+
+WORDS = (
+    "transformer attention diffusion graph neural network retrieval language model vision "
+    "reinforcement policy agent benchmark dataset robust efficient sparse quantization "
+    "contrastive representation federated privacy causal inference reasoning alignment "
+    "multimodal segmentation detection generative adversarial optimization gradient"
+).split()
+CATEGORIES = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.IR", "cs.RO", "cs.CR", "cs.DB"]
+
+class ZipfText:
+    """
+    Sentences of `WORDS` plus `vocabulary` pseudo-words drawn with a Zipf
+    distribution: compresses and repeats roughly like prose, and rare words are
+    rare (word rank r has frequency ~1/r).
+    """
+    def __init__(self, rng: random.Random, vocabulary: int = 8_000):
+        self.rng = rng
+        self.words = list(WORDS) + [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 11))) for _ in range(vocabulary)
+        ]
+        self.cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.words))))
+
+    def sentence(self, low: int = 8, high: int = 24) -> str:
+        return " ".join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=self.rng.randint(low, high))).capitalize() + "."
+
+class SyntheticArxivFeed:
+    """
+    Deterministic corpus of `size` papers, newest update first.
+
+    Args:
+        size: Number of papers in the corpus.
+        seed: RNG seed; the same seed always yields the same feed.
+        versions: Fraction of papers published with a `v2` entry.
+    """
+    def __init__(self, size: int, seed: int = 42, versions: float = 0.1):
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.entries: List[str] = []
+        for i in range(size):
+            updated = now - timedelta(minutes=i)
+            published = updated - timedelta(days=rng.randint(0, 5))
+            version = 2 if rng.random() < versions else 1
+            arxiv_id = f"{updated:%y%m}.{i:05d}v{version}"
+            cats = rng.sample(CATEGORIES, rng.randint(1, 3))
+            title = " ".join(rng.choices(WORDS, k=rng.randint(6, 12))).capitalize()
+            summary = " ".join(rng.choices(WORDS, k=rng.randint(120, 220)))
+            authors = "".join(
+                f"<author><name>Author{rng.randint(0, size // 3 + 10)} Surname{rng.randint(0, 500)}</name></author>"
+                for _ in range(rng.randint(1, 6))
+            )
+            self.entries.append(
+                "<entry>"
+                f"<id>http://arxiv.org/abs/{arxiv_id}</id>"
+                f"<updated>{updated:%Y-%m-%dT%H:%M:%SZ}</updated>"
+                f"<published>{published:%Y-%m-%dT%H:%M:%SZ}</published>"
+                f"<title>{escape(title)}</title>"
+                f"<summary>{escape(summary)}</summary>"
+                f"{authors}"
+                f'<link href="http://arxiv.org/abs/{arxiv_id}" rel="alternate" type="text/html"/>'
+                f'<link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}" rel="related" type="application/pdf"/>'
+                f'<arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="{cats[0]}" scheme="http://arxiv.org/schemas/atom"/>'
+                + "".join(f'<category term="{c}" scheme="http://arxiv.org/schemas/atom"/>' for c in cats)
+                + "</entry>"
+            )
+
+    def page(self, start: int, max_results: int) -> bytes:
+        entries = self.entries[start:start + max_results]
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+            'xmlns:arxiv="http://arxiv.org/schemas/atom">'
+            "<title>ArXiv Query</title><id>http://arxiv.org/api/synthetic</id>"
+            f"<updated>{datetime.now(timezone.utc):%Y-%m-%dT%H:%M:%SZ}</updated>"
+            f"<opensearch:totalResults>{len(self.entries)}</opensearch:totalResults>"
+            f"<opensearch:startIndex>{start}</opensearch:startIndex>"
+            f"<opensearch:itemsPerPage>{len(entries)}</opensearch:itemsPerPage>"
+            + "".join(entries) +
+            "</feed>"
+        ).encode("utf-8")
+
+class FeedServer:
+    """Serves a `SyntheticArxivFeed` on 127.0.0.1 in a background thread."""
+    def __init__(self, feed: SyntheticArxivFeed):
+        feed_ref = feed
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                start = int(query.get("start", ["0"])[0])
+                max_results = int(query.get("max_results", ["100"])[0])
+                body = feed_ref.page(start, max_results)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def query_url_format(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/api/query?{{}}"
+
+    def __enter__(self) -> "FeedServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def _patch_mongomock() -> None:
+    """
+    Aligns `mongomock_motor` with what Beanie 2 / PyMongo 4.16 expect:
+    awaitable `aggregate()` and `UpdateOne` / `ReplaceOne(sort=...)` in bulk writes.
+    """
+    import mongomock.collection
+    import mongomock_motor
+
+    if getattr(mongomock_motor, "_arxiv_bench_patched", False):
+        return
+
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+    def _add_update(self, selector, doc, multi=False, upsert=False, collation=None,
+                    array_filters=None, hint=None, sort=None, **_):
+        return add_update(self, selector, doc, multi, upsert, collation=collation,
+                          array_filters=array_filters, hint=hint)
+
+    mongomock.collection.BulkOperationBuilder.add_update = _add_update
+
+    add_replace = mongomock.collection.BulkOperationBuilder.add_replace
+
+    def _add_replace(self, selector, doc, upsert, collation=None, hint=None, sort=None, **_):
+        return add_replace(self, selector, doc, upsert, collation=collation, hint=hint)
+
+    mongomock.collection.BulkOperationBuilder.add_replace = _add_replace
+
+    aggregate = mongomock_motor.AsyncMongoMockCollection.aggregate
+
+    class _AwaitableCursor:
+        def __init__(self, cursor):
+            self._cursor = cursor
+
+        def __await__(self):
+            async def _self():
+                return self._cursor
+            return _self().__await__()
+
+        def __getattr__(self, name):
+            return getattr(self._cursor, name)
+
+        def __aiter__(self):
+            return self._cursor.__aiter__()
+
+    mongomock_motor.AsyncMongoMockCollection.aggregate = lambda self, *a, **k: _AwaitableCursor(aggregate(self, *a, **k))
+    mongomock_motor._arxiv_bench_patched = True
+
+async def init_offline_stores(
+        mongo_uri: Optional[str],
+        vector_size: int,
+        document_models: list,
+        vector_dir: Optional[str] = None
+    ) -> str:
+    """
+    Initialises Beanie and the module-level vector store without any external service
+    (unless `mongo_uri` is given): Qdrant in local in-memory mode, or the embedded
+    mmap store in `vector_dir` when given. Returns a short description of the
+    Mongo backend used.
+    """
+    if mongo_uri:
+        from pymongo import AsyncMongoClient
+        client = AsyncMongoClient(mongo_uri)
+        db = client.get_database(f"arxiv_bench_{random.randint(0, 1_000_000)}")
+        backend = "mongodb"
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError as e:
+            raise SystemExit("Install mongomock-motor (`uv sync --extra bench`) or pass --mongo-uri.") from e
+        _patch_mongomock()
+        db = AsyncMongoMockClient()["arxiv_bench"]
+        backend = "mongomock"
+
+    await init_beanie(database=db, document_models=document_models)
+
+    if vector_dir:
+        database.vector_store = MmapVectorStore(vector_dir, dimension=vector_size)
+        return backend
+
+    database.qdrant_client = AsyncQdrantClient(location=":memory:")
+    await database.qdrant_client.create_collection(
+        collection_name=VECTOR_COLLECTION,
+        vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+    )
+    database.vector_store = database.QdrantVectorStore()
+    return backend
+
+async def drop_offline_stores(document_models: list) -> None:
+    for model in document_models:
+        await model.get_pymongo_collection().drop()
+    if isinstance(database.vector_store, MmapVectorStore):
+        database.vector_store.close()
+        shutil.rmtree(database.vector_store.path, ignore_errors=True)
+    else:
+        await database.qdrant_client.close()
+        database.qdrant_client = None
+    database.vector_store = None
@@ -0,0 +1,234 @@
+"""
+Working set of `arxiv_papers` before and after moving the deep analyses into
+the compressed `paper_artifacts` collection (`src.migrations.move_analyses`).
+
+A corpus of `--papers` papers is seeded in the legacy layout, with
+`--analysed` of them carrying an inline `deep_analysis` of 6-12 KB of synthetic
+markdown (Zipf-distributed vocabulary, so it compresses about like real text),
+and a few stale ones (cleared `analyzed_at`). Then, before and after the
+migration, the script reports:
+
+- the size of `arxiv_papers` (BSON bytes of every document): the collection
+  every list and chat query reads, i.e. the working set that must stay in cache;
+- per operation, the latency and the bytes read from MongoDB: the chat-turn
+  paper lookup (`ArxivPaper.get` before, the `PaperContextView` projection
+  after), a `/news/latest` page of 20 papers, and a cached `read_full_paper`
+  (the inline field before, `load_artifact` after);
+- the size of `paper_artifacts` and the compression ratio.
+
+Finally every moved analysis is read back through `load_artifact` and compared
+with the original text. Exits with status 1 on any mismatch.
+
+Usage (from backend/):
+    python -m benchmarks.analysis_storage --papers 20000
+    python -m benchmarks.analysis_storage --mongo-uri mongodb://localhost:27017 --papers 200000 --out analysis_storage.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+import bson
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.database import DOCUMENT_MODELS
+from src.model import ArxivPaper, PaperArtifact, PaperContextView
+from src.artifacts import ANALYSIS, load_artifact
+from src.utils.arxiv_id import content_hash
+from src.migrations.move_analyses import LEGACY_VARIANT, move_analyses
+from benchmarks._offline import CATEGORIES, ZipfText, init_offline_stores, drop_offline_stores
+
+SECTIONS = [
+    "# 1. Đóng góp cốt lõi (Core Contributions)",
+    "# 2. Phương pháp luận (Methodology)",
+    "# 3. Thực nghiệm & Kết quả (Experiments & Results)",
+    "# 4. Hạn chế & Hướng phát triển (Limitations & Future Work)",
+]
+
+class _TextGenerator(ZipfText):
+    """Markdown analyses in the layout of the analysis prompt."""
+    def analysis(self, size: int) -> str:
+        parts = []
+        while sum(len(p) for p in parts) < size:
+            parts.append(SECTIONS[len(parts) % len(SECTIONS)])
+            parts.extend(f"- {self.sentence()}" for _ in range(self.rng.randint(4, 10)))
+        return "\n".join(parts)
+
+async def seed_legacy(count: int, analysed: float, stale: float, seed: int = 42) -> Dict[str, str]:
+    """Inserts papers in the legacy layout and returns the analyses that should be moved."""
+    rng = random.Random(seed)
+    text = _TextGenerator(rng)
+    collection = ArxivPaper.get_pymongo_collection()
+    start = datetime(2021, 1, 1)
+    expected: Dict[str, str] = {}
+    for offset in range(0, count, 2_000):
+        docs = []
+        for i in range(offset, min(count, offset + 2_000)):
+            published = start + timedelta(minutes=i)
+            paper_id = f"{published:%y%m}.{i:05d}"
+            title = text.sentence()
+            summary = " ".join(text.sentence() for _ in range(rng.randint(6, 12)))
+            categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+            doc = {
+                "_id": paper_id, "version": 1, "title": title,
+                "author": [f"Author{rng.randint(0, 900)} Surname{rng.randint(0, 50_000)}" for _ in range(rng.randint(1, 6))],
+                "arxiv_url": f"http://arxiv.org/abs/{paper_id}v1", "pdf_url": f"http://arxiv.org/pdf/{paper_id}v1",
+                "published_date": published, "updated_date": published, "summary": summary,
+                "prime_category": categories[0], "categories": categories, "crawled_at": datetime.combine(published.date(), datetime.min.time()),
+                "content_hash": content_hash(title, summary), "deep_analysis": None, "analyzed_at": None,
+                "similar": [{"paper_id": f"{published:%y%m}.{rng.randint(0, count):05d}", "title": text.sentence(), "score": rng.random()} for _ in range(10)],
+                "similar_updated_at": published,
+            }
+            doc["author_keys"] = [a.lower() for a in doc["author"]]
+            if rng.random() < analysed:
+                doc["deep_analysis"] = text.analysis(rng.randint(6_000, 12_000))
+                if rng.random() < stale:
+                    doc["analyzed_at"] = None  # a newer version changed the text
+                else:
+                    doc["analyzed_at"] = published + timedelta(days=1)
+                    expected[paper_id] = doc["deep_analysis"]
+            docs.append(doc)
+        await collection.insert_many(docs)
+    return expected
+
+async def _collection_bytes(collection) -> Dict[str, Any]:
+    sizes = [len(bson.encode(doc)) async for doc in collection.find({})]
+    return {
+        "documents": len(sizes),
+        "mib": round(sum(sizes) / 2**20, 1),
+        "avg_bytes": round(sum(sizes) / max(len(sizes), 1)),
+    }
+
+async def _time(op: Callable[[str], Awaitable[Any]], ids: List[str]) -> Dict[str, float]:
+    timings = []
+    for paper_id in ids:
+        start = time.perf_counter()
+        await op(paper_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 3), "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 3)}
+
+async def measure(layout: str, sample: List[str]) -> Dict[str, Any]:
+    papers = ArxivPaper.get_pymongo_collection()
+    artifacts = PaperArtifact.get_pymongo_collection()
+    legacy = layout == "inline"
+
+    async def chat_context(paper_id: str):
+        if legacy:
+            return await ArxivPaper.get(paper_id)
+        return await ArxivPaper.find_one(ArxivPaper.id == paper_id).project(PaperContextView)
+
+    async def latest_page(_: str):
+        return await ArxivPaper.find_all().sort("-published_date").limit(20).to_list()
+
+    async def cached_analysis(paper_id: str):
+        if legacy:
+            doc = await papers.find_one({"_id": paper_id})
+            return doc["deep_analysis"]
+        return await load_artifact(await ArxivPaper.get(paper_id), ANALYSIS, LEGACY_VARIANT)
+
+    context_bytes = [
+        len(bson.encode(await papers.find_one({"_id": i}, None if legacy else {"version": 1, "title": 1, "summary": 1, "pdf_url": 1, "content_hash": 1})))
+        for i in sample
+    ]
+    page_bytes = sum([len(bson.encode(d)) async for d in papers.find({}).sort("published_date", -1).limit(20)])
+    analysis_bytes = []
+    for paper_id in sample:
+        size = len(bson.encode(await papers.find_one({"_id": paper_id})))
+        if not legacy:
+            size += sum([len(bson.encode(a)) async for a in artifacts.find({"paper_id": paper_id})])
+        analysis_bytes.append(size)
+
+    return {
+        "arxiv_papers": await _collection_bytes(papers),
+        "paper_artifacts": await _collection_bytes(artifacts),
+        "chat_context": {**await _time(chat_context, sample), "bytes": round(statistics.mean(context_bytes))},
+        "latest_page": {**await _time(latest_page, sample[:50]), "bytes": page_bytes},
+        "cached_analysis": {**await _time(cached_analysis, sample), "bytes": round(statistics.mean(analysis_bytes))},
+    }
+
+def _report(layout: str, m: Dict[str, Any]) -> None:
+    p, a = m["arxiv_papers"], m["paper_artifacts"]
+    print(
+        f"[{layout:>9}] arxiv_papers {p['mib']} MiB (avg {p['avg_bytes']:,} B/doc) | paper_artifacts {a['mib']} MiB | "
+        f"chat context p50 {m['chat_context']['p50_ms']} ms, {m['chat_context']['bytes']:,} B | "
+        f"latest page p50 {m['latest_page']['p50_ms']} ms, {m['latest_page']['bytes'] / 1024:.0f} KiB | "
+        f"cached analysis p50 {m['cached_analysis']['p50_ms']} ms, {m['cached_analysis']['bytes']:,} B"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=20_000)
+    parser.add_argument("--analysed", type=float, default=0.3, help="Share of papers with an inline analysis.")
+    parser.add_argument("--stale", type=float, default=0.02, help="Share of analyses left stale by a new version.")
+    parser.add_argument("--sample", type=int, default=300, help="Papers timed per operation.")
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    backend = await init_offline_stores(args.mongo_uri, 8, DOCUMENT_MODELS)
+    failures: List[str] = []
+    try:
+        start = time.perf_counter()
+        expected = await seed_legacy(args.papers, args.analysed, args.stale)
+        print(f"Seeded {args.papers:,} papers ({len(expected):,} analyses, {backend}) in {time.perf_counter() - start:.0f}s")
+        sample = random.Random(1).sample(sorted(expected), min(args.sample, len(expected)))
+
+        before = await measure("inline", sample)
+        _report("inline", before)
+
+        start = time.perf_counter()
+        migrated = await move_analyses()
+        migrated["seconds"] = round(time.perf_counter() - start, 2)
+        print(
+            f"[migrate] {migrated['moved']:,} analyses moved, {migrated['dropped_stale']} stale dropped | "
+            f"{migrated['raw_bytes'] / 2**20:.1f} MiB -> {migrated['stored_bytes'] / 2**20:.1f} MiB zstd "
+            f"(x{migrated['raw_bytes'] / max(migrated['stored_bytes'], 1):.1f}) in {migrated['seconds']}s"
+        )
+
+        after = await measure("artifacts", sample)
+        _report("artifacts", after)
+        shrink = before["arxiv_papers"]["mib"] / max(after["arxiv_papers"]["mib"], 0.1)
+        print(f"[working set] arxiv_papers {before['arxiv_papers']['mib']} -> {after['arxiv_papers']['mib']} MiB (x{shrink:.1f} smaller)")
+
+        if migrated["moved"] != len(expected):
+            failures.append(f"{migrated['moved']} analyses moved, expected {len(expected)}")
+        if await ArxivPaper.find({"deep_analysis": {"$exists": True}}).count():
+            failures.append("some papers still carry deep_analysis")
+        for paper_id, text in expected.items():
+            if await load_artifact(await ArxivPaper.get(paper_id), ANALYSIS) != text:
+                failures.append(f"analysis of {paper_id} differs after the move")
+                break
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": {"inline": before, "migration": migrated, "artifacts": after},
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
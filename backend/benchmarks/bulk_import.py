@@ -0,0 +1,275 @@
+"""
+Throughput of the arXiv snapshot bulk importer (`src.jobs.import_snapshot`).
+
+A synthetic snapshot in the public JSON-lines format (gzip by default, with a
+share of non-cs records, multi-version papers and a few corrupt lines) is
+generated once, then:
+
+- read: `SnapshotReader` alone over the whole fixture with the `cs.*` filter
+  (decompress + pre-filter + JSON parse + mapping to `ArxivPaper`), in
+  lines/s and matched records/s, with peak RSS;
+- import: the full job (read + unordered bulk writes, + hashing embedder and
+  vector upserts with `--index`) on the first `--import-lines` lines, in
+  records/s. This stage uses a local MongoDB with `--mongo-uri`, otherwise the
+  in-memory stand-in, which is much slower than a real server and holds every
+  document in RAM (hence the smaller default). Its queries and updates scan
+  the whole collection, so throughput drops as it fills up, most with
+  `--index` (which rewrites neighbour lists): measure against a real server;
+- resume: the same import is cancelled halfway and started again, once
+  without and once with indexing. It must pick up from the checkpoint and end
+  with exactly the expected papers and, when indexing, one vector per paper
+  (batches written but not yet indexed at the interruption included).
+
+Exits with status 1 if a resumed import does not match a clean one.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_import --lines 2000000 --out bulk_import.json
+    python -m benchmarks.bulk_import --mongo-uri mongodb://localhost:27017 --import-lines 2000000
+"""
+import sys
+import gzip
+import shutil
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, Any
+
+from src.database import DOCUMENT_MODELS, get_vector_store
+from src.model import ArxivPaper, Author, ImportCheckpoint
+from src.processor import VectorProcessor
+from src.embeddings import HashingEmbeddingProvider
+from src.crawler.snapshot import SnapshotFilter, SnapshotReader
+from src.jobs.import_snapshot import import_snapshot
+from benchmarks._offline import WORDS, CATEGORIES, init_offline_stores, drop_offline_stores
+
+OTHER_CATEGORIES = ["math.OC", "stat.ML", "physics.optics", "hep-th", "q-bio.NC", "eess.SP", "astro-ph.GA"]
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def generate_snapshot(path: Path, lines: int, cs_share: float = 0.4, invalid: float = 0.0005, seed: int = 42) -> Dict[str, Any]:
+    """Writes a synthetic snapshot and returns the expected import counts per line prefix."""
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    opener = gzip.open(path, "wt", compresslevel=1, encoding="utf-8") if path.suffix == ".gz" else open(path, "w", encoding="utf-8")
+    matched = 0
+    with opener as f:
+        for i in range(lines):
+            if rng.random() < invalid:
+                f.write('{"id": "broken", "title": \n')
+                continue
+            created = start + timedelta(minutes=i * 3)
+            if rng.random() < cs_share:
+                categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+                matched += 1
+            else:
+                categories = rng.sample(OTHER_CATEGORIES, rng.randint(1, 2))
+            versions = [
+                {"version": f"v{v + 1}", "created": format_datetime(created + timedelta(days=30 * v), usegmt=True)}
+                for v in range(rng.choice((1, 1, 1, 2, 3)))
+            ]
+            authors = [[f"Surname{rng.randint(0, 50_000)}", f"Author{rng.randint(0, 900)}", ""] for _ in range(rng.randint(1, 6))]
+            record = {
+                "id": f"{created:%y%m}.{i % 100_000:05d}",
+                "submitter": " ".join(authors[0][1::-1]),
+                "authors": ", ".join(f"{a[1]} {a[0]}" for a in authors),
+                "title": " ".join(rng.choices(WORDS, k=rng.randint(6, 12))).capitalize(),
+                "comments": f"{rng.randint(4, 30)} pages",
+                "journal-ref": None,
+                "doi": None,
+                "report-no": None,
+                "categories": " ".join(categories),
+                "license": "http://arxiv.org/licenses/nonexclusive-distrib/1.0/",
+                "abstract": "  " + "\n".join(" ".join(rng.choices(WORDS, k=12)) for _ in range(rng.randint(8, 16))) + "\n",
+                "versions": versions,
+                "update_date": f"{created + timedelta(days=30 * (len(versions) - 1)):%Y-%m-%d}",
+                "authors_parsed": authors,
+            }
+            f.write(json.dumps(record) + "\n")
+    return {"lines": lines, "matched": matched}
+
+def _expected_papers(path: Path) -> int:
+    reader = SnapshotReader(path, SnapshotFilter(["cs.*"]))
+    ids = set()
+    try:
+        eof = False
+        while not eof:
+            papers, eof = reader.read_batch(10_000)
+            ids.update(p.id for p in papers)
+    finally:
+        reader.close()
+    return len(ids)
+
+def bench_read(path: Path) -> Dict[str, Any]:
+    reader = SnapshotReader(path, SnapshotFilter(["cs.*"]))
+    start = time.perf_counter()
+    try:
+        while True:
+            _, eof = reader.read_batch(1_000)
+            if eof:
+                break
+    finally:
+        reader.close()
+    seconds = time.perf_counter() - start
+    return {
+        **reader.stats,
+        "seconds": round(seconds, 2),
+        "lines_per_s": round(reader.stats["lines"] / seconds),
+        "matched_per_s": round(reader.stats["matched"] / seconds),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+def _head(source: Path, target: Path, lines: int) -> None:
+    with gzip.open(source, "rb") if source.suffix == ".gz" else open(source, "rb") as src, open(target, "wb") as dst:
+        for i, line in enumerate(src):
+            if i >= lines:
+                break
+            dst.write(line)
+
+async def bench_import(path: Path, args: argparse.Namespace) -> Dict[str, Any]:
+    processor = VectorProcessor(HashingEmbeddingProvider(args.dimension), batch_pause=0) if args.index else None
+    start = time.perf_counter()
+    stats = await import_snapshot(
+        path, SnapshotFilter(["cs.*"]), batch_size=args.batch_size, index=args.index, processor=processor,
+        rebuild_author_index=bool(args.mongo_uri)  # the stand-in lacks `$zip`
+    )
+    seconds = time.perf_counter() - start
+    return {
+        **stats,
+        "seconds": round(seconds, 2),
+        "lines_per_s": round(stats["lines"] / seconds),
+        "records_per_s": round(stats["matched"] / seconds),
+        "papers_in_db": await ArxivPaper.count(),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+async def _clear() -> None:
+    """Drops the imported papers, their vectors and the checkpoints."""
+    ids = [doc["_id"] for doc in await ArxivPaper.get_pymongo_collection().find({}, {"_id": 1}).to_list(None)]
+    if ids:
+        await get_vector_store().delete(ids)
+    for model in (ArxivPaper, Author, ImportCheckpoint):
+        await model.get_pymongo_collection().delete_many({})
+
+async def bench_resume(path: Path, args: argparse.Namespace, total_lines: int, index: bool) -> Dict[str, Any]:
+    snapshot_filter = SnapshotFilter(["cs.*"])
+    processor = VectorProcessor(HashingEmbeddingProvider(args.dimension), batch_pause=0) if index else None
+    options = {"batch_size": args.batch_size, "index": index, "processor": processor, "rebuild_author_index": bool(args.mongo_uri)}
+    task = asyncio.create_task(import_snapshot(path, snapshot_filter, **options))
+    while not task.done():
+        checkpoint = await ImportCheckpoint.get(path.name)
+        if checkpoint and checkpoint.stats.get("lines", 0) >= total_lines // 2:
+            break
+        await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    interrupted = await ImportCheckpoint.get(path.name)
+
+    stats = await import_snapshot(path, snapshot_filter, **options)
+    return {
+        "index": index,
+        "interrupted_at_lines": interrupted.stats.get("lines", 0),
+        "lines": stats["lines"],
+        "inserted": stats["inserted"],
+        "papers_in_db": await ArxivPaper.count(),
+        "vectors": await get_vector_store().count() if index else None,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=2_000_000, help="Lines of the generated snapshot.")
+    parser.add_argument("--import-lines", type=int, default=None,
+                        help="Lines imported end to end (default: all with --mongo-uri, 50000 on the stand-in).")
+    parser.add_argument("--plain", action="store_true", help="Generate an uncompressed fixture instead of gzip.")
+    parser.add_argument("--fixture", type=Path, default=None, help="Reuse (or keep) the fixture at this path.")
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    parser.add_argument("--index", action="store_true", help="Also embed (hashing embedder) and upsert vectors.")
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="arxiv_snapshot_"))
+    fixture = args.fixture or workdir / ("snapshot.jsonl" if args.plain else "snapshot.jsonl.gz")
+    if not fixture.exists():
+        start = time.perf_counter()
+        generate_snapshot(fixture, args.lines)
+        print(f"Generated {args.lines:,} lines ({fixture.stat().st_size / 2**20:.0f} MiB) in {time.perf_counter() - start:.0f}s: {fixture}")
+
+    # `ArxivPaper` needs Beanie initialised, even for the read-only stage.
+    backend = await init_offline_stores(args.mongo_uri, args.dimension, DOCUMENT_MODELS, vector_dir=str(workdir / "vectors"))
+    failures = []
+    try:
+        read = bench_read(fixture)
+        print(
+            f"[read] {read['lines']:,} lines, {read['matched']:,} matched, {read['invalid']} invalid in {read['seconds']}s | "
+            f"{read['lines_per_s']:,} lines/s, {read['matched_per_s']:,} records/s | peak RSS {read['peak_rss_mb']} MB"
+        )
+
+        import_lines = min(args.import_lines or (read["lines"] if args.mongo_uri else 50_000), read["lines"])
+        subset = fixture
+        if import_lines < read["lines"]:
+            subset = workdir / f"head_{import_lines}.jsonl"
+            _head(fixture, subset, import_lines)
+        expected = _expected_papers(subset)
+
+        imported = await bench_import(subset, args)
+        print(
+            f"[import, {backend}{', indexed' if args.index else ''}] {imported['lines']:,} lines -> "
+            f"{imported['inserted']:,} inserted, {imported['updated']:,} updated in {imported['seconds']}s | "
+            f"{imported['records_per_s']:,} records/s ({imported['lines_per_s']:,} lines/s) | peak RSS {imported['peak_rss_mb']} MB"
+        )
+        if imported["papers_in_db"] != expected:
+            failures.append(f"import stored {imported['papers_in_db']} papers, expected {expected}")
+
+        resumed = []
+        for index in (False, True):
+            await _clear()
+            run = await bench_resume(subset, args, import_lines, index)
+            resumed.append(run)
+            print(
+                f"[resume{', indexed' if index else ''}] interrupted after {run['interrupted_at_lines']:,} lines, "
+                f"resumed to {run['lines']:,} | {run['papers_in_db']:,} papers (expected {expected:,})"
+                + (f", {run['vectors']:,} vectors" if index else "")
+            )
+            if run["papers_in_db"] != expected or run["lines"] != import_lines:
+                failures.append(f"resumed import ended with {run['papers_in_db']} papers / {run['lines']} lines")
+            if index and run["vectors"] != run["papers_in_db"]:
+                failures.append(f"resumed indexed import left {run['papers_in_db'] - run['vectors']} papers without a vector")
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+        if subset != fixture:
+            subset.unlink()
+        if not args.fixture:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "fixture": {"lines": read["lines"], "bytes": fixture.stat().st_size, "gzip": fixture.suffix == ".gz"},
+                "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": {"read": read, "import": imported, "resume": resumed},
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,236 @@
+"""
+Cancellation and deadlines of `/chat/stream` with the fake models of
+`benchmarks/_fake_llm.py`, in-process through the ASGI app.
+
+Scenarios (each with `--sessions` concurrent chats on papers without a stored
+analysis):
+
+- analysis: `read_full_paper` waits for the whole analysis, then the model
+  answers (nobody disconnects);
+- answer: the client disconnects while the answer streams;
+- tool: the client disconnects while `read_full_paper` waits for the analysis;
+- tool_deadline: the analysis outlasts `READ_FULL_PAPER_TIMEOUT`; the tool
+  returns a partial result, the model still answers, and the analysis keeps
+  running and is stored;
+- turn_deadline: the answer outlasts `CHAT_TURN_TIMEOUT`; the client gets the
+  tokens streamed so far, then an `error` and `done`.
+
+For every scenario it reports how long after the last response ended (client
+disconnect or deadline) the model calls stopped, and checks that no model
+produced a token in the following `--quiet` seconds (the analyses of
+tool_deadline excepted). In every scenario the analysis model writes a marker
+word that must never reach the client: its tokens are not part of the answer.
+Exits with status 1 if work outlives the disconnect by more than `--max-stop`
+seconds or an expectation fails.
+
+Usage (from backend/):
+    python -m benchmarks.chat_cancel --sessions 20
+    python -m benchmarks.chat_cancel --mongo-uri mongodb://localhost:27017 --out chat_cancel.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.admission import ANALYSIS_ADMISSION, CHAT_ADMISSION
+from src.model import PaperArtifact
+from src.artifacts import ANALYSIS
+from src.database import DOCUMENT_MODELS
+from src.agent import graph, paper_processor, tools
+from src.utils.metrics import CHAT_TURNS, TOOL_TIMEOUTS
+from benchmarks._fake_llm import FakeStreamingChatModel
+from benchmarks._offline import init_offline_stores, drop_offline_stores
+from benchmarks.chat_load import stream_chat
+from benchmarks.chat_prefetch import seed_papers
+
+# Only word of the analysis model's output.
+ANALYSIS_MARKER = "PHÂN_TÍCH"
+
+def _events(body: bytes) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in body.splitlines() if line]
+
+async def _wait_idle(models: List[FakeStreamingChatModel], since: float, limit: float) -> Optional[float]:
+    """Seconds from `since` until no call of `models` is running (None if still busy after `limit`)."""
+    while time.perf_counter() - since < limit:
+        if not any(m.active_calls for m in models):
+            return time.perf_counter() - since
+        await asyncio.sleep(0.01)
+    return None
+
+async def run_scenario(
+        name: str,
+        chat: FakeStreamingChatModel,
+        analyst: FakeStreamingChatModel,
+        paper_ids: List[str],
+        abandon_after: Optional[float],
+        args: argparse.Namespace
+    ) -> Dict[str, Any]:
+    graph.set_chat_model(chat)
+    paper_processor.set_analysis_model(analyst)
+    bodies: Dict[str, bytearray] = {p: bytearray() for p in paper_ids}
+    turns = {o: CHAT_TURNS.value(outcome=o) for o in ("completed", "deadline", "cancelled", "error")}
+    timeouts = TOOL_TIMEOUTS.value(tool="read_full_paper")
+
+    async def session(paper_id: str):
+        result = await stream_chat(
+            paper_id, "Kết quả thực nghiệm chính của bài báo là gì?",
+            on_chunk=lambda _, chunk: bodies[paper_id].extend(chunk), client_id=f"cancel-{paper_id}",
+            abandon_after=abandon_after,
+        )
+        result["ended_at"] = time.perf_counter()
+        return result
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[session(p) for p in paper_ids])
+    last_end = max(r["ended_at"] for r in results)
+    # After a tool deadline the analyses keep running on purpose (see `read_full_paper`).
+    idle = [chat] if name == "tool_deadline" else [chat, analyst]
+    stop_s = await _wait_idle(idle, last_end, limit=args.max_stop * 5)
+
+    emitted = sum(m.tokens_emitted for m in idle)
+    await asyncio.sleep(args.quiet)
+    late_tokens = sum(m.tokens_emitted for m in idle) - emitted
+
+    events = {p: _events(bytes(b)) for p, b in bodies.items()}
+    outcome = {
+        "scenario": name,
+        "sessions": len(paper_ids),
+        "elapsed_s": round(last_end - start, 2),
+        "abandoned": sum(1 for r in results if "abandoned_at" in r),
+        "stop_after_s": round(stop_s, 3) if stop_s is not None else None,
+        "late_tokens": late_tokens,
+        "answered": sum(1 for e in events.values() if any(x["type"] == "token" for x in e)),
+        "analysis_tokens_streamed": sum(
+            x["text"].count(ANALYSIS_MARKER) for e in events.values() for x in e if x["type"] == "token"
+        ),
+        "errors": sum(1 for e in events.values() if any(x["type"] == "error" for x in e)),
+        "done": sum(1 for e in events.values() if e and e[-1]["type"] == "done"),
+        "turns": {o: int(CHAT_TURNS.value(outcome=o) - v) for o, v in turns.items()},
+        "tool_timeouts": int(TOOL_TIMEOUTS.value(tool="read_full_paper") - timeouts),
+        "analyses_stored": await PaperArtifact.find({"paper_id": {"$in": paper_ids}, "kind": ANALYSIS}).count(),
+        "analysis_permits_held": ANALYSIS_ADMISSION.in_flight,
+    }
+    return outcome
+
+def _check(r: Dict[str, Any], max_stop: float) -> List[str]:
+    problems = []
+    name, n = r["scenario"], r["sessions"]
+    if r["stop_after_s"] is None or r["stop_after_s"] > max_stop:
+        problems.append(f"{name}: model calls still running {r['stop_after_s'] or '> ' + str(max_stop * 5)}s after the last request ended")
+    if r["late_tokens"]:
+        problems.append(f"{name}: {r['late_tokens']} tokens generated after the requests ended")
+    if r["analysis_tokens_streamed"]:
+        problems.append(f"{name}: {r['analysis_tokens_streamed']} tokens of the PDF analysis streamed as the chat answer")
+    expected = {
+        "analysis": {"completed": n},
+        "answer": {"cancelled": n},
+        "tool": {"cancelled": n},
+        "tool_deadline": {"completed": n},
+        "turn_deadline": {"deadline": n},
+    }[name]
+    for outcome, count in expected.items():
+        if r["turns"][outcome] != count:
+            problems.append(f"{name}: {r['turns'][outcome]} turns {outcome}, expected {count}")
+    if name == "tool" and (r["analyses_stored"] or r["analysis_permits_held"]):
+        problems.append(f"tool: {r['analyses_stored']} abandoned analyses completed, {r['analysis_permits_held']} permits still held")
+    if name == "analysis" and (r["answered"] != n or r["analyses_stored"] != n):
+        problems.append(f"analysis: {r['answered']} answers, {r['analyses_stored']} analyses stored, expected {n}")
+    if name == "tool_deadline":
+        if r["tool_timeouts"] != n or r["answered"] != n:
+            problems.append(f"tool_deadline: {r['tool_timeouts']} tool timeouts, {r['answered']} answers, expected {n}")
+        if r["analyses_stored"] != n:
+            problems.append(f"tool_deadline: {r['analyses_stored']} analyses stored after the deadline, expected {n}")
+    if name == "turn_deadline" and (r["errors"] != n or r["done"] != n or r["answered"] != n):
+        problems.append(f"turn_deadline: {r['answered']} partial answers, {r['errors']} errors, {r['done']} done, expected {n}")
+    return problems
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent chats per scenario.")
+    parser.add_argument("--abandon-after", type=float, default=1.5, help="Seconds before the client disconnects.")
+    parser.add_argument("--analysis-seconds", type=float, default=6.0)
+    parser.add_argument("--tool-timeout", type=float, default=1.0, help="READ_FULL_PAPER_TIMEOUT for tool_deadline.")
+    parser.add_argument("--turn-timeout", type=float, default=2.0, help="CHAT_TURN_TIMEOUT for turn_deadline.")
+    parser.add_argument("--max-stop", type=float, default=1.0, help="Allowed seconds of work after a disconnect.")
+    parser.add_argument("--quiet", type=float, default=1.0, help="Seconds without any token required afterwards.")
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    # Cancellation is measured here, not admission control.
+    CHAT_ADMISSION.concurrency = CHAT_ADMISSION.queue_size = args.sessions
+    CHAT_ADMISSION.rate = 0
+    ANALYSIS_ADMISSION.concurrency = ANALYSIS_ADMISSION.queue_size = args.sessions
+
+    def answering(**kwargs) -> FakeStreamingChatModel:
+        # A long answer: 600 tokens at 50 tokens/s.
+        return FakeStreamingChatModel(**{"first_token_latency": 0.2, "tokens_per_second": 50, "answer_tokens": 600, "seed": 1, **kwargs})
+
+    def analysing(seconds: float) -> FakeStreamingChatModel:
+        return FakeStreamingChatModel(
+            first_token_latency=seconds, jitter=0.1, tokens_per_second=0, answer_tokens=200, seed=2, vocabulary=(ANALYSIS_MARKER,)
+        )
+
+    backend = await init_offline_stores(args.mongo_uri, 8, DOCUMENT_MODELS)
+    failures: List[str] = []
+    results = []
+    try:
+        scenarios = [
+            ("analysis", answering(tool_call_rate=1.0, answer_tokens=20), None),
+            ("answer", answering(), args.abandon_after),
+            ("tool", answering(tool_call_rate=1.0), args.abandon_after),
+            ("tool_deadline", answering(tool_call_rate=1.0, answer_tokens=20), None),
+            ("turn_deadline", answering(), None),
+        ]
+        paper_ids = await seed_papers(args.sessions * len(scenarios))
+        batches = [paper_ids[i * args.sessions:(i + 1) * args.sessions] for i in range(len(scenarios))]
+        for (name, chat, abandon_after), batch in zip(scenarios, batches):
+            tools.READ_FULL_PAPER_TIMEOUT = args.tool_timeout if name == "tool_deadline" else 90
+            graph.CHAT_TURN_TIMEOUT = args.turn_timeout if name == "turn_deadline" else 120
+            # The analysis scenario waits for whole analyses: keep them short.
+            analyst = analysing(args.analysis_seconds / 4 if name == "analysis" else args.analysis_seconds)
+            result = await run_scenario(name, chat, analyst, batch, abandon_after, args)
+            if name == "tool_deadline":
+                # The analyses outlive the tool deadline and finish in the background.
+                await _wait_idle([analyst], time.perf_counter(), limit=args.analysis_seconds * 3)
+                result["analyses_stored"] = await PaperArtifact.find({"paper_id": {"$in": batch}, "kind": ANALYSIS}).count()
+            results.append(result)
+            problems = _check(result, args.max_stop)
+            failures.extend(problems)
+            print(
+                f"[{name:>13}, {backend}] {result['sessions']} chats in {result['elapsed_s']}s | turns {result['turns']} | "
+                f"work stopped {result['stop_after_s']}s after the last response, {result['late_tokens']} late tokens | "
+                f"tool timeouts {result['tool_timeouts']}, analyses stored {result['analyses_stored']} | "
+                f"{'ok' if not problems else 'FAILED'}"
+            )
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }, indent=2, ensure_ascii=False))
+        print(f"Results written to {args.out}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,270 @@
+"""
+Concurrent `/chat/stream` load test against the FastAPI app, in-process.
+
+The Gemini models of `agent/graph.py` and `agent/paper_processor.py` are replaced
+by `FakeStreamingChatModel` (configurable latency, tokens/second and tool-call
+rate), papers are seeded with a stored analysis so `read_full_paper` never
+downloads a PDF, and the app is driven through raw ASGI calls so every body chunk
+is timestamped as the server emits it (no HTTP client buffering in between).
+
+For each concurrency level it reports:
+- TTFT: request start -> first body chunk carrying a `token` event;
+- inter-chunk gap: time between consecutive body chunks (NDJSON event batches) of a session;
+- total latency: request start -> end of the response;
+- event-loop lag measured by a 10 ms probe task;
+all as p50/p95/p99/max in milliseconds, plus completed sessions/second.
+
+Usage (from backend/):
+    python -m benchmarks.chat_load --concurrency 1 10 50 --sessions 100
+    python -m benchmarks.chat_load --tool-call-rate 0.5 --tokens-per-second 80 --out chat.json
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.main import app
+from src import admission
+from src.admission import CHAT_ADMISSION
+from src.model import ArxivPaper, PaperArtifact
+from src.artifacts import ANALYSIS, build_artifact
+from src.database import DOCUMENT_MODELS
+from src.agent import graph, paper_processor
+from benchmarks._fake_llm import FakeStreamingChatModel
+from benchmarks._offline import init_offline_stores, drop_offline_stores
+
+# Simulated sessions send their `X-Client-ID` with the secret, as the frontend does;
+# without one the backend keys every session on 127.0.0.1.
+if not admission.CLIENT_ID_SECRET:
+    admission.CLIENT_ID_SECRET = "offline-benchmark"
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {
+        "p50": round(pick(0.50) * 1000, 2),
+        "p95": round(pick(0.95) * 1000, 2),
+        "p99": round(pick(0.99) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+async def seed_papers(count: int) -> List[str]:
+    papers = [
+        ArxivPaper(
+            id=f"2401.{i:05d}",
+            title=f"Synthetic paper {i}",
+            author=[f"Author {i % 17}"],
+            arxiv_url=f"http://arxiv.org/abs/2401.{i:05d}",
+            pdf_url=f"http://arxiv.org/pdf/2401.{i:05d}",
+            published_date=datetime.now(timezone.utc),
+            updated_date=datetime.now(timezone.utc),
+            summary="A synthetic abstract used by the chat load test. " * 8,
+            prime_category="cs.CL",
+            categories=["cs.CL"],
+        )
+        for i in range(count)
+    ]
+    await ArxivPaper.insert_many(papers)
+    analysis = "# 1. Đóng góp cốt lõi\n- Phân tích tổng hợp dùng cho kiểm thử tải.\n" * 20
+    await PaperArtifact.insert_many([
+        build_artifact(p, ANALYSIS, paper_processor.analysis_variant(), analysis) for p in papers
+    ])
+    return [p.id for p in papers]
+
+async def stream_chat(
+        paper_id: str,
+        message: str,
+        on_chunk: Optional[Callable[[float, bytes], None]] = None,
+        client_id: Optional[str] = None,
+        abandon_after: Optional[float] = None
+    ) -> Dict[str, Any]:
+    """
+    Runs one `/chat/stream` request through the ASGI app and timestamps each body
+    chunk; `on_chunk(elapsed, body)` is called for every non-empty chunk.
+    `client_id` is sent as `X-Client-ID` (the admission rate-limit key), with
+    the `CLIENT_ID_SECRET` the frontend sends. With
+    `abandon_after`, the client disconnects that many seconds after the request
+    started (`result["abandoned_at"]`).
+    """
+    body = json.dumps({"paper_id": paper_id, "message": message, "history": []}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/chat/stream",
+        "raw_path": b"/chat/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                   + ([(b"x-client-id", client_id.encode())] if client_id else [])
+                   + ([(b"x-client-secret", admission.CLIENT_ID_SECRET.encode())] if client_id else []),
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent = False
+    disconnect = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    result = {"status": None, "chunks": [], "bytes": 0, "first_token": None}
+    start = time.perf_counter()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if chunk:
+                now = time.perf_counter() - start
+                result["chunks"].append(now)
+                result["bytes"] += len(chunk)
+                if result["first_token"] is None and b'"type":"token"' in chunk:
+                    result["first_token"] = now
+                if on_chunk:
+                    on_chunk(now, chunk)
+            if not message.get("more_body", False):
+                result["total"] = time.perf_counter() - start
+
+    def abandon():
+        result["abandoned_at"] = time.perf_counter() - start
+        disconnect.set()
+
+    timer = asyncio.get_running_loop().call_later(abandon_after, abandon) if abandon_after is not None else None
+    try:
+        await app(scope, receive, send)
+    finally:
+        if timer:
+            timer.cancel()
+        disconnect.set()
+    result.setdefault("total", time.perf_counter() - start)
+    return result
+
+async def _probe(lags: list, stop: asyncio.Event, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def run_level(concurrency: int, sessions: int, paper_ids: List[str]) -> Dict[str, Any]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(sessions):
+        queue.put_nowait(i)
+    results: List[Dict[str, Any]] = []
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            results.append(await stream_chat(
+                paper_ids[i % len(paper_ids)], f"Phương pháp của bài báo là gì? ({i})", client_id=f"session-{i}"
+            ))
+
+    lags: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    ok = [r for r in results if r["status"] == 200 and r["first_token"] is not None]
+    gaps = [b - a for r in ok for a, b in zip(r["chunks"], r["chunks"][1:])]
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "completed": len(ok),
+        "failed": len(results) - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(len(ok) / elapsed, 2),
+        "chunks_per_session": round(sum(len(r["chunks"]) for r in ok) / max(len(ok), 1), 1),
+        "ttft_ms": _percentiles([r["first_token"] for r in ok]),
+        "inter_chunk_gap_ms": _percentiles(gaps),
+        "total_ms": _percentiles([r["total"] for r in ok]),
+        "loop_lag_ms": _percentiles(lags),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--sessions", type=int, default=100, help="Chats per concurrency level.")
+    parser.add_argument("--papers", type=int, default=50, help="Seeded papers the chats are spread over.")
+    parser.add_argument("--first-token-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--tool-call-rate", type=float, default=0.3)
+    parser.add_argument("--tool", default="read_full_paper", choices=["read_full_paper", "web_search"])
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    fake = FakeStreamingChatModel(
+        first_token_latency=args.first_token_latency,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        tool_call_rate=args.tool_call_rate,
+        tool_name=args.tool,
+        seed=args.seed,
+    )
+    graph.set_chat_model(fake)
+    paper_processor.set_analysis_model(fake)
+    # Streaming is measured here, not admission control (see benchmarks/overload.py).
+    CHAT_ADMISSION.concurrency = max(args.concurrency)
+
+    backend = await init_offline_stores(args.mongo_uri, 8, DOCUMENT_MODELS)
+    try:
+        paper_ids = await seed_papers(args.papers)
+        levels = []
+        for concurrency in args.concurrency:
+            level = await run_level(concurrency, args.sessions, paper_ids)
+            levels.append(level)
+            print(
+                f"[c={concurrency:>4}, {backend}] {level['completed']}/{level['sessions']} ok, "
+                f"{level['sessions_per_s']} sessions/s | "
+                f"TTFT p50 {level['ttft_ms']['p50']} p99 {level['ttft_ms']['p99']} ms | "
+                f"gap p99 {level['inter_chunk_gap_ms']['p99']} ms | "
+                f"total p99 {level['total_ms']['p99']} ms | "
+                f"loop lag p99 {level['loop_lag_ms']['p99']} max {level['loop_lag_ms']['max']} ms"
+            )
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    if args.out:
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "model": fake.model_dump(exclude={"rng", "gate", "active_calls", "tokens_emitted"}),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": levels,
+        }
+        args.out.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
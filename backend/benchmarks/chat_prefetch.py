@@ -0,0 +1,204 @@
+"""
+Chat warm-up (`POST /papers/{id}/prepare`): how often the first deep question
+of a chat finds its analysis ready, and what that does to time-to-first-token.
+
+Chats open as a Poisson process (`--rate` per second), each on a paper nobody
+has asked about yet. A user reads the greeting and types for `--think` seconds
+(+-50%), then asks a question the (fake) chat model always answers by calling
+`read_full_paper`. With `prepare` on, the chat is warmed as the frontend does
+when "Chat" is clicked; with it off, the analysis starts with the question.
+
+The analysis model is a `FakeStreamingChatModel` taking `--analysis-seconds`;
+the extracted full text is seeded, so the PDF download/parse (which the
+warm-up hides as well) is not part of the timings. Analyses go through
+`ANALYSIS_ADMISSION` with its configured limits; a warm-up only starts one
+when a slot is free.
+
+For each think time and mode it reports the state the first deep questions
+found (`deep_question_cache_total`: warm = stored, in_flight = joined the
+running warm-up, cold = started by the question), chat context cache hits,
+analysis admissions rejected, warm-ups that found no free analysis slot
+(`busy`, not started), and TTFT p50/p95/p99.
+
+Usage (from backend/):
+    python -m benchmarks.chat_prefetch --think 1 3 6 --sessions 30
+    python -m benchmarks.chat_prefetch --analysis-seconds 8 --rate 0.2 --out prefetch.json
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.main import app
+from src.admission import ANALYSIS_ADMISSION, CHAT_ADMISSION, PREPARE_ADMISSION
+from src.model import ArxivPaper, PaperArtifact
+from src.artifacts import FULL_TEXT, FULL_TEXT_EXTRACTOR, build_artifact
+from src.database import DOCUMENT_MODELS
+from src.agent import graph, paper_processor
+from src.utils.metrics import DEEP_QUESTION_CACHE, PAPER_CONTEXT_CACHE, PAPER_PREPARE
+from benchmarks._fake_llm import FakeStreamingChatModel
+from benchmarks._offline import ZipfText, init_offline_stores, drop_offline_stores
+from benchmarks.chat_load import _percentiles, stream_chat
+
+STATES = ("warm", "in_flight", "cold")
+
+async def seed_papers(count: int, seed: int = 42) -> List[str]:
+    """Papers with their extracted full text stored, but no analysis."""
+    rng = random.Random(seed)
+    text = ZipfText(rng)
+    now = datetime.now(timezone.utc)
+    papers = [
+        ArxivPaper(
+            id=f"2402.{i:05d}",
+            title=text.sentence(6, 12),
+            author=[f"Author {i % 17}"],
+            arxiv_url=f"http://arxiv.org/abs/2402.{i:05d}",
+            pdf_url=f"http://arxiv.org/pdf/2402.{i:05d}",
+            published_date=now,
+            updated_date=now,
+            summary=" ".join(text.sentence() for _ in range(8)),
+            prime_category="cs.CL",
+            categories=["cs.CL"],
+        )
+        for i in range(count)
+    ]
+    await ArxivPaper.insert_many(papers)
+    await PaperArtifact.insert_many([
+        build_artifact(p, FULL_TEXT, FULL_TEXT_EXTRACTOR, " ".join(text.sentence() for _ in range(200))) for p in papers
+    ])
+    return [p.id for p in papers]
+
+def _counters() -> Dict[str, float]:
+    values = {state: DEEP_QUESTION_CACHE.value(state=state) for state in STATES}
+    values.update(context_hit=PAPER_CONTEXT_CACHE.value(result="hit"), context_miss=PAPER_CONTEXT_CACHE.value(result="miss"))
+    values["rejected"] = sum(ANALYSIS_ADMISSION.rejected.values())
+    values["prepare_busy"] = PAPER_PREPARE.value(analysis="busy")
+    return values
+
+async def run_level(
+        client: httpx.AsyncClient,
+        paper_ids: List[str],
+        think: float,
+        rate: float,
+        prepare: bool,
+        rng: random.Random
+    ) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    prepare_ms: List[float] = []
+
+    async def session(paper_id: str, delay: float):
+        await asyncio.sleep(delay)
+        if prepare:
+            start = time.perf_counter()
+            response = await client.post(f"/papers/{paper_id}/prepare")
+            prepare_ms.append(time.perf_counter() - start)
+            response.raise_for_status()
+        await asyncio.sleep(think * rng.uniform(0.5, 1.5))
+        results.append(await stream_chat(paper_id, "Hàm loss của bài báo là gì?", client_id=f"user-{paper_id}"))
+
+    before = _counters()
+    delays, at = [], 0.0
+    for _ in paper_ids:
+        delays.append(at)
+        at += rng.expovariate(rate)
+    start = time.perf_counter()
+    await asyncio.gather(*[session(p, d) for p, d in zip(paper_ids, delays)])
+    elapsed = time.perf_counter() - start
+    after = _counters()
+
+    delta = {k: after[k] - before[k] for k in after}
+    questions = sum(delta[s] for s in STATES)
+    lookups = delta["context_hit"] + delta["context_miss"]
+    ok = [r for r in results if r["status"] == 200 and r["first_token"] is not None]
+    return {
+        "think_s": think,
+        "prepare": prepare,
+        "sessions": len(paper_ids),
+        "completed": len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "deep_questions": int(questions),
+        **{f"{s}_share": round(delta[s] / max(questions, 1), 3) for s in STATES},
+        "context_cache_hit_rate": round(delta["context_hit"] / max(lookups, 1), 3),
+        "analyses_rejected": int(delta["rejected"]),
+        "prepare_busy": int(delta["prepare_busy"]) if prepare else None,
+        "prepare_ms": _percentiles(prepare_ms) if prepare else None,
+        "ttft_ms": _percentiles([r["first_token"] for r in ok]),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--think", type=float, nargs="+", default=[1.0, 3.0, 6.0], help="Mean seconds between opening a chat and asking.")
+    parser.add_argument("--sessions", type=int, default=30, help="Chats per think time and mode.")
+    parser.add_argument("--rate", type=float, default=1.0, help="Chats opened per second.")
+    parser.add_argument("--analysis-seconds", type=float, default=2.0, help="Duration of one deep analysis call.")
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    chat = FakeStreamingChatModel(
+        first_token_latency=args.first_token_latency, tokens_per_second=200, answer_tokens=40,
+        tool_call_rate=1.0, tool_name="read_full_paper", seed=args.seed,
+    )
+    analyst = FakeStreamingChatModel(
+        first_token_latency=args.analysis_seconds, jitter=0.3, tokens_per_second=0, answer_tokens=300, seed=args.seed,
+    )
+    graph.set_chat_model(chat)
+    paper_processor.set_analysis_model(analyst)
+    # Chat admission is measured in benchmarks/overload.py; analysis admission stays as configured.
+    CHAT_ADMISSION.concurrency = args.sessions
+    CHAT_ADMISSION.rate = 0
+    # Every simulated client shares 127.0.0.1.
+    PREPARE_ADMISSION.rate = 0
+
+    backend = await init_offline_stores(args.mongo_uri, 8, DOCUMENT_MODELS)
+    rng = random.Random(args.seed)
+    levels = []
+    try:
+        paper_ids = await seed_papers(args.sessions * len(args.think) * 2)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            for i, think in enumerate(args.think):
+                for j, prepare in enumerate((False, True)):
+                    offset = (i * 2 + j) * args.sessions
+                    level = await run_level(client, paper_ids[offset:offset + args.sessions], think, args.rate, prepare, rng)
+                    levels.append(level)
+                    print(
+                        f"[think {think:>4}s, prepare {'on ' if prepare else 'off'}, {backend}] "
+                        f"{level['completed']}/{level['sessions']} ok | first deep question: "
+                        f"warm {level['warm_share']:.0%}, in flight {level['in_flight_share']:.0%}, cold {level['cold_share']:.0%} | "
+                        f"context cache hits {level['context_cache_hit_rate']:.0%} | rejected {level['analyses_rejected']}, "
+                        f"warm-ups busy {level['prepare_busy'] or 0} | "
+                        f"TTFT p50 {level['ttft_ms']['p50']} p95 {level['ttft_ms']['p95']} ms"
+                    )
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "analysis_admission": {"concurrency": ANALYSIS_ADMISSION.concurrency, "queue_size": ANALYSIS_ADMISSION.queue_size},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": levels,
+        }, indent=2, ensure_ascii=False))
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Render cost of a long streamed chat answer, before and after the typed,
+coalesced `/chat/stream` protocol.
+
+One long answer (default 4,000 tokens) is streamed from `FakeStreamingChatModel`
+through the FastAPI app, and the client is replayed against the arrival times
+of the body chunks:
+
+- before: no server-side coalescing (one event per LLM chunk) and the
+  previous frontend consumer, which re-renders the whole accumulated markdown
+  on every chunk;
+- after: default coalescing window (`CHAT_COALESCE_MS`) and the throttled
+  consumer of `frontend/src/main.py` (one render per `--render-interval`, plus
+  a final one).
+
+The client is a single-threaded renderer: a render of `n` characters keeps it
+busy for `n * --render-us-per-char` microseconds, and chunks that arrive
+meanwhile wait (like a Streamlit script thread pushing a full markdown
+element to the browser). Reported per mode: body chunks, renders, characters
+re-rendered (the quadratic term), time spent rendering and end-to-end latency
+(request start -> final render done).
+
+Usage (from backend/):
+    python -m benchmarks.chat_render --answer-tokens 4000 --tokens-per-second 200 --out render.json
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.agent import graph, paper_processor, streaming
+from benchmarks._fake_llm import FakeStreamingChatModel
+from benchmarks._offline import init_offline_stores, drop_offline_stores
+from benchmarks.chat_load import DOCUMENT_MODELS, seed_papers, stream_chat
+
+def replay(arrivals: List[Tuple[float, str]], throttle: float, us_per_char: float) -> Dict[str, Any]:
+    """
+    Replays the token text received at each arrival time through a single-threaded
+    renderer; `throttle=0` renders on every chunk.
+    """
+    clock = 0.0
+    last_render = float("-inf")
+    text = ""
+    renders = rendered_chars = 0
+    busy = 0.0
+
+    def render(at: float, size: int) -> float:
+        nonlocal renders, rendered_chars, busy
+        cost = size * us_per_char / 1e6
+        renders += 1
+        rendered_chars += size
+        busy += cost
+        return at + cost
+
+    for arrival, delta in arrivals:
+        clock = max(clock, arrival)
+        text += delta
+        if clock - last_render >= throttle:
+            last_render = clock
+            clock = render(clock, len(text) + 1)
+    clock = render(clock, len(text))
+
+    return {
+        "renders": renders,
+        "rendered_kchars": round(rendered_chars / 1000, 1),
+        "render_busy_ms": round(busy * 1000, 1),
+        "end_to_end_ms": round(clock * 1000, 1),
+        "answer_chars": len(text),
+    }
+
+async def run_mode(paper_id: str, window: float, throttle: float, us_per_char: float) -> Dict[str, Any]:
+    streaming.COALESCE_WINDOW = window
+    arrivals: List[Tuple[float, str]] = []
+    buffer = b""
+
+    def on_chunk(elapsed: float, body: bytes):
+        nonlocal buffer
+        buffer += body
+        *lines, buffer = buffer.split(b"\n")
+        text = "".join(
+            event["text"] for event in map(json.loads, filter(None, lines)) if event["type"] == "token"
+        )
+        if text:
+            arrivals.append((elapsed, text))
+
+    result = await stream_chat(paper_id, "Giải thích chi tiết phương pháp của bài báo.", on_chunk)
+    return {
+        "coalesce_window_ms": round(window * 1000, 1),
+        "render_interval_ms": round(throttle * 1000, 1),
+        "body_chunks": len(result["chunks"]),
+        "stream_ms": round(result["total"] * 1000, 1),
+        **replay(arrivals, throttle, us_per_char),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answer-tokens", type=int, default=4000)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--render-interval", type=float, default=0.1, help="Throttle of the new consumer (s).")
+    parser.add_argument("--render-us-per-char", type=float, default=0.25, help="Simulated client render cost.")
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    fake = FakeStreamingChatModel(
+        first_token_latency=args.first_token_latency,
+        jitter=0.0,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        seed=args.seed,
+    )
+    graph.set_chat_model(fake)
+    paper_processor.set_analysis_model(fake)
+
+    default_window = streaming.COALESCE_WINDOW
+    await init_offline_stores(args.mongo_uri, 8, DOCUMENT_MODELS)
+    try:
+        paper_id = (await seed_papers(1))[0]
+        results = {
+            "before": await run_mode(paper_id, 0.0, 0.0, args.render_us_per_char),
+            "after": await run_mode(paper_id, default_window, args.render_interval, args.render_us_per_char),
+        }
+    finally:
+        streaming.COALESCE_WINDOW = default_window
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    for mode, r in results.items():
+        print(
+            f"[{mode:>6}] {r['body_chunks']} chunks | {r['renders']} renders | "
+            f"{r['rendered_kchars']}k chars re-rendered ({r['render_busy_ms']} ms busy) | "
+            f"stream {r['stream_ms']} ms | end-to-end {r['end_to_end_ms']} ms"
+        )
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "answer_tokens": args.answer_tokens,
+                "tokens_per_second": args.tokens_per_second,
+                "render_us_per_char": args.render_us_per_char,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+"""
+Round trip of the corpus archive (`src.jobs.corpus_archive`): export to Parquet,
+drop everything, restore, compare.
+
+A synthetic corpus of `--papers` papers (with `similar` lists, a share of deep
+analyses and of papers without a vector) is seeded into MongoDB (`--mongo-uri`,
+otherwise the in-memory stand-in) and the vector store (the embedded mmap store,
+or in-memory Qdrant with `--vector-backend qdrant`). The script reports export
+and restore throughput in papers/s, the file size per paper, and peak RSS, then
+checks that every document and vector came back and that exactly the papers
+restored with a vector are stamped `indexed_at`. Exits with status 1 on any
+mismatch.
+
+Usage (from backend/):
+    python -m benchmarks.corpus_archive --papers 100000
+    python -m benchmarks.corpus_archive --mongo-uri mongodb://localhost:27017 --papers 1000000 --out archive.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import shutil
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+
+import numpy as np
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.database import DOCUMENT_MODELS, get_vector_store
+from src.model import ArxivPaper, PaperArtifact
+from src.artifacts import ANALYSIS, build_artifact, decompress
+from src.processor import paper_payload
+from src.interfaces.interfaces import VectorRecord
+from src.jobs import corpus_archive
+from src.jobs.corpus_archive import export_corpus, restore_corpus
+from benchmarks._offline import WORDS, CATEGORIES, init_offline_stores, drop_offline_stores
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+async def seed(count: int, dimension: int, analysed: float, without_vector: float, seed: int = 42) -> List[str]:
+    """Inserts the synthetic corpus and returns the paper IDs."""
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    collection = ArxivPaper.get_pymongo_collection()
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    ids: List[str] = []
+    for offset in range(0, count, 5_000):
+        papers = []
+        for i in range(offset, min(count, offset + 5_000)):
+            published = start + timedelta(minutes=i)
+            categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+            papers.append(ArxivPaper(
+                id=f"{published:%y%m}.{i:05d}",
+                version=rng.choice((1, 1, 2)),
+                title=" ".join(rng.choices(WORDS, k=rng.randint(6, 12))).capitalize(),
+                author=[f"Author{rng.randint(0, 900)} Surname{rng.randint(0, 50_000)}" for _ in range(rng.randint(1, 6))],
+                arxiv_url=f"http://arxiv.org/abs/{published:%y%m}.{i:05d}v1",
+                pdf_url=f"http://arxiv.org/pdf/{published:%y%m}.{i:05d}v1",
+                published_date=published,
+                updated_date=published + timedelta(days=rng.randint(0, 60)),
+                summary=" ".join(rng.choices(WORDS, k=rng.randint(120, 220))),
+                prime_category=categories[0],
+                categories=categories,
+                similar=[
+                    {"paper_id": f"{published:%y%m}.{rng.randint(0, count):05d}", "title": "Neighbour", "score": round(rng.random(), 4)}
+                    for _ in range(10)
+                ],
+                similar_updated_at=published,
+            ))
+        await collection.insert_many([_document(p) for p in papers])
+        analyses = [
+            build_artifact(p, ANALYSIS, "prompt-1:bench", "# 1. Đóng góp cốt lõi\n" + " ".join(rng.choices(WORDS, k=600)))
+            for p in papers if rng.random() < analysed
+        ]
+        if analyses:
+            await PaperArtifact.insert_many(analyses)
+        ids.extend(p.id for p in papers)
+        vectors = np_rng.standard_normal((len(papers), dimension)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        await get_vector_store().upsert([
+            VectorRecord(id=p.id, vector=v.tolist(), payload=paper_payload(p))
+            for p, v in zip(papers, vectors) if rng.random() >= without_vector
+        ])
+    return ids
+
+def _document(paper: ArxivPaper) -> Dict[str, Any]:
+    doc = paper.model_dump(by_alias=True)
+    doc["crawled_at"] = datetime.combine(doc["crawled_at"], datetime.min.time())
+    return doc
+
+async def snapshot_state(ids: List[str]) -> Dict[str, Any]:
+    docs = {doc["_id"]: doc async for doc in ArxivPaper.get_pymongo_collection().find({"_id": {"$in": ids}})}
+    analyses = {
+        a["paper_id"]: (a["variant"], decompress(a["data"]))
+        async for a in PaperArtifact.get_pymongo_collection().find({"paper_id": {"$in": ids}})
+    }
+    return {"docs": docs, "analyses": analyses, "vectors": await get_vector_store().retrieve(ids)}
+
+def _compare(before: Dict[str, Any], after: Dict[str, Any], atol: float) -> List[str]:
+    problems = []
+    for paper_id, doc in before["docs"].items():
+        restored = after["docs"].get(paper_id)
+        if restored is None:
+            problems.append(f"{paper_id} missing after restore")
+            continue
+        for key, value in doc.items():
+            if key == "indexed_at":
+                continue  # stamped by the restore itself, checked in `main`
+            other = restored.get(key)
+            if isinstance(value, datetime):
+                same = other is not None and value.replace(tzinfo=None) == other.replace(tzinfo=None)
+            else:
+                same = value == other
+            if not same:
+                problems.append(f"{paper_id}.{key}: {value!r} != {other!r}")
+    if before["analyses"] != after["analyses"]:
+        problems.append(f"{len(before['analyses'])} analyses before, {len(after['analyses'])} after (or different texts)")
+    if set(before["vectors"]) != set(after["vectors"]):
+        problems.append(f"{len(before['vectors'])} vectors before, {len(after['vectors'])} after")
+    for paper_id, vector in before["vectors"].items():
+        if paper_id in after["vectors"] and not np.allclose(vector, after["vectors"][paper_id], atol=atol):
+            problems.append(f"{paper_id}: vector differs")
+    return problems
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--analysed", type=float, default=0.05, help="Share of papers with a deep analysis.")
+    parser.add_argument("--without-vector", type=float, default=0.01, help="Share of papers without a vector.")
+    parser.add_argument("--vector-backend", choices=["mmap", "qdrant"], default="mmap")
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--row-group-size", type=int, default=corpus_archive.ROW_GROUP_SIZE)
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--sample", type=int, default=2_000, help="Papers compared field by field after the restore.")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    # The restore checks the archive's dimension against the configured provider.
+    os.environ["EMBEDDING_PROVIDER"] = "local"
+    os.environ["EMBEDDING_DIMENSION"] = str(args.dimension)
+
+    workdir = Path(tempfile.mkdtemp(prefix="arxiv_archive_"))
+    vector_dir = str(workdir / "vectors") if args.vector_backend == "mmap" else None
+    backend = await init_offline_stores(args.mongo_uri, args.dimension, DOCUMENT_MODELS, vector_dir=vector_dir)
+    path = workdir / "corpus.parquet"
+    failures: List[str] = []
+    try:
+        start = time.perf_counter()
+        ids = await seed(args.papers, args.dimension, args.analysed, args.without_vector)
+        print(f"Seeded {args.papers:,} papers ({backend}, {args.vector_backend}) in {time.perf_counter() - start:.0f}s")
+        sample_ids = random.Random(1).sample(ids, min(args.sample, len(ids)))
+        before = await snapshot_state(sample_ids)
+
+        start = time.perf_counter()
+        exported = await export_corpus(path, row_group_size=args.row_group_size, compression=args.compression)
+        export_seconds = time.perf_counter() - start
+        exported.update({
+            "seconds": round(export_seconds, 2),
+            "papers_per_s": round(exported["papers"] / export_seconds),
+            "bytes_per_paper": round(exported["bytes"] / max(exported["papers"], 1)),
+            "peak_rss_mb": _peak_rss_mb(),
+        })
+        print(
+            f"[export] {exported['papers']:,} papers, {exported['vectors']:,} vectors -> {exported['bytes'] / 2**20:.1f} MiB "
+            f"({exported['bytes_per_paper']:,} B/paper, {args.compression}) in {exported['seconds']}s | "
+            f"{exported['papers_per_s']:,} papers/s | peak RSS {exported['peak_rss_mb']} MB"
+        )
+
+        await drop_offline_stores(DOCUMENT_MODELS)
+        await init_offline_stores(args.mongo_uri, args.dimension, DOCUMENT_MODELS, vector_dir=vector_dir)
+
+        start = time.perf_counter()
+        restored = await restore_corpus(path, rebuild_author_index=bool(args.mongo_uri))  # the stand-in lacks `$zip`
+        restore_seconds = time.perf_counter() - start
+        restored.update({
+            "seconds": round(restore_seconds, 2),
+            "papers_per_s": round(restored["papers"] / restore_seconds),
+            "peak_rss_mb": _peak_rss_mb(),
+        })
+        print(
+            f"[restore] {restored['papers']:,} papers ({restored['inserted']:,} inserted), {restored['vectors']:,} vectors "
+            f"in {restored['seconds']}s | {restored['papers_per_s']:,} papers/s | peak RSS {restored['peak_rss_mb']} MB"
+        )
+
+        after = await snapshot_state(sample_ids)
+        if await ArxivPaper.count() != args.papers:
+            failures.append(f"{await ArxivPaper.count()} papers after restore, expected {args.papers}")
+        if await get_vector_store().count() != exported["vectors"]:
+            failures.append(f"{await get_vector_store().count()} vectors after restore, expected {exported['vectors']}")
+        indexed = await ArxivPaper.find({"indexed_at": {"$ne": None}}).count()
+        if indexed != exported["vectors"]:
+            failures.append(f"{indexed} papers stamped indexed after restore, expected {exported['vectors']}")
+        problems = _compare(before, after, atol=1e-6)
+        failures.extend(problems[:10])
+        print(f"[compare] {len(sample_ids):,} sampled papers: {'identical' if not problems else f'{len(problems)} differences'}")
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": {"export": exported, "restore": restored},
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+"""
+Offline end-to-end ingest benchmark: crawl -> save -> embed -> upsert.
+
+Everything runs locally: a synthetic arXiv Atom feed served on localhost, the
+local hashing embedder from `src.embeddings`, Qdrant in in-memory mode (or the
+embedded mmap store with `--vector-backend mmap`) and either a local MongoDB
+(`--mongo-uri`) or the in-memory mongomock stand-in. For each corpus size the
+stages are timed separately (embedding and upsert are split using the pipeline
+histograms from `src.utils.metrics`) and reported as papers/second together with
+the process peak RSS.
+
+Usage (from backend/):
+    python -m benchmarks.ingest --sizes 100 1000 5000 --out results.json
+    python -m benchmarks.ingest --compare baseline.json --tolerance 0.15
+
+`--compare` exits with status 1 when any stage is slower than the baseline by
+more than the tolerance.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List
+
+from src.database import DOCUMENT_MODELS
+from src.crawler.scraper import ArxivScraper
+from src.processor import VectorProcessor
+from src.utils import metrics
+from src.embeddings import HashingEmbeddingProvider
+from benchmarks._offline import SyntheticArxivFeed, FeedServer, init_offline_stores, drop_offline_stores
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _stage(papers: int, seconds: float) -> Dict[str, Any]:
+    return {
+        "seconds": round(seconds, 4),
+        "papers_per_s": round(papers / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+async def run_size(size: int, mongo_uri: str, dimension: int, batch_size: int, vector_backend: str) -> Dict[str, Any]:
+    feed = SyntheticArxivFeed(size)
+    vector_dir = tempfile.mkdtemp(prefix="arxiv_bench_vectors_") if vector_backend == "mmap" else None
+    backend = await init_offline_stores(mongo_uri, dimension, DOCUMENT_MODELS, vector_dir=vector_dir)
+    provider = HashingEmbeddingProvider(dimension)
+    embed_before = metrics.EMBEDDING_BATCH_SECONDS.total(provider=provider.name)
+    upsert_before = metrics.QDRANT_UPSERT_SECONDS.total()
+
+    try:
+        with FeedServer(feed) as server:
+            scraper = ArxivScraper(api_url=server.query_url_format, delay_seconds=0)
+            start = time.perf_counter()
+            papers = await asyncio.to_thread(scraper.get_paper, topics=[], days_back=3650, max_results=size)
+            crawl = time.perf_counter() - start
+
+        start = time.perf_counter()
+        to_index = await scraper.save_to_db(papers)
+        save = time.perf_counter() - start
+
+        processor = VectorProcessor(provider=provider, batch_size=batch_size, batch_pause=0)
+        start = time.perf_counter()
+        await processor.process_and_index(to_index)
+        index = time.perf_counter() - start
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    embed = metrics.EMBEDDING_BATCH_SECONDS.total(provider=provider.name) - embed_before
+    upsert = metrics.QDRANT_UPSERT_SECONDS.total() - upsert_before
+    total = crawl + save + index
+    return {
+        "size": size,
+        "papers": len(papers),
+        "mongo": backend,
+        "vectors": vector_backend,
+        "stages": {
+            "crawl": _stage(len(papers), crawl),
+            "save": _stage(len(papers), save),
+            "embed": _stage(len(to_index), embed),
+            "upsert": _stage(len(to_index), upsert),
+            "index_total": _stage(len(to_index), index),
+            "end_to_end": _stage(len(papers), total),
+        },
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Returns one message per stage whose throughput regressed beyond `tolerance`."""
+    regressions = []
+    base_by_size = {r["size"]: r for r in baseline["results"]}
+    for result in current["results"]:
+        base = base_by_size.get(result["size"])
+        if not base:
+            continue
+        for stage, values in result["stages"].items():
+            now, before = values.get("papers_per_s"), base["stages"].get(stage, {}).get("papers_per_s")
+            if not now or not before:
+                continue
+            change = now / before - 1
+            if change < -tolerance:
+                regressions.append(f"size={result['size']} {stage}: {before} -> {now} papers/s ({change:+.1%})")
+    return regressions
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--vector-backend", choices=["qdrant", "mmap"], default="qdrant",
+                        help="In-memory Qdrant or the embedded mmap store (in a temp dir).")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per size; the fastest time of each stage is kept.")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative throughput drop.")
+    args = parser.parse_args()
+
+    metrics.set_metrics_enabled(True)
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "dimension": args.dimension,
+            "batch_size": args.batch_size,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": [],
+    }
+    for size in args.sizes:
+        runs = [await run_size(size, args.mongo_uri, args.dimension, args.batch_size, args.vector_backend) for _ in range(max(args.repeat, 1))]
+        result = runs[0]
+        for stage in result["stages"]:
+            result["stages"][stage] = min((r["stages"][stage] for r in runs), key=lambda v: v["seconds"])
+        results["results"].append(result)
+        line = " | ".join(f"{k} {v['papers_per_s']}/s" for k, v in result["stages"].items())
+        print(f"[{size:>6} papers, {result['mongo']}/{result['vectors']}] {line} | peak RSS {result['stages']['end_to_end']['peak_rss_mb']} MB")
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for r in regressions:
+                print(f"  - {r}")
+            sys.exit(1)
+        print("✅ No regression against baseline.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Micro-benchmark: event-loop latency under heavy logging.
+
+Runs producers that log in a tight async loop while a probe task measures how
+late `asyncio.sleep(1ms)` wakes up. Three configurations are compared:
+    - sync:    the former setup (RotatingFileHandler + StreamHandler on the root
+               logger, I/O done inline on the event loop);
+    - queue:   `setup_logging()` (QueueHandler -> QueueListener thread);
+    - sampled: `setup_logging()` with the hot-loop records going through `LogSampler`.
+
+Console output is redirected to a temporary file so the terminal is not the
+bottleneck; `--stall-ms` makes every `--stall-every`-th console write block
+(time.sleep) to model a back-pressured stdout pipe or a slow disk, which is
+where inline logging I/O hurts the event loop the most.
+
+Usage (from backend/):
+    python -m benchmarks.logging_latency [--records 100000] [--producers 8] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from logging.handlers import RotatingFileHandler
+
+from src.utils import log_config
+from src.utils.log_config import setup_logging, shutdown_logging, LogSampler
+
+class _StallingStream:
+    """File wrapper whose writes periodically block, like a full pipe buffer."""
+    def __init__(self, stream, stall_ms: float, every: int):
+        self.stream = stream
+        self.stall = stall_ms / 1000
+        self.every = max(every, 1)
+        self.writes = 0
+
+    def write(self, data: str) -> int:
+        self.writes += 1
+        if self.stall and self.writes % self.every == 0:
+            time.sleep(self.stall)
+        return self.stream.write(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+def _configure_sync(log_dir: Path, stream) -> None:
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+    root_logger.handlers = []
+    file_handler = RotatingFileHandler(log_dir / "app.log", maxBytes=5_000_000, backupCount=3, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(filename)s:%(lineno)d - %(asctime)s - %(message)s"))
+    file_handler.setLevel(logging.INFO)
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(logging.Formatter("%(levelname)s: [%(name)s] %(message)s"))
+    stream_handler.setLevel(logging.DEBUG)
+    root_logger.addHandler(file_handler)
+    root_logger.addHandler(stream_handler)
+
+def _configure_queue(log_dir: Path, stream) -> None:
+    os.environ["LOG_DIR"] = str(log_dir)
+    os.environ["LOG_LEVEL"] = "DEBUG"
+    original_stdout = sys.stdout
+    sys.stdout = stream
+    try:
+        setup_logging()
+    finally:
+        sys.stdout = original_stdout
+
+async def _probe(lags: list, stop: asyncio.Event, interval: float = 0.001) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def _producer(logger: logging.Logger, sampler: LogSampler, count: int, producer_id: int) -> None:
+    for i in range(count):
+        if sampler:
+            sampler.debug("hot", "producer %d record %d", producer_id, i)
+        else:
+            logger.debug("producer %d record %d", producer_id, i)
+        if i % 10 == 0:
+            logger.info("producer %d reached %d", producer_id, i)
+        await asyncio.sleep(0)
+
+async def _run(mode: str, records: int, producers: int) -> dict:
+    logger = logging.getLogger("bench")
+    sampler = LogSampler(logger, interval=0.05) if mode == "sampled" else None
+    lags: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+
+    start = time.perf_counter()
+    per_producer = records // producers
+    await asyncio.gather(*[_producer(logger, sampler, per_producer, p) for p in range(producers)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    lags_ms = sorted(l * 1000 for l in lags) or [0.0]
+    return {
+        "mode": mode,
+        "records": per_producer * producers,
+        "elapsed_s": round(elapsed, 3),
+        "records_per_s": round(per_producer * producers / elapsed),
+        "loop_lag_ms": {
+            "p50": round(statistics.median(lags_ms), 3),
+            "p99": round(lags_ms[int(len(lags_ms) * 0.99) - 1], 3),
+            "max": round(lags_ms[-1], 3),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--stall-ms", type=float, default=2.0, help="Blocking time of a stalled console write.")
+    parser.add_argument("--stall-every", type=int, default=200, help="Stall one console write out of N.")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this file.")
+    args = parser.parse_args()
+
+    results = []
+    print(f"records={args.records} producers={args.producers} stall={args.stall_ms}ms every {args.stall_every} writes")
+    for mode in ("sync", "queue", "sampled"):
+        with tempfile.TemporaryDirectory() as tmp, open(Path(tmp) / "console.log", "w") as console_file:
+            console = _StallingStream(console_file, args.stall_ms, args.stall_every)
+            if mode == "sync":
+                _configure_sync(Path(tmp), console)
+            else:
+                _configure_queue(Path(tmp), console)
+            results.append(asyncio.run(_run(mode, args.records, args.producers)))
+            shutdown_logging()
+            logging.getLogger().handlers = []
+
+    for r in results:
+        lag = r["loop_lag_ms"]
+        print(f"{r['mode']:>8}: {r['records_per_s']:>9} rec/s | loop lag p50 {lag['p50']:.3f} ms "
+              f"p99 {lag['p99']:.3f} ms max {lag['max']:.3f} ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Scaling benchmark of the embedded mmap vector store (`src.mmap_store`).
+
+For each size it bulk-loads random normalised vectors with category/date
+payloads, then reports append throughput, single-query and batched search
+latency (unfiltered and with a category + date prefilter), recall@k against
+exact search on the loaded vectors, compaction time after deleting a third of
+the rows, on-disk size and peak RSS.
+
+BLAS is pinned to one thread unless OPENBLAS_NUM_THREADS / OMP_NUM_THREADS /
+MKL_NUM_THREADS are already set, to measure the single-core case.
+
+Usage (from backend/):
+    python -m benchmarks.mmap_store --sizes 100000 1000000 --dimension 384 --out mmap.json
+"""
+import os
+
+for _var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+
+import numpy as np
+
+from src.mmap_store import MmapVectorStore
+from src.interfaces.interfaces import VectorRecord, VectorFilter
+
+CATEGORIES = ["cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.IR", "cs.RO", "cs.CR", "cs.DB"]
+LOAD_BATCH = 10_000
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(s * 1000 for s in samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p99": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+    }
+
+def _dir_size_mb(path: Path) -> float:
+    return round(sum(f.stat().st_size for f in path.iterdir()) / 2**20, 1)
+
+async def run_size(size: int, dimension: int, queries: int, k: int, seed: int) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc)
+    path = Path(tempfile.mkdtemp(prefix="mmap_store_bench_"))
+    store = MmapVectorStore(str(path), dimension)
+    exact = np.empty((size, dimension), dtype=np.float32)
+
+    try:
+        start = time.perf_counter()
+        for offset in range(0, size, LOAD_BATCH):
+            n = min(LOAD_BATCH, size - offset)
+            vectors = rng.standard_normal((n, dimension)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            exact[offset:offset + n] = vectors
+            await store.upsert([
+                VectorRecord(id=f"p{offset + i}", vector=vectors[i].tolist(), payload={
+                    "title": f"paper {offset + i}",
+                    "category": CATEGORIES[(offset + i) % len(CATEGORIES)],
+                    "published_date": (now - timedelta(hours=offset + i)).isoformat(),
+                })
+                for i in range(n)
+            ])
+        load = time.perf_counter() - start
+
+        query = exact[rng.integers(0, size, queries)] + 0.5 * rng.standard_normal((queries, dimension)).astype(np.float32)
+        query /= np.linalg.norm(query, axis=1, keepdims=True)
+
+        single, hits = [], 0
+        for q in query:
+            t = time.perf_counter()
+            result = await store.search_batch([q.tolist()], k)
+            single.append(time.perf_counter() - t)
+            expected = {f"p{i}" for i in np.argpartition(-(exact @ q), k)[:k]}
+            hits += len({h.id for h in result[0]} & expected)
+
+        batch_size = 16
+        batched = []
+        for i in range(0, queries, batch_size):
+            t = time.perf_counter()
+            await store.search_batch(query[i:i + batch_size].tolist(), k)
+            batched.append((time.perf_counter() - t) / len(query[i:i + batch_size]))
+
+        recent = VectorFilter(category="cs.CL", published_after=now - timedelta(hours=size // 4))
+        filtered = []
+        for q in query:
+            t = time.perf_counter()
+            await store.search_batch([q.tolist()], k, recent)
+            filtered.append(time.perf_counter() - t)
+
+        disk = _dir_size_mb(path)
+        await store.delete([f"p{i}" for i in range(0, size, 3)])
+        start = time.perf_counter()
+        await store.compact()
+        compact = time.perf_counter() - start
+    finally:
+        store.close()
+        shutil.rmtree(path, ignore_errors=True)
+
+    return {
+        "size": size,
+        "load_vectors_per_s": round(size / load),
+        "search_ms": _latency(single),
+        "search_batched_ms_per_query": _latency(batched),
+        "search_filtered_ms": _latency(filtered),
+        f"recall_at_{k}": round(hits / (queries * k), 4),
+        "compact_s": round(compact, 2),
+        "disk_mb": disk,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        r = await run_size(size, args.dimension, args.queries, args.k, args.seed)
+        results.append(r)
+        print(
+            f"[{size:>8} x {args.dimension}] load {r['load_vectors_per_s']}/s | "
+            f"search p50 {r['search_ms']['p50']} p99 {r['search_ms']['p99']} ms | "
+            f"batched p50 {r['search_batched_ms_per_query']['p50']} ms/q | "
+            f"filtered p50 {r['search_filtered_ms']['p50']} ms | recall@{args.k} {r[f'recall_at_{args.k}']} | "
+            f"compact {r['compact_s']}s | disk {r['disk_mb']} MB | peak RSS {r['peak_rss_mb']} MB"
+        )
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "numpy": np.__version__,
+                "blas_threads": os.environ.get("OPENBLAS_NUM_THREADS"),
+                "dimension": args.dimension,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,233 @@
+"""
+Exactly-once check of the scheduled crawl across several workers (`src.cluster`).
+
+N workers campaign for the scheduler lease and run a fake crawl job every
+`--interval` seconds (slots aligned like production). Each execution of the job
+is recorded with its worker and start/end time. After `--kill-after` seconds
+the current leader is killed without releasing its lease (SIGKILL for worker
+processes), and the time until another worker holds the lease is measured.
+
+At the end it verifies that:
+- every complete slot has exactly one `done` run in `crawl_runs` (a new leader
+  runs the current slot, so `--interval` must exceed the failover time);
+- no slot was executed twice, except a slot the killed leader was running,
+  which is taken over once by the next leader (and marked `attempts: 2`);
+- no two executions overlapped in time (one leader at a time);
+- failover took at most `lease * 4/3` plus a small margin.
+
+With `--mongo-uri` the workers are separate processes on a real MongoDB, as in
+production. Without it they are asyncio tasks sharing the in-memory
+`mongomock_motor` stand-in (same election/claim logic, no real concurrency).
+Exits with status 1 if a check fails.
+
+`tests/test_multi_worker.py` runs the process mode when `MONGO_URI` is set.
+
+Usage (from backend/):
+    python -m benchmarks.multi_worker --mongo-uri mongodb://localhost:27017 --workers 4 --duration 30
+    python -m benchmarks.multi_worker --workers 4 --duration 30 --out workers.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+from beanie import init_beanie
+
+from src import cluster
+from src.cluster import ClusterMember, LeaderElector, PeriodicJob
+from src.database import DOCUMENT_MODELS
+from src.model import Lease, CrawlRun
+from benchmarks._offline import _patch_mongomock
+
+EXECUTIONS = "bench_executions"
+
+def _job(worker_id: str, interval: float, crawl_seconds: float, db) -> PeriodicJob:
+    async def fake_crawl() -> Dict[str, Any]:
+        started = datetime.now(timezone.utc)
+        await asyncio.sleep(crawl_seconds)
+        await db[EXECUTIONS].insert_one({"worker": worker_id, "started": started, "ended": datetime.now(timezone.utc)})
+        return {"worker": worker_id}
+    return PeriodicJob("crawl", timedelta(seconds=interval), fake_crawl)
+
+async def _worker(db, index: int, args: argparse.Namespace) -> ClusterMember:
+    worker_id = f"worker-{index}:{os.getpid()}"
+    member = ClusterMember(
+        [_job(worker_id, args.interval, args.crawl_seconds, db)],
+        elector=LeaderElector(worker_id=worker_id, lease_seconds=args.lease)
+    )
+    member.start()
+    return member
+
+def _process_main(mongo_uri: str, db_name: str, index: int, args: argparse.Namespace) -> None:
+    async def run():
+        from pymongo import AsyncMongoClient
+        db = AsyncMongoClient(mongo_uri)[db_name]
+        await init_beanie(database=db, document_models=DOCUMENT_MODELS)
+        await _worker(db, index, args)
+        await asyncio.Event().wait()
+    asyncio.run(run())
+
+async def _wait_for_new_leader(previous: Optional[str], timeout: float) -> Optional[float]:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        lease = await Lease.get_pymongo_collection().find_one({"_id": "scheduler"})
+        if lease and lease["holder"] != previous and lease["expires_at"].replace(tzinfo=timezone.utc) > datetime.now(timezone.utc):
+            return time.perf_counter() - start
+        await asyncio.sleep(0.05)
+    return None
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    cluster.GENERATION_POLL_SECONDS = 0.5
+    if args.mongo_uri:
+        from pymongo import AsyncMongoClient
+        db_name = f"arxiv_workers_{random.randint(0, 1_000_000)}"
+        db = AsyncMongoClient(args.mongo_uri)[db_name]
+        backend = "mongodb"
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        _patch_mongomock()
+        db = AsyncMongoMockClient()["arxiv_workers"]
+        backend = "mongomock"
+    await init_beanie(database=db, document_models=DOCUMENT_MODELS)
+
+    # Start on a slot boundary so every slot of the window is complete.
+    await asyncio.sleep(args.interval - time.time() % args.interval)
+    window_start = datetime.now(timezone.utc)
+
+    processes: Dict[str, multiprocessing.Process] = {}
+    members: Dict[str, ClusterMember] = {}
+    if args.mongo_uri:
+        context = multiprocessing.get_context("spawn")
+        for i in range(args.workers):
+            process = context.Process(target=_process_main, args=(args.mongo_uri, db_name, i, args), daemon=True)
+            process.start()
+            processes[str(process.pid)] = process
+    else:
+        for i in range(args.workers):
+            member = await _worker(db, i, args)
+            members[member.elector.worker_id] = member
+
+    await asyncio.sleep(args.kill_after)
+    lease = await Lease.get_pymongo_collection().find_one({"_id": "scheduler"})
+    killed = lease["holder"] if lease else None
+    if killed:
+        if args.mongo_uri:
+            processes[killed.rsplit(":", 1)[1]].kill()
+        else:
+            member = members.pop(killed)
+            async def crashed():
+                pass
+            member.elector.release = crashed  # a crash does not release the lease
+            await member.stop()
+    failover = await _wait_for_new_leader(killed, timeout=args.lease * 3)
+
+    await asyncio.sleep(max(0.0, args.duration - (datetime.now(timezone.utc) - window_start).total_seconds()))
+    window_end = datetime.now(timezone.utc)
+    for process in processes.values():
+        process.kill()
+    for member in members.values():
+        await member.stop()
+
+    job = PeriodicJob("crawl", timedelta(seconds=args.interval), None)
+    runs = await CrawlRun.find_all().to_list()
+    executions = await db[EXECUTIONS].find({}).sort("started", 1).to_list(None)
+    for e in executions:
+        e["started"] = e["started"].replace(tzinfo=timezone.utc)
+        e["ended"] = e["ended"].replace(tzinfo=timezone.utc)
+
+    # Complete slots: started after the window opened and ended (crawl included) before it closed.
+    last_slot = job.slot(window_end - timedelta(seconds=args.crawl_seconds + 1)) - job.interval
+    expected = []
+    slot = job.slot(window_start)
+    while slot <= last_slot:
+        expected.append(slot)
+        slot += job.interval
+
+    done = Counter(r.slot.replace(tzinfo=timezone.utc) for r in runs if r.status == "done")
+    taken_over = {r.slot.replace(tzinfo=timezone.utc) for r in runs if r.attempts > 1}
+    executed = Counter(job.slot(e["started"]) for e in executions)
+    overlaps = sum(1 for a, b in zip(executions, executions[1:]) if b["started"] < a["ended"])
+
+    failures = []
+    missing = [s for s in expected if done[s] != 1]
+    if missing:
+        failures.append(f"slots without exactly one done run: {[s.isoformat() for s in missing]}")
+    duplicated = [s for s, n in executed.items() if n > 1 and not (s in taken_over and n == 2)]
+    if duplicated:
+        failures.append(f"slots executed more than once: {[s.isoformat() for s in duplicated]}")
+    if overlaps:
+        failures.append(f"{overlaps} overlapping executions")
+    if killed and (failover is None or failover > args.lease * 4 / 3 + 1.0):
+        failures.append(f"failover took {failover}s")
+
+    if args.mongo_uri:
+        await db.client.drop_database(db_name)
+
+    return {
+        "mongo": backend,
+        "workers": args.workers,
+        "slots_expected": len(expected),
+        "runs_done": sum(done.values()),
+        "done_per_slot": [done[s] for s in expected],
+        "executions": len(executions),
+        "taken_over_slots": len(taken_over),
+        "killed_leader": killed,
+        "failover_s": round(failover, 2) if failover is not None else None,
+        "leaders": sorted({r.holder for r in runs}),
+        "failures": failures,
+    }
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=None, help="Real MongoDB (worker processes); default: in-process stand-in.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of the observed window.")
+    parser.add_argument("--interval", type=float, default=5.0, help="Slot length of the fake crawl (s).")
+    parser.add_argument("--crawl-seconds", type=float, default=0.5, help="Duration of one fake crawl.")
+    parser.add_argument("--lease", type=float, default=3.0, help="Leader lease (s).")
+    parser.add_argument("--kill-after", type=float, default=7.0, help="Kill the leader after this many seconds.")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args(argv)
+    if args.interval <= args.lease * 4 / 3 + args.crawl_seconds:
+        parser.error("--interval must be longer than the failover time (lease * 4/3) plus a crawl.")
+    return args
+
+async def main():
+    args = parse_args()
+    result = await run(args)
+    print(
+        f"[{result['mongo']}, {result['workers']} workers] {result['runs_done']} runs done / "
+        f"{result['slots_expected']} slots, {result['executions']} executions, "
+        f"{result['taken_over_slots']} taken over | leader {result['killed_leader']} killed, "
+        f"failover {result['failover_s']}s | leaders: {', '.join(result['leaders'])}"
+    )
+    for failure in result["failures"]:
+        print(f"❌ {failure}")
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": result,
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+    if result["failures"]:
+        sys.exit(1)
+    print("✅ Exactly-once crawl execution verified.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
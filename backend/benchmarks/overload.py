@@ -0,0 +1,206 @@
+"""
+`/chat/stream` under 10x overload, with and without admission control.
+
+The Gemini model is replaced by `FakeStreamingChatModel` with a fixed upstream
+capacity (`--upstream-capacity` concurrent calls, like a quota): calls beyond
+it wait for a free slot, so without admission control every extra request
+makes all the later ones slower.
+
+1. Capacity: closed loop at `--upstream-capacity` concurrent chats gives the
+   sustainable throughput and the unloaded latency.
+2. Overload: Poisson arrivals at `--overload` times that throughput for
+   `--duration` seconds, once per mode:
+   - `admission`: the chat limiter sized to the upstream capacity, with a
+     bounded queue (`--queue`) and a wait deadline (`--queue-timeout`);
+   - `none`: limits lifted, every request is accepted.
+   Clients give up after `--client-timeout` seconds (counted as timeouts).
+
+For each mode it reports completed / rejected (429/503) / timed-out requests,
+goodput, latency percentiles of the admitted requests, how fast rejections come
+back, and the peak in-flight count. The admission mode passes when the p99 of
+admitted requests stays within the unloaded p99 + queue timeout (+10%); the
+script exits with status 1 otherwise.
+
+Usage (from backend/):
+    python -m benchmarks.overload
+    python -m benchmarks.overload --upstream-capacity 8 --overload 10 --duration 10 --out overload.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.admission import CHAT_ADMISSION
+from src.database import DOCUMENT_MODELS
+from src.agent import graph, paper_processor
+from benchmarks._fake_llm import FakeStreamingChatModel
+from benchmarks._offline import init_offline_stores, drop_offline_stores
+from benchmarks.chat_load import seed_papers, stream_chat, _percentiles
+
+def _configure(mode: str, args: argparse.Namespace) -> None:
+    CHAT_ADMISSION.rate = 0  # every simulated client shares 127.0.0.1
+    if mode == "admission":
+        CHAT_ADMISSION.concurrency = args.upstream_capacity
+        CHAT_ADMISSION.queue_size = args.queue
+        CHAT_ADMISSION.queue_timeout = args.queue_timeout
+    else:
+        CHAT_ADMISSION.concurrency = 1_000_000
+        CHAT_ADMISSION.queue_size = 1_000_000
+    CHAT_ADMISSION.rejected = {reason: 0 for reason in CHAT_ADMISSION.rejected}
+    CHAT_ADMISSION.admitted = 0
+
+async def _one(paper_id: str, i: int, client_timeout: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(stream_chat(paper_id, f"Phương pháp của bài báo là gì? ({i})"), client_timeout)
+    except asyncio.TimeoutError:
+        return {"status": "timeout", "total": time.perf_counter() - start}
+    return result
+
+async def capacity(args: argparse.Namespace, paper_ids: List[str]) -> Dict[str, Any]:
+    _configure("admission", args)
+    results: List[Dict[str, Any]] = []
+    count = args.upstream_capacity * 4
+
+    async def worker(offset: int):
+        for i in range(offset, count, args.upstream_capacity):
+            results.append(await _one(paper_ids[i % len(paper_ids)], i, args.client_timeout))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(k) for k in range(args.upstream_capacity)])
+    elapsed = time.perf_counter() - start
+    ok = [r["total"] for r in results if r["status"] == 200]
+    return {"throughput_rps": round(len(ok) / elapsed, 2), "total_ms": _percentiles(ok)}
+
+async def overload(mode: str, rate: float, args: argparse.Namespace, paper_ids: List[str]) -> Dict[str, Any]:
+    _configure(mode, args)
+    rng = random.Random(args.seed)
+    tasks: List[asyncio.Task] = []
+    peak = 0
+
+    async def sample_in_flight(stop: asyncio.Event):
+        nonlocal peak
+        while not stop.is_set():
+            peak = max(peak, CHAT_ADMISSION.in_flight)
+            await asyncio.sleep(0.01)
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_in_flight(stop))
+    start = time.perf_counter()
+    i = 0
+    next_at = 0.0
+    while next_at < args.duration:
+        delay = start + next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_one(paper_ids[i % len(paper_ids)], i, args.client_timeout)))
+        i += 1
+        next_at += rng.expovariate(rate)
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+
+    completed = [r["total"] for r in results if r["status"] == 200]
+    rejected = [r["total"] for r in results if r["status"] in (429, 503)]
+    return {
+        "mode": mode,
+        "offered": len(results),
+        "offered_rps": round(len(results) / args.duration, 2),
+        "completed": len(completed),
+        "rejected": len(rejected),
+        "rejected_by_reason": dict(CHAT_ADMISSION.rejected),
+        "timed_out": sum(1 for r in results if r["status"] == "timeout"),
+        "goodput_rps": round(len(completed) / elapsed, 2),
+        "peak_in_flight": peak,
+        "admitted_total_ms": _percentiles(completed),
+        "rejection_ms": _percentiles(rejected),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream-capacity", type=int, default=8, help="Concurrent LLM calls the fake upstream serves.")
+    parser.add_argument("--overload", type=float, default=10.0, help="Offered load as a multiple of the measured capacity.")
+    parser.add_argument("--duration", type=float, default=8.0, help="Seconds of arrivals per mode.")
+    parser.add_argument("--queue", type=int, default=16, help="Admission queue size.")
+    parser.add_argument("--queue-timeout", type=float, default=2.0, help="Admission queue deadline (s).")
+    parser.add_argument("--client-timeout", type=float, default=30.0, help="Clients give up after this many seconds.")
+    parser.add_argument("--modes", nargs="+", default=["admission", "none"], choices=["admission", "none"])
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    fake = FakeStreamingChatModel(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        max_concurrent_calls=args.upstream_capacity,
+        seed=args.seed,
+    )
+    graph.set_chat_model(fake)
+    paper_processor.set_analysis_model(fake)
+
+    backend = await init_offline_stores(None, 8, DOCUMENT_MODELS)
+    try:
+        paper_ids = await seed_papers(20)
+        base = await capacity(args, paper_ids)
+        rate = base["throughput_rps"] * args.overload
+        print(
+            f"[capacity, {backend}] {base['throughput_rps']} chats/s at {args.upstream_capacity} upstream slots | "
+            f"total p50 {base['total_ms']['p50']} p99 {base['total_ms']['p99']} ms -> offering {rate:.1f} chats/s"
+        )
+        runs = []
+        for mode in args.modes:
+            run = await overload(mode, rate, args, paper_ids)
+            runs.append(run)
+            print(
+                f"[{mode:>9}] {run['offered']} offered | {run['completed']} ok, {run['rejected']} rejected "
+                f"{run['rejected_by_reason'] if mode == 'admission' else ''}, {run['timed_out']} timed out | "
+                f"goodput {run['goodput_rps']}/s | admitted p50 {run['admitted_total_ms']['p50']} "
+                f"p99 {run['admitted_total_ms']['p99']} ms | rejection p99 {run['rejection_ms']['p99']} ms | "
+                f"peak in-flight {run['peak_in_flight']}"
+            )
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    bound_ms = (base["total_ms"]["p99"] + args.queue_timeout * 1000) * 1.1
+    failures = [
+        f"admission p99 {r['admitted_total_ms']['p99']} ms exceeds {bound_ms:.0f} ms"
+        for r in runs
+        if r["mode"] == "admission" and (r["admitted_total_ms"]["p99"] is None or r["admitted_total_ms"]["p99"] > bound_ms)
+    ]
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "args": {k: v for k, v in vars(args).items() if k != "out"},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "capacity": base,
+            "p99_bound_ms": round(bound_ms, 1),
+            "results": runs,
+        }, indent=2, ensure_ascii=False))
+        print(f"Results written to {args.out}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,215 @@
+"""
+Watchlist percolator (`src.watchlists`) at scale: `--watchlists` watchlists of
+`--users` users against a daily batch of `--papers` new papers.
+
+Papers have Zipf-distributed titles/abstracts (150-300 words) and authors;
+watchlists have 1-4 keyword phrases of 1-3 words taken from the mid/long tail of
+the vocabulary, and a share of them also follow authors, restrict to
+categories, or only follow categories. The script reports:
+
+- index: loading and compiling every watchlist (seconds, phrases, RSS growth).
+  The in-memory stand-in re-slices its result list on every cursor step, so
+  without `--mongo-uri` the index is compiled from the generated documents;
+- match: percolating the batch (papers/s, matches, users with a match), plus
+  the same batch against indexes of increasing size (`--sweep`), to show that
+  the time follows the matches, not the number of watchlists;
+- write: the inbox upserts (one per user). The in-memory stand-in scans its
+  collection on every upsert, so without `--mongo-uri` only `--stand-in-users`
+  inboxes are written;
+- verify: the index results for `--verify` papers against a brute-force scan
+  of every watchlist, and the written inboxes read back through `read_inbox`.
+
+Exits with status 1 on any mismatch.
+
+Usage (from backend/):
+    python -m benchmarks.percolator --watchlists 100000 --papers 5000
+    python -m benchmarks.percolator --mongo-uri mongodb://localhost:27017 --out percolator.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Set, Tuple
+
+# The Gemini clients are constructed at import time but never called here.
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from src.database import DOCUMENT_MODELS
+from src.model import ArxivPaper, Watchlist
+from src.watchlists import INBOX_MAX_ITEMS, WatchlistIndex, load_index, read_inbox, tokenize, write_inboxes
+from src.utils.names import normalize_author_name
+from benchmarks._offline import CATEGORIES, ZipfText, init_offline_stores, drop_offline_stores
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return round(int(f.read().split()[1]) * resource.getpagesize() / 2**20, 1)
+
+def _authors(rng: random.Random, count: int) -> List[str]:
+    return [f"Author{rng.randint(0, 900)} Surname{rng.randint(0, count)}" for _ in range(rng.randint(1, 6))]
+
+def generate(args: argparse.Namespace, seed: int = 42) -> Tuple[List[ArxivPaper], List[Dict[str, Any]]]:
+    """The daily batch of papers and the watchlist documents."""
+    rng = random.Random(seed)
+    text = ZipfText(rng, vocabulary=20_000)
+    now = datetime.now(timezone.utc)
+    papers = []
+    for i in range(args.papers):
+        categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+        papers.append(ArxivPaper(
+            id=f"{now:%y%m}.{i:05d}",
+            title=text.sentence(6, 14),
+            author=_authors(rng, 20_000),
+            arxiv_url=f"http://arxiv.org/abs/{now:%y%m}.{i:05d}v1",
+            pdf_url=f"http://arxiv.org/pdf/{now:%y%m}.{i:05d}v1",
+            published_date=now,
+            updated_date=now,
+            summary=" ".join(text.sentence() for _ in range(rng.randint(10, 18))),
+            prime_category=categories[0],
+            categories=categories,
+        ))
+
+    tail = text.words[3_000:]
+    watchlists = []
+    for i in range(args.watchlists):
+        doc: Dict[str, Any] = {"user_id": f"user{rng.randrange(args.users)}", "name": f"watchlist {i}"}
+        if rng.random() < 0.002:
+            doc["categories"] = rng.sample(CATEGORIES, rng.randint(1, 2))
+        else:
+            doc["keywords"] = [" ".join(rng.choices(tail, k=rng.choice((1, 2, 2, 3)))) for _ in range(rng.randint(1, 4))]
+            if rng.random() < 0.3:
+                doc["authors"] = _authors(rng, 20_000)[:rng.randint(1, 3)]
+                doc["author_keys"] = [normalize_author_name(a) for a in doc["authors"]]
+            if rng.random() < 0.4:
+                doc["categories"] = rng.sample(CATEGORIES, rng.randint(1, 2))
+        watchlists.append(doc)
+    return papers, watchlists
+
+def compile_index(watchlists: List[Dict[str, Any]]) -> WatchlistIndex:
+    index = WatchlistIndex()
+    for doc in watchlists:
+        index.add(doc["user_id"], doc["name"], doc.get("keywords", []), doc.get("categories", []), doc.get("author_keys", []))
+    return index
+
+def brute_force(paper: ArxivPaper, watchlists: List[Dict[str, Any]]) -> Set[int]:
+    """Positions of the matching watchlists, testing every watchlist one by one."""
+    texts = [f" {' '.join(tokenize(paper.title))} ", f" {' '.join(tokenize(paper.summary))} "]
+    matched = set()
+    for position, doc in enumerate(watchlists):
+        keywords, author_keys, categories = doc.get("keywords", []), doc.get("author_keys", []), doc.get("categories", [])
+        if keywords or author_keys:
+            hit = any(f" {' '.join(tokenize(k))} " in t for k in keywords for t in texts)
+            hit = hit or any(key in paper.author_keys for key in author_keys)
+            hit = hit and (not categories or any(c in paper.categories for c in categories))
+        else:
+            hit = any(c in paper.categories for c in categories)
+        if hit:
+            matched.add(position)
+    return matched
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watchlists", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=25_000)
+    parser.add_argument("--papers", type=int, default=5_000)
+    parser.add_argument("--sweep", type=int, nargs="*", default=[1_000, 10_000], help="Smaller index sizes matched against the same batch.")
+    parser.add_argument("--verify", type=int, default=20, help="Papers checked against the brute-force scan.")
+    parser.add_argument("--stand-in-users", type=int, default=500, help="Inboxes written when running on the in-memory stand-in.")
+    parser.add_argument("--mongo-uri", default=None, help="Local MongoDB; defaults to the in-memory stand-in.")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    backend = await init_offline_stores(args.mongo_uri, 8, DOCUMENT_MODELS)
+    failures: List[str] = []
+    results: Dict[str, Any] = {}
+    try:
+        start = time.perf_counter()
+        papers, watchlists = generate(args)
+        for offset in range(0, len(watchlists), 10_000):
+            await Watchlist.get_pymongo_collection().insert_many([dict(d) for d in watchlists[offset:offset + 10_000]])
+        print(f"Seeded {len(watchlists):,} watchlists of {args.users:,} users, {len(papers):,} papers ({backend}) in {time.perf_counter() - start:.0f}s")
+
+        rss = _rss_mb()
+        start = time.perf_counter()
+        index = await load_index() if args.mongo_uri else compile_index(watchlists)
+        results["index"] = {
+            "seconds": round(time.perf_counter() - start, 2),
+            "watchlists": len(index),
+            "phrases": len(index.phrases),
+            "authors": len(index.authors),
+            "rss_growth_mb": round(_rss_mb() - rss, 1),
+        }
+        print(
+            f"[index] {len(index):,} watchlists, {len(index.phrases):,} phrases, {len(index.authors):,} authors "
+            f"{'loaded and ' if args.mongo_uri else ''}compiled in {results['index']['seconds']}s (+{results['index']['rss_growth_mb']} MB RSS)"
+        )
+
+        sweep = []
+        for size in sorted(set(s for s in args.sweep if s < len(watchlists))) + [len(watchlists)]:
+            sized = index if size == len(watchlists) else compile_index(watchlists[:size])
+            start = time.perf_counter()
+            inboxes = sized.percolate(papers)
+            seconds = time.perf_counter() - start
+            matches = sum(len(items) for items in inboxes.values())
+            sweep.append({
+                "watchlists": size,
+                "seconds": round(seconds, 2),
+                "papers_per_s": round(len(papers) / seconds),
+                "matches": matches,
+                "users": len(inboxes),
+            })
+            print(
+                f"[match] {len(papers):,} papers x {size:,} watchlists in {seconds:.2f}s "
+                f"({len(papers) / seconds:,.0f} papers/s) -> {matches:,} matches for {len(inboxes):,} users"
+            )
+        results["match"] = sweep
+
+        users = sorted(inboxes)
+        if not args.mongo_uri:
+            users = users[:args.stand_in_users]
+        start = time.perf_counter()
+        await write_inboxes(papers, {user: inboxes[user] for user in users}, datetime.now(timezone.utc))
+        seconds = time.perf_counter() - start
+        results["write"] = {"users": len(users), "seconds": round(seconds, 2), "users_per_s": round(len(users) / max(seconds, 1e-9))}
+        print(f"[write] {len(users):,} of {len(inboxes):,} inboxes in {seconds:.2f}s ({results['write']['users_per_s']:,} upserts/s)")
+
+        for paper in random.Random(1).sample(papers, min(args.verify, len(papers))):
+            expected = brute_force(paper, watchlists)
+            got = set(index.match(paper.title, paper.summary, paper.author_keys, paper.categories))
+            if got != expected:
+                failures.append(f"{paper.id}: {len(got)} watchlists matched, brute force finds {len(expected)}")
+        for user in random.Random(2).sample(users, min(50, len(users))):
+            page = await read_inbox(user, limit=INBOX_MAX_ITEMS)
+            got, expected = {i.paper_id for i in page["items"]}, {papers[i].id for i, _, _ in inboxes[user]}
+            if len(got) != min(len(expected), INBOX_MAX_ITEMS) or not got <= expected:
+                failures.append(f"inbox of {user} differs from the matches")
+        print(f"[verify] {min(args.verify, len(papers))} papers against brute force, {min(50, len(users))} inboxes: {'ok' if not failures else f'{len(failures)} problems'}")
+    finally:
+        await drop_offline_stores(DOCUMENT_MODELS)
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "mongo": backend,
+                "args": {k: v for k, v in vars(args).items() if k not in ("out", "mongo_uri")},
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+"""
+Recall / latency / memory comparison of the Qdrant collection profiles
+(`src.vector_profiles`).
+
+A synthetic clustered corpus of normalised vectors is loaded into one collection
+per profile (bulk load with deferred indexing, like `reindex_vectors`), then the
+same queries are run against each. Exact top-k neighbours computed with NumPy
+serve as ground truth for recall@k. Memory is reported two ways: an estimate of
+the RAM held by vectors, int8 copies and the HNSW graph from the profile, and the
+growth of Qdrant's own `memory_allocated_bytes` gauge across the load when the
+server exposes `/metrics`.
+
+Needs a real Qdrant server: local mode (`--qdrant-url :memory:`) ignores HNSW
+and quantization, so it only checks that the profiles apply.
+
+Usage (from backend/):
+    docker run -p 6333:6333 qdrant/qdrant
+    python -m benchmarks.vector_profiles --points 100000 --dimension 384 --out profiles.json
+"""
+import re
+import json
+import time
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import httpx
+import numpy as np
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import PointStruct, CollectionStatus
+
+from src.vector_profiles import CollectionProfile, load_profiles
+
+UPLOAD_BATCH = 1_000
+
+def make_corpus(points: int, queries: int, dimension: int, clusters: int, seed: int):
+    """Clustered unit vectors, plus queries drawn near (but not on) corpus points."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, points)
+    corpus = centers[labels] + 0.6 * rng.standard_normal((points, dimension)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+
+    anchors = corpus[rng.integers(0, points, queries)]
+    query = anchors + 0.3 * rng.standard_normal((queries, dimension)).astype(np.float32)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return corpus, query
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, block: int = 256) -> np.ndarray:
+    result = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), block):
+        scores = queries[start:start + block] @ corpus.T
+        top = np.argpartition(-scores, k, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        result[start:start + block] = np.take_along_axis(top, order, axis=1)
+    return result
+
+def estimated_ram_mb(profile: CollectionProfile, points: int, dimension: int) -> float:
+    ram = 0 if profile.on_disk else points * dimension * 4
+    if profile.quantization == "int8" and profile.quantization_always_ram:
+        ram += points * dimension
+    if not profile.hnsw_on_disk:
+        ram += points * profile.hnsw_m * 2 * 4
+    return round(ram / 2**20, 1)
+
+async def _allocated_bytes(url: Optional[str]) -> Optional[float]:
+    if not url:
+        return None
+    try:
+        async with httpx.AsyncClient(timeout=5) as client:
+            text = (await client.get(f"{url.rstrip('/')}/metrics")).text
+    except httpx.HTTPError:
+        return None
+    match = re.search(r"^memory_allocated_bytes\s+(\S+)", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+async def run_profile(
+        client: AsyncQdrantClient,
+        url: Optional[str],
+        profile: CollectionProfile,
+        corpus: np.ndarray,
+        queries: np.ndarray,
+        truth: np.ndarray,
+        k: int
+    ) -> Dict[str, Any]:
+    name = f"bench_profile_{profile.name}"
+    if await client.collection_exists(name):
+        await client.delete_collection(name)
+
+    memory_before = await _allocated_bytes(url)
+    start = time.perf_counter()
+    await client.create_collection(collection_name=name, **profile.create_kwargs(corpus.shape[1], indexing=False))
+    for offset in range(0, len(corpus), UPLOAD_BATCH):
+        batch = corpus[offset:offset + UPLOAD_BATCH]
+        await client.upsert(
+            collection_name=name,
+            points=[PointStruct(id=offset + i, vector=v.tolist()) for i, v in enumerate(batch)]
+        )
+    await client.update_collection(collection_name=name, optimizers_config=profile.optimizers_config(indexing=True))
+    while (await client.get_collection(name)).status != CollectionStatus.GREEN:
+        await asyncio.sleep(0.5)
+    build = time.perf_counter() - start
+    memory_after = await _allocated_bytes(url)
+
+    params = profile.search_params()
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        t = time.perf_counter()
+        response = await client.query_points(collection_name=name, query=query.tolist(), limit=k, search_params=params)
+        latencies.append(time.perf_counter() - t)
+        hits += len({p.id for p in response.points} & set(expected.tolist()))
+    await client.delete_collection(name)
+
+    latencies_ms = sorted(l * 1000 for l in latencies)
+    return {
+        "profile": profile.name,
+        "build_s": round(build, 2),
+        f"recall_at_{k}": round(hits / (len(queries) * k), 4),
+        "latency_ms": {
+            "p50": round(latencies_ms[len(latencies_ms) // 2], 2),
+            "p99": round(latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.99))], 2),
+        },
+        "estimated_ram_mb": estimated_ram_mb(profile, len(corpus), corpus.shape[1]),
+        "measured_alloc_mb": (
+            round((memory_after - memory_before) / 2**20, 1)
+            if memory_before is not None and memory_after is not None else None
+        ),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--profiles", nargs="+", default=None, help="Profiles to compare (default: all).")
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here.")
+    args = parser.parse_args()
+
+    profiles = load_profiles()
+    selected: List[CollectionProfile] = [profiles[p] for p in (args.profiles or profiles)]
+
+    if args.qdrant_url == ":memory:":
+        print("⚠️ Local mode ignores HNSW and quantization: recall is exact and latency is brute force.")
+        client, url = AsyncQdrantClient(location=":memory:"), None
+    else:
+        client, url = AsyncQdrantClient(url=args.qdrant_url, timeout=300), args.qdrant_url
+
+    corpus, queries = make_corpus(args.points, args.queries, args.dimension, args.clusters, args.seed)
+    truth = exact_top_k(corpus, queries, args.k)
+
+    results = []
+    try:
+        for profile in selected:
+            r = await run_profile(client, url, profile, corpus, queries, truth, args.k)
+            results.append(r)
+            print(
+                f"[{profile.name:>12}] build {r['build_s']}s | recall@{args.k} {r[f'recall_at_{args.k}']} | "
+                f"p50 {r['latency_ms']['p50']} ms p99 {r['latency_ms']['p99']} ms | "
+                f"RAM est. {r['estimated_ram_mb']} MB, measured {r['measured_alloc_mb']} MB"
+            )
+    finally:
+        await client.close()
+
+    if args.out:
+        args.out.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "qdrant": args.qdrant_url,
+                "points": args.points,
+                "queries": args.queries,
+                "dimension": args.dimension,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }, indent=2))
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,338 @@
+"""
+Admission control for the expensive endpoints (agent chat, PDF analysis, chat
+warm-ups, crawls).
+
+Each protected endpoint owns an `Admission`:
+
+- a per-client `TokenBucket` (key: the `X-Client-ID` header when the request
+  comes from the frontend, else the client IP) rejects bursts with 429 before
+  they cost anything;
+- at most `concurrency` requests run at once; the next `queue_size` wait in
+  FIFO order for at most `queue_timeout` seconds;
+- when the queue is full, or a waiter's deadline passes, the request is
+  rejected with 503 right away instead of piling up behind the others;
+- speculative work (`try_admit`) only takes a slot that is free right now and
+  never queues ahead of real requests.
+
+Rejections carry a `Retry-After` estimate (queue depth x observed service time
+/ concurrency). The state of every limiter is exported as Prometheus metrics
+and by `admission_stats()`.
+
+Limits are configured per endpoint through environment variables, e.g.
+`ADMISSION_CHAT_CONCURRENCY`, `ADMISSION_CHAT_QUEUE`, `ADMISSION_CHAT_QUEUE_TIMEOUT`,
+`ADMISSION_CHAT_RATE_PER_MINUTE` and `ADMISSION_CHAT_BURST`. They apply per
+worker process.
+"""
+import os
+import hmac
+import math
+import time
+import asyncio
+import secrets
+from pathlib import Path
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+from src.utils.log_config import get_logger
+from src.utils.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+logger = get_logger("Admission")
+
+MAX_RETRY_AFTER = 60
+CLIENT_ID_HEADER = "x-client-id"
+CLIENT_SECRET_HEADER = "x-client-secret"
+def load_client_secret() -> str:
+    """
+    Secret shared with the frontend: `CLIENT_ID_SECRET`, else the content of
+    `CLIENT_ID_SECRET_FILE`, created with a random secret by the first worker
+    to start (the frontend reads the same file through a shared volume).
+    Empty when neither is set: `X-Client-ID` is then ignored.
+    """
+    secret = os.getenv("CLIENT_ID_SECRET", "")
+    path = os.getenv("CLIENT_ID_SECRET_FILE")
+    if secret or not path:
+        return secret
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside then linked into place: concurrent workers agree on one secret.
+        staging = path.with_name(f".{path.name}.{os.getpid()}")
+        staging.write_text(secrets.token_urlsafe(32))
+        staging.chmod(0o600)
+        try:
+            os.link(staging, path)
+        except FileExistsError:
+            pass
+        finally:
+            staging.unlink()
+    return path.read_text().strip()
+
+# Shared with the frontend, which sends it with every request.
+CLIENT_ID_SECRET = load_client_secret()
+# Comma-separated addresses (e.g. a reverse proxy) trusted to set `X-Client-ID`.
+TRUSTED_PROXIES = frozenset(h.strip() for h in os.getenv("TRUSTED_PROXIES", "").split(",") if h.strip())
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted.
+
+    Attributes:
+        status_code: 429 (client over its rate limit) or 503 (endpoint saturated).
+        reason: `rate_limited`, `queue_full` or `queue_timeout`.
+        retry_after: Suggested delay in whole seconds.
+    """
+    def __init__(self, endpoint: str, status_code: int, reason: str, retry_after: float):
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, min(MAX_RETRY_AFTER, math.ceil(retry_after)))
+        super().__init__(f"{endpoint}: {reason}, retry after {self.retry_after}s")
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; each request takes one."""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Takes a token. Returns 0 on success, else the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class Permit:
+    """A granted slot. `release()` is idempotent, so it can be wired to several exit paths."""
+    __slots__ = ("_admission", "_granted_at", "_released")
+
+    def __init__(self, admission: "Admission"):
+        self._admission = admission
+        self._granted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._admission._release(time.monotonic() - self._granted_at)
+
+    async def __aenter__(self) -> "Permit":
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        self.release()
+        return False
+
+class Admission:
+    """
+    Concurrency limit + bounded FIFO queue + per-client rate limit of one endpoint.
+
+    Args:
+        name: Endpoint name, used in metrics and rejections.
+        concurrency: Requests running at once.
+        queue_size: Requests allowed to wait for a slot (0: reject as soon as
+            every slot is busy).
+        queue_timeout: Maximum wait in the queue, in seconds.
+        rate_per_minute: Sustained requests per client and minute (0 disables
+            the rate limit).
+        burst: Requests a client may send at once above the sustained rate.
+        max_clients: Token buckets kept (least recently seen clients are dropped).
+    """
+    def __init__(
+            self,
+            name: str,
+            concurrency: int,
+            queue_size: int,
+            queue_timeout: float,
+            rate_per_minute: float = 0,
+            burst: int = 1,
+            max_clients: int = 10_000
+        ):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.rate = rate_per_minute / 60
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+
+        self.in_flight = 0
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+        self.admitted = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        # Moving average of how long a permit is held, for Retry-After.
+        self._service_seconds = 1.0
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, queue_size: int, queue_timeout: float,
+                 rate_per_minute: float = 0, burst: int = 1) -> "Admission":
+        """Builds the limiter, letting `ADMISSION_<NAME>_*` variables override the defaults."""
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            concurrency=int(os.getenv(prefix + "CONCURRENCY", concurrency)),
+            queue_size=int(os.getenv(prefix + "QUEUE", queue_size)),
+            queue_timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT", queue_timeout)),
+            rate_per_minute=float(os.getenv(prefix + "RATE_PER_MINUTE", rate_per_minute)),
+            burst=int(os.getenv(prefix + "BURST", burst)),
+        )
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _retry_after(self) -> float:
+        return self._service_seconds * (self.queued + 1) / self.concurrency
+
+    def _reject(self, status_code: int, reason: str, retry_after: float) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(endpoint=self.name, reason=reason)
+        return AdmissionRejected(self.name, status_code, reason, retry_after)
+
+    def _check_rate(self, client: Optional[str]) -> None:
+        if not self.rate or client is None:
+            return
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.take()
+        if wait:
+            raise self._reject(429, "rate_limited", wait)
+
+    def _release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self._service_seconds += 0.2 * (held - self._service_seconds)
+        # Hand the slot straight to the oldest live waiter (no thundering herd).
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUED.set(self.queued, endpoint=self.name)
+                return
+        self.in_flight -= 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight, endpoint=self.name)
+        ADMISSION_QUEUED.set(self.queued, endpoint=self.name)
+
+    def _has_free_slot(self) -> bool:
+        return self.in_flight < self.concurrency and not self._waiters
+
+    def _grant(self) -> Permit:
+        self.in_flight += 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.set(self.in_flight, endpoint=self.name)
+        ADMISSION_WAIT_SECONDS.observe(0.0, endpoint=self.name)
+        return Permit(self)
+
+    def try_admit(self) -> Optional[Permit]:
+        """
+        Slot for speculative work: a `Permit` if one is free and nobody waits,
+        else None (not counted as a rejection). Never queues, so it cannot
+        delay the requests that do.
+        """
+        return self._grant() if self._has_free_slot() else None
+
+    async def admit(self, client: Optional[str] = None) -> Permit:
+        """
+        Waits for a slot and returns its `Permit`; the caller must release it.
+
+        Raises:
+            AdmissionRejected: Rate limited (429), queue full or wait longer
+                than `queue_timeout` (503).
+        """
+        self._check_rate(client)
+
+        if self._has_free_slot():
+            return self._grant()
+        if self.queued >= self.queue_size:
+            raise self._reject(503, "queue_full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.set(self.queued, endpoint=self.name)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the deadline hit: pass it on.
+                self._release()
+            else:
+                waiter.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject(503, "queue_timeout", self._retry_after()) from None
+
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, endpoint=self.name)
+        # The releasing request kept `in_flight` unchanged and passed its slot on.
+        self.admitted += 1
+        return Permit(self)
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        ADMISSION_QUEUED.set(self.queued, endpoint=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_service_seconds": round(self._service_seconds, 3),
+        }
+
+# Agent runs: bounded by Gemini quota and memory per stream.
+CHAT_ADMISSION = Admission.from_env("chat", concurrency=16, queue_size=32, queue_timeout=10, rate_per_minute=20, burst=5)
+# PDF download + long-context analysis (cache misses of `read_full_paper`).
+ANALYSIS_ADMISSION = Admission.from_env("analysis", concurrency=2, queue_size=8, queue_timeout=60)
+# Chat warm-ups (`/papers/{id}/prepare`): cheap, but each may start an analysis.
+PREPARE_ADMISSION = Admission.from_env("prepare", concurrency=64, queue_size=0, queue_timeout=0, rate_per_minute=12, burst=4)
+# Watchlist profile creation: each one is a document until pruned.
+PROFILE_ADMISSION = Admission.from_env("profile", concurrency=8, queue_size=0, queue_timeout=0, rate_per_minute=6, burst=3)
+# Manual crawls: one at a time, no queue.
+CRAWL_ADMISSION = Admission.from_env("crawl", concurrency=1, queue_size=0, queue_timeout=0, rate_per_minute=2, burst=2)
+
+def trusted_client_id(headers: Any, host: Optional[str]) -> Optional[str]:
+    """
+    `X-Client-ID` of a request sent by the frontend: one carrying the shared
+    `CLIENT_ID_SECRET` in `X-Client-Secret`, or coming from an address of
+    `TRUSTED_PROXIES`. None for any other request, as whoever reaches the
+    published port can set the header to anything.
+    """
+    client_id = headers.get(CLIENT_ID_HEADER)
+    if not client_id:
+        return None
+    secret = headers.get(CLIENT_SECRET_HEADER)
+    if CLIENT_ID_SECRET and secret and hmac.compare_digest(secret.encode(), CLIENT_ID_SECRET.encode()):
+        return client_id
+    if host in TRUSTED_PROXIES:
+        return client_id
+    return None
+
+def client_key(headers: Any, host: Optional[str]) -> Optional[str]:
+    """
+    Rate-limit key of a request: the trusted `X-Client-ID` of the frontend (one
+    per browser session, as every user reaches the API through the same
+    Streamlit server), else the client IP. An untrusted header is ignored, so
+    rotating it neither bypasses the limit nor evicts other clients' buckets.
+    """
+    return trusted_client_id(headers, host) or host
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {a.name: a.stats() for a in (CHAT_ADMISSION, ANALYSIS_ADMISSION, PREPARE_ADMISSION, PROFILE_ADMISSION, CRAWL_ADMISSION)}
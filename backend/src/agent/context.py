@@ -0,0 +1,51 @@
+"""
+Per-paper chat context, cached in process.
+
+Every chat turn needs the paper (`PaperContextView`) and the context message
+built from it; `read_full_paper` needs the same projection to find or store the
+analysis. Both are kept in a `GenerationCache`, so a crawl that ingests a new
+version of a paper invalidates them, and `/papers/{id}/prepare` loads them
+before the first question is asked.
+"""
+import os
+from typing import Optional
+
+from src.model import ArxivPaper, PaperContextView
+from src.utils.cache import GenerationCache
+from src.utils.metrics import PAPER_CONTEXT_CACHE
+
+PAPER_CONTEXT_CACHE_SIZE = int(os.getenv("PAPER_CONTEXT_CACHE_SIZE", 2048))
+
+class PaperContext:
+    """The paper projection and the system message rendered from it."""
+    __slots__ = ("paper", "message")
+
+    def __init__(self, paper: PaperContextView):
+        self.paper = paper
+        self.message = render_context(paper)
+
+def render_context(paper: PaperContextView) -> str:
+    return f"""
+    --- CONTEXT BÀI BÁO ĐANG THẢO LUẬN ---
+    ID: {paper.id}
+    Title: {paper.title}
+    Abstract: {paper.summary}
+    ---------------------------------------
+    """
+
+_contexts = GenerationCache(maxsize=PAPER_CONTEXT_CACHE_SIZE)
+
+async def paper_context(paper_id: str) -> Optional[PaperContext]:
+    """Context of `paper_id`, from the cache or MongoDB; None if the paper does not exist."""
+    hit, context = _contexts.get(paper_id)
+    if hit:
+        PAPER_CONTEXT_CACHE.inc(result="hit")
+        return context
+
+    PAPER_CONTEXT_CACHE.inc(result="miss")
+    paper = await ArxivPaper.find_one(ArxivPaper.id == paper_id).project(PaperContextView)
+    if paper is None:
+        return None
+    context = PaperContext(paper)
+    _contexts.set(paper_id, context)
+    return context
@@ -1,12 +1,16 @@
 import os
-from typing import Any
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, SystemMessage, ToolMessage
 from langchain.agents import create_agent
 
-from src.model import ArxivPaper
 from src.utils.log_config import get_logger
-from src.agent.tools import web_search, read_full_paper
+from src.utils.metrics import CHAT_TURNS, LLM_TTFT_SECONDS, LLM_TOKENS_PER_SECOND
+from src.agent.context import paper_context
+from src.agent.tools import TURN_DEADLINE, web_search, read_full_paper
 
 logger = get_logger("AgentGraph")
 
@@ -19,6 +23,10 @@ llm = ChatGoogleGenerativeAI(
 
 tools = [web_search, read_full_paper]
 
+# Thời hạn của một lượt chat (LLM + tool). Khi hết hạn agent bị dừng và người dùng
+# nhận phần câu trả lời đã stream; các tool tự kết thúc sớm hơn (xem `src.agent.tools`).
+CHAT_TURN_TIMEOUT = float(os.getenv("CHAT_TURN_TIMEOUT", 120))
+
 SYSTEM_PROMPT = """Bạn là một Trợ lý Nghiên cứu AI (AI Research Assistant) cao cấp.
 Bạn đang hỗ trợ người dùng tìm hiểu về một bài báo khoa học cụ thể.
 
@@ -34,26 +42,65 @@ Lưu ý:
 - Khi gọi `read_full_paper`, hãy kiên nhẫn đọc nội dung trả về.
 """
 
-agent_executor = create_agent(llm, tools, system_prompt=SYSTEM_PROMPT)
+def build_agent(model: BaseChatModel):
+    """Builds the tool-calling agent around `model`."""
+    return create_agent(model, tools, system_prompt=SYSTEM_PROMPT)
+
+agent_executor = build_agent(llm)
 
-async def chat_with_paper(paper_id: str, user_query: str, history: list) -> Any:
+def set_chat_model(model: BaseChatModel) -> None:
     """
-    Hàm entrypoint để gọi Agent.
+    Replaces the chat model used by `chat_with_paper` (e.g. a fake streaming model
+    for load tests). Sessions already streaming keep their current agent.
     """
-    paper = await ArxivPaper.get(paper_id)
-    if not paper:
-        yield "Xin lỗi, tôi không tìm thấy thông tin bài báo này trong cơ sở dữ liệu."
-        return
+    global llm, agent_executor
+    llm = model
+    agent_executor = build_agent(model)
+
+_END = object()
 
-    context_msg = f"""
-    --- CONTEXT BÀI BÁO ĐANG THẢO LUẬN ---
-    ID: {paper.id}
-    Title: {paper.title}
-    Abstract: {paper.summary}
-    ---------------------------------------
+async def _run_agent(messages: list, deadline: float, events: asyncio.Queue) -> None:
     """
+    Chạy agent trong một task riêng và đẩy các cập nhật vào `events`: chỉ token
+    của model (`messages`) và các bước của graph (`updates`, cho tool_start/tool_end),
+    không phải toàn bộ callback như `astream_events`. Task này bị huỷ khi hết thời
+    hạn của lượt hoặc khi client ngắt kết nối.
+    """
+    TURN_DEADLINE.set(deadline)
+    try:
+        async for item in agent_executor.astream({"messages": messages}, stream_mode=["messages", "updates"]):
+            events.put_nowait(item)
+    finally:
+        events.put_nowait(_END)
 
-    langchain_history = [SystemMessage(content=context_msg)]
+async def chat_with_paper(paper_id: str, user_query: str, history: list) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Hàm entrypoint để gọi Agent.
+
+    Sinh ra các sự kiện có kiểu của giao thức `/chat/stream` (xem
+    `src.agent.streaming`): `token`, `tool_start`, `tool_end`, `error` và luôn
+    kết thúc bằng `done` kèm thống kê.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    chunk_count = 0
+    output_tokens = 0
+
+    def done() -> Dict[str, Any]:
+        return {"type": "done", "usage": {
+            "output_tokens": output_tokens or chunk_count,
+            "chunks": chunk_count,
+            "ttft_ms": round((first_token_at - started) * 1000, 1) if first_token_at is not None else None,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }}
+
+    context = await paper_context(paper_id)
+    if not context:
+        yield {"type": "error", "message": "Xin lỗi, tôi không tìm thấy thông tin bài báo này trong cơ sở dữ liệu."}
+        yield done()
+        return
+
+    langchain_history = [SystemMessage(content=context.message)]
     for msg in history:
         if msg['role'] == 'user':
             langchain_history.append(HumanMessage(content=msg['content']))
@@ -62,24 +109,74 @@ async def chat_with_paper(paper_id: str, user_query: str, history: list) -> Any:
     
     langchain_history.append(HumanMessage(content=user_query))
 
+    deadline = time.monotonic() + CHAT_TURN_TIMEOUT
+    events: asyncio.Queue = asyncio.Queue()
+    agent = asyncio.create_task(_run_agent(langchain_history, deadline, events))
+    # Hết thời hạn của lượt: huỷ agent (LLM và tool đang chạy), giữ phần đã stream.
+    timer = asyncio.get_running_loop().call_later(CHAT_TURN_TIMEOUT, agent.cancel)
+    outcome = "error"
     try:
-        async for event in agent_executor.astream_events(
-            {"messages": langchain_history},
-            version="v1"
-        ):
-            kind = event["event"]
-            if kind == "on_tool_start":
-                tool_name = event['name']
-                if tool_name == "web_search":
-                    yield f"\n\n*🔍 Đang tìm kiếm thông tin trên web...*\n\n"
-                elif tool_name == "read_full_paper":
-                    yield f"\n\n*📥 Đang tải và đọc toàn văn bài báo (Full PDF)...*\n\n"
-
-            elif kind == "on_chat_model_stream":
-                content = event["data"]["chunk"].content
+        while True:
+            item = await events.get()
+            if item is _END:
+                break
+            mode, data = item
+            if mode == "messages":
+                chunk, metadata = data
+                # Chỉ token của node model là câu trả lời; LLM chạy bên trong tool
+                # (vd. bản phân tích của `read_full_paper`) cũng phát ra ở chế độ này.
+                if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "model":
+                    continue
+                usage = chunk.usage_metadata
+                if usage:
+                    output_tokens += usage.get("output_tokens", 0)
+                content = chunk.content
                 if content:
-                    yield content
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        LLM_TTFT_SECONDS.observe(first_token_at - started)
+                    chunk_count += 1
+                    yield {"type": "token", "text": content}
+
+            else:
+                for update in data.values():
+                    if not isinstance(update, dict):
+                        continue
+                    for message in update.get("messages", []):
+                        if isinstance(message, AIMessage):
+                            for call in message.tool_calls:
+                                yield {"type": "tool_start", "tool": call["name"]}
+                        elif isinstance(message, ToolMessage):
+                            yield {"type": "tool_end", "tool": message.name}
+
+        await asyncio.gather(agent, return_exceptions=True)
+        if agent.cancelled():
+            outcome = "deadline"
+            logger.warning(f"⏱️ Lượt chat về {paper_id} vượt quá {CHAT_TURN_TIMEOUT:g}s, đã dừng agent.")
+            yield {"type": "error", "message": "Đã hết thời gian cho lượt trả lời này, câu trả lời có thể chưa đầy đủ."}
+        elif agent.exception() is not None:
+            e = agent.exception()
+            logger.error(f"Lỗi Agent: {e}", exc_info=e)
+            yield {"type": "error", "message": f"Lỗi hệ thống: {str(e)}"}
+        else:
+            outcome = "completed"
+    except (asyncio.CancelledError, GeneratorExit):
+        # Client đã ngắt kết nối (StreamingResponse huỷ generator): dừng LLM và tool.
+        outcome = "cancelled"
+        raise
+    finally:
+        timer.cancel()
+        # Không chờ agent ở đây: khi client ngắt kết nối, task này có thể bị huỷ thêm
+        # lần nữa và việc chờ sẽ chuyển lần huỷ đó sang agent, làm langgraph bỏ dở
+        # việc dừng các node đang chạy (LLM vẫn tiếp tục sinh token).
+        if not agent.done():
+            agent.cancel()
+        CHAT_TURNS.inc(outcome=outcome)
+        if first_token_at is not None:
+            elapsed = time.perf_counter() - first_token_at
+            # Gemini reports usage on the last chunk; fall back to chunk count otherwise.
+            tokens = output_tokens or chunk_count
+            if elapsed > 0:
+                LLM_TOKENS_PER_SECOND.observe(tokens / elapsed)
 
-    except Exception as e:
-        logger.error(f"Lỗi Agent: {e}", exc_info=True)
-        yield f"\n\n[Lỗi hệ thống: {str(e)}]"
\ No newline at end of file
+    yield done()
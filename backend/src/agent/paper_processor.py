@@ -1,5 +1,6 @@
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from src.utils.log_config import get_logger
@@ -12,6 +13,19 @@ llm = ChatGoogleGenerativeAI(
     temperature=0.2
 )
 
+def set_analysis_model(model: BaseChatModel) -> None:
+    """Replaces the model used for deep analysis (e.g. a fake model for load tests)."""
+    global llm
+    llm = model
+
+# Tăng khi sửa ANALYSIS_PROMPT: các bản phân tích cũ vẫn được giữ và dùng tạm cho tới khi có bản mới.
+ANALYSIS_PROMPT_VERSION = 1
+
+def analysis_variant() -> str:
+    """Phiên bản prompt/model của bản phân tích, dùng làm khoá trong `paper_artifacts`."""
+    model = getattr(llm, "model", None) or type(llm).__name__
+    return f"prompt-{ANALYSIS_PROMPT_VERSION}:{model.removeprefix('models/')}"
+
 ANALYSIS_PROMPT = """Bạn là một Chuyên gia phân tích bài báo khoa học (AI Researcher).
 Nhiệm vụ của bạn là đọc toàn văn nội dung thô của một bài báo và tạo ra bản "PHÂN TÍCH CHUYÊN SÂU" (Deep Analysis).
 
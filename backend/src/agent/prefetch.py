@@ -0,0 +1,61 @@
+"""
+Chat warm-up (`POST /papers/{id}/prepare`), called by the frontend as soon as
+a user opens the chat of a paper, so that the heavy work of the first turns
+runs while the question is being typed:
+
+- the chat context of the paper is loaded into the per-paper cache
+  (`src.agent.context`);
+- unless the analysis of the current prompt/model variant is already stored,
+  the PDF download, text extraction and deep analysis start in the background,
+  as the same per-paper task `read_full_paper` joins: a deep question asked
+  meanwhile waits for the running analysis instead of starting a second one.
+
+Calls are idempotent: a paper that is analysed, or being analysed, is not
+started again. A warm-up is speculative, so it only starts an analysis when
+`ANALYSIS_ADMISSION` has a slot free right now (`try_admit`); otherwise it
+reports `busy` and leaves the analysis to the first deep question, instead of
+queueing ahead of real questions. `/prepare` itself is rate-limited per client
+(`PREPARE_ADMISSION`).
+
+`deep_question_cache_total{state}` counts whether each `read_full_paper` call
+found the analysis stored (`warm`), running (`in_flight`) or had to start it
+(`cold`).
+"""
+from typing import Optional
+
+from src.admission import ANALYSIS_ADMISSION
+from src.artifacts import ANALYSIS, load_artifact
+from src.utils.log_config import get_logger
+from src.utils.metrics import PAPER_PREPARE
+from src.agent.context import paper_context
+from src.agent.paper_processor import analysis_variant
+from src.agent.tools import analysis_running, start_analysis
+
+logger = get_logger("Prefetch")
+
+async def prepare_paper(paper_id: str) -> Optional[str]:
+    """
+    Warms the chat of `paper_id`.
+
+    Returns:
+        Optional[str]: State of the analysis: `ready` (stored), `running` (a
+        task was already running), `started` or `busy` (no free analysis slot,
+        not started); None if the paper does not exist.
+    """
+    context = await paper_context(paper_id)
+    if context is None:
+        return None
+    paper = context.paper
+
+    if analysis_running(paper.id):
+        state = "running"
+    elif await load_artifact(paper, ANALYSIS, analysis_variant()):
+        state = "ready"
+    elif (permit := ANALYSIS_ADMISSION.try_admit()) is None:
+        state = "busy"
+    else:
+        state = "started"
+        start_analysis(paper, analysis_variant(), keep=True, permit=permit)
+        logger.info(f"🔥 Chuẩn bị trước bài báo {paper.id}")
+    PAPER_PREPARE.inc(analysis=state)
+    return state
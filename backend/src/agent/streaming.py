@@ -0,0 +1,111 @@
+"""
+Wire protocol of `/chat/stream`: newline-delimited JSON, one typed event per line.
+
+    {"type": "token", "text": "..."}
+    {"type": "tool_start", "tool": "read_full_paper"}
+    {"type": "tool_end", "tool": "read_full_paper"}
+    {"type": "error", "message": "..."}
+    {"type": "done", "usage": {"output_tokens": 812, "chunks": 812, "ttft_ms": 640.2, "duration_ms": 9120.5}}
+
+`done` is always the last event of a turn. Consecutive `token` events are
+merged by `coalesce_tokens` before they reach the socket.
+"""
+import os
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from src.utils.log_config import get_logger
+
+logger = get_logger("ChatStream")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+COALESCE_WINDOW = float(os.getenv("CHAT_COALESCE_MS", 40)) / 1000
+COALESCE_MAX_CHARS = int(os.getenv("CHAT_COALESCE_CHARS", 512))
+
+_END = object()
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """One NDJSON line."""
+    return (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+async def coalesce_tokens(
+        events: AsyncIterator[Dict[str, Any]],
+        window: Optional[float] = None,
+        max_chars: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Merges consecutive `token` events into one, flushed when the first buffered
+    token is `window` seconds old, when the buffer reaches `max_chars`, or before
+    any other event (so tool/error/done events keep their order). A window of 0
+    disables coalescing.
+
+    The source is consumed by a single producer task so a slow model still gets
+    its buffer flushed on time; the task is cancelled if the consumer goes away.
+    """
+    window = COALESCE_WINDOW if window is None else window
+    max_chars = COALESCE_MAX_CHARS if max_chars is None else max_chars
+    if window <= 0:
+        async for event in events:
+            yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1024)
+    failure: List[BaseException] = []
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            failure.append(e)
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    buffer: List[str] = []
+    size = 0
+    deadline: Optional[float] = None
+
+    def flush() -> Dict[str, Any]:
+        nonlocal buffer, size, deadline
+        event = {"type": "token", "text": "".join(buffer)}
+        buffer, size, deadline = [], 0, None
+        return event
+
+    try:
+        while True:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                event = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield flush()
+                continue
+
+            if event is _END:
+                break
+            if event["type"] == "token":
+                buffer.append(event["text"])
+                size += len(event["text"])
+                if deadline is None:
+                    deadline = loop.time() + window
+                if size >= max_chars:
+                    yield flush()
+                continue
+
+            if buffer:
+                yield flush()
+            yield event
+
+        if buffer:
+            yield flush()
+        if failure:
+            raise failure[0]
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
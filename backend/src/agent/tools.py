@@ -1,23 +1,55 @@
+import os
+import time
+import asyncio
+import contextvars
+from contextvars import ContextVar
 from datetime import datetime, timezone
+from typing import Any, Dict, Optional
 from langchain_core.tools import tool
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_community.document_loaders import PyMuPDFLoader
 
 from src.model import ArxivPaper
+from src.admission import ANALYSIS_ADMISSION, AdmissionRejected, Permit
 from src.utils.log_config import get_logger
-from src.agent.paper_processor import summarize_and_analyze_pdf
+from src.utils.metrics import DEEP_QUESTION_CACHE, PDF_STAGE_SECONDS, TOOL_TIMEOUTS
+from src.artifacts import ANALYSIS, FULL_TEXT, FULL_TEXT_EXTRACTOR, load_artifact, save_artifact
+from src.agent.context import paper_context
+from src.agent.paper_processor import summarize_and_analyze_pdf, analysis_variant
 
 logger = get_logger("AgentTools")
 
+# Thời hạn (time.monotonic()) của lượt chat đang chạy, do `chat_with_paper` đặt.
+TURN_DEADLINE: ContextVar[Optional[float]] = ContextVar("turn_deadline", default=None)
+
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", 15))
+READ_FULL_PAPER_TIMEOUT = float(os.getenv("READ_FULL_PAPER_TIMEOUT", 90))
+# Thời gian chừa lại cho model trả lời sau khi một tool hết hạn.
+ANSWER_RESERVE_SECONDS = 15
+# Độ dài trích đoạn toàn văn trả về khi bản phân tích chưa xong.
+PARTIAL_EXCERPT_CHARS = 8000
+
+def tool_timeout(limit: float) -> float:
+    """Thời hạn của một lần gọi tool: `limit`, rút ngắn để lượt chat còn thời gian trả lời."""
+    deadline = TURN_DEADLINE.get()
+    if deadline is None:
+        return limit
+    return max(0.0, min(limit, deadline - time.monotonic() - ANSWER_RESERVE_SECONDS))
+
 @tool
-def web_search(query: str):
+async def web_search(query: str):
     """
     Sử dụng công cụ này khi cần tìm kiếm các thông tin, kiến thức bên ngoài (General Knowledge),
     các khái niệm mới, hoặc thông tin cập nhật không có trong bài báo.
     """
     logger.info(f"🔎 Agent đang search web: {query}")
     search = DuckDuckGoSearchRun()
-    return search.run(query)
+    try:
+        return await asyncio.wait_for(asyncio.to_thread(search.run, query), tool_timeout(WEB_SEARCH_TIMEOUT))
+    except asyncio.TimeoutError:
+        TOOL_TIMEOUTS.inc(tool="web_search")
+        logger.warning(f"⏱️ Search web quá thời gian: {query}")
+        return "Tìm kiếm web quá thời gian, không có kết quả. Hãy trả lời bằng thông tin đã có."
 
 @tool
 async def read_full_paper(paper_id: str):
@@ -26,32 +58,144 @@ async def read_full_paper(paper_id: str):
     Công cụ này sẽ TẢI PDF -> PHÂN TÍCH -> TRẢ VỀ bản phân tích chi tiết.
     """
     logger.info(f"📥 Agent phân tích: {paper_id}")
-    
-    paper = await ArxivPaper.get(paper_id)
-    if not paper:
+
+    context = await paper_context(paper_id)
+    if not context:
         return "Không tìm thấy bài báo trong Database."
+    paper = context.paper
 
-    if hasattr(paper, "deep_analysis") and paper.deep_analysis:
+    variant = analysis_variant()
+    analysis = await load_artifact(paper, ANALYSIS, variant)
+    if analysis:
+        DEEP_QUESTION_CACHE.inc(state="warm")
         logger.info("✅ Đã có bản phân tích trong Cache. Lấy ra dùng ngay.")
-        return paper.deep_analysis
+        return analysis
 
+    DEEP_QUESTION_CACHE.inc(state="in_flight" if analysis_running(paper.id) else "cold")
+    running = start_analysis(paper, variant)
+    running.waiters += 1
     try:
-        pdf_url = paper.pdf_url or f"http://arxiv.org/pdf/{paper.id}.pdf"
-            
-        logger.info(f"Downloading PDF from: {pdf_url}")
-        
-        loader = PyMuPDFLoader(pdf_url)
-        docs = loader.load()
-        raw_full_text = "\n\n".join([doc.page_content for doc in docs])
+        # shield: hết hạn chờ không huỷ bản phân tích, lần hỏi sau sẽ dùng được.
+        return await asyncio.wait_for(asyncio.shield(running.task), tool_timeout(READ_FULL_PAPER_TIMEOUT))
+    except asyncio.TimeoutError:
+        TOOL_TIMEOUTS.inc(tool="read_full_paper")
+        logger.warning(f"⏱️ Phân tích {paper.id} chưa xong, trả về kết quả tạm.")
+        return await _partial_result(paper)
+    except asyncio.CancelledError:
+        running.abandon()
+        raise
+    finally:
+        running.waiters -= 1
+
+async def _partial_result(paper: Any) -> str:
+    note = "Bản phân tích chi tiết vẫn đang được tạo, người dùng có thể hỏi lại sau ít phút để có bản đầy đủ."
+    full_text = await load_artifact(paper, FULL_TEXT, FULL_TEXT_EXTRACTOR)
+    if not full_text:
+        return f"{note} Hiện chỉ có phần tóm tắt (Abstract) để trả lời."
+    return f"{note} Trích đoạn đầu toàn văn:\n\n{full_text[:PARTIAL_EXCERPT_CHARS]}..."
+
+class _Analysis:
+    """
+    Bản phân tích đang chạy của một bài báo và số lượt chat đang chờ nó.
+
+    Tác vụ bị huỷ khi lượt chat cuối cùng chờ nó bị huỷ (client ngắt kết nối),
+    trừ khi nó được khởi động bởi `/papers/{id}/prepare` (`keep`): khi đó người
+    dùng sắp hỏi đến và kết quả vẫn có ích.
+    """
+    __slots__ = ("task", "waiters", "keep")
+
+    def __init__(self, task: asyncio.Task, keep: bool):
+        self.task = task
+        self.waiters = 0
+        self.keep = keep
+
+    def abandon(self) -> None:
+        """Gọi khi một lượt chat đang chờ bị huỷ: huỷ luôn tác vụ nếu không còn ai chờ."""
+        if self.waiters <= 1 and not self.keep:
+            self.task.cancel()
+
+# Bản phân tích đang chạy theo bài báo. `read_full_paper` và `/papers/{id}/prepare`
+# dùng chung một tác vụ nên mỗi bài báo chỉ được tải và phân tích một lần.
+_running_analyses: Dict[str, _Analysis] = {}
+
+def analysis_running(paper_id: str) -> bool:
+    return paper_id in _running_analyses
+
+def start_analysis(paper: Any, variant: str, keep: bool = False, permit: Optional[Permit] = None) -> _Analysis:
+    """
+    Phân tích `paper` (`ArxivPaper` hoặc `PaperContextView`): tác vụ đang chạy
+    nếu có, nếu không thì khởi động một tác vụ mới. Kết quả của tác vụ luôn là
+    chuỗi (bản phân tích, hoặc thông báo lỗi/quá tải cho người dùng).
+
+    `permit`: suất `ANALYSIS_ADMISSION` đã giành trước (`/prepare` không xếp hàng);
+    được trả lại khi tác vụ kết thúc, hoặc ngay nếu đã có tác vụ đang chạy.
+    """
+    running = _running_analyses.get(paper.id)
+    if running is None:
+        # Context trống: tác vụ không kế thừa callback của lượt chat (token của bản
+        # phân tích không lọt vào stream) hay `TURN_DEADLINE`, vì nó có thể sống lâu hơn lượt chat.
+        task = asyncio.create_task(_admitted_analysis(paper, variant, permit), context=contextvars.Context())
+        running = _running_analyses[paper.id] = _Analysis(task, keep)
+        running.task.add_done_callback(
+            lambda t: _running_analyses.pop(paper.id, None) if _running_analyses.get(paper.id) is running else None
+        )
+        if permit is not None:
+            # Cả khi tác vụ bị huỷ trước khi kịp chạy.
+            running.task.add_done_callback(lambda t: permit.release())
+    elif permit is not None:
+        permit.release()
+    running.keep = running.keep or keep
+    return running
+
+async def _admitted_analysis(paper: Any, variant: str, permit: Optional[Permit] = None) -> str:
+    # Giới hạn số bản phân tích PDF chạy đồng thời (quota Gemini, bộ nhớ).
+    if permit is None:
+        try:
+            permit = await ANALYSIS_ADMISSION.admit()
+        except AdmissionRejected as e:
+            logger.warning(f"🚦 Phân tích {paper.id} bị từ chối: {e}")
+            return f"Hệ thống đang phân tích quá nhiều bài báo, vui lòng thử lại sau {e.retry_after} giây."
+
+    async with permit:
+        # Một yêu cầu khác (hoặc worker khác) có thể đã phân tích xong trong lúc chờ.
+        analysis = await load_artifact(paper, ANALYSIS, variant)
+        if analysis:
+            return analysis
+        return await _analyze_pdf(paper, variant)
+
+async def _extract_full_text(paper: Any) -> str:
+    """
+    Toàn văn của bài báo: lấy bản đã lưu của version hiện tại nếu có (version mới
+    thay PDF dù tóm tắt giữ nguyên), nếu không thì tải và trích từ PDF.
+    """
+    full_text = await load_artifact(paper, FULL_TEXT, FULL_TEXT_EXTRACTOR)
+    if full_text:
+        return full_text
+
+    pdf_url = paper.pdf_url or f"http://arxiv.org/pdf/{paper.id}.pdf"
+    logger.info(f"Downloading PDF from: {pdf_url}")
+
+    # PyMuPDFLoader tải và đọc PDF đồng bộ: chạy trong thread để không chặn event loop
+    # (các bản phân tích khởi động trước bởi `/prepare` chạy song song với các phiên chat).
+    with PDF_STAGE_SECONDS.time(stage="download"):
+        loader = await asyncio.to_thread(PyMuPDFLoader, pdf_url)
+    with PDF_STAGE_SECONDS.time(stage="parse"):
+        docs = await asyncio.to_thread(loader.load)
+    full_text = "\n\n".join([doc.page_content for doc in docs])
+    await save_artifact(paper, FULL_TEXT, FULL_TEXT_EXTRACTOR, full_text)
+    return full_text
+
+async def _analyze_pdf(paper: Any, variant: str) -> str:
+    try:
+        raw_full_text = await _extract_full_text(paper)
         analysis_text = await summarize_and_analyze_pdf(raw_full_text)
 
-        paper.deep_analysis = analysis_text
-        paper.analyzed_at = datetime.now(timezone.utc)
-        await paper.save()
+        await save_artifact(paper, ANALYSIS, variant, analysis_text)
+        await ArxivPaper.find_one(ArxivPaper.id == paper.id).update({"$set": {"analyzed_at": datetime.now(timezone.utc)}})
         
         logger.info("✅ Đã lưu bản phân tích vào DB.")
         return analysis_text
         
     except Exception as e:
         logger.error(f"Lỗi quy trình đọc PDF: {e}")
-        return f"Không thể đọc bài báo: {str(e)}"
\ No newline at end of file
+        return f"Không thể đọc bài báo: {str(e)}"
@@ -0,0 +1,94 @@
+"""
+Storage of the large per-paper texts, deep analyses and extracted PDF full
+text, in `paper_artifacts`, zstd-compressed and outside the `arxiv_papers`
+documents, so reading or listing papers never moves them. Only
+`read_full_paper` loads them, one document at a time.
+
+Artifacts are keyed by paper, kind and variant (prompt/model version for
+analyses, extractor for full text). Several analysis variants are kept side by
+side: after a prompt change the newest analysis computed from the paper's
+current content is still served until the new variant is computed. Artifacts
+computed from an older version of the title/abstract are ignored, and so is
+the full text of an older version of the paper: a new version replaces the
+PDF even when the abstract stays the same.
+"""
+import os
+from typing import Any, Dict, Optional
+
+import zstandard
+
+from src.model import ArxivPaper, PaperArtifact
+from src.utils.arxiv_id import content_hash
+from src.utils.log_config import get_logger
+
+logger = get_logger("Artifacts")
+
+ANALYSIS = "analysis"
+FULL_TEXT = "full_text"
+FULL_TEXT_EXTRACTOR = "pymupdf"
+
+ZSTD_LEVEL = int(os.getenv("ARTIFACT_ZSTD_LEVEL", 9))
+
+def compress(text: str) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(text.encode("utf-8"))
+
+def decompress(data: bytes, codec: str = "zstd") -> str:
+    if codec != "zstd":
+        raise ValueError(f"Unknown artifact codec: {codec}")
+    return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
+def artifact_id(paper_id: str, kind: str, variant: str) -> str:
+    return f"{paper_id}:{kind}:{variant}"
+
+def _paper_hash(paper: Any) -> str:
+    return getattr(paper, "content_hash", None) or content_hash(paper.title, paper.summary)
+
+def _current_query(paper: Any, kind: str) -> Dict[str, Any]:
+    """Fields an artifact of `kind` must match to be served for the current `paper`."""
+    query = {"content_hash": _paper_hash(paper)}
+    if kind == FULL_TEXT:
+        query["paper_version"] = getattr(paper, "version", 1)
+    return query
+
+def build_artifact(paper: Any, kind: str, variant: str, text: str) -> PaperArtifact:
+    """`PaperArtifact` of `text` for `paper` (`ArxivPaper` or a projection with id/title/summary)."""
+    return PaperArtifact(
+        id=artifact_id(paper.id, kind, variant),
+        paper_id=paper.id,
+        kind=kind,
+        variant=variant,
+        paper_version=getattr(paper, "version", 1),
+        content_hash=_paper_hash(paper),
+        data=compress(text),
+        size=len(text.encode("utf-8")),
+    )
+
+async def save_artifact(paper: Any, kind: str, variant: str, text: str) -> PaperArtifact:
+    """Stores (or replaces) the `kind`/`variant` artifact of `paper`."""
+    artifact = build_artifact(paper, kind, variant, text)
+    await artifact.save()
+    logger.info(
+        f"🗜️ {kind} of {paper.id} ({variant}) stored: {artifact.size:,} -> {len(artifact.data):,} bytes"
+    )
+    return artifact
+
+async def load_artifact(paper: Any, kind: str, variant: Optional[str] = None) -> Optional[str]:
+    """
+    Text of the `variant` artifact of `paper` or, when missing (or no `variant`
+    is given), of the most recent one of that kind. Only artifacts computed from
+    the paper's current title/abstract (and, for the full text, its current
+    version) are returned; None if there is none.
+    """
+    current = _current_query(paper, kind)
+    if variant is not None:
+        artifact = await PaperArtifact.get(artifact_id(paper.id, kind, variant))
+        if artifact is not None and all(getattr(artifact, k) == v for k, v in current.items()):
+            return decompress(artifact.data, artifact.codec)
+
+    query: Dict[str, Any] = {"paper_id": paper.id, "kind": kind, **current}
+    artifact = await PaperArtifact.find(query).sort("-created_at").first_or_none()
+    if artifact is None:
+        return None
+    if variant is not None:
+        logger.info(f"♻️ Serving {kind} of {paper.id} from variant {artifact.variant} (no {variant} yet).")
+    return decompress(artifact.data, artifact.codec)
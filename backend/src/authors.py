@@ -0,0 +1,149 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Optional, Tuple, Any
+
+from beanie.operators import In
+from pymongo import UpdateOne
+
+from src.model import ArxivPaper, Author, AuthorCategory
+from src.utils.cache import GenerationCache
+from src.utils.log_config import get_logger
+from src.utils.names import normalize_author_name
+
+logger = get_logger("AuthorIndex")
+
+_top_authors_cache = GenerationCache(maxsize=128)
+
+def normalize_category(category: str) -> str:
+    """Accepts both the short frontend code (`CL`) and the arXiv name (`cs.CL`)."""
+    category = category.strip()
+    return category if "." in category else f"cs.{category}"
+
+async def update_author_index(
+        papers: List[ArxivPaper],
+        previous: Optional[Dict[str, Tuple[List[str], List[str]]]] = None
+    ) -> int:
+    """
+    Incrementally maintains the `authors` and `author_categories` collections
+    after an ingest.
+
+    Each paper contributes +1 to the `paper_count` of every author and of every
+    (author, category) pair. For a new version of an already stored paper,
+    `previous` holds the `(author_keys, categories)` it was counted with, whose
+    contribution is subtracted first, so the counts stay exact when the author
+    list or the categories change between versions.
+
+    All changes are netted per author (and category) and written in one
+    unordered bulk write per collection.
+
+    Args:
+        papers (List[ArxivPaper]): Inserted or updated papers.
+        previous (Dict): paper_id -> (author_keys, categories) before the update.
+
+    Returns:
+        int: The number of author documents touched (not counting `author_categories`).
+    """
+    previous = previous or {}
+    paper_delta: Counter = Counter()
+    category_delta: Dict[str, Counter] = defaultdict(Counter)
+    names: Dict[str, str] = {}
+    last_published: Dict[str, datetime] = {}
+
+    for paper in papers:
+        old_keys, old_categories = previous.get(paper.id, ([], []))
+        for key in old_keys:
+            paper_delta[key] -= 1
+            for category in old_categories:
+                category_delta[key][category] -= 1
+
+        for name in paper.author:
+            names.setdefault(normalize_author_name(name), name)
+
+        for key in paper.author_keys:
+            paper_delta[key] += 1
+            for category in paper.categories:
+                category_delta[key][category] += 1
+            if key not in last_published or paper.published_date > last_published[key]:
+                last_published[key] = paper.published_date
+
+    updates = []
+    for key in set(paper_delta) | set(last_published):
+        if not paper_delta[key] and key not in last_published:
+            continue
+        update: Dict[str, Any] = {"$setOnInsert": {"name": names.get(key, key)}}
+        if paper_delta[key]:
+            update["$inc"] = {"paper_count": paper_delta[key]}
+        if key in last_published:
+            update["$max"] = {"last_published": last_published[key]}
+        updates.append(UpdateOne({"_id": key}, update, upsert=True))
+
+    category_updates = [
+        UpdateOne(
+            {"_id": f"{key}|{category}"},
+            {"$setOnInsert": {"author": key, "category": category}, "$inc": {"paper_count": n}},
+            upsert=True
+        )
+        for key, counts in category_delta.items() for category, n in counts.items() if n
+    ]
+
+    if updates:
+        await Author.get_pymongo_collection().bulk_write(updates, ordered=False)
+    if category_updates:
+        await AuthorCategory.get_pymongo_collection().bulk_write(category_updates, ordered=False)
+    logger.debug(f"Author index: {len(updates)} authors updated from {len(papers)} papers")
+    return len(updates)
+
+async def papers_by_author(name: str, limit: int = 50, skip: int = 0) -> List[ArxivPaper]:
+    """All papers of one author, newest first (served by the `author_keys_published` index)."""
+    key = normalize_author_name(name)
+    return await ArxivPaper.find(ArxivPaper.author_keys == key) \
+        .sort("-published_date").skip(skip).limit(limit).to_list()
+
+async def top_authors(category: Optional[str] = None, days: Optional[int] = 7, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Most active authors, optionally restricted to a category and a time window.
+
+    With a window, only the papers published in it are aggregated (bounded by the
+    `categories_published` index, so the cost follows the window, not the corpus).
+    Without a window the precomputed counters are used: `authors.paper_count`,
+    or `author_categories` (walked along its (category, paper_count) index) for a category.
+    Results are cached until the next crawl generation.
+    """
+    category = normalize_category(category) if category else None
+    cache_key = (category, days, limit)
+    hit, cached = _top_authors_cache.get(cache_key)
+    if hit:
+        return cached
+
+    if days:
+        match: Dict[str, Any] = {"published_date": {"$gte": datetime.now(timezone.utc) - timedelta(days=days)}}
+        if category:
+            match["categories"] = category
+        pipeline = [
+            {"$match": match},
+            {"$project": {"author_keys": 1}},
+            {"$unwind": "$author_keys"},
+            {"$group": {"_id": "$author_keys", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit},
+            {"$lookup": {"from": Author.get_collection_name(), "localField": "_id", "foreignField": "_id", "as": "author"}},
+            {"$project": {
+                "_id": 0,
+                "key": "$_id",
+                "count": 1,
+                "name": {"$ifNull": [{"$arrayElemAt": ["$author.name", 0]}, "$_id"]}
+            }},
+        ]
+        result = await ArxivPaper.aggregate(pipeline).to_list()
+    elif category:
+        counts = await AuthorCategory.find(AuthorCategory.category == category, AuthorCategory.paper_count > 0) \
+            .sort([("paper_count", -1), ("_id", 1)]).limit(limit).to_list()
+        authors = await Author.find(In(Author.id, [c.author for c in counts])).to_list()
+        names = {a.id: a.name for a in authors}
+        result = [{"key": c.author, "name": names.get(c.author, c.author), "count": c.paper_count} for c in counts]
+    else:
+        query = Author.find(Author.paper_count > 0).sort("-paper_count").limit(limit)
+        result = [{"key": a.id, "name": a.name, "count": a.paper_count} for a in await query.to_list()]
+
+    _top_authors_cache.set(cache_key, result)
+    return result
@@ -0,0 +1,279 @@
+"""
+Coordination between API worker processes through MongoDB.
+
+Every worker (uvicorn `--workers N`, or several containers) owns its own
+database clients and runs a `ClusterMember`:
+
+- `LeaderElector` campaigns for a lease document in `leases`. The holder
+  renews it every `lease_seconds / 3`; if it dies, another worker takes the
+  lease over once it expires (a clean shutdown releases it immediately). Each
+  change of holder increments `term`.
+- Only the leader runs the `PeriodicJob`s (scheduled crawls, background jobs).
+  Every run is claimed in `crawl_runs` under a unique `<job>:<slot>` ID before
+  it starts, so a slot is executed once even across failovers and restarts; a
+  run left `running` by a leader of an older term is taken over and retried.
+- The corpus generation (see `src.utils.cache`) is published in
+  `cluster_state` after each ingest and polled by every worker, so the
+  generation caches of all workers are invalidated by a crawl in any of them.
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from src.model import Lease, CrawlRun, ClusterState
+from src.utils.cache import bump_generation, set_generation
+from src.utils.log_config import get_logger, job_context
+
+logger = get_logger("Cluster")
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+LEASE_SECONDS = float(os.getenv("LEADER_LEASE_SECONDS", 15))
+GENERATION_POLL_SECONDS = float(os.getenv("GENERATION_POLL_SECONDS", 2))
+SCHEDULER_TICK_SECONDS = 30.0
+
+CORPUS_GENERATION = "corpus_generation"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+class LeaderElector:
+    """
+    Lease-based leader election on one document of `leases`.
+
+    Args:
+        name: Lease name; workers campaigning on the same name elect one leader.
+        worker_id: Identity written in the lease (default: host:pid:random).
+        lease_seconds: Lease duration. Failover after a crash takes at most
+            about `lease_seconds * 4 / 3`.
+    """
+    def __init__(self, name: str = "scheduler", worker_id: str = WORKER_ID, lease_seconds: float = LEASE_SECONDS):
+        self.name = name
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.renew_interval = lease_seconds / 3
+        self.term: Optional[int] = None
+        self._valid_until = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        """True while the lease is held and cannot have expired for the others yet."""
+        return self.term is not None and time.monotonic() < self._valid_until
+
+    async def try_acquire(self) -> bool:
+        """Renews the lease if held, otherwise takes it if free or expired."""
+        collection = Lease.get_pymongo_collection()
+        sent = time.monotonic()
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+
+        if self.term is not None:
+            renewed = await collection.find_one_and_update(
+                {"_id": self.name, "holder": self.worker_id, "term": self.term},
+                {"$set": {"expires_at": expires_at}}
+            )
+            if renewed:
+                self._valid_until = sent + self.lease_seconds
+                return True
+            logger.warning(f"⚠️ Lease '{self.name}' (term {self.term}) was taken over.")
+            self.term = None
+
+        try:
+            lease = await collection.find_one_and_update(
+                {"_id": self.name, "expires_at": {"$lt": now}},
+                {"$set": {"holder": self.worker_id, "expires_at": expires_at}, "$inc": {"term": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The lease exists and has not expired: someone else leads.
+            return False
+
+        self.term = lease["term"]
+        self._valid_until = sent + self.lease_seconds
+        logger.info(f"👑 {self.worker_id} is now the leader of '{self.name}' (term {self.term}).")
+        return True
+
+    async def release(self) -> None:
+        """Gives the lease up so another worker can take over immediately."""
+        if self.term is None:
+            return
+        await Lease.get_pymongo_collection().update_one(
+            {"_id": self.name, "holder": self.worker_id, "term": self.term},
+            {"$set": {"expires_at": _EPOCH}}
+        )
+        logger.info(f"Lease '{self.name}' (term {self.term}) released.")
+        self.term = None
+
+    async def run(self, on_elected: Callable[[], Awaitable[None]]) -> None:
+        """
+        Campaigns forever. While leader, `on_elected()` runs as a task (restarted
+        if it stops); the task is cancelled as soon as the lease is lost.
+        """
+        task: Optional[asyncio.Task] = None
+        try:
+            while True:
+                try:
+                    leader = await self.try_acquire()
+                except PyMongoError as e:
+                    logger.warning(f"⚠️ Lease '{self.name}' unreachable: {e}")
+                    leader = self.is_leader
+
+                if leader and (task is None or task.done()):
+                    if task is not None and not task.cancelled() and task.exception():
+                        logger.error(f"❌ Leader task failed: {task.exception()}", exc_info=task.exception())
+                    task = asyncio.create_task(on_elected())
+                elif not leader and task is not None:
+                    logger.warning(f"⚠️ {self.worker_id} lost the leadership of '{self.name}'; stopping leader tasks.")
+                    await _cancel(task)
+                    task = None
+
+                await asyncio.sleep(self.renew_interval)
+        finally:
+            if task is not None:
+                await _cancel(task)
+            try:
+                await self.release()
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Could not release lease '{self.name}': {e}")
+
+class PeriodicJob:
+    """
+    A job run once per `interval`-long slot (slots are aligned on the epoch, so
+    every worker computes the same ones).
+
+    Args:
+        name: Job name, prefix of its `crawl_runs` IDs.
+        interval: Slot length.
+        run: Coroutine function executing the job; its returned dict is stored
+            in the run document.
+    """
+    def __init__(self, name: str, interval: timedelta, run: Callable[[], Awaitable[Optional[Dict[str, Any]]]]):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.last_slot: Optional[datetime] = None
+
+    def slot(self, now: datetime) -> datetime:
+        step = self.interval.total_seconds()
+        return datetime.fromtimestamp(now.timestamp() // step * step, tz=timezone.utc)
+
+    def next_slot(self, now: datetime) -> datetime:
+        return self.slot(now) + self.interval
+
+async def run_slot(job: PeriodicJob, slot: datetime, elector: LeaderElector) -> Optional[CrawlRun]:
+    """
+    Claims and executes one slot of `job`. Returns the finished run, or None if
+    the slot was already done or is being run under the current term.
+    """
+    run_id = f"{job.name}:{slot.isoformat()}"
+    run = CrawlRun(id=run_id, job=job.name, slot=slot, holder=elector.worker_id, term=elector.term)
+    try:
+        await run.insert()
+    except DuplicateKeyError:
+        # A leader of an older term died (or lost its lease) while running it.
+        previous = await CrawlRun.get_pymongo_collection().find_one_and_update(
+            {"_id": run_id, "status": "running", "term": {"$lt": elector.term}},
+            {
+                "$set": {"holder": elector.worker_id, "term": elector.term, "started_at": datetime.now(timezone.utc)},
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if previous is None:
+            return None
+        run = CrawlRun.model_validate(previous)
+        logger.warning(f"♻️ Taking over {run_id} left running by an earlier leader (attempt {run.attempts}).")
+
+    with job_context(f"{job.name}-{slot:%Y%m%dT%H%M}"):
+        logger.info(f"⏰ Running {run_id} (term {elector.term})...")
+        try:
+            result = await job.run() or {}
+            update = {"status": "done", "result": result}
+            logger.info(f"✅ {run_id} done: {result}")
+        except Exception as e:
+            update = {"status": "failed", "error": str(e)}
+            logger.error(f"❌ {run_id} failed: {e}", exc_info=True)
+
+    update["finished_at"] = datetime.now(timezone.utc)
+    await CrawlRun.get_pymongo_collection().update_one({"_id": run_id, "term": elector.term}, {"$set": update})
+    return run.model_copy(update=update)
+
+async def run_scheduler(jobs: List[PeriodicJob], elector: LeaderElector) -> None:
+    """Leader task: runs the current slot of every job, then sleeps until the next one."""
+    while True:
+        now = datetime.now(timezone.utc)
+        for job in jobs:
+            slot = job.slot(now)
+            if job.last_slot != slot:
+                await run_slot(job, slot, elector)
+                job.last_slot = slot
+
+        now = datetime.now(timezone.utc)
+        wake = min(job.next_slot(now) for job in jobs)
+        await asyncio.sleep(min(SCHEDULER_TICK_SECONDS, max(0.0, (wake - now).total_seconds())))
+
+async def publish_generation() -> int:
+    """
+    Bumps the corpus generation for every worker (falls back to a local bump if
+    MongoDB is unreachable) and returns the new value.
+    """
+    try:
+        state = await ClusterState.get_pymongo_collection().find_one_and_update(
+            {"_id": CORPUS_GENERATION},
+            {"$inc": {"value": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except PyMongoError as e:
+        logger.warning(f"⚠️ Could not publish the corpus generation: {e}")
+        return bump_generation()
+    set_generation(state["value"])
+    return state["value"]
+
+async def follow_generation(interval: float = GENERATION_POLL_SECONDS) -> None:
+    """Adopts the corpus generation published by other workers."""
+    collection = ClusterState.get_pymongo_collection()
+    while True:
+        try:
+            state = await collection.find_one({"_id": CORPUS_GENERATION})
+            if state and set_generation(state["value"]):
+                logger.debug(f"Corpus generation -> {state['value']}")
+        except PyMongoError as e:
+            logger.warning(f"⚠️ Could not read the corpus generation: {e}")
+        await asyncio.sleep(interval)
+
+class ClusterMember:
+    """
+    Background tasks of one worker: generation follower, plus leader election and
+    the scheduler when `scheduler` is enabled.
+    """
+    def __init__(self, jobs: List[PeriodicJob], scheduler: bool = True, elector: Optional[LeaderElector] = None):
+        self.jobs = jobs
+        self.scheduler = scheduler and bool(jobs)
+        self.elector = elector or LeaderElector()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks.append(asyncio.create_task(follow_generation()))
+        if self.scheduler:
+            self._tasks.append(asyncio.create_task(self.elector.run(lambda: run_scheduler(self.jobs, self.elector))))
+        logger.info(f"🤝 Worker {self.elector.worker_id} joined the cluster (scheduler: {self.scheduler}).")
+
+    async def stop(self) -> None:
+        for task in reversed(self._tasks):
+            await _cancel(task)
+        self._tasks = []
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        logger.error(f"❌ Background task failed: {e}", exc_info=True)
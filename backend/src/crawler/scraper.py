@@ -1,27 +1,84 @@
+import os
 import arxiv
 from ast import List
-from src.model import ArxivPaper
+from beanie.operators import In
+from src.model import ArxivPaper, PaperVersionView
 from typing import Literal, List, Optional
-from src.utils.log_config import get_logger
+from src.utils.log_config import get_logger, LogSampler
+from src.utils.arxiv_id import split_arxiv_id, content_hash
+from src.cluster import publish_generation
+from src.utils.metrics import timed, ARXIV_FETCH_SECONDS, SAVE_TO_DB_SECONDS, PAPERS_SAVED
+from src.authors import update_author_index
+from src.watchlists import percolate
+from src.database import get_vector_store
+from src.processor import mark_indexed, paper_payload
 from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timezone, timedelta
 
 logger = get_logger("Crawler") 
+sampled_logger = LogSampler(logger, interval=1.0)
+
+def content_changed(paper: ArxivPaper, current: PaperVersionView) -> bool:
+    """True if the title/abstract of `paper` differ from the stored version."""
+    return paper.content_hash != (current.content_hash or content_hash(current.title, current.summary))
+
+def version_update_fields(paper: ArxivPaper, changed: bool) -> dict:
+    """
+    `$set` applied when a newer version of a stored paper arrives. A content
+    change also clears `analyzed_at`; the stored analysis, computed from the
+    old text, no longer matches the paper's content hash and is not served.
+    It clears `indexed_at` as well until the new vector is written.
+    """
+    fields = {
+        "version": paper.version,
+        "title": paper.title,
+        "author": paper.author,
+        "author_keys": paper.author_keys,
+        "arxiv_url": paper.arxiv_url,
+        "pdf_url": paper.pdf_url,
+        "updated_date": paper.updated_date,
+        "summary": paper.summary,
+        "prime_category": paper.prime_category,
+        "categories": paper.categories,
+        "content_hash": paper.content_hash,
+    }
+    if changed:
+        fields["analyzed_at"] = None
+        fields["indexed_at"] = None
+    return fields
+
+class _InstrumentedClient(arxiv.Client):
+    """arxiv.Client that records the fetch time of every result page."""
+    def _parse_feed(self, url: str, first_page: bool = True, _try_index: int = 0):
+        if _try_index:
+            return super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
+        with ARXIV_FETCH_SECONDS.time():
+            return super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
 
 class ArxivScraper:
-    def __init__(self):
-        self.client = arxiv.Client(
+    def __init__(self, api_url: Optional[str] = None, delay_seconds: float = 3):
+        """
+        Args:
+            api_url: Query URL format of the arXiv API (`...query?{}`). Defaults to
+                `ARXIV_API_URL` or the public endpoint; benchmarks point it at a local feed.
+            delay_seconds: Minimum delay between two page requests (arXiv asks for 3s).
+        """
+        self.client = _InstrumentedClient(
                 page_size = 100,
-                delay_seconds = 3,
+                delay_seconds = delay_seconds,
                 num_retries = 3
             )
+        api_url = api_url or os.getenv("ARXIV_API_URL")
+        if api_url:
+            self.client.query_url_format = api_url
 
     def get_paper(
             self,
             topics: List[Literal["AI", "AR", "CC", "CE", "CL", "CR", "CV", "CY", "DB", "DC", "DL", "DM", "DS", "ET", "GR", "GT", "HC", "IR", "IT", "LO", "LG", "MA", "MM", "MS", "NA", "NE", "NI", "OS", "PF", "PL", "RO", "SC", "SD", "SE", "SI", "SY"]] = "AI",
             keyword: str = '',
             days_back: Optional[int] = 3,
-            start_date: Optional[str] = None
+            start_date: Optional[str] = None,
+            max_results: Optional[int] = None
         ) -> list[ArxivPaper]:
         """Get recent papers from arXiv based on topic, keyword and date.
         
@@ -67,6 +124,7 @@ class ArxivScraper:
 
             keyword: Keywords used to search for content users are interested in.
             days_back: Number of days to start searching for content. Calculated as: today's date - days_back
+            max_results: Upper bound on fetched results. Defaults to 300 with a keyword, 100 otherwise.
 
         Returns:
             List[Dict[str, Any]]: A list of dictionaries containing paper details.
@@ -85,7 +143,6 @@ class ArxivScraper:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=max(days_back, 1))
         else:
             cutoff_date = datetime.now(timezone.utc) - timedelta(days=30)
-        today = datetime.now(timezone.utc).date()
 
         if not topics:
             cat_part = 'cat:cs.*'
@@ -104,34 +161,40 @@ class ArxivScraper:
 
         search = arxiv.Search(
             query = query,
-            max_results = 300 if keyword else 100,
+            max_results = max_results or (300 if keyword else 100),
             sort_by = arxiv.SortCriterion.LastUpdatedDate,
             sort_order=arxiv.SortOrder.Descending
         )
 
         results_list = []
-        seen_ids = set()
+        seen_papers = {}
 
         try:
             for result in self.client.results(search):
-                if result.updated.date() > today - cutoff_date: continue
-                short_id = result.entry_id.split('/')[-1]
+                if result.updated < cutoff_date: break
+                base_id, version = split_arxiv_id(result.entry_id)
 
-                if short_id in seen_ids: continue
-                seen_ids.add(short_id)
+                if base_id in seen_papers:
+                    if version <= seen_papers[base_id].version: continue
+                    results_list.remove(seen_papers[base_id])
 
+                title = result.title.replace('\n', ' ')
+                summary = result.summary.replace('\n', ' ')
                 paper = ArxivPaper(
-                    _id = result.entry_id.split('/')[-1],
-                    title = result.title.replace('\n', ' '),
+                    _id = base_id,
+                    version = version,
+                    title = title,
                     author = [str(a) for a in result.authors],
                     arxiv_url = result.entry_id,
                     pdf_url=result.pdf_url,
                     published_date=result.published,
                     updated_date=result.updated,
-                    summary = result.summary.replace('\n', ' '),
+                    summary = summary,
                     prime_category = result.primary_category,
-                    categories = result.categories
+                    categories = result.categories,
+                    content_hash = content_hash(title, summary)
                 )
+                seen_papers[base_id] = paper
                 results_list.append(paper)
                 
         except Exception as e:
@@ -141,25 +204,99 @@ class ArxivScraper:
 
         return results_list
     
+    @timed(SAVE_TO_DB_SECONDS)
     async def save_to_db(self, papers: List[ArxivPaper]) -> List[ArxivPaper]:
-        """An asynchronous function to save to MongoDB via Beanie.
-        Returns the number of new posts added."""
+        """An asynchronous, version-aware upsert to MongoDB via Beanie.
+
+        Papers are keyed by their base arXiv ID:
+            - unknown IDs are inserted;
+            - a newer version updates the stored metadata and, only when the
+              title/abstract actually changed, clears `analyzed_at`; otherwise
+              the embedding is kept and only the vector payload (version,
+              URL) is rewritten;
+            - an equal or older version is ignored.
+
+        Inserted papers are then matched against the users' watchlists (see
+        `src.watchlists`).
+
+        Returns the papers whose embedding must be (re)computed, i.e. new papers
+        and new versions with changed content."""
         if not papers:
             logger.info("No new papers to save.")
             return []
         
-        new_papers = []
+        to_index = []
+        payload_only = []
+        changed_papers = []
+        inserted_papers = []
+        previous = {}
+        inserted = updated = 0
         logger.info('Start saving to the database...')
 
+        stored = {
+            p.id: p for p in await ArxivPaper.find(
+                In(ArxivPaper.id, [paper.id for paper in papers])
+            ).project(PaperVersionView).to_list()
+        }
+
         for paper in papers:
+            if not paper.content_hash:
+                paper.content_hash = content_hash(paper.title, paper.summary)
+            current = stored.get(paper.id)
+
             try:
-                await paper.insert()
-                new_papers.append(paper)
-                logger.debug(f'Add {paper.id} to the database')
+                if current is None:
+                    await paper.insert()
+                    to_index.append(paper)
+                    changed_papers.append(paper)
+                    inserted_papers.append(paper)
+                    inserted += 1
+                    sampled_logger.debug('save.insert', 'Add %sv%s to the database', paper.id, paper.version)
+                    continue
+
+                if paper.version <= current.version:
+                    continue
+
+                changed = content_changed(paper, current)
+                fields = version_update_fields(paper, changed)
+                if changed:
+                    to_index.append(paper)
+                else:
+                    payload_only.append(paper)
+
+                await ArxivPaper.find_one(ArxivPaper.id == paper.id).update({"$set": fields})
+                changed_papers.append(paper)
+                previous[paper.id] = (current.author_keys, current.categories)
+                updated += 1
+                sampled_logger.debug('save.update', 'Update %s v%s -> v%s (content changed: %s)', paper.id, current.version, paper.version, changed)
             except DuplicateKeyError:
                 pass
             except Exception as e:
                 logger.error(f'Error saving paper ID {paper.id}: {e}')
 
-        logger.info(f'✅ Saved {len(new_papers)} new papers to the Mongodb.')
-        return new_papers
\ No newline at end of file
+        PAPERS_SAVED.inc(inserted, result="inserted")
+        PAPERS_SAVED.inc(updated, result="updated")
+        PAPERS_SAVED.inc(len(papers) - inserted - updated, result="unchanged")
+
+        if changed_papers:
+            try:
+                await update_author_index(changed_papers, previous)
+            except Exception as e:
+                logger.error(f'Error updating the author index: {e}')
+            await publish_generation()
+
+        if payload_only:
+            try:
+                await get_vector_store().set_payload({p.id: paper_payload(p) for p in payload_only})
+                await mark_indexed([p.id for p in payload_only])
+            except Exception as e:
+                logger.error(f'Error updating the vector payloads: {e}')
+
+        if inserted_papers:
+            try:
+                await percolate(inserted_papers)
+            except Exception as e:
+                logger.error(f'Error percolating the watchlists: {e}')
+
+        logger.info(f'✅ Saved {inserted} new papers and {updated} new versions to the Mongodb ({len(to_index)} need indexing).')
+        return to_index
@@ -0,0 +1,188 @@
+"""
+Streaming reader for the arXiv metadata snapshot (the JSON-lines dump published
+on Kaggle / the arXiv S3 bucket, one record per line, optionally gzip-compressed).
+
+The file is read line by line in binary mode, so memory stays flat whatever its
+size. Lines that cannot match the category filter are skipped on a substring
+test before any JSON parsing. The reader tracks the uncompressed byte offset of
+the next line, which lets an interrupted import seek back to where it stopped
+(for gzip, seeking decompresses up to the offset without parsing anything).
+"""
+import gzip
+import json
+from pathlib import Path
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from src.model import ArxivPaper
+from src.utils.arxiv_id import content_hash
+from src.utils.names import normalize_author_name
+from src.utils.log_config import get_logger, LogSampler
+
+logger = get_logger("Snapshot")
+sampled_logger = LogSampler(logger, interval=5.0)
+
+def open_snapshot(path: Path) -> BinaryIO:
+    """Opens a snapshot file for binary line reading (gzip detected by its magic bytes)."""
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    return open(path, "rb", buffering=1 << 20)
+
+def _clean(text: str) -> str:
+    return " ".join(text.split())
+
+def _authors(record: Dict[str, Any]) -> List[str]:
+    parsed = record.get("authors_parsed")
+    if parsed:
+        names = []
+        for parts in parsed:
+            last, first, suffix = (list(parts) + ["", "", ""])[:3]
+            names.append(" ".join(p for p in (first, last, suffix) if p))
+        return names
+    raw = record.get("authors") or ""
+    return [a.strip() for a in raw.replace(" and ", ", ").split(",") if a.strip()]
+
+_MONTHS = {m: i for i, m in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+def _version_date(version: Dict[str, str]) -> datetime:
+    created = version["created"]
+    # Fast path for the snapshot's fixed format, "Mon, 2 Apr 2007 19:18:42 GMT".
+    parts = created.split()
+    if len(parts) == 6 and parts[5] == "GMT" and parts[2] in _MONTHS:
+        hour, minute, second = parts[4].split(":")
+        return datetime(int(parts[3]), _MONTHS[parts[2]], int(parts[1]), int(hour), int(minute), int(second), tzinfo=timezone.utc)
+    return parsedate_to_datetime(created).astimezone(timezone.utc)
+
+def record_to_paper(record: Dict[str, Any]) -> ArxivPaper:
+    """
+    Maps one snapshot record to an `ArxivPaper`.
+
+    The latest entry of `versions` gives the version number and `updated_date`,
+    the first one `published_date` (the same dates the arXiv API reports).
+
+    Raises:
+        KeyError, ValueError: If a required field is missing or malformed.
+    """
+    versions = record["versions"]
+    latest = versions[-1]
+    version = int(latest["version"].lstrip("v"))
+    base_id = record["id"]
+    categories = record["categories"].split()
+    title = _clean(record["title"])
+    summary = _clean(record["abstract"])
+    authors = _authors(record)
+    # Every value is already typed, so pydantic validation (most of the mapping
+    # cost) is skipped; `author_keys` is filled here instead of by the validator.
+    return ArxivPaper.model_construct(
+        id=base_id,
+        version=version,
+        title=title,
+        author=authors,
+        author_keys=list(dict.fromkeys(normalize_author_name(a) for a in authors)),
+        arxiv_url=f"http://arxiv.org/abs/{base_id}v{version}",
+        pdf_url=f"http://arxiv.org/pdf/{base_id}v{version}",
+        published_date=_version_date(versions[0]),
+        updated_date=_version_date(latest),
+        summary=summary,
+        prime_category=categories[0],
+        categories=categories,
+        content_hash=content_hash(title, summary),
+        crawled_at=datetime.now(timezone.utc).date()
+    )
+
+class SnapshotFilter:
+    """
+    Category and date filter applied while reading.
+
+    Args:
+        categories: Exact categories (`cs.CL`) or prefixes (`cs.*`); a paper
+            matches if any of its categories does (like `cat:` in the arXiv API).
+            Empty means every category.
+        since / until: Bounds on `updated_date` (date of the latest version),
+            `until` exclusive.
+    """
+    def __init__(self, categories: Iterable[str] = (), since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.categories = sorted(set(categories))
+        self.exact = {c for c in self.categories if not c.endswith("*")}
+        self.prefixes = tuple(c.rstrip("*") for c in self.categories if c.endswith("*"))
+        self.since = since
+        self.until = until
+        # Every matching line contains one of these byte strings: a category
+        # starts the `categories` value or follows a space in it, which keeps
+        # `cs.` from matching inside `physics.optics`.
+        self._needles = [
+            sep + c.encode() for c in (*self.exact, *self.prefixes) for sep in (b'"', b" ")
+        ]
+
+    def may_match(self, line: bytes) -> bool:
+        return not self._needles or any(n in line for n in self._needles)
+
+    def matches(self, paper: ArxivPaper) -> bool:
+        if self.categories and not any(c in self.exact or c.startswith(self.prefixes) for c in paper.categories):
+            return False
+        if self.since and paper.updated_date < self.since:
+            return False
+        if self.until and paper.updated_date >= self.until:
+            return False
+        return True
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "categories": self.categories,
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+        }
+
+class SnapshotReader:
+    """
+    Reads matching papers from a snapshot in batches, starting at `offset`.
+
+    Attributes:
+        offset: Uncompressed byte offset of the next unread line.
+        stats: Lines read, matched, filtered out and invalid since the start.
+    """
+    def __init__(self, path: Path, snapshot_filter: Optional[SnapshotFilter] = None, offset: int = 0):
+        self.path = Path(path)
+        self.filter = snapshot_filter or SnapshotFilter()
+        self.offset = offset
+        self.stats = {"lines": 0, "matched": 0, "filtered": 0, "invalid": 0}
+        self._file = open_snapshot(self.path)
+        if offset:
+            self._file.seek(offset)
+
+    def read_batch(self, size: int) -> Tuple[List[ArxivPaper], bool]:
+        """
+        Returns up to `size` matching papers and whether the end of the file was
+        reached. Blocking (file I/O and parsing): run it in a thread from async code.
+        """
+        papers: List[ArxivPaper] = []
+        readline = self._file.readline
+        stats = self.stats
+        snapshot_filter = self.filter
+        while len(papers) < size:
+            line = readline()
+            if not line:
+                return papers, True
+            self.offset += len(line)
+            stats["lines"] += 1
+            if not snapshot_filter.may_match(line):
+                stats["filtered"] += 1
+                continue
+            try:
+                paper = record_to_paper(json.loads(line))
+            except (ValueError, KeyError, TypeError, IndexError) as e:
+                stats["invalid"] += 1
+                sampled_logger.warning("invalid", "⚠️ Skipping invalid snapshot line %d: %s", stats["lines"], e)
+                continue
+            if snapshot_filter.matches(paper):
+                stats["matched"] += 1
+                papers.append(paper)
+            else:
+                stats["filtered"] += 1
+        return papers, False
+
+    def close(self) -> None:
+        self._file.close()
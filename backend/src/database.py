@@ -1,14 +1,71 @@
 import os
 from beanie import init_beanie
 from qdrant_client import AsyncQdrantClient
-from motor.motor_asyncio import AsyncIOMotorClient
-from qdrant_client.models import Distance, VectorParams
+from pymongo import AsyncMongoClient
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+from qdrant_client.models import (
+    CreateAliasOperation, CreateAlias, SearchParams, PointStruct, QueryRequest,
+    Filter, FieldCondition, MatchValue, DatetimeRange, OverwritePayloadOperation, SetPayload
+)
 
 from src.utils.log_config import get_logger
-from src.model import ArxivPaper, ChatSession
+from src.model import ArxivPaper, Author, AuthorCategory, ChatSession, Lease, CrawlRun, ClusterState, ImportCheckpoint, PaperArtifact, Profile, Watchlist, Inbox
+from src.embeddings import get_embedding_provider
+from src.vector_profiles import CollectionProfile, PROFILES, get_profile
+from src.interfaces.interfaces import BaseVectorStore, VectorRecord, VectorHit, VectorFilter
+from src.mmap_store import MmapVectorStore
+from src.utils.arxiv_id import paper_point_id
 
 logger = get_logger("Database")
 qdrant_client: AsyncQdrantClient = None
+vector_store: BaseVectorStore = None
+
+DOCUMENT_MODELS = [ArxivPaper, Author, AuthorCategory, ChatSession, Lease, CrawlRun, ClusterState, ImportCheckpoint, PaperArtifact, Profile, Watchlist, Inbox]
+
+VECTOR_COLLECTION = "arxiv_vectors"
+# `qdrant` (service) or `mmap` (embedded store in VECTOR_STORE_DIR, no Qdrant needed).
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+
+_active_profile: CollectionProfile = PROFILES["default"]
+
+def mongo_client_options() -> Dict[str, int]:
+    """
+    Connection-pool settings of the MongoDB client, from the environment
+    (PyMongo defaults otherwise). Each API/worker process has its own pool, so
+    the server sees up to `MONGO_MAX_POOL_SIZE` x processes connections.
+    """
+    options = {}
+    for env, option in [
+        ("MONGO_MAX_POOL_SIZE", "maxPoolSize"),
+        ("MONGO_MIN_POOL_SIZE", "minPoolSize"),
+        ("MONGO_MAX_IDLE_TIME_MS", "maxIdleTimeMS"),
+        ("MONGO_MAX_CONNECTING", "maxConnecting"),
+    ]:
+        value = os.getenv(env)
+        if value:
+            options[option] = int(value)
+    return options
+
+async def init_mongo(mongo_uri: str):
+    """
+    Connects Beanie to MongoDB. Beanie creates the indexes declared in each
+    model's Settings; indexes no longer declared are only dropped when
+    `MONGO_DROP_UNDECLARED_INDEXES=true`.
+    """
+    try:
+        mongo_client = AsyncMongoClient(mongo_uri, **mongo_client_options())
+        db = mongo_client.get_default_database("arxiv_db")
+        
+        await init_beanie(
+            database=db,
+            document_models=DOCUMENT_MODELS,
+            allow_index_dropping=os.getenv("MONGO_DROP_UNDECLARED_INDEXES", "false").lower() == "true"
+        )
+        logger.info("✅ MongoDB & Beanie Connected (indexes synced)!")
+    except Exception as e:
+        logger.error(f"❌ MongoDB connection error: {e}")
+        raise e
 
 async def init_database():
     """
@@ -20,28 +77,32 @@ async def init_database():
     mongo_uri = os.getenv("MONGO_URI")
     qdrant_url = os.getenv("QDRANT_URL")
     
-    if not mongo_uri or not qdrant_url:
+    if not mongo_uri or (VECTOR_BACKEND == "qdrant" and not qdrant_url):
         logger.error("Missing environment variables MONGO_URI or QDRANT_URL!")
         raise ValueError("Database configuration missing.")
 
-    try:
-        mongo_client = AsyncIOMotorClient(mongo_uri)
-        db = mongo_client.get_default_database("arxiv_db")
-        
-        await init_beanie(database=db, document_models=[ArxivPaper, ChatSession])
-        logger.info("✅ MongoDB & Beanie Connected!")
-    except Exception as e:
-        logger.error(f"❌ MongoDB connection error: {e}")
-        raise e
+    await init_mongo(mongo_uri)
+
+    global qdrant_client, vector_store
+    if VECTOR_BACKEND == "mmap":
+        store_dir = os.getenv("VECTOR_STORE_DIR", "data/vectors")
+        vector_store = MmapVectorStore(store_dir, dimension=get_embedding_provider().dimension)
+        logger.info(f"✅ Embedded vector store opened at {store_dir} ({await vector_store.count()} vectors)")
+        return
+    if VECTOR_BACKEND != "qdrant":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
 
-    global qdrant_client
     try:
-        qdrant_client = AsyncQdrantClient(url=qdrant_url)
+        if qdrant_url == ":memory:":
+            qdrant_client = AsyncQdrantClient(location=":memory:")
+        else:
+            qdrant_client = AsyncQdrantClient(url=qdrant_url)
         
         await qdrant_client.get_collections()
         logger.info("✅ Qdrant Connected!")
         
-        await _ensure_qdrant_collection("arxiv_vectors")
+        await _ensure_qdrant_collection(VECTOR_COLLECTION)
+        vector_store = QdrantVectorStore()
         
     except Exception as e:
         logger.error(f"❌ Qdrant connection error: {e}")
@@ -50,29 +111,153 @@ async def init_database():
 async def _ensure_qdrant_collection(collection_name: str):
     """
     Check if the collection already exists in Qdrant; if not, create a new one.
+
+    `collection_name` is an alias pointing at a physical collection built with a
+    profile from `src.vector_profiles` (so it can be rebuilt and swapped later);
+    a plain collection of that name from older deployments is used as-is. The
+    vector size comes from the configured embedding provider.
     """
+    global _active_profile
     try:
-        collections = await qdrant_client.get_collections()
-        exists = any(c.name == collection_name for c in collections.collections)
-        
-        if not exists:
-            logger.info(f"Creating a Qdrant collection: {collection_name}...")
-            await qdrant_client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=os.getenv("VECTOR_SIZE"),
-                    distance=Distance.COSINE
-                )
+        vector_size = get_embedding_provider().dimension
+        profile = get_profile()
+
+        if not await qdrant_client.collection_exists(collection_name):
+            physical = physical_collection_name(collection_name, profile.name)
+            logger.info(f"Creating a Qdrant collection: {physical} ({vector_size} dims, profile '{profile.name}')...")
+            await qdrant_client.create_collection(collection_name=physical, **profile.create_kwargs(vector_size))
+            await qdrant_client.update_collection_aliases(change_aliases_operations=[
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=physical, alias_name=collection_name))
+            ])
+            _active_profile = profile
+            logger.info(f"✅ Collection created {physical} (alias {collection_name})")
+            return
+
+        info = await qdrant_client.get_collection(collection_name)
+        existing_size = info.config.params.vectors.size
+        if existing_size != vector_size:
+            logger.error(
+                f"❌ Collection {collection_name} stores {existing_size}-dim vectors but the embedding "
+                f"provider produces {vector_size}; re-index before switching EMBEDDING_PROVIDER."
             )
-            logger.info(f"✅ Collection created {collection_name}")
-        else:
-            logger.debug(f"Collection {collection_name} already exists.")
+
+        active = (info.config.metadata or {}).get("profile", "default")
+        try:
+            _active_profile = get_profile(active)
+        except ValueError:
+            logger.warning(f"Collection {collection_name} was built with unknown profile '{active}'.")
+            _active_profile = PROFILES["default"]
+        if active != profile.name:
+            logger.warning(
+                f"⚠️ Collection {collection_name} uses profile '{active}' but QDRANT_PROFILE is "
+                f"'{profile.name}'; run `python -m src.jobs.reindex_vectors` to switch."
+            )
+        logger.debug(f"Collection {collection_name} already exists.")
             
     except Exception as e:
         logger.error(f"Error when checking/creating Qdrant collection: {e}")
 
+def physical_collection_name(alias: str, profile_name: str) -> str:
+    """Name of a new physical collection behind `alias`, unique per build."""
+    return f"{alias}_{profile_name}_{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+
+async def resolve_alias(alias: str) -> Optional[str]:
+    """Physical collection behind `alias`, or None if `alias` is not an alias."""
+    aliases = await get_qdrant_client().get_aliases()
+    return next((a.collection_name for a in aliases.aliases if a.alias_name == alias), None)
+
+def get_search_params() -> Optional[SearchParams]:
+    """Query-time parameters (hnsw_ef, quantization rescoring) of the active collection profile."""
+    return _active_profile.search_params()
+
 def get_qdrant_client() -> AsyncQdrantClient:
     """Dependency to get the Qdrant client in other modules"""
     if qdrant_client is None:
+        if VECTOR_BACKEND != "qdrant":
+            raise RuntimeError(f"This operation needs Qdrant but VECTOR_BACKEND is '{VECTOR_BACKEND}'.")
+        raise RuntimeError("The database has not been initialized yet! Please call init_database() first.")
+    return qdrant_client
+
+def get_vector_store() -> BaseVectorStore:
+    """Dependency to get the configured vector store (Qdrant or embedded mmap)"""
+    if vector_store is None:
         raise RuntimeError("The database has not been initialized yet! Please call init_database() first.")
-    return qdrant_client
\ No newline at end of file
+    return vector_store
+
+class QdrantVectorStore(BaseVectorStore):
+    """
+    `BaseVectorStore` over the `arxiv_vectors` alias. Point IDs are derived from
+    the paper ID and the active profile's search parameters are applied.
+    """
+    def __init__(self, collection_name: str = VECTOR_COLLECTION):
+        self.collection_name = collection_name
+
+    @staticmethod
+    def _filter(filter: Optional[VectorFilter]) -> Optional[Filter]:
+        if filter is None:
+            return None
+        must = []
+        if filter.category:
+            must.append(FieldCondition(key="category", match=MatchValue(value=filter.category)))
+        if filter.published_after or filter.published_before:
+            must.append(FieldCondition(
+                key="published_date",
+                range=DatetimeRange(gte=filter.published_after, lte=filter.published_before)
+            ))
+        return Filter(must=must) if must else None
+
+    async def upsert(self, records: List[VectorRecord]):
+        await get_qdrant_client().upsert(
+            collection_name=self.collection_name,
+            points=[PointStruct(id=paper_point_id(r.id), vector=r.vector, payload=r.payload) for r in records]
+        )
+
+    async def set_payload(self, payloads: Dict[str, Dict[str, Any]]):
+        if not payloads:
+            return
+        await get_qdrant_client().batch_update_points(
+            collection_name=self.collection_name,
+            update_operations=[
+                OverwritePayloadOperation(overwrite_payload=SetPayload(payload=payload, points=[paper_point_id(paper_id)]))
+                for paper_id, payload in payloads.items()
+            ]
+        )
+
+    async def search_batch(
+            self,
+            vectors: List[List[float]],
+            limit: int,
+            filter: Optional[VectorFilter] = None
+        ) -> List[List[VectorHit]]:
+        if not vectors:
+            return []
+        params, query_filter = get_search_params(), self._filter(filter)
+        responses = await get_qdrant_client().query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                QueryRequest(query=vector, limit=limit, params=params, filter=query_filter, with_payload=True)
+                for vector in vectors
+            ]
+        )
+        return [
+            [VectorHit(id=p.payload["paper_id"], score=p.score, payload=p.payload) for p in response.points]
+            for response in responses
+        ]
+
+    async def retrieve(self, ids: List[str]) -> Dict[str, List[float]]:
+        points = await get_qdrant_client().retrieve(
+            collection_name=self.collection_name,
+            ids=[paper_point_id(i) for i in ids],
+            with_vectors=True,
+            with_payload=["paper_id"]
+        )
+        return {p.payload["paper_id"]: p.vector for p in points}
+
+    async def delete(self, ids: List[str]):
+        await get_qdrant_client().delete(
+            collection_name=self.collection_name,
+            points_selector=[paper_point_id(i) for i in ids]
+        )
+
+    async def count(self) -> int:
+        return (await get_qdrant_client().count(collection_name=self.collection_name, exact=True)).count
\ No newline at end of file
@@ -0,0 +1,167 @@
+import os
+import re
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import List, Optional, Tuple, Dict
+
+import numpy as np
+
+from src.interfaces.interfaces import BaseEmbeddingProvider
+from src.utils.log_config import get_logger
+
+logger = get_logger("Embeddings")
+
+GEMINI_DIMENSION = 768
+
+_TOKEN = re.compile(r"\w+")
+
+class GeminiEmbeddingProvider(BaseEmbeddingProvider):
+    """
+    Gemini `text-embedding-004` through the Google AI API (768 dimensions).
+
+    Batches are small and paced (`batch_pause`) to stay under the free-tier quota.
+    """
+    name = "gemini"
+    batch_size = 20
+    batch_pause = 0.5
+
+    def __init__(self, api_key: Optional[str] = None, model: str = "models/text-embedding-004"):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            logger.error("GOOGLE_API_KEY has not been configured yet!")
+            raise ValueError("GOOGLE_API_KEY missing")
+
+        self.model = GoogleGenerativeAIEmbeddings(
+            model=model,
+            google_api_key=api_key,
+            task_type="SEMANTIC_SIMILARITY"
+        )
+
+    @property
+    def dimension(self) -> int:
+        return GEMINI_DIMENSION
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.model.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.model.aembed_query(text)
+
+class HashingEmbeddingProvider(BaseEmbeddingProvider):
+    """
+    Local CPU embedder: signed feature hashing of word unigrams and bigrams.
+
+    Each feature is hashed to one of `dimension` columns with a random sign, which
+    is a sparse random projection of the (unbounded) bag-of-words vector. Counts
+    are dampened with `log1p` (sublinear TF) and rows are L2-normalised, so cosine
+    similarity behaves like TF cosine on the original vocabulary. Needs no model
+    file and no network; a batch is one NumPy scatter-add, run off the event loop.
+
+    Args:
+        dimension (int): Output vector size.
+        bigrams (bool): Also hash adjacent word pairs.
+    """
+    name = "local-hashing"
+    batch_size = 256
+    batch_pause = 0.0
+
+    _MAX_CACHED_FEATURES = 500_000
+
+    def __init__(self, dimension: int = 384, bigrams: bool = True):
+        self._dimension = dimension
+        self.bigrams = bigrams
+        self._features: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def _feature(self, feature: str) -> Tuple[int, float]:
+        slot = self._features.get(feature)
+        if slot is None:
+            if len(self._features) >= self._MAX_CACHED_FEATURES:
+                self._features.clear()
+            h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+            slot = self._features[feature] = (h % self._dimension, 1.0 if (h >> 63) & 1 else -1.0)
+        return slot
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Synchronous batch embedding; returns a `(len(texts), dimension)` float32 array."""
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.casefold())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])] if self.bigrams else tokens
+            for feature in features:
+                col, sign = self._feature(feature)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+
+        out = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        np.add.at(out, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), np.asarray(signs, dtype=np.float32))
+        np.copysign(np.log1p(np.abs(out)), out, out=out)
+        out /= np.linalg.norm(out, axis=1, keepdims=True).clip(min=1e-12)
+        return out
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return (await asyncio.to_thread(self.embed, texts)).tolist()
+
+class SentenceTransformerProvider(BaseEmbeddingProvider):
+    """
+    Local model stored on disk, loaded with `sentence-transformers` (optional
+    dependency, install it in the image when `EMBEDDING_MODEL_PATH` is used).
+    """
+    name = "local-model"
+    batch_size = 64
+    batch_pause = 0.0
+
+    def __init__(self, model_path: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ValueError("EMBEDDING_MODEL_PATH is set but sentence-transformers is not installed.") from e
+
+        self.model = SentenceTransformer(model_path, device="cpu")
+        logger.info(f"🧮 Local embedding model loaded from {model_path}")
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = await asyncio.to_thread(
+            self.model.encode, texts,
+            batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.tolist()
+
+_provider: Optional[BaseEmbeddingProvider] = None
+
+def create_embedding_provider(name: Optional[str] = None) -> BaseEmbeddingProvider:
+    """
+    Builds the provider selected by `name` or the `EMBEDDING_PROVIDER` env var:
+
+    - `gemini` (default): Gemini API, needs `GOOGLE_API_KEY`.
+    - `local`: the on-disk model at `EMBEDDING_MODEL_PATH` when it exists,
+      otherwise `HashingEmbeddingProvider` with `EMBEDDING_DIMENSION` (default 384).
+    """
+    name = (name or os.getenv("EMBEDDING_PROVIDER", "gemini")).lower()
+    if name == "gemini":
+        return GeminiEmbeddingProvider()
+    if name == "local":
+        model_path = os.getenv("EMBEDDING_MODEL_PATH")
+        if model_path and Path(model_path).exists():
+            return SentenceTransformerProvider(model_path)
+        return HashingEmbeddingProvider(dimension=int(os.getenv("EMBEDDING_DIMENSION", 384)))
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {name}")
+
+def get_embedding_provider() -> BaseEmbeddingProvider:
+    """Process-wide provider instance, created on first use."""
+    global _provider
+    if _provider is None:
+        _provider = create_embedding_provider()
+        logger.info(f"🧮 Embedding provider: {_provider.name} ({_provider.dimension} dims)")
+    return _provider
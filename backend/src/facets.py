@@ -0,0 +1,71 @@
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Optional, Any
+
+from src.model import ArxivPaper
+from src.authors import normalize_category
+from src.utils.cache import GenerationCache
+from src.utils.log_config import get_logger
+
+logger = get_logger("Facets")
+
+_facets_cache = GenerationCache(maxsize=64)
+
+def facets_pipeline(since: Optional[datetime], category: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Aggregation counting papers per primary category and per publication day.
+
+    The `$match` is bounded by `prime_category_published` (with a category) or
+    `published_date_id`, so the cost follows the window, not the corpus.
+    """
+    match: Dict[str, Any] = {}
+    if category:
+        match["prime_category"] = category
+    if since:
+        match["published_date"] = {"$gte": since}
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "prime_category": 1, "published_date": 1}},
+        {"$facet": {
+            "categories": [
+                {"$group": {"_id": "$prime_category", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$project": {"_id": 0, "category": "$_id", "count": 1}},
+            ],
+            "dates": [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$published_date"}},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "date": "$_id", "count": 1}},
+            ],
+            "total": [{"$count": "count"}],
+        }},
+    ]
+
+async def paper_facets(days: Optional[int] = 30, category: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Category and publication-date histograms of the papers published in the last
+    `days` days (all papers with `days=0`), optionally within one primary
+    category. Results are cached until the next crawl generation.
+    """
+    category = normalize_category(category) if category else None
+    cache_key = (days, category)
+    hit, cached = _facets_cache.get(cache_key)
+    if hit:
+        return cached
+
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+    facets = (await ArxivPaper.aggregate(facets_pipeline(since, category)).to_list())[0]
+    total = facets["total"][0]["count"] if facets["total"] else 0
+    result = {
+        "days": days,
+        "category": category,
+        "total": total,
+        "categories": facets["categories"],
+        "dates": facets["dates"],
+    }
+
+    _facets_cache.set(cache_key, result)
+    logger.debug(f"Facets computed for {cache_key}: {total} papers.")
+    return result
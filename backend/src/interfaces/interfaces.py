@@ -28,20 +28,86 @@ class BaseNewsScraper(ABC):
         """Convert raw HTML to clean list of ArxivPaper objects"""
         pass
 
+class VectorRecord(BaseModel):
+    """One vector keyed by paper ID, with the payload stored next to it."""
+    id: str
+    vector: List[float]
+    payload: Dict[str, Any] = {}
+
+class VectorHit(BaseModel):
+    id: str
+    score: float
+    payload: Dict[str, Any] = {}
+
+class VectorFilter(BaseModel):
+    """Prefilter on the payload columns `category` and `published_date`."""
+    category: Optional[str] = None
+    published_after: Optional[datetime] = None
+    published_before: Optional[datetime] = None
+
 class BaseVectorStore(ABC):
     """
     Interface to store and search vectors (RAG).
+    Scores are cosine similarities, higher is closer.
     """
     @abstractmethod
-    def add_documents(self, documents: List[ArxivPaper]):
-        """Save documents to vector db"""
+    async def upsert(self, records: List[VectorRecord]):
+        """Insert or replace vectors by paper ID"""
         pass
 
     @abstractmethod
-    def similarity_search(self, query: str, k: int = 3) -> List[ArxivPaper]:
-        """Search for related content based on query"""
+    async def set_payload(self, payloads: Dict[str, Dict[str, Any]]):
+        """Replace the payload of stored vectors by paper ID, keeping the vectors (missing IDs are skipped)"""
         pass
 
+    @abstractmethod
+    async def search_batch(
+            self,
+            vectors: List[List[float]],
+            limit: int,
+            filter: Optional[VectorFilter] = None
+        ) -> List[List[VectorHit]]:
+        """Top-`limit` neighbours of each query vector, best first"""
+        pass
+
+    @abstractmethod
+    async def retrieve(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Stored vectors of the given paper IDs (missing IDs are left out)"""
+        pass
+
+    @abstractmethod
+    async def delete(self, ids: List[str]):
+        """Remove vectors by paper ID"""
+        pass
+
+    @abstractmethod
+    async def count(self) -> int:
+        """Number of stored vectors"""
+        pass
+
+class BaseEmbeddingProvider(ABC):
+    """
+    Interface for text embedding backends (remote API or local model).
+    """
+    name: str = "base"
+    batch_size: int = 20
+    batch_pause: float = 0.0
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Size of the produced vectors (used to create the vector collection)"""
+        pass
+
+    @abstractmethod
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of documents"""
+        pass
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a search query"""
+        return (await self.aembed_documents([text]))[0]
+
 class BaseLLMService(ABC):
     """
     Interface wrap LLMs 
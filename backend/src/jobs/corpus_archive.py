@@ -0,0 +1,380 @@
+"""
+Exports the corpus (`arxiv_papers` with each paper's vector) to one Parquet file
+and restores it into MongoDB and the vector store, to clone an environment or
+rebuild one without re-crawling and re-embedding (days of arXiv/Gemini quota).
+
+File layout: one row per paper, one column per `ArxivPaper` field (dates as UTC
+timestamps, `similar` as a list of structs), the paper's latest analysis
+(`deep_analysis`, `analysis_variant`; other variants are not exported) and
+`vector`, a nullable `fixed_size_list<float32>[dimension]` column. Rows are
+written in row groups of `--row-group-size` papers, zstd-compressed; the schema
+metadata records the format version, the vector dimension and the embedding
+provider. Any Arrow reader (pandas, DuckDB, Polars) can query the file directly.
+
+Export streams Mongo in `_id` order and fetches vectors per page through
+`BaseVectorStore.retrieve` (Qdrant or mmap), while the previous row group is
+compressed and written in a thread. Restore reads one row group at a time and
+writes each batch to MongoDB (unordered inserts, existing papers replaced; the
+analyses into `paper_artifacts`) and to the vector store concurrently, decoding
+the next batch meanwhile; running it again over a partially restored target is
+harmless. `indexed_at` is not exported (it describes the source's vector
+store): restored papers are stamped once their vector is written, so
+`import_snapshot` and `reindex_vectors` leave them alone, and a restore with
+`--no-vectors` leaves them for `reindex_vectors`. The author index is rebuilt and the corpus generation published at
+the end.
+
+Needs `pyarrow` (`uv sync --extra archive`).
+
+Usage:
+    python -m src.jobs.corpus_archive export corpus.parquet
+    python -m src.jobs.corpus_archive restore corpus.parquet [--no-vectors]
+"""
+import time
+import json
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone, date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as e:
+    raise SystemExit("The corpus archive needs pyarrow: `uv sync --extra archive`.") from e
+
+from src.model import ArxivPaper, PaperArtifact, PaperIndexView, PaperVersionView
+from src.database import init_database, get_vector_store
+from src.embeddings import get_embedding_provider
+from src.processor import paper_payload, mark_indexed
+from src.artifacts import ANALYSIS, build_artifact, decompress
+from src.utils.arxiv_id import content_hash
+from src.interfaces.interfaces import VectorRecord
+from src.cluster import publish_generation
+from src.migrations.build_author_index import rebuild_authors
+from src.utils.log_config import setup_logging, get_logger, LogSampler
+
+logger = get_logger("CorpusArchive")
+sampled_logger = LogSampler(logger, interval=5.0)
+
+FORMAT = "arxiv-corpus/1"
+ROW_GROUP_SIZE = 10_000
+RESTORE_BATCH = 1_000
+VECTOR_PAGE = 1_000
+DUPLICATE_KEY = 11000
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+_STRINGS = pa.list_(pa.string())
+_SIMILAR = pa.list_(pa.struct([("paper_id", pa.string()), ("title", pa.string()), ("score", pa.float64())]))
+
+# Paper columns in file order; `vector` is appended by `archive_schema`.
+PAPER_COLUMNS: List[Tuple[str, pa.DataType]] = [
+    ("_id", pa.string()),
+    ("version", pa.int32()),
+    ("title", pa.string()),
+    ("author", _STRINGS),
+    ("author_keys", _STRINGS),
+    ("arxiv_url", pa.string()),
+    ("pdf_url", pa.string()),
+    ("published_date", _TIMESTAMP),
+    ("updated_date", _TIMESTAMP),
+    ("summary", pa.string()),
+    ("prime_category", pa.string()),
+    ("categories", _STRINGS),
+    ("crawled_at", pa.date32()),
+    ("content_hash", pa.string()),
+    ("analyzed_at", _TIMESTAMP),
+    ("similar", _SIMILAR),
+    ("similar_updated_at", _TIMESTAMP),
+]
+# Latest analysis of the paper's current content (from `paper_artifacts`), as
+# plain text: Parquet compresses the column.
+ANALYSIS_COLUMNS: List[Tuple[str, pa.DataType]] = [
+    ("deep_analysis", pa.string()),
+    ("analysis_variant", pa.string()),
+]
+
+def archive_schema(dimension: int, metadata: Optional[Dict[str, Any]] = None) -> pa.Schema:
+    fields = [pa.field(name, type) for name, type in PAPER_COLUMNS + ANALYSIS_COLUMNS]
+    fields.append(pa.field("vector", pa.list_(pa.float32(), dimension)))
+    meta = {"format": FORMAT, "dimension": dimension, **(metadata or {})}
+    return pa.schema(fields, metadata={"arxiv_corpus": json.dumps(meta)})
+
+def archive_metadata(schema: pa.Schema) -> Dict[str, Any]:
+    """
+    Metadata written by `export_corpus`.
+
+    Raises:
+        ValueError: If the file is not a corpus archive of a known format.
+    """
+    raw = (schema.metadata or {}).get(b"arxiv_corpus")
+    meta = json.loads(raw) if raw else {}
+    if meta.get("format") != FORMAT:
+        raise ValueError(f"Not a corpus archive (format {meta.get('format')!r}, expected {FORMAT!r}).")
+    return meta
+
+def _paper_columns(docs: List[Dict[str, Any]]) -> Dict[str, list]:
+    columns = {name: [doc.get(name) for doc in docs] for name, _ in PAPER_COLUMNS}
+    # Beanie stores `crawled_at` (a date) as a midnight datetime.
+    columns["crawled_at"] = [v.date() if isinstance(v, datetime) else v for v in columns["crawled_at"]]
+    return columns
+
+def _vector_column(vectors: List[Optional[List[float]]], dimension: int) -> pa.Array:
+    missing = np.array([v is None for v in vectors], dtype=bool)
+    matrix = np.zeros((len(vectors), dimension), dtype=np.float32)
+    present = [v for v in vectors if v is not None]
+    if present:
+        values = np.asarray(present, dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != dimension:
+            raise ValueError(f"Vectors of another dimension than the archive's ({dimension}).")
+        matrix[~missing] = values
+    return pa.FixedSizeListArray.from_arrays(
+        pa.array(matrix.ravel()), dimension, mask=pa.array(missing) if missing.any() else None
+    )
+
+async def _fetch_vectors(ids: List[str]) -> Dict[str, List[float]]:
+    store = get_vector_store()
+    vectors: Dict[str, List[float]] = {}
+    for start in range(0, len(ids), VECTOR_PAGE):
+        vectors.update(await store.retrieve(ids[start:start + VECTOR_PAGE]))
+    return vectors
+
+async def _fetch_analyses(docs: List[Dict[str, Any]]) -> Dict[str, Tuple[str, str]]:
+    """Latest analysis of each paper computed from its current content: paper ID -> (text, variant)."""
+    hashes = {doc["_id"]: doc.get("content_hash") or content_hash(doc["title"], doc["summary"]) for doc in docs}
+    analyses: Dict[str, Tuple[str, str]] = {}
+    cursor = PaperArtifact.get_pymongo_collection().find(
+        {"paper_id": {"$in": list(hashes)}, "kind": ANALYSIS}, sort=[("created_at", -1)]
+    )
+    async for artifact in cursor:
+        paper_id = artifact["paper_id"]
+        if paper_id not in analyses and artifact.get("content_hash") == hashes[paper_id]:
+            analyses[paper_id] = (decompress(artifact["data"], artifact.get("codec", "zstd")), artifact["variant"])
+    return analyses
+
+async def export_corpus(path: Path, row_group_size: int = ROW_GROUP_SIZE, compression: str = "zstd") -> Dict[str, Any]:
+    """
+    Writes every paper and its vector to `path` (replaced if it exists) and
+    returns the counters: papers, vectors, missing_vectors, analyses, bytes.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".partial")
+    collection = ArxivPaper.get_pymongo_collection()
+    stats = {"papers": 0, "vectors": 0, "missing_vectors": 0, "analyses": 0}
+    writer: Optional[pq.ParquetWriter] = None
+    pending: Optional[asyncio.Task] = None
+    start = time.perf_counter()
+
+    async def flush(docs: List[Dict[str, Any]]) -> None:
+        nonlocal writer, pending
+        vectors = await _fetch_vectors([doc["_id"] for doc in docs])
+        if writer is None:
+            dimension = len(next(iter(vectors.values()), [])) or get_embedding_provider().dimension
+            schema = archive_schema(dimension, {
+                "embedding_provider": get_embedding_provider().name,
+                "exported_at": datetime.now(timezone.utc).isoformat(),
+            })
+            writer = pq.ParquetWriter(tmp, schema, compression=compression)
+        analyses = await _fetch_analyses(docs)
+        columns = _paper_columns(docs)
+        columns["deep_analysis"] = [analyses.get(doc["_id"], (None, None))[0] for doc in docs]
+        columns["analysis_variant"] = [analyses.get(doc["_id"], (None, None))[1] for doc in docs]
+        columns["vector"] = _vector_column([vectors.get(doc["_id"]) for doc in docs], writer.schema.field("vector").type.list_size)
+        table = pa.Table.from_pydict(columns, schema=writer.schema)
+        if pending is not None:
+            await pending
+        pending = asyncio.create_task(asyncio.to_thread(writer.write_table, table, row_group_size=row_group_size))
+
+        stats["papers"] += len(docs)
+        stats["vectors"] += len(vectors)
+        stats["missing_vectors"] += len(docs) - len(vectors)
+        stats["analyses"] += len(analyses)
+        sampled_logger.info(
+            "export", "📤 %s papers exported (%s without vector) | %.0f papers/s",
+            f"{stats['papers']:,}", f"{stats['missing_vectors']:,}", stats["papers"] / (time.perf_counter() - start)
+        )
+
+    try:
+        docs: List[Dict[str, Any]] = []
+        async for doc in collection.find({}, sort=[("_id", 1)], batch_size=row_group_size):
+            docs.append(doc)
+            if len(docs) >= row_group_size:
+                await flush(docs)
+                docs = []
+        if docs or writer is None:
+            await flush(docs)
+        await pending
+        writer.close()
+        tmp.replace(path)
+    finally:
+        if pending is not None and not pending.done():
+            await asyncio.gather(pending, return_exceptions=True)
+        if tmp.exists():
+            if writer is not None:
+                writer.close()
+            tmp.unlink()
+
+    stats["bytes"] = path.stat().st_size
+    return stats
+
+def _documents(batch: pa.RecordBatch) -> Tuple[List[Dict[str, Any]], List[PaperArtifact]]:
+    """Paper documents of `batch` and the analysis artifacts stored with them."""
+    docs = batch.drop_columns(["vector"]).to_pylist() if "vector" in batch.schema.names else batch.to_pylist()
+    analyses = []
+    for doc in docs:
+        if isinstance(doc.get("crawled_at"), date):
+            doc["crawled_at"] = datetime.combine(doc["crawled_at"], datetime.min.time())
+        text, variant = doc.pop("deep_analysis", None), doc.pop("analysis_variant", None)
+        if text:
+            analyses.append(build_artifact(PaperVersionView.model_validate(doc), ANALYSIS, variant, text))
+    return docs, analyses
+
+def _vectors(batch: pa.RecordBatch) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the vectors of `batch` as a float32 matrix and the mask of rows that have one."""
+    column = batch.column("vector")
+    dimension = column.type.list_size
+    values = column.values.slice(column.offset * dimension, len(column) * dimension)
+    matrix = values.to_numpy(zero_copy_only=False).reshape(len(column), dimension)
+    return matrix, ~column.is_null().to_numpy(zero_copy_only=False)
+
+def _decode(batches, with_vectors: bool) -> Optional[Tuple[List[Dict[str, Any]], List[PaperArtifact], Optional[Tuple[np.ndarray, np.ndarray]]]]:
+    batch = next(batches, None)
+    if batch is None:
+        return None
+    docs, analyses = _documents(batch)
+    return docs, analyses, _vectors(batch) if with_vectors else None
+
+async def _write_papers(docs: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Inserts `docs`, replacing the papers that already exist. Returns (inserted, replaced)."""
+    collection = ArxivPaper.get_pymongo_collection()
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids), 0
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(err["code"] != DUPLICATE_KEY for err in errors):
+            raise
+        replacements = [ReplaceOne({"_id": docs[err["index"]]["_id"]}, docs[err["index"]]) for err in errors]
+        await collection.bulk_write(replacements, ordered=False)
+        return e.details["nInserted"], len(replacements)
+
+async def _write_analyses(analyses: List[PaperArtifact]) -> int:
+    if analyses:
+        await PaperArtifact.get_pymongo_collection().bulk_write([
+            ReplaceOne({"_id": a.id}, a.model_dump(by_alias=True), upsert=True) for a in analyses
+        ], ordered=False)
+    return len(analyses)
+
+async def _write_vectors(docs: List[Dict[str, Any]], matrix: np.ndarray, present: np.ndarray) -> List[str]:
+    """Upserts the vectors of `docs` that have one. Returns their paper IDs."""
+    records = [
+        VectorRecord(id=doc["_id"], vector=matrix[i].tolist(), payload=paper_payload(PaperIndexView.model_validate(doc)))
+        for i, doc in enumerate(docs) if present[i]
+    ]
+    if records:
+        await get_vector_store().upsert(records)
+    return [r.id for r in records]
+
+async def restore_corpus(
+        path: Path,
+        vectors: bool = True,
+        batch_size: int = RESTORE_BATCH,
+        rebuild_author_index: bool = True
+    ) -> Dict[str, Any]:
+    """
+    Loads an archive written by `export_corpus` into MongoDB and (unless
+    `vectors` is off) the vector store, and the analyses into
+    `paper_artifacts`. Returns the counters: papers, inserted, replaced,
+    analyses, vectors.
+
+    Raises:
+        ValueError: If `path` is not a corpus archive, or its vector dimension
+            differs from the configured embedding provider's.
+    """
+    parquet = pq.ParquetFile(path)
+    meta = archive_metadata(parquet.schema_arrow)
+    if vectors and meta["dimension"] != get_embedding_provider().dimension:
+        raise ValueError(
+            f"The archive holds {meta['dimension']}-dim vectors ({meta.get('embedding_provider')}) but the "
+            f"embedding provider produces {get_embedding_provider().dimension}; restore with --no-vectors "
+            "and run reindex_vectors, or configure the same provider."
+        )
+    total = parquet.metadata.num_rows
+    logger.info(f"📥 Restoring {total:,} papers from {path} (exported {meta.get('exported_at')}, {meta['dimension']} dims)...")
+
+    columns = None if vectors else [name for name, _ in PAPER_COLUMNS + ANALYSIS_COLUMNS]
+    batches = parquet.iter_batches(batch_size=batch_size, columns=columns)
+    stats = {"papers": 0, "inserted": 0, "replaced": 0, "analyses": 0, "vectors": 0}
+    start = time.perf_counter()
+
+    pending = asyncio.create_task(asyncio.to_thread(_decode, batches, vectors))
+    try:
+        while True:
+            decoded = await asyncio.shield(pending)
+            if decoded is None:
+                break
+            pending = asyncio.create_task(asyncio.to_thread(_decode, batches, vectors))
+            docs, analyses, vector_batch = decoded
+            writes = [_write_papers(docs), _write_analyses(analyses)]
+            if vector_batch is not None:
+                writes.append(_write_vectors(docs, *vector_batch))
+            results = await asyncio.gather(*writes)
+            indexed = results[2] if len(results) > 2 else []
+            if indexed:
+                # After both writes: a replaced paper document would drop the stamp.
+                await mark_indexed(indexed)
+
+            inserted, replaced = results[0]
+            stats["papers"] += len(docs)
+            stats["inserted"] += inserted
+            stats["replaced"] += replaced
+            stats["analyses"] += results[1]
+            stats["vectors"] += len(indexed)
+            sampled_logger.info(
+                "restore", "📥 %s / %s papers restored | %.0f papers/s",
+                f"{stats['papers']:,}", f"{total:,}", stats["papers"] / (time.perf_counter() - start)
+            )
+    finally:
+        if not pending.done():
+            await asyncio.gather(pending, return_exceptions=True)
+        parquet.close()
+
+    if stats["papers"]:
+        if rebuild_author_index:
+            await rebuild_authors()
+        await publish_generation()
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Export / restore the corpus and its vectors as Parquet.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write every paper and its vector to a Parquet file.")
+    export.add_argument("path", type=Path)
+    export.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+    export.add_argument("--compression", default="zstd", help="Parquet codec (zstd, snappy, gzip, none).")
+    restore = commands.add_parser("restore", help="Load a Parquet export into MongoDB and the vector store.")
+    restore.add_argument("path", type=Path)
+    restore.add_argument("--no-vectors", action="store_true", help="Only restore MongoDB; embed later with reindex_vectors.")
+    restore.add_argument("--batch-size", type=int, default=RESTORE_BATCH)
+    args = parser.parse_args()
+
+    setup_logging()
+    await init_database()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        stats = await export_corpus(args.path, row_group_size=args.row_group_size, compression=args.compression)
+        logger.info(f"✅ Exported to {args.path} in {time.perf_counter() - start:.0f}s: {stats}")
+    else:
+        try:
+            stats = await restore_corpus(args.path, vectors=not args.no_vectors, batch_size=args.batch_size)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        logger.info(f"✅ Restored {args.path} in {time.perf_counter() - start:.0f}s: {stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
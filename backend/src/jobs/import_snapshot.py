@@ -0,0 +1,252 @@
+"""
+Bulk-imports papers from an arXiv metadata snapshot (JSON lines, optionally
+gzip), for seeding a deployment with years of history that the arXiv API
+(100-300 results per query, one page every 3 s) cannot provide.
+
+Pipeline, with at most one batch in flight per stage:
+1. a thread streams the file and parses/filters the next batch
+   (`src.crawler.snapshot`) while the current one is written;
+2. the batch is written with one unordered `bulk_write` (new papers inserted,
+   newer versions updated like `ArxivScraper.save_to_db`, older ones skipped);
+3. new or changed papers are embedded and upserted into the vector store.
+
+After each batch is indexed (or written, without indexing) its end offset is
+stored in `import_checkpoints`, so running the same command again after an
+interruption resumes at the first unfinished batch. Writes run ahead of the
+indexer by up to `INDEX_QUEUE` batches, so a resumed import finds papers
+already written at their current version but never embedded: those without an
+`indexed_at` stamp (set by `mark_indexed` after the vector store write,
+cleared when the content of a new version changes) are indexed again. The
+author index is rebuilt and the corpus generation published at the end.
+
+With `--no-index` only MongoDB is filled (much faster with a rate-limited
+embedding API); `python -m src.jobs.reindex_vectors --profile <profile>` then
+embeds every paper that has no vector yet.
+
+Usage:
+    python -m src.jobs.import_snapshot arxiv-metadata-oai-snapshot.json.gz --categories "cs.*" --since 2020-01-01
+    python -m src.jobs.import_snapshot snapshot.jsonl --categories cs.CL cs.AI --no-index
+"""
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from beanie.operators import In
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.model import ArxivPaper, PaperVersionView, ImportCheckpoint
+from src.database import init_database
+from src.processor import VectorProcessor
+from src.cluster import publish_generation
+from src.crawler.scraper import content_changed, version_update_fields
+from src.crawler.snapshot import SnapshotFilter, SnapshotReader
+from src.migrations.build_author_index import rebuild_authors
+from src.utils.log_config import setup_logging, get_logger, LogSampler
+
+logger = get_logger("ImportSnapshot")
+sampled_logger = LogSampler(logger, interval=10.0)
+
+BATCH_SIZE = 1_000
+INDEX_QUEUE = 2
+DUPLICATE_KEY = 11000
+
+def _document(paper: ArxivPaper) -> Dict[str, Any]:
+    doc = paper.model_dump(by_alias=True)
+    # BSON has no date type; Beanie stores dates as midnight datetimes.
+    doc["crawled_at"] = datetime.combine(doc["crawled_at"], datetime.min.time())
+    return doc
+
+async def write_batch(papers: List[ArxivPaper], stats: Dict[str, int]) -> List[ArxivPaper]:
+    """
+    Writes one batch with a single unordered bulk write and returns the papers
+    that need (re)indexing: new papers, new versions with changed content, and
+    stored papers of the same version that were never indexed (written by an
+    interrupted run before its indexer reached them).
+    """
+    if not papers:
+        return []
+    stored = {
+        p.id: p for p in await ArxivPaper.find(In(ArxivPaper.id, [p.id for p in papers])).project(PaperVersionView).to_list()
+    }
+
+    operations, to_index = [], []
+    for paper in papers:
+        current = stored.get(paper.id)
+        if current is None:
+            operations.append(InsertOne(_document(paper)))
+            to_index.append(paper)
+        elif paper.version > current.version:
+            changed = content_changed(paper, current)
+            operations.append(UpdateOne(
+                {"_id": paper.id, "version": {"$lt": paper.version}},
+                {"$set": version_update_fields(paper, changed)}
+            ))
+            if changed:
+                to_index.append(paper)
+        elif paper.version == current.version and current.indexed_at is None:
+            to_index.append(paper)
+
+    inserted = updated = 0
+    if operations:
+        try:
+            result = await ArxivPaper.get_pymongo_collection().bulk_write(operations, ordered=False)
+            inserted, updated = result.inserted_count, result.modified_count
+        except BulkWriteError as e:
+            # Papers inserted by a concurrent crawl in between: already up to date.
+            if any(err["code"] != DUPLICATE_KEY for err in e.details["writeErrors"]):
+                raise
+            inserted, updated = e.details["nInserted"], e.details["nModified"]
+
+    stats["inserted"] = stats.get("inserted", 0) + inserted
+    stats["updated"] = stats.get("updated", 0) + updated
+    stats["unchanged"] = stats.get("unchanged", 0) + len(papers) - inserted - updated
+    return to_index
+
+async def _save_checkpoint(checkpoint: ImportCheckpoint, offset: int, stats: Dict[str, int], done: bool = False) -> None:
+    checkpoint.offset = offset
+    checkpoint.stats = stats
+    checkpoint.done = done
+    checkpoint.updated_at = datetime.now(timezone.utc)
+    await checkpoint.save()
+
+async def _index_worker(queue: asyncio.Queue, processor: VectorProcessor, checkpoint: ImportCheckpoint) -> None:
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        papers, offset, stats = item
+        if papers:
+            await processor.process_and_index(papers, strict=True)
+        checkpoint_stats = {**stats, "indexed": checkpoint.stats.get("indexed", 0) + len(papers)}
+        await _save_checkpoint(checkpoint, offset, checkpoint_stats)
+
+async def _hand_off(queue: asyncio.Queue, item: Any, indexer: asyncio.Task) -> None:
+    """Queues `item` for the indexer, re-raising its error if it died meanwhile."""
+    put = asyncio.create_task(queue.put(item))
+    done, _ = await asyncio.wait({put, indexer}, return_when=asyncio.FIRST_COMPLETED)
+    if put not in done:
+        put.cancel()
+        indexer.result()
+        raise RuntimeError("The indexing stage stopped unexpectedly.")
+
+async def _load_checkpoint(path: Path, snapshot_filter: SnapshotFilter, restart: bool) -> ImportCheckpoint:
+    size = path.stat().st_size
+    checkpoint = None if restart else await ImportCheckpoint.get(path.name)
+    if checkpoint is not None:
+        if checkpoint.size != size or checkpoint.filters != snapshot_filter.describe():
+            raise ValueError(
+                f"A checkpoint for {path.name} exists with another file size or filters "
+                f"({checkpoint.filters}); use --restart to start over."
+            )
+        if not checkpoint.done:
+            logger.info(f"↩️ Resuming {path.name} at byte {checkpoint.offset:,} ({checkpoint.stats.get('lines', 0):,} lines done).")
+        return checkpoint
+    return ImportCheckpoint(id=path.name, path=str(path), size=size, filters=snapshot_filter.describe())
+
+async def import_snapshot(
+        path: Path,
+        snapshot_filter: SnapshotFilter,
+        batch_size: int = BATCH_SIZE,
+        index: bool = True,
+        restart: bool = False,
+        processor: Optional[VectorProcessor] = None,
+        rebuild_author_index: bool = True
+    ) -> Dict[str, int]:
+    """
+    Imports `path` (resuming from its checkpoint) and returns the cumulative counters:
+    lines, matched, filtered, invalid, inserted, updated, unchanged, indexed.
+    The author index is rebuilt at the end unless `rebuild_author_index` is off.
+
+    Raises:
+        ValueError: If a checkpoint exists for another file size or other filters.
+    """
+    path = Path(path)
+    checkpoint = await _load_checkpoint(path, snapshot_filter, restart)
+    if checkpoint.done:
+        logger.info(f"✅ {path.name} was already imported: {checkpoint.stats}")
+        return checkpoint.stats
+    await checkpoint.save()
+
+    reader = SnapshotReader(path, snapshot_filter, offset=checkpoint.offset)
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "indexed": 0, **checkpoint.stats}
+    reader.stats.update({k: stats.get(k, 0) for k in reader.stats})
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=INDEX_QUEUE)
+    indexer = asyncio.create_task(_index_worker(queue, processor or VectorProcessor(), checkpoint)) if index else None
+    pending = asyncio.create_task(asyncio.to_thread(reader.read_batch, batch_size))
+    start, start_lines = time.perf_counter(), stats.get("lines", 0)
+    try:
+        while True:
+            # Shielded: on cancellation the reader thread finishes its batch before the file is closed.
+            papers, eof = await asyncio.shield(pending)
+            offset = reader.offset
+            stats.update(reader.stats)
+            if not eof:
+                pending = asyncio.create_task(asyncio.to_thread(reader.read_batch, batch_size))
+
+            to_index = await write_batch(papers, stats)
+            if indexer:
+                await _hand_off(queue, (to_index, offset, dict(stats)), indexer)
+            else:
+                await _save_checkpoint(checkpoint, offset, dict(stats))
+
+            lines = stats["lines"] - start_lines
+            sampled_logger.info(
+                "progress", "📦 %s lines (%s matched, %s inserted, %s updated) | %.0f lines/s",
+                f"{stats['lines']:,}", f"{stats['matched']:,}", f"{stats['inserted']:,}", f"{stats['updated']:,}",
+                lines / (time.perf_counter() - start)
+            )
+            if eof:
+                break
+
+        if indexer:
+            await _hand_off(queue, None, indexer)
+            await indexer
+            stats["indexed"] = checkpoint.stats.get("indexed", 0)
+        await _save_checkpoint(checkpoint, reader.offset, dict(stats), done=True)
+    finally:
+        if indexer and not indexer.done():
+            indexer.cancel()
+        if not pending.done():
+            await asyncio.gather(pending, return_exceptions=True)
+        reader.close()
+
+    if stats["inserted"] or stats["updated"]:
+        if rebuild_author_index:
+            await rebuild_authors()
+        await publish_generation()
+    return stats
+
+def _date(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Bulk-import an arXiv metadata snapshot (JSON lines, optionally gzip).")
+    parser.add_argument("path", type=Path, help="Snapshot file (.json / .jsonl, optionally .gz).")
+    parser.add_argument("--categories", nargs="*", default=["cs.*"], help="Categories or prefixes (`cs.*`); none = all.")
+    parser.add_argument("--since", type=_date, default=None, help="Only papers updated on or after YYYY-MM-DD.")
+    parser.add_argument("--until", type=_date, default=None, help="Only papers updated before YYYY-MM-DD.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--no-index", action="store_true", help="Only write MongoDB; embed later with reindex_vectors.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning.")
+    args = parser.parse_args()
+
+    setup_logging()
+    await init_database()
+
+    snapshot_filter = SnapshotFilter(args.categories, since=args.since, until=args.until)
+    start = time.perf_counter()
+    try:
+        stats = await import_snapshot(
+            args.path, snapshot_filter, batch_size=args.batch_size, index=not args.no_index, restart=args.restart
+        )
+    except ValueError as e:
+        raise SystemExit(str(e))
+    logger.info(f"✅ Snapshot imported in {time.perf_counter() - start:.0f}s: {stats}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""
+Batch recomputation of the precomputed "similar papers" lists.
+
+Small corpora are handled exactly in memory: all vectors are scrolled out of
+Qdrant into one normalised NumPy matrix and scored block by block with a single
+matrix product per block. Above `--exact-threshold` points the job falls back to
+Qdrant's recommend API (batched), which keeps memory flat at any corpus size.
+
+Usage:
+    python -m src.jobs.recompute_similar [--top-k 10] [--exact-threshold 50000]
+"""
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+from qdrant_client.models import QueryRequest, RecommendQuery, RecommendInput
+
+from src.model import ArxivPaper, SimilarPaper
+from src.processor import SIMILAR_TOP_K
+from src.database import init_database, get_qdrant_client, get_search_params, VECTOR_COLLECTION
+from src.utils.log_config import setup_logging, get_logger
+
+logger = get_logger("RecomputeSimilar")
+
+SCROLL_PAGE = 1_000
+BLOCK_ROWS = 256
+WRITE_BATCH = 1_000
+RECOMMEND_BATCH = 64
+
+async def _scroll_all(with_vectors: bool) -> Tuple[List[Any], List[Dict[str, Any]], List[List[float]]]:
+    qdrant_client = get_qdrant_client()
+    ids, payloads, vectors = [], [], []
+    offset = None
+    while True:
+        points, offset = await qdrant_client.scroll(
+            collection_name=VECTOR_COLLECTION,
+            limit=SCROLL_PAGE,
+            offset=offset,
+            with_payload=["paper_id", "title"],
+            with_vectors=with_vectors
+        )
+        for point in points:
+            ids.append(point.id)
+            payloads.append(point.payload or {})
+            if with_vectors:
+                vectors.append(point.vector)
+        if offset is None:
+            return ids, payloads, vectors
+
+async def _write(updates: List[UpdateOne]):
+    if updates:
+        await ArxivPaper.get_pymongo_collection().bulk_write(updates, ordered=False)
+
+def _update(paper_id: str, neighbours: List[SimilarPaper], now: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"_id": paper_id},
+        {"$set": {"similar": [n.model_dump() for n in neighbours], "similar_updated_at": now}}
+    )
+
+async def recompute_exact(top_k: int) -> int:
+    """Exact top-k over all vectors with blocked cosine similarity."""
+    _, payloads, vectors = await _scroll_all(with_vectors=True)
+    if not vectors:
+        return 0
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+    n = matrix.shape[0]
+    k = min(top_k, n - 1)
+    now = datetime.now(timezone.utc)
+    updates = []
+
+    for start in range(0, n, BLOCK_ROWS):
+        block = matrix[start:start + BLOCK_ROWS]
+        scores = block @ matrix.T
+        rows = np.arange(block.shape[0])
+        scores[rows, rows + start] = -np.inf
+
+        if k <= 0:
+            top = np.empty((block.shape[0], 0), dtype=np.int64)
+        else:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+
+        for row, neighbour_rows in enumerate(top):
+            neighbours = [
+                SimilarPaper(
+                    paper_id=payloads[j]["paper_id"],
+                    title=payloads[j].get("title", ""),
+                    score=float(scores[row, j])
+                )
+                for j in neighbour_rows
+            ]
+            updates.append(_update(payloads[start + row]["paper_id"], neighbours, now))
+
+        if len(updates) >= WRITE_BATCH:
+            await _write(updates)
+            updates = []
+
+    await _write(updates)
+    return n
+
+async def recompute_with_recommend(top_k: int) -> int:
+    """Approximate top-k through Qdrant recommend, one batched request per chunk of points."""
+    qdrant_client = get_qdrant_client()
+    ids, payloads, _ = await _scroll_all(with_vectors=False)
+    search_params = get_search_params()
+    now = datetime.now(timezone.utc)
+    updates = []
+
+    for start in range(0, len(ids), RECOMMEND_BATCH):
+        chunk_ids = ids[start:start + RECOMMEND_BATCH]
+        responses = await qdrant_client.query_batch_points(
+            collection_name=VECTOR_COLLECTION,
+            requests=[
+                QueryRequest(
+                    query=RecommendQuery(recommend=RecommendInput(positive=[point_id])),
+                    limit=top_k,
+                    params=search_params,
+                    with_payload=["paper_id", "title"]
+                )
+                for point_id in chunk_ids
+            ]
+        )
+        for payload, response in zip(payloads[start:start + RECOMMEND_BATCH], responses):
+            neighbours = [
+                SimilarPaper(paper_id=p.payload["paper_id"], title=p.payload.get("title", ""), score=p.score)
+                for p in response.points
+                if p.payload.get("paper_id") != payload["paper_id"]
+            ]
+            updates.append(_update(payload["paper_id"], neighbours, now))
+
+        if len(updates) >= WRITE_BATCH:
+            await _write(updates)
+            updates = []
+
+    await _write(updates)
+    return len(ids)
+
+async def recompute_similar(top_k: int = SIMILAR_TOP_K, exact_threshold: int = 50_000) -> int:
+    qdrant_client = get_qdrant_client()
+    total = (await qdrant_client.count(collection_name=VECTOR_COLLECTION, exact=True)).count
+
+    if total <= exact_threshold:
+        logger.info(f"🧮 Exact recompute over {total} vectors (NumPy).")
+        done = await recompute_exact(top_k)
+    else:
+        logger.info(f"🛰 Recompute over {total} vectors with Qdrant recommend.")
+        done = await recompute_with_recommend(top_k)
+
+    logger.info(f"✅ Similar lists recomputed for {done} papers.")
+    return done
+
+async def main():
+    parser = argparse.ArgumentParser(description="Recompute precomputed similar-paper lists.")
+    parser.add_argument("--top-k", type=int, default=SIMILAR_TOP_K)
+    parser.add_argument("--exact-threshold", type=int, default=50_000,
+                        help="Max corpus size for the in-memory exact computation.")
+    args = parser.parse_args()
+
+    setup_logging()
+    await init_database()
+    await recompute_similar(top_k=args.top_k, exact_threshold=args.exact_threshold)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,191 @@
+"""
+Rebuilds the vector collection with a (new) collection profile and swaps it in
+without downtime.
+
+`arxiv_vectors` is a Qdrant alias. The job:
+1. creates a new physical collection from the profile, with HNSW indexing
+   deferred so the bulk load does not rebuild the graph continuously;
+2. streams every paper from MongoDB and copies its vector from the current
+   collection (re-embedding only papers without one, or all with `--reembed`);
+3. copies again the papers indexed by live ingests during the copy (stamped
+   `indexed_at` after their vector store write, see `mark_indexed`);
+4. re-enables indexing and waits for the collection to be optimised (green);
+5. atomically re-points the alias, copies the last writes that reached the old
+   collection, and drops it (unless `--keep-old`).
+
+The API keeps serving from the old collection until the swap. A plain (non-alias)
+`arxiv_vectors` collection from older deployments is replaced by an alias; this
+first swap needs a delete and cannot be atomic, so writes in that instant fail.
+Running API processes apply the new profile's search parameters after a restart.
+
+Usage:
+    python -m src.jobs.reindex_vectors --profile compact [--reembed] [--keep-old]
+"""
+import time
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from qdrant_client.models import (
+    PointStruct, CollectionStatus, CreateAliasOperation, CreateAlias, DeleteAliasOperation, DeleteAlias
+)
+
+from src.model import ArxivPaper, PaperIndexView
+from src.processor import VectorProcessor, paper_payload, paper_text
+from src.utils.arxiv_id import paper_point_id
+from src.database import init_database, get_qdrant_client, resolve_alias, physical_collection_name, VECTOR_COLLECTION
+from src.embeddings import get_embedding_provider
+from src.vector_profiles import CollectionProfile, get_profile
+from src.utils.log_config import setup_logging, get_logger, LogSampler
+
+logger = get_logger("ReindexVectors")
+sampled_logger = LogSampler(logger, interval=5.0)
+
+PAGE_SIZE = 256
+
+class _Copier:
+    """Copies papers (by Mongo filter) from `source` into `target`, page by page."""
+    def __init__(self, source: Optional[str], target: str, vector_size: int, reembed: bool):
+        self.source = source
+        self.target = target
+        self.vector_size = vector_size
+        self.reembed = reembed or source is None
+        self._processor: Optional[VectorProcessor] = None
+        self.stats = {"copied": 0, "embedded": 0, "skipped": 0}
+
+    def _embedder(self) -> Optional[VectorProcessor]:
+        if self._processor is None:
+            provider = get_embedding_provider()
+            if provider.dimension != self.vector_size:
+                return None
+            self._processor = VectorProcessor(provider)
+        return self._processor
+
+    async def _copy_page(self, papers: List[PaperIndexView]) -> None:
+        qdrant_client = get_qdrant_client()
+        vectors: Dict[str, Any] = {}
+        if not self.reembed:
+            points = await qdrant_client.retrieve(
+                collection_name=self.source,
+                ids=[paper_point_id(p.id) for p in papers],
+                with_vectors=True,
+                with_payload=False
+            )
+            vectors = {str(p.id): p.vector for p in points}
+
+        missing = [p for p in papers if paper_point_id(p.id) not in vectors]
+        if missing:
+            embedder = self._embedder()
+            if embedder is None:
+                self.stats["skipped"] += len(missing)
+                sampled_logger.info("missing", "⚠️ %d papers have no vector and the provider's dimension does not match; skipped.", len(missing))
+            else:
+                embeddings = await embedder.embed_texts([paper_text(p) for p in missing])
+                vectors.update({paper_point_id(p.id): v for p, v in zip(missing, embeddings)})
+                self.stats["embedded"] += len(missing)
+
+        points = [
+            PointStruct(id=paper_point_id(p.id), vector=vectors[paper_point_id(p.id)], payload=paper_payload(p))
+            for p in papers if paper_point_id(p.id) in vectors
+        ]
+        if points:
+            await qdrant_client.upsert(collection_name=self.target, points=points)
+        self.stats["copied"] += len(points)
+        sampled_logger.info("progress", "📦 %d points copied into %s...", self.stats["copied"], self.target)
+
+    async def copy(self, query: Dict[str, Any]) -> None:
+        page: List[PaperIndexView] = []
+        async for paper in ArxivPaper.find(query).project(PaperIndexView):
+            page.append(paper)
+            if len(page) >= PAGE_SIZE:
+                await self._copy_page(page)
+                page = []
+        if page:
+            await self._copy_page(page)
+
+def catch_up_query(since: datetime) -> Dict[str, Any]:
+    """Papers whose vector or payload was written to the live collection since `since`."""
+    return {"indexed_at": {"$gte": since}}
+
+async def _wait_until_green(collection: str, timeout: float) -> bool:
+    qdrant_client = get_qdrant_client()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = await qdrant_client.get_collection(collection)
+        if info.status == CollectionStatus.GREEN:
+            return True
+        await asyncio.sleep(2)
+    return False
+
+async def reindex(
+        profile: CollectionProfile,
+        reembed: bool = False,
+        keep_old: bool = False,
+        green_timeout: float = 3600
+    ) -> Dict[str, Any]:
+    qdrant_client = get_qdrant_client()
+    old = await resolve_alias(VECTOR_COLLECTION)
+    legacy = old is None and await qdrant_client.collection_exists(VECTOR_COLLECTION)
+    source = old or (VECTOR_COLLECTION if legacy else None)
+
+    if reembed or source is None:
+        vector_size = get_embedding_provider().dimension
+    else:
+        vector_size = (await qdrant_client.get_collection(source)).config.params.vectors.size
+
+    target = physical_collection_name(VECTOR_COLLECTION, profile.name)
+    logger.info(f"🏗️ Building {target} (profile '{profile.name}', {vector_size} dims) from {source or 'MongoDB'}...")
+    await qdrant_client.create_collection(collection_name=target, **profile.create_kwargs(vector_size, indexing=False))
+
+    copier = _Copier(source, target, vector_size, reembed)
+    started = datetime.now(timezone.utc)
+    await copier.copy({})
+
+    # Papers indexed by an ingest while we were copying.
+    catch_up_started = datetime.now(timezone.utc)
+    await copier.copy(catch_up_query(started))
+
+    await qdrant_client.update_collection(collection_name=target, optimizers_config=profile.optimizers_config(indexing=True))
+    logger.info(f"⏳ Waiting for {target} to finish indexing...")
+    if not await _wait_until_green(target, green_timeout):
+        raise RuntimeError(f"{target} did not become green within {green_timeout}s; alias left on {source}.")
+
+    operations = [CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=VECTOR_COLLECTION))]
+    if old:
+        operations.insert(0, DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=VECTOR_COLLECTION)))
+    elif legacy:
+        logger.warning(f"⚠️ Replacing the plain collection {VECTOR_COLLECTION} by an alias (non-atomic, one-time).")
+        await copier.copy(catch_up_query(catch_up_started))
+        await qdrant_client.delete_collection(VECTOR_COLLECTION)
+        source = None
+    await qdrant_client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"🔀 Alias {VECTOR_COLLECTION} -> {target}")
+
+    if source:
+        # Writes that still reached the old collection between the catch-up and the swap.
+        await copier.copy(catch_up_query(catch_up_started))
+        if keep_old:
+            logger.info(f"Old collection {source} kept for rollback.")
+        else:
+            await qdrant_client.delete_collection(source)
+            logger.info(f"🗑️ Old collection {source} dropped.")
+
+    result = {"collection": target, "profile": profile.name, "vector_size": vector_size, **copier.stats}
+    logger.info(f"✅ Reindex done: {result}")
+    return result
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector collection with a profile and swap it in.")
+    parser.add_argument("--profile", default=None, help="Collection profile (default: QDRANT_PROFILE).")
+    parser.add_argument("--reembed", action="store_true", help="Re-embed every paper instead of copying vectors.")
+    parser.add_argument("--keep-old", action="store_true", help="Keep the previous collection for rollback.")
+    parser.add_argument("--green-timeout", type=float, default=3600, help="Max seconds to wait for indexing.")
+    args = parser.parse_args()
+
+    setup_logging()
+    await init_database()
+    await reindex(get_profile(args.profile), reembed=args.reembed, keep_old=args.keep_old, green_timeout=args.green_timeout)
+
+if __name__ == "__main__":
+    asyncio.run(main())
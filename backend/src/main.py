@@ -1,18 +1,48 @@
-from fastapi import FastAPI
+import os
+import re
+import time
+import uuid
+import asyncio
+import weakref
+from datetime import timedelta
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, JSONResponse
 from contextlib import asynccontextmanager
 from typing import List, Dict, Optional
 from pydantic import BaseModel
 from beanie.operators import RegEx
+from pymongo import ASCENDING, DESCENDING
 from fastapi.responses import StreamingResponse
 
 from src.agent.graph import chat_with_paper
-from src.database import init_database
+from src.agent.prefetch import prepare_paper
+from src.agent.streaming import NDJSON_MEDIA_TYPE, coalesce_tokens, encode_event
+from src.database import init_database, VECTOR_BACKEND
+from src.cluster import ClusterMember, PeriodicJob
+from src.admission import (
+    AdmissionRejected, CHAT_ADMISSION, CLIENT_ID_SECRET, CRAWL_ADMISSION, PREPARE_ADMISSION, PROFILE_ADMISSION, TRUSTED_PROXIES,
+    admission_stats, client_key
+)
 from src.crawler.scraper import ArxivScraper
-from src.utils.log_config import setup_logging, get_logger
+from src.utils.log_config import setup_logging, get_logger, request_id_var
 from src.processor import VectorProcessor
-from src.model import ArxivPaper
+from src.model import ArxivPaper, PaperListView, SimilarPapersView, SEARCH_SORT_FIELDS
+from src.facets import paper_facets
+from src.authors import papers_by_author, top_authors
+from src.watchlists import (
+    create_profile, create_watchlist, delete_watchlist, list_watchlists, mark_inbox_read, profile_owner, prune_profiles,
+    read_inbox, update_watchlist, watchlist_fields
+)
+from src.utils.pagination import encode_cursor, keyset_filter
+from src.utils.metrics import HTTP_REQUEST_SECONDS, PROMETHEUS_CONTENT_TYPE, metrics_enabled, render_metrics
+
+logger = get_logger("MainApp")
 
-logger = None
+CRAWL_INTERVAL = timedelta(minutes=float(os.getenv("CRAWL_INTERVAL_MINUTES", 720)))
+# Only the elected leader runs scheduled jobs; set to false for API-only replicas.
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+PROFILE_PRUNE_INTERVAL = timedelta(days=1)
+PROFILE_HEADER = "x-profile-token"
 
 class CrawlRequest(BaseModel):
     topics: List[str] = []
@@ -25,6 +55,13 @@ class SearchRequest(BaseModel):
     sort_by: str = "published_date"
     order: str = "desc"
     limit: int = 50
+    cursor: Optional[str] = None
+
+class WatchlistRequest(BaseModel):
+    name: str = ''
+    keywords: List[str] = []
+    categories: List[str] = []
+    authors: List[str] = []
 
 class ChatRequest(BaseModel):
     paper_id: str
@@ -34,9 +71,6 @@ class ChatRequest(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
-    global logger
-    logger = get_logger("MainApp")
-
     logger.info("🚀 The server is starting up...")
 
     try:
@@ -44,50 +78,118 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.critical(f"Failed to initialize the database: {e}")
         raise e
-    logger.info("🔄 Activate the Crawler Pipeline to start...")
-
-    try:
-        scraper = ArxivScraper()
-        processor = VectorProcessor()
 
-        papers = scraper.get_paper(topics=["AI", "CL", "CV", "CL"], days_back=3)
-        new_papers = await scraper.save_to_db(papers)
+    if not CLIENT_ID_SECRET and not TRUSTED_PROXIES:
+        logger.warning(
+            "⚠️ Neither CLIENT_ID_SECRET(_FILE) nor TRUSTED_PROXIES is set: X-Client-ID is ignored and "
+            "every user of the frontend shares its IP's rate limits."
+        )
 
-        if new_papers:
-            await processor.process_and_index(new_papers)
-            logger.info(f"📊 Pipeline complete: {len(new_papers)} new post is ready for chat.")
-        else:
-            logger.info("⚠️ There are no new posts to process.")
-            
-    except Exception as e:
-        logger.error(f"❌ Pipeline error: {e}", exc_info=True)
+    cluster = ClusterMember([
+        PeriodicJob("crawl", CRAWL_INTERVAL, scheduled_crawl),
+        PeriodicJob("prune_profiles", PROFILE_PRUNE_INTERVAL, prune_profiles),
+    ], scheduler=SCHEDULER_ENABLED)
+    cluster.start()
     logger.info("✅ The system is ready to receive requests!")
     
     yield
 
+    await cluster.stop()
     logger.info("🛑 Server is off...")
 
+async def scheduled_crawl() -> Dict[str, int]:
+    """
+    Crawler pipeline run by the leader once per `CRAWL_INTERVAL_MINUTES` slot
+    (the current slot runs as soon as a leader is elected, i.e. at startup).
+    """
+    logger.info("🔄 Activate the Crawler Pipeline...")
+    scraper = ArxivScraper()
+    processor = VectorProcessor()
+
+    papers = await asyncio.to_thread(scraper.get_paper, topics=["AI", "CL", "CV"], days_back=3)
+    new_papers = await scraper.save_to_db(papers)
+
+    if new_papers:
+        await processor.process_and_index(new_papers)
+        logger.info(f"📊 Pipeline complete: {len(new_papers)} new post is ready for chat.")
+    else:
+        logger.info("⚠️ There are no new posts to process.")
+    return {"fetched": len(papers), "indexed": len(new_papers)}
+
 app = FastAPI(lifespan=lifespan)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    """429 (client rate limit) or 503 (endpoint saturated), always with Retry-After."""
+    logger.debug(f"🚦 Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "reason": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    if not metrics_enabled():
+        return await call_next(request)
+
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Correlation ID for every log line of a request (reuses an incoming X-Request-ID)."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/admission", include_in_schema=False)
+def get_admission():
+    """In-flight, queued, admitted and rejected requests of every protected endpoint."""
+    return admission_stats()
+
 @app.get("/")
 def read_root():
     return {"status": "running", "service": "Arxiv Agent"}
 
 @app.get("/news/latest")
 async def get_latest_news():
-    papers = await ArxivPaper.find_all().sort("-published_date").limit(20).to_list()
+    papers = await ArxivPaper.find_all().sort("-published_date").limit(20).project(PaperListView).to_list()
     return papers
 
 @app.post("/crawler/trigger")
-async def trigger_craw(request: CrawlRequest):
+async def trigger_craw(request: CrawlRequest, http_request: Request):
     """
     API for Frontend to immediately issue commands to scrape data. 
+
+    Only one manual crawl runs at a time per worker: a second one gets a 503.
     """
+    permit = await CRAWL_ADMISSION.admit(client_key(http_request.headers, http_request.client and http_request.client.host))
     logger.info(f'Receive commands to manually retrieve news: {request.topics} within {request.days_back} days.')
     try:
         scraper = ArxivScraper()
         processor = VectorProcessor()
 
-        papers = scraper.get_paper(
+        papers = await asyncio.to_thread(
+            scraper.get_paper,
             topics=request.topics,
             keyword=request.keyword,
             days_back=request.days_back,
@@ -111,45 +213,202 @@ async def trigger_craw(request: CrawlRequest):
     except Exception as e:
         logger.error(f"❌ Crawl error: {e}", exc_info=True)
         return {"status": "error", "message": str(e)}
+    finally:
+        permit.release()
     
 @app.post('/papers/search')
-async def search_papers(request: SearchRequest):
+async def search_papers(request: SearchRequest, response: Response):
     """
-    API retrieves a list of articles from Mongo with sorting.
+    API retrieves a page of articles from Mongo with sorting (list view: no
+    `similar` neighbours, see `/papers/{id}/similar`).
+
+    Pages are keyset-paginated: when more results exist, the `X-Next-Cursor`
+    response header holds the cursor to send back for the next page.
     """
-    sort_prefix = "-" if request.order == "desc" else "+"
-    valid_fields = ["published_date", "updated_date", "crawled_at"]
-    field = request.sort_by if request.sort_by in valid_fields else "published_date"
-    sort_str = f"{sort_prefix}{field}"
-    
+    descending = request.order == "desc"
+    direction = DESCENDING if descending else ASCENDING
+    field = request.sort_by if request.sort_by in SEARCH_SORT_FIELDS else "published_date"
+    limit = max(1, min(request.limit, 100))
+
+    try:
+        filters = keyset_filter(field, descending, request.cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     if request.keyword and request.keyword.strip():
-        search_pattern = request.keyword.strip()
-        query = ArxivPaper.find({
-            "title": {"$regex": search_pattern, "$options": "i"}
-        })
-    else:
-        query = ArxivPaper.find_all()
-        
-    papers = await query.sort(sort_str).limit(request.limit).to_list()
+        filters["title"] = {"$regex": re.escape(request.keyword.strip()), "$options": "i"}
+
+    papers = await ArxivPaper.find(filters).sort((field, direction), ("_id", direction)).limit(limit + 1) \
+        .project(PaperListView).to_list()
+    if len(papers) > limit:
+        papers = papers[:limit]
+        last = papers[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(last, field), last.id)
     
     logger.info(f"🔍 Search: Key='{request.keyword}' | Found: {len(papers)}")
     return papers
 
-from fastapi.responses import StreamingResponse
-import asyncio
+@app.get('/papers/facets')
+async def get_paper_facets(days: Optional[int] = 30, category: Optional[str] = None):
+    """
+    API returns paper counts per primary category and per publication day, e.g.
+    `/papers/facets?days=30&category=cs.CL`. `days=0` covers every paper.
+    """
+    return await paper_facets(days=days, category=category)
+
+@app.get('/papers/{paper_id}/similar')
+async def get_similar_papers(paper_id: str):
+    """
+    API returns the neighbour list precomputed at index time (single document read).
+    """
+    paper = await ArxivPaper.find_one(ArxivPaper.id == paper_id).project(SimilarPapersView)
+    if not paper:
+        raise HTTPException(status_code=404, detail="Paper not found")
+    return paper
+
+@app.post('/papers/{paper_id}/prepare', status_code=202)
+async def prepare_paper_chat(paper_id: str, request: Request):
+    """
+    API warms the chat of a paper (called when the user opens it): loads its chat
+    context and starts the PDF analysis in the background unless it is stored,
+    already running or no analysis slot is free (see `src.agent.prefetch`).
+    Idempotent; rate-limited per client.
+    """
+    async with await PREPARE_ADMISSION.admit(client_key(request.headers, request.client and request.client.host)):
+        state = await prepare_paper(paper_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Paper not found")
+    return {"paper_id": paper_id, "analysis": state}
+
+@app.get('/authors/top')
+async def get_top_authors(category: Optional[str] = None, days: Optional[int] = 7, limit: int = 20):
+    """
+    API returns the most active authors, e.g. `/authors/top?category=cs.CL&days=7`.
+    `days=0` ranks by all-time paper counts.
+    """
+    return await top_authors(category=category, days=days, limit=min(limit, 100))
+
+@app.get('/authors/{name}/papers')
+async def get_author_papers(name: str, limit: int = 50, skip: int = 0):
+    """
+    API returns every paper of an author (name is normalised), newest first.
+    """
+    return await papers_by_author(name, limit=min(limit, 200), skip=skip)
+
+async def request_user(request: Request) -> str:
+    """
+    Owner of watchlists and inbox: the profile of the `X-Profile-Token` header
+    (see `POST /profiles`).
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    user_id = await profile_owner(token) if token else None
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Missing or unknown X-Profile-Token; create a profile with POST /profiles.")
+    return user_id
+
+@app.post('/profiles', status_code=201)
+async def new_profile(request: Request):
+    """
+    API creates a watchlist profile and returns its token: the only credential
+    for the profile's watchlists and inbox, kept by the user and sent as
+    `X-Profile-Token`. Profiles unused for `PROFILE_MAX_IDLE_DAYS` are deleted.
+    """
+    async with await PROFILE_ADMISSION.admit(client_key(request.headers, request.client and request.client.host)):
+        return {"token": await create_profile()}
+
+def _watchlist_fields(body: WatchlistRequest) -> Dict:
+    try:
+        return watchlist_fields(body.name, body.keywords, body.categories, body.authors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get('/watchlists')
+async def get_watchlists(request: Request):
+    """
+    API returns the watchlists of the profile (see `request_user`).
+    """
+    return await list_watchlists(await request_user(request))
+
+@app.post('/watchlists')
+async def add_watchlist(body: WatchlistRequest, request: Request):
+    """
+    API creates a watchlist: new papers containing one of the keywords (phrase
+    in title/abstract) or by one of the authors, optionally restricted to
+    `categories`, land in the client's `/inbox` at ingest time. Categories
+    alone follow every new paper of those categories.
+    """
+    user_id = await request_user(request)
+    fields = _watchlist_fields(body)
+    try:
+        return await create_watchlist(user_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put('/watchlists/{watchlist_id}')
+async def replace_watchlist(watchlist_id: str, body: WatchlistRequest, request: Request):
+    watchlist = await update_watchlist(await request_user(request), watchlist_id, _watchlist_fields(body))
+    if watchlist is None:
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    return watchlist
+
+@app.delete('/watchlists/{watchlist_id}')
+async def remove_watchlist(watchlist_id: str, request: Request):
+    if not await delete_watchlist(await request_user(request), watchlist_id):
+        raise HTTPException(status_code=404, detail="Watchlist not found")
+    return {"status": "deleted"}
+
+@app.get('/inbox')
+async def get_inbox(request: Request, limit: int = 50, skip: int = 0):
+    """
+    API returns the papers matched by the client's watchlists, newest match
+    first, with the number of unread items (since the last `/inbox/read`).
+    """
+    return await read_inbox(await request_user(request), limit=max(1, min(limit, 100)), skip=max(0, skip))
+
+@app.post('/inbox/read')
+async def read_all_inbox(request: Request):
+    """
+    API marks every inbox item of the client as read.
+    """
+    await mark_inbox_read(await request_user(request))
+    return {"status": "ok"}
 
 @app.post("/chat/stream")
-async def chat_stream(body: ChatRequest):
+async def chat_stream(body: ChatRequest, request: Request):
     """
-    API Chat Streaming với Gemini
+    API Chat Streaming với Gemini.
+
+    Trả về NDJSON: mỗi dòng là một sự kiện có kiểu (`token`, `tool_start`,
+    `tool_end`, `error`, `done`), các token liên tiếp được gộp theo cửa sổ
+    thời gian/kích thước (xem `src.agent.streaming`).
+
+    Số phiên chạy đồng thời bị giới hạn (`src.admission`): khi hàng đợi đầy,
+    API trả về 503/429 kèm header `Retry-After` trước khi bắt đầu stream.
+    Khi client ngắt kết nối, generator bị huỷ và agent (LLM, tool) dừng theo.
     """
+    permit = await CHAT_ADMISSION.admit(client_key(request.headers, request.client and request.client.host))
     logger.info(f"💬 Chat request for paper {body.paper_id}: {body.message[:50]}...")
     async def response_generator():
-        async for chunk in chat_with_paper(body.paper_id, body.message, body.history):
-            yield chunk
-            
-    return StreamingResponse(response_generator(), media_type="text/plain")
+        try:
+            async for event in coalesce_tokens(chat_with_paper(body.paper_id, body.message, body.history)):
+                yield encode_event(event)
+        finally:
+            permit.release()
+
+    # The slot is held until the stream ends. A generator that never started
+    # (client gone before the first chunk) frees it when it is collected.
+    stream = response_generator()
+    weakref.finalize(stream, permit.release)
+    return StreamingResponse(stream, media_type=NDJSON_MEDIA_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run('src.main:app', host='0.0.0.0', port=8000, reload=True)
\ No newline at end of file
+    # APP_ENV=production: WEB_WORKERS processes, each with its own clients; the
+    # scheduled crawl runs in the elected leader only (see src.cluster).
+    if os.getenv("APP_ENV", "development") == "production":
+        workers = int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+        if workers > 1 and VECTOR_BACKEND == "mmap":
+            raise SystemExit("The embedded mmap vector store is single-process: use WEB_WORKERS=1 or VECTOR_BACKEND=qdrant.")
+        uvicorn.run('src.main:app', host='0.0.0.0', port=8000, workers=workers, proxy_headers=True)
+    else:
+        uvicorn.run('src.main:app', host='0.0.0.0', port=8000, reload=True)
\ No newline at end of file
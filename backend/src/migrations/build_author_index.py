@@ -0,0 +1,126 @@
+"""
+Backfills `author_keys` on existing papers and rebuilds the `authors` and
+`author_categories` collections.
+
+Name normalisation needs Python (Unicode folding), so papers are streamed once
+and their keys written back in unordered bulk batches. The per-author counters
+are then computed server-side with two aggregation pipelines merged into
+`authors` and `author_categories`, which keeps the job's memory flat at any corpus size. Only the
+display names of keys shared by several names of one paper are paired in
+Python, on those papers alone.
+
+Usage:
+    python -m src.migrations.build_author_index
+"""
+import asyncio
+from pymongo import UpdateOne
+
+from src.model import ArxivPaper, Author, AuthorCategory
+from src.database import init_database
+from src.cluster import publish_generation
+from src.utils.names import normalize_author_name
+from src.utils.log_config import setup_logging, get_logger
+
+logger = get_logger("MigrationAuthorIndex")
+
+BATCH_SIZE = 1_000
+
+async def backfill_author_keys() -> int:
+    collection = ArxivPaper.get_pymongo_collection()
+    updates, total = [], 0
+
+    async for doc in collection.find({}, {"author": 1, "author_keys": 1}):
+        keys = list(dict.fromkeys(normalize_author_name(a) for a in doc.get("author", [])))
+        if keys != doc.get("author_keys"):
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"author_keys": keys}}))
+        if len(updates) >= BATCH_SIZE:
+            await collection.bulk_write(updates, ordered=False)
+            total += len(updates)
+            updates = []
+
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        total += len(updates)
+    return total
+
+async def rebuild_authors() -> None:
+    authors = Author.get_collection_name()
+    await Author.get_pymongo_collection().delete_many({})
+    await AuthorCategory.get_pymongo_collection().delete_many({})
+
+    # `author_keys` is `author` normalised and deduplicated, so the i-th key is
+    # the i-th name only when no two names share a key; other papers leave the
+    # display name to `fill_author_names`.
+    keyed = [
+        {"$project": {
+            "categories": 1,
+            "published_date": 1,
+            "author_keys": 1,
+            "names": {"$cond": [{"$eq": [{"$size": "$author"}, {"$size": "$author_keys"}]}, "$author", []]}
+        }},
+        {"$unwind": {"path": "$author_keys", "includeArrayIndex": "position"}},
+    ]
+    totals = keyed + [
+        {"$group": {
+            "_id": "$author_keys",
+            "name": {"$max": {"$arrayElemAt": ["$names", "$position"]}},
+            "paper_count": {"$sum": 1},
+            "last_published": {"$max": "$published_date"}
+        }},
+        {"$merge": {"into": authors, "whenMatched": "merge", "whenNotMatched": "insert"}},
+    ]
+    per_category = keyed + [
+        {"$unwind": "$categories"},
+        {"$group": {
+            "_id": {"author": "$author_keys", "category": "$categories"},
+            "n": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": {"$concat": ["$_id.author", "|", "$_id.category"]},
+            "author": "$_id.author",
+            "category": "$_id.category",
+            "paper_count": "$n"
+        }},
+        {"$merge": {"into": AuthorCategory.get_collection_name(), "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+    for pipeline in (totals, per_category):
+        await ArxivPaper.aggregate(pipeline, allowDiskUse=True).to_list()
+    await fill_author_names()
+
+async def fill_author_names() -> int:
+    """
+    Names the authors left without one by `rebuild_authors`: keys that only
+    occur on papers where several names normalise to the same key. Names are
+    paired with their key in Python, as `update_author_index` does.
+    """
+    collection = ArxivPaper.get_pymongo_collection()
+    updates, total = [], 0
+    ambiguous = {"$expr": {"$ne": [{"$size": "$author"}, {"$size": "$author_keys"}]}}
+
+    async for doc in collection.find(ambiguous, {"author": 1}):
+        names = {}
+        for name in doc.get("author", []):
+            names.setdefault(normalize_author_name(name), name)
+        updates.extend(UpdateOne({"_id": key, "name": None}, {"$set": {"name": name}}) for key, name in names.items())
+        if len(updates) >= BATCH_SIZE:
+            total += (await Author.get_pymongo_collection().bulk_write(updates, ordered=False)).modified_count
+            updates = []
+
+    if updates:
+        total += (await Author.get_pymongo_collection().bulk_write(updates, ordered=False)).modified_count
+    return total
+
+async def main():
+    setup_logging()
+    await init_database()
+
+    updated = await backfill_author_keys()
+    logger.info(f"✅ author_keys backfilled on {updated} papers.")
+
+    await rebuild_authors()
+    await publish_generation()
+    logger.info(f"✅ authors collection rebuilt ({await Author.count()} authors).")
+
+if __name__ == "__main__":
+    asyncio.run(main())
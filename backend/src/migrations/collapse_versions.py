@@ -0,0 +1,153 @@
+"""
+Collapses versioned paper duplicates (`2401.12345v1`, `2401.12345v2`, ...) into a
+single document keyed by the base arXiv ID, in both MongoDB and Qdrant.
+
+Existing vectors are re-used (re-keyed to the base ID point) so the migration does
+not spend any embedding quota; papers with no stored vector can optionally be
+re-embedded with `--embed-missing`.
+
+Usage:
+    python -m src.migrations.collapse_versions [--dry-run] [--embed-missing]
+"""
+import asyncio
+import argparse
+from typing import Dict, List, Any, Optional
+
+from qdrant_client.models import PointStruct
+
+from src.model import ArxivPaper
+from src.processor import VectorProcessor
+from src.database import init_database, get_qdrant_client, VECTOR_COLLECTION
+from src.utils.arxiv_id import split_arxiv_id, content_hash, paper_point_id
+from src.utils.log_config import setup_logging, get_logger
+
+logger = get_logger("MigrationCollapseVersions")
+
+VERSIONED_ID_FILTER = {"_id": {"$regex": r"v\d+$"}}
+
+def _pick_survivor(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Keeps the highest version, carrying over a deep analysis from another
+    version when the text it was computed from is identical.
+    """
+    survivor = dict(max(docs, key=lambda d: d["version"]))
+    survivor["content_hash"] = content_hash(survivor["title"], survivor["summary"])
+
+    if not survivor.get("deep_analysis"):
+        for doc in docs:
+            if doc.get("deep_analysis") and content_hash(doc["title"], doc["summary"]) == survivor["content_hash"]:
+                survivor["deep_analysis"] = doc["deep_analysis"]
+                survivor["analyzed_at"] = doc.get("analyzed_at")
+                break
+    return survivor
+
+async def _collapse_group(base_id: str, versioned: List[Dict[str, Any]], dry_run: bool) -> Optional[str]:
+    """
+    Merges one group of versioned documents. Returns the base ID when no vector
+    could be carried over (the paper needs re-embedding), otherwise None.
+
+    The survivor (base point, then base document) is written before anything is
+    deleted, so an interrupted run leaves every paper with a document and a
+    vector, and running again picks up where it stopped.
+    """
+    collection = ArxivPaper.get_pymongo_collection()
+    qdrant_client = get_qdrant_client()
+
+    docs = []
+    for doc in versioned:
+        _, version = split_arxiv_id(doc["_id"])
+        docs.append({**doc, "version": version})
+
+    base_doc = await collection.find_one({"_id": base_id})
+    if base_doc:
+        docs.append({**base_doc, "version": base_doc.get("version", 1)})
+
+    survivor = _pick_survivor(docs)
+    source_id = survivor["_id"]
+    survivor["_id"] = base_id
+    old_ids = [doc["_id"] for doc in versioned]
+
+    logger.info(f"🔀 {base_id}: {len(docs)} documents -> v{survivor['version']} (from {source_id})")
+    if dry_run:
+        return None
+
+    points = await qdrant_client.retrieve(
+        collection_name=VECTOR_COLLECTION,
+        ids=list({paper_point_id(doc["_id"]) for doc in docs}),
+        with_vectors=True,
+        with_payload=True
+    )
+    by_point_id = {str(p.id): p for p in points}
+
+    vector_point = by_point_id.get(paper_point_id(source_id))
+    if vector_point is None:
+        # Any other version embedded from exactly the same text is just as good.
+        same_text = [
+            paper_point_id(doc["_id"]) for doc in docs
+            if content_hash(doc["title"], doc["summary"]) == survivor["content_hash"]
+        ]
+        vector_point = next((by_point_id[i] for i in same_text if i in by_point_id), None)
+
+    if vector_point is not None:
+        payload = dict(vector_point.payload or {})
+        payload.update({"paper_id": base_id, "version": survivor["version"], "title": survivor["title"]})
+        await qdrant_client.upsert(
+            collection_name=VECTOR_COLLECTION,
+            points=[PointStruct(id=paper_point_id(base_id), vector=vector_point.vector, payload=payload)]
+        )
+    await collection.replace_one({"_id": base_id}, survivor, upsert=True)
+
+    await qdrant_client.delete(collection_name=VECTOR_COLLECTION, points_selector=[paper_point_id(i) for i in old_ids])
+    await collection.delete_many({"_id": {"$in": old_ids}})
+    return base_id if vector_point is None else None
+
+async def collapse_versions(dry_run: bool = False, embed_missing: bool = False) -> Dict[str, int]:
+    """
+    Streams versioned documents ordered by `_id` (all versions of one paper are
+    adjacent) and collapses them group by group, so memory stays bounded by the
+    size of a single group.
+    """
+    collection = ArxivPaper.get_pymongo_collection()
+    stats = {"groups": 0, "removed": 0, "missing_vectors": 0}
+    missing: List[str] = []
+
+    current_base, group = None, []
+    cursor = collection.find(VERSIONED_ID_FILTER).sort("_id", 1)
+
+    async def flush():
+        if not group:
+            return
+        stats["groups"] += 1
+        stats["removed"] += len(group)
+        needs_embedding = await _collapse_group(current_base, group, dry_run)
+        if needs_embedding:
+            missing.append(needs_embedding)
+
+    async for doc in cursor:
+        base_id, _ = split_arxiv_id(doc["_id"])
+        if base_id != current_base:
+            await flush()
+            current_base, group = base_id, []
+        group.append(doc)
+    await flush()
+
+    stats["missing_vectors"] = len(missing)
+    if missing and embed_missing and not dry_run:
+        papers = await ArxivPaper.find({"_id": {"$in": missing}}).to_list()
+        await VectorProcessor().process_and_index(papers)
+
+    logger.info(f"✅ Migration done: {stats}")
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Collapse versioned arXiv duplicates.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+    parser.add_argument("--embed-missing", action="store_true", help="Re-embed papers that have no vector to carry over.")
+    args = parser.parse_args()
+
+    setup_logging()
+    await init_database()
+    await collapse_versions(dry_run=args.dry_run, embed_missing=args.embed_missing)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Moves the deep analyses stored inline on `arxiv_papers` (`deep_analysis`) into
+the compressed `paper_artifacts` collection (see `src.artifacts`) and removes
+the field from the papers.
+
+Moved analyses get the variant `legacy` and the content hash of the paper as
+read, so they keep being served until an analysis of the current prompt/model
+variant is computed. An analysis whose `analyzed_at` was cleared by the crawler
+described an older version of the paper and is dropped instead. Each batch
+writes the artifacts before unsetting the field, so the migration can be
+interrupted and run again.
+
+The size of `arxiv_papers` (and of `paper_artifacts`) is logged before and
+after from `collStats`. The freed space is reused by MongoDB for new writes; run
+`compact` on the collection to give it back to the filesystem.
+
+Usage:
+    python -m src.migrations.move_analyses [--dry-run]
+"""
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReplaceOne
+from pymongo.errors import OperationFailure
+
+from src.model import ArxivPaper, PaperArtifact, PaperVersionView
+from src.database import init_database
+from src.artifacts import ANALYSIS, build_artifact
+from src.utils.log_config import setup_logging, get_logger
+
+logger = get_logger("MigrationMoveAnalyses")
+
+LEGACY_VARIANT = "legacy"
+BATCH_SIZE = 200
+
+async def collection_stats(model) -> Optional[Dict[str, int]]:
+    """`collStats` summary of a model's collection (None when the server does not support it)."""
+    collection = model.get_pymongo_collection()
+    try:
+        stats = await collection.database.command({"collStats": collection.name})
+    except (OperationFailure, NotImplementedError):
+        return None
+    return {key: int(stats.get(key, 0)) for key in ("count", "size", "avgObjSize", "storageSize")}
+
+def _describe(name: str, stats: Optional[Dict[str, int]]) -> str:
+    if stats is None:
+        return f"{name}: collStats unavailable"
+    return (
+        f"{name}: {stats['count']:,} docs, {stats['size'] / 2**20:.1f} MiB data "
+        f"(avg {stats['avgObjSize']:,} B), {stats['storageSize'] / 2**20:.1f} MiB on disk"
+    )
+
+async def _flush(docs: List[Dict[str, Any]], stats: Dict[str, int], dry_run: bool) -> None:
+    artifacts = []
+    for doc in docs:
+        text = doc.get("deep_analysis")
+        if not text:
+            continue
+        if doc.get("analyzed_at") is None:
+            stats["dropped_stale"] += 1
+            continue
+        artifact = build_artifact(PaperVersionView.model_validate(doc), ANALYSIS, LEGACY_VARIANT, text)
+        artifact.created_at = doc["analyzed_at"]
+        artifacts.append(artifact)
+        stats["raw_bytes"] += artifact.size
+        stats["stored_bytes"] += len(artifact.data)
+
+    stats["moved"] += len(artifacts)
+    stats["papers"] += len(docs)
+    if dry_run:
+        return
+    if artifacts:
+        await PaperArtifact.get_pymongo_collection().bulk_write([
+            ReplaceOne({"_id": a.id}, a.model_dump(by_alias=True), upsert=True) for a in artifacts
+        ], ordered=False)
+    await ArxivPaper.get_pymongo_collection().update_many(
+        {"_id": {"$in": [doc["_id"] for doc in docs]}}, {"$unset": {"deep_analysis": ""}}
+    )
+
+async def move_analyses(dry_run: bool = False) -> Dict[str, int]:
+    """
+    Streams the papers that still have a `deep_analysis` field and moves them in
+    batches. Returns the counters: papers, moved, dropped_stale, raw_bytes,
+    stored_bytes.
+    """
+    before = await collection_stats(ArxivPaper)
+    logger.info(f"📏 Before: {_describe('arxiv_papers', before)}")
+
+    stats = {"papers": 0, "moved": 0, "dropped_stale": 0, "raw_bytes": 0, "stored_bytes": 0}
+    projection = {"title": 1, "summary": 1, "version": 1, "content_hash": 1, "deep_analysis": 1, "analyzed_at": 1}
+    batch: List[Dict[str, Any]] = []
+    async for doc in ArxivPaper.get_pymongo_collection().find({"deep_analysis": {"$exists": True}}, projection):
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            await _flush(batch, stats, dry_run)
+            batch = []
+            logger.info(f"📦 {stats['papers']:,} papers processed, {stats['moved']:,} analyses moved...")
+    if batch:
+        await _flush(batch, stats, dry_run)
+
+    ratio = stats["raw_bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+    logger.info(
+        f"🗜️ {stats['moved']:,} analyses {'would be ' if dry_run else ''}moved: {stats['raw_bytes'] / 2**20:.1f} MiB -> "
+        f"{stats['stored_bytes'] / 2**20:.1f} MiB zstd (x{ratio:.1f}); {stats['dropped_stale']:,} stale analyses dropped."
+    )
+    if not dry_run:
+        logger.info(f"📏 After: {_describe('arxiv_papers', await collection_stats(ArxivPaper))}")
+        logger.info(f"📏 After: {_describe('paper_artifacts', await collection_stats(PaperArtifact))}")
+    logger.info(f"✅ Migration done: {stats}")
+    return stats
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move inline deep analyses into the compressed paper_artifacts collection.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be moved.")
+    args = parser.parse_args()
+
+    setup_logging()
+    await init_database()
+    await move_analyses(dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,465 @@
+import os
+import json
+import asyncio
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+import numpy as np
+
+from src.interfaces.interfaces import BaseVectorStore, VectorRecord, VectorHit, VectorFilter
+from src.utils.log_config import get_logger
+
+logger = get_logger("MmapVectorStore")
+
+MANIFEST = "manifest.json"
+FORMAT = 2
+NO_DATE = np.iinfo(np.int64).min
+
+# name -> (file suffix, dtype); every column has one entry per row.
+_COLUMNS = {
+    "category": ("u16", np.uint16),
+    "published": ("i8", np.int64),
+    "alive": ("u1", np.uint8),
+}
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _timestamp(value: Any) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp()) if isinstance(value, datetime) else NO_DATE
+
+class MmapVectorStore(BaseVectorStore):
+    """
+    In-process vector store for small and edge deployments (no Qdrant service).
+
+    Layout of `path` (one set of files per compaction generation `g`):
+    - `vectors.g.f32`: row-major float32 matrix of L2-normalised vectors, memory-mapped;
+    - `category.g.u16`, `published.g.i8`, `alive.g.u1`: column arrays used for
+      prefiltering and tombstones;
+    - `payload.g.jsonl`: one JSON payload per row (the row -> paper ID map);
+    - `manifest.json`: generation, committed row count, capacity, category codes.
+
+    Writes are append-only: a new or updated vector goes to a new row, the manifest
+    is atomically replaced to commit it, and only then is the previous row of the
+    same paper tombstoned. Rows past the committed count are ignored (and the
+    payload file truncated) on open, so a crash mid-write loses at most the
+    uncommitted batch. Compaction writes generation `g+1` next to the live one and
+    commits it with the same manifest swap; leftovers of an interrupted compaction
+    are deleted on open.
+
+    Search is a vectorised brute force in blocks of `SEARCH_BLOCK_ROWS` rows
+    (one BLAS product per block for the whole query batch), so latency grows
+    linearly and predictably with the number of rows. Vectors are stored as
+    float32 so blocks are multiplied straight from the mapped file: nothing is
+    copied into process memory and the page cache decides what stays resident
+    (1.5 GB for 1M x 384). Category/date filters are evaluated on the column
+    arrays first and only matching rows are gathered, into a float32 buffer
+    allocated once per search. Searches run in a worker thread.
+
+    Stores written with float16 vectors (manifest format 1) are converted on
+    open, through the same generation swap as compaction.
+
+    Args:
+        path: Directory of the store (created if missing).
+        dimension: Vector size.
+        compact_ratio: Compact once tombstoned rows exceed this share of all rows.
+    """
+    BLOCK_ROWS = 16_384
+    SEARCH_BLOCK_ROWS = 2_048
+    INITIAL_CAPACITY = 1_024
+
+    def __init__(self, path: str, dimension: int, compact_ratio: float = 0.3):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._open()
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+    def _file(self, name: str, suffix: str, generation: Optional[int] = None) -> Path:
+        return self.path / f"{name}.{self.generation if generation is None else generation}.{suffix}"
+
+    def _map(self, generation: int, capacity: int, mode: str) -> Dict[str, np.memmap]:
+        arrays = {"vectors": np.memmap(
+            self._file("vectors", "f32", generation), dtype=np.float32, mode=mode, shape=(capacity, self.dimension)
+        )}
+        for name, (suffix, dtype) in _COLUMNS.items():
+            arrays[name] = np.memmap(self._file(name, suffix, generation), dtype=dtype, mode=mode, shape=(capacity,))
+        return arrays
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "format": FORMAT,
+            "generation": self.generation,
+            "dimension": self.dimension,
+            "count": self.count_rows,
+            "capacity": self.capacity,
+            "categories": self.categories,
+        }
+        tmp = self.path / f"{MANIFEST}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path / MANIFEST)
+        _fsync_dir(self.path)
+
+    def _open(self) -> None:
+        manifest_path = self.path / MANIFEST
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            if manifest["dimension"] != self.dimension:
+                raise ValueError(
+                    f"Vector store at {self.path} holds {manifest['dimension']}-dim vectors, "
+                    f"the embedding provider produces {self.dimension}."
+                )
+            self.generation = manifest["generation"]
+            self.count_rows = manifest["count"]
+            self.capacity = manifest["capacity"]
+            self.categories: List[str] = manifest["categories"]
+            if manifest["format"] == 1:
+                self._convert_float16()
+        else:
+            self.generation, self.count_rows, self.capacity, self.categories = 0, 0, self.INITIAL_CAPACITY, []
+            self._allocate(self.generation, self.capacity)
+            (self.path / f"payload.{self.generation}.jsonl").touch()
+            self._write_manifest()
+
+        self._remove_stale_generations()
+        self.arrays = self._map(self.generation, self.capacity, "r+")
+        self._load_payload_index()
+
+    def _convert_float16(self) -> None:
+        """Rewrites a format 1 store (float16 vectors) as the next generation with float32 vectors."""
+        generation = self.generation + 1
+        logger.info(f"🔄 Converting vector store to float32 vectors (generation {generation}).")
+        with open(self._file("vectors", "f32", generation), "wb") as f:
+            f.truncate(self.capacity * 4 * self.dimension)
+        source = np.memmap(self._file("vectors", "f16"), dtype=np.float16, mode="r", shape=(self.capacity, self.dimension))
+        target = np.memmap(self._file("vectors", "f32", generation), dtype=np.float32, mode="r+", shape=(self.capacity, self.dimension))
+        for start in range(0, self.count_rows, self.BLOCK_ROWS):
+            target[start:start + self.BLOCK_ROWS] = source[start:start + self.BLOCK_ROWS]
+        target.flush()
+        del source, target
+        # Columns and payload are unchanged: the new generation links the same files.
+        for name, suffix in [("payload", "jsonl")] + [(n, s) for n, (s, _) in _COLUMNS.items()]:
+            self._file(name, suffix, generation).unlink(missing_ok=True)
+            os.link(self._file(name, suffix), self._file(name, suffix, generation))
+        _fsync_dir(self.path)
+        self.generation = generation
+        self._write_manifest()
+
+    def _allocate(self, generation: int, capacity: int) -> None:
+        for name, suffix, itemsize in [("vectors", "f32", 4 * self.dimension)] + [
+            (n, s, np.dtype(t).itemsize) for n, (s, t) in _COLUMNS.items()
+        ]:
+            with open(self._file(name, suffix, generation), "ab") as f:
+                f.truncate(capacity * itemsize)
+
+    def _remove_stale_generations(self) -> None:
+        live = f".{self.generation}."
+        for file in self.path.iterdir():
+            if file.name.startswith(("vectors.", "category.", "published.", "alive.", "payload.")) and live not in file.name:
+                file.unlink()
+                logger.info(f"🧹 Removed leftover file {file.name}")
+
+    def _load_payload_index(self) -> None:
+        """Rebuilds the row -> paper ID map and payload offsets, dropping uncommitted rows."""
+        payload_path = self._file("payload", "jsonl")
+        self.ids: List[str] = []
+        offsets = [0]
+        with open(payload_path, "rb") as f:
+            for line in f:
+                if len(self.ids) == self.count_rows or not line.endswith(b"\n"):
+                    break
+                self.ids.append(json.loads(line)["id"])
+                offsets.append(offsets[-1] + len(line))
+        if len(self.ids) < self.count_rows:
+            logger.warning(f"⚠️ Payload file has {len(self.ids)} of {self.count_rows} committed rows; truncating.")
+            self.count_rows = len(self.ids)
+        with open(payload_path, "r+b") as f:
+            f.truncate(offsets[-1])
+
+        self.offsets = offsets
+        self._payload_file = open(payload_path, "ab+")
+
+        alive = self.arrays["alive"]
+        self.id_to_row: Dict[str, int] = {}
+        for row, paper_id in enumerate(self.ids):
+            if not alive[row]:
+                continue
+            previous = self.id_to_row.get(paper_id)
+            if previous is not None:
+                # Crash between committing an update and tombstoning the old row.
+                alive[previous] = 0
+            self.id_to_row[paper_id] = row
+        alive.flush()
+        self.dead_rows = self.count_rows - len(self.id_to_row)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        for array in self.arrays.values():
+            array.flush()
+        self._allocate(self.generation, capacity)
+        self.capacity = capacity
+        self.arrays = self._map(self.generation, capacity, "r+")
+
+    def _category_code(self, category: Optional[str], create: bool) -> int:
+        if not category:
+            return 0
+        try:
+            return self.categories.index(category) + 1
+        except ValueError:
+            if not create:
+                return -1
+            self.categories.append(category)
+            return len(self.categories)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def _upsert_sync(self, records: List[VectorRecord]) -> None:
+        records = list({r.id: r for r in records}.values())
+        if not records:
+            return
+        matrix = np.asarray([r.vector for r in records], dtype=np.float32)
+        if matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dim vectors, got {matrix.shape[1]}.")
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+        with self._lock:
+            start, end = self.count_rows, self.count_rows + len(records)
+            self._grow(end)
+            arrays = self.arrays
+            arrays["vectors"][start:end] = matrix
+            arrays["category"][start:end] = [self._category_code(r.payload.get("category"), create=True) for r in records]
+            arrays["published"][start:end] = [_timestamp(r.payload.get("published_date")) for r in records]
+            arrays["alive"][start:end] = 1
+            for array in arrays.values():
+                array.flush()
+
+            lines = [(json.dumps({**r.payload, "id": r.id}, ensure_ascii=False) + "\n").encode() for r in records]
+            self._payload_file.write(b"".join(lines))
+            self._payload_file.flush()
+            os.fsync(self._payload_file.fileno())
+
+            self.count_rows = end
+            self._write_manifest()
+
+            for row, (record, line) in enumerate(zip(records, lines), start=start):
+                previous = self.id_to_row.get(record.id)
+                if previous is not None:
+                    arrays["alive"][previous] = 0
+                    self.dead_rows += 1
+                self.id_to_row[record.id] = row
+                self.ids.append(record.id)
+                self.offsets.append(self.offsets[-1] + len(line))
+            arrays["alive"].flush()
+            self._maybe_compact()
+
+    def _set_payload_sync(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        """Rewrites the rows of `payloads` with their current vectors (rows are append-only)."""
+        with self._lock:
+            vectors = self._retrieve_sync(list(payloads))
+            self._upsert_sync([
+                VectorRecord(id=paper_id, vector=vector, payload=payloads[paper_id])
+                for paper_id, vector in vectors.items()
+            ])
+
+    def _delete_sync(self, ids: List[str]) -> None:
+        with self._lock:
+            alive = self.arrays["alive"]
+            for paper_id in ids:
+                row = self.id_to_row.pop(paper_id, None)
+                if row is not None:
+                    alive[row] = 0
+                    self.dead_rows += 1
+            alive.flush()
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self.dead_rows > self.INITIAL_CAPACITY and self.dead_rows > self.compact_ratio * self.count_rows:
+            self._compact_sync()
+
+    def _compact_sync(self) -> None:
+        with self._lock:
+            rows = np.asarray(sorted(self.id_to_row.values()), dtype=np.int64)
+            generation = self.generation + 1
+            capacity = self.INITIAL_CAPACITY
+            while capacity < len(rows) * 1.25:
+                capacity *= 2
+            logger.info(f"🗜️ Compacting vector store: {self.count_rows} -> {len(rows)} rows (generation {generation}).")
+
+            self._allocate(generation, capacity)
+            target = self._map(generation, capacity, "r+")
+            for i in range(0, len(rows), self.BLOCK_ROWS):
+                chunk = rows[i:i + self.BLOCK_ROWS]
+                for name, array in self.arrays.items():
+                    target[name][i:i + len(chunk)] = array[chunk]
+            for array in target.values():
+                array.flush()
+
+            ids, offsets = [], [0]
+            payload_path = self._file("payload", "jsonl", generation)
+            with open(payload_path, "wb") as out:
+                for row in rows:
+                    line = os.pread(self._payload_file.fileno(), self.offsets[row + 1] - self.offsets[row], self.offsets[row])
+                    out.write(line)
+                    ids.append(self.ids[row])
+                    offsets.append(offsets[-1] + len(line))
+                out.flush()
+                os.fsync(out.fileno())
+
+            old_generation = self.generation
+            self.generation, self.count_rows, self.capacity = generation, len(rows), capacity
+            self._write_manifest()
+
+            self._payload_file.close()
+            self.arrays = target
+            self.ids, self.offsets = ids, offsets
+            self.id_to_row = {paper_id: row for row, paper_id in enumerate(ids)}
+            self.dead_rows = 0
+            self._payload_file = open(payload_path, "ab+")
+            for name, suffix in [("vectors", "f32"), ("payload", "jsonl")] + [(n, s) for n, (s, _) in _COLUMNS.items()]:
+                self._file(name, suffix, old_generation).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def _candidate_rows(self, arrays: Dict[str, np.memmap], count: int, filter: Optional[VectorFilter]) -> Optional[np.ndarray]:
+        """Rows passing the prefilter, or None when every live row is a candidate."""
+        if filter is None or not (filter.category or filter.published_after or filter.published_before):
+            return None
+        mask = arrays["alive"][:count] == 1
+        if filter.category:
+            code = self._category_code(filter.category, create=False)
+            mask &= arrays["category"][:count] == code
+        if filter.published_after:
+            mask &= arrays["published"][:count] >= _timestamp(filter.published_after)
+        if filter.published_before:
+            mask &= arrays["published"][:count] <= _timestamp(filter.published_before)
+        return np.flatnonzero(mask)
+
+    def _search_sync(self, vectors: List[List[float]], limit: int, filter: Optional[VectorFilter]) -> List[List[VectorHit]]:
+        with self._lock:
+            # `ids` is append-only until a compaction replaces the list, so the
+            # reference is a consistent snapshot of the first `count` rows.
+            arrays, count, ids = self.arrays, self.count_rows, self.ids
+
+        queries = np.asarray(vectors, dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+        n_queries = len(queries)
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+
+        candidates = self._candidate_rows(arrays, count, filter)
+        total = count if candidates is None else len(candidates)
+        matrix = arrays["vectors"].view(np.ndarray)
+        if candidates is not None:
+            buffer = np.empty((min(self.SEARCH_BLOCK_ROWS, max(total, 1)), self.dimension), dtype=np.float32)
+        for start in range(0, total, self.SEARCH_BLOCK_ROWS):
+            if candidates is None:
+                rows = np.arange(start, min(start + self.SEARCH_BLOCK_ROWS, count))
+                block = matrix[start:start + len(rows)]
+                dead = arrays["alive"][start:start + len(rows)] == 0
+            else:
+                rows = candidates[start:start + self.SEARCH_BLOCK_ROWS]
+                block = np.take(matrix, rows, axis=0, out=buffer[:len(rows)])
+                dead = None
+
+            scores = queries @ block.T
+            if dead is not None and dead.any():
+                scores[:, dead] = -np.inf
+
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(rows, (n_queries, len(rows)))], axis=1)
+            if scores.shape[1] > limit:
+                top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        with self._lock:
+            results = []
+            for scores, rows in zip(best_scores, best_rows):
+                hits = []
+                for score, row in zip(scores, rows):
+                    if score == -np.inf:
+                        break
+                    current = self.id_to_row.get(ids[row])
+                    if current is None:
+                        continue
+                    hits.append(VectorHit(id=ids[row], score=float(score), payload=self._payload(current)))
+                results.append(hits)
+        return results
+
+    def _payload(self, row: int) -> Dict[str, Any]:
+        line = os.pread(self._payload_file.fileno(), self.offsets[row + 1] - self.offsets[row], self.offsets[row])
+        payload = json.loads(line)
+        payload.pop("id", None)
+        return payload
+
+    def _retrieve_sync(self, ids: List[str]) -> Dict[str, List[float]]:
+        with self._lock:
+            found = [(paper_id, self.id_to_row[paper_id]) for paper_id in ids if paper_id in self.id_to_row]
+            if not found:
+                return {}
+            matrix = self.arrays["vectors"][[row for _, row in found]]
+        return {paper_id: vector.tolist() for (paper_id, _), vector in zip(found, matrix)}
+
+    # ------------------------------------------------------------------
+    # BaseVectorStore
+    # ------------------------------------------------------------------
+    async def upsert(self, records: List[VectorRecord]):
+        await asyncio.to_thread(self._upsert_sync, records)
+
+    async def set_payload(self, payloads: Dict[str, Dict[str, Any]]):
+        await asyncio.to_thread(self._set_payload_sync, payloads)
+
+    async def search_batch(
+            self,
+            vectors: List[List[float]],
+            limit: int,
+            filter: Optional[VectorFilter] = None
+        ) -> List[List[VectorHit]]:
+        if not vectors:
+            return []
+        return await asyncio.to_thread(self._search_sync, vectors, limit, filter)
+
+    async def retrieve(self, ids: List[str]) -> Dict[str, List[float]]:
+        return await asyncio.to_thread(self._retrieve_sync, ids)
+
+    async def delete(self, ids: List[str]):
+        await asyncio.to_thread(self._delete_sync, ids)
+
+    async def count(self) -> int:
+        return len(self.id_to_row)
+
+    async def compact(self):
+        """Rewrites the store without tombstoned rows."""
+        await asyncio.to_thread(self._compact_sync)
+
+    def close(self) -> None:
+        with self._lock:
+            for array in self.arrays.values():
+                array.flush()
+            self._payload_file.close()
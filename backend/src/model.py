@@ -1,16 +1,35 @@
 from datetime import datetime, timezone, date
 from typing import List, Optional, Dict, Any
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field, model_validator
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from src.utils.names import normalize_author_name
+
+class SimilarPaper(BaseModel):
+    """
+    Một bài báo lân cận (theo cosine similarity của embedding).
+    """
+    paper_id: str
+    title: str
+    score: float
+
+# Các trường sort được `/papers/search` chấp nhận; mỗi trường có một index (trường, _id).
+SEARCH_SORT_FIELDS = ["published_date", "updated_date", "crawled_at", "prime_category"]
 
 class ArxivPaper(Document):
     """
     Lưu trữ thông tin bài báo khoa học.
     Collection: arxiv_papers
+
+    `id` là arXiv ID gốc (không có hậu tố version, ví dụ `2401.12345`),
+    version hiện tại được lưu riêng trong `version`.
     """
     id: str = Field(alias="_id")
+    version: int = 1
     title: str
     author: List[str]
+    author_keys: List[str] = []
     arxiv_url: str
     pdf_url: str
     published_date: datetime
@@ -19,11 +38,140 @@ class ArxivPaper(Document):
     prime_category: str
     categories: List[str]
     crawled_at: date = Field(default_factory=lambda: datetime.now(timezone.utc).date())
-    deep_analysis: Optional[str] = None 
+    content_hash: Optional[str] = None
+    # Bản phân tích sâu nằm ở `paper_artifacts` (xem `PaperArtifact`); đây chỉ là mốc thời gian.
     analyzed_at: Optional[datetime] = None
+    similar: List[SimilarPaper] = []
+    similar_updated_at: Optional[datetime] = None
+    # Lần cuối vector/payload của bài báo được ghi vào vector store (ghi sau khi upsert).
+    indexed_at: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def _fill_author_keys(self):
+        """Tên tác giả đã chuẩn hoá, dùng cho multikey index `author_keys`."""
+        if not self.author_keys and self.author:
+            self.author_keys = list(dict.fromkeys(normalize_author_name(a) for a in self.author))
+        return self
 
     class Settings:
         name = "arxiv_papers"
+        indexes = [
+            # Sort của `/papers/search` (keyset trên (trường, _id)) và `/news/latest`.
+            IndexModel([("published_date", DESCENDING), ("_id", DESCENDING)], name="published_date_id"),
+            IndexModel([("updated_date", DESCENDING), ("_id", DESCENDING)], name="updated_date_id"),
+            IndexModel([("crawled_at", DESCENDING), ("_id", DESCENDING)], name="crawled_at_id"),
+            IndexModel([("prime_category", ASCENDING), ("_id", ASCENDING)], name="prime_category_id"),
+            # Lọc theo chuyên mục chính + khoảng thời gian (facets, frontend).
+            IndexModel([("prime_category", ASCENDING), ("published_date", DESCENDING)], name="prime_category_published"),
+            IndexModel([("author_keys", ASCENDING), ("published_date", DESCENDING)], name="author_keys_published"),
+            # Multikey: mọi chuyên mục của bài báo (top authors theo chuyên mục).
+            IndexModel([("categories", ASCENDING), ("published_date", DESCENDING)], name="categories_published"),
+            # Bước catch-up của reindex_vectors.
+            IndexModel([("indexed_at", ASCENDING)], name="indexed_at", sparse=True),
+        ]
+
+class PaperVersionView(BaseModel):
+    """
+    Projection nhẹ dùng khi so sánh version lúc ingest.
+    """
+    id: str = Field(alias="_id")
+    version: int = 1
+    title: str
+    summary: str
+    author_keys: List[str] = []
+    categories: List[str] = []
+    content_hash: Optional[str] = None
+    indexed_at: Optional[datetime] = None
+
+class PaperIndexView(BaseModel):
+    """
+    Projection chứa đúng các trường cần để embed và dựng payload Qdrant (dùng khi reindex).
+    """
+    id: str = Field(alias="_id")
+    version: int = 1
+    title: str
+    summary: str
+    published_date: datetime
+    prime_category: str
+    arxiv_url: str
+
+class PaperContextView(BaseModel):
+    """
+    Projection dựng context cho mỗi lượt chat: ID, tiêu đề, tóm tắt và các
+    trường `read_full_paper` cần để tìm/lưu bản phân tích (version, hash, PDF).
+    """
+    id: str = Field(alias="_id")
+    version: int = 1
+    title: str
+    summary: str
+    pdf_url: Optional[str] = None
+    content_hash: Optional[str] = None
+
+class PaperListView(BaseModel):
+    """
+    Projection cho các danh sách bài báo (`/news/latest`, `/papers/search`):
+    bỏ danh sách lân cận `similar` và các trường nội bộ của ingest/index.
+    """
+    id: str = Field(alias="_id")
+    version: int = 1
+    title: str
+    author: List[str]
+    arxiv_url: str
+    pdf_url: str
+    published_date: datetime
+    updated_date: datetime
+    summary: str
+    prime_category: str
+    categories: List[str]
+    crawled_at: Optional[date] = None
+    analyzed_at: Optional[datetime] = None
+
+class SimilarPapersView(BaseModel):
+    """
+    Projection cho endpoint `/papers/{id}/similar`: chỉ đọc danh sách lân cận.
+    """
+    id: str = Field(alias="_id")
+    similar: List[SimilarPaper] = []
+    similar_updated_at: Optional[datetime] = None
+
+class Author(Document):
+    """
+    Chỉ mục tác giả, cập nhật tăng dần mỗi lần ingest.
+    Collection: authors
+
+    `id` là tên đã chuẩn hoá (xem `normalize_author_name`); số bài theo từng
+    category nằm trong `AuthorCategory`.
+    """
+    id: str = Field(alias="_id")
+    name: str
+    paper_count: int = 0
+    last_published: Optional[datetime] = None
+
+    class Settings:
+        name = "authors"
+        indexes = [
+            IndexModel([("paper_count", DESCENDING)], name="paper_count_desc"),
+        ]
+
+class AuthorCategory(Document):
+    """
+    Số bài của một tác giả trong một category (một document mỗi cặp).
+    Collection: author_categories
+
+    `id` là `"<author>|<category>"` (khoá tác giả không chứa `|`). Index
+    (category, paper_count giảm dần, _id) phục vụ bảng xếp hạng mọi thời gian của
+    một category mà không cần sort trong bộ nhớ.
+    """
+    id: str = Field(alias="_id")
+    author: str
+    category: str
+    paper_count: int = 0
+
+    class Settings:
+        name = "author_categories"
+        indexes = [
+            IndexModel([("category", ASCENDING), ("paper_count", DESCENDING), ("_id", ASCENDING)], name="category_paper_count_desc"),
+        ]
 
 class ChatSession(Document):
     """
@@ -37,4 +185,180 @@ class ChatSession(Document):
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
-        name = "chat_sessions"
\ No newline at end of file
+        name = "chat_sessions"
+class Lease(Document):
+    """
+    Lease (khoá có thời hạn) dùng để bầu leader giữa các worker.
+    Collection: leases
+
+    `holder` là ID của worker đang giữ lease, hết hạn ở `expires_at` nếu không
+    được gia hạn; `term` tăng mỗi lần lease đổi chủ (fencing token).
+    """
+    id: str = Field(alias="_id")
+    holder: str
+    term: int = 0
+    expires_at: datetime
+
+    class Settings:
+        name = "leases"
+
+class CrawlRun(Document):
+    """
+    Một lần chạy của job định kỳ trong một khung thời gian (slot).
+    Collection: crawl_runs
+
+    `id` = `<job>:<slot ISO>`; khoá chính duy nhất đảm bảo mỗi slot chỉ được
+    nhận một lần. `status`: running | done | failed.
+    """
+    id: str = Field(alias="_id")
+    job: str
+    slot: datetime
+    holder: str
+    term: int
+    status: str = "running"
+    attempts: int = 1
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+    result: Dict[str, Any] = {}
+    error: Optional[str] = None
+
+    class Settings:
+        name = "crawl_runs"
+        indexes = [
+            IndexModel([("job", ASCENDING), ("slot", DESCENDING)], name="job_slot"),
+        ]
+
+class ClusterState(Document):
+    """
+    Trạng thái dùng chung giữa các worker (ví dụ generation của corpus).
+    Collection: cluster_state
+    """
+    id: str = Field(alias="_id")
+    value: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "cluster_state"
+
+class ImportCheckpoint(Document):
+    """
+    Tiến độ của một lần import snapshot metadata arXiv (`src.jobs.import_snapshot`).
+    Collection: import_checkpoints
+
+    `offset` là vị trí byte (chưa nén) của dòng kế tiếp chưa xử lý; chỉ được
+    ghi sau khi cả batch đã được lưu (và index), nên chạy lại sẽ tiếp tục từ đó.
+    """
+    id: str = Field(alias="_id")
+    path: str
+    size: int
+    filters: Dict[str, Any] = {}
+    offset: int = 0
+    stats: Dict[str, int] = {}
+    done: bool = False
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "import_checkpoints"
+
+class PaperArtifact(Document):
+    """
+    Nội dung lớn của một bài báo, tách khỏi `arxiv_papers` và nén zstd (xem `src.artifacts`).
+    Collection: paper_artifacts
+
+    `kind`: `analysis` (bản phân tích sâu) | `full_text` (toàn văn trích từ PDF).
+    `variant`: phiên bản prompt/model đã sinh bản phân tích (`prompt-1:gemini-2.5-flash-lite`)
+    hoặc bộ trích xuất của toàn văn (`pymupdf`). `id` = `<paper_id>:<kind>:<variant>`,
+    nên mỗi biến thể được giữ riêng: đổi prompt không xoá các bản cũ.
+    `content_hash` là hash tiêu đề/tóm tắt lúc sinh; bản không khớp nội dung hiện
+    tại của bài báo (đã có version mới) bị bỏ qua khi đọc.
+    """
+    id: str = Field(alias="_id")
+    paper_id: str
+    kind: str
+    variant: str
+    paper_version: int = 1
+    content_hash: Optional[str] = None
+    codec: str = "zstd"
+    data: bytes
+    size: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "paper_artifacts"
+        indexes = [
+            IndexModel([("paper_id", ASCENDING), ("kind", ASCENDING), ("created_at", DESCENDING)], name="paper_kind_created"),
+        ]
+
+class Profile(Document):
+    """
+    Hồ sơ sở hữu watchlist và hộp thư (xem `src.watchlists`).
+    Collection: profiles
+
+    `id` là SHA-256 của mã hồ sơ, token ngẫu nhiên do `POST /profiles` cấp và người
+    dùng giữ lại để mở lại watchlist ở lần sau (DB không lưu chính mã). Hồ sơ
+    không được dùng quá `PROFILE_MAX_IDLE_DAYS` ngày bị xoá cùng watchlist và hộp thư.
+    """
+    id: str = Field(alias="_id")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_seen_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "profiles"
+        indexes = [
+            IndexModel([("last_seen_at", ASCENDING)], name="last_seen_at"),
+        ]
+
+class Watchlist(Document):
+    """
+    Danh sách theo dõi của một người dùng (`user_id` = ID hồ sơ, xem `Profile`).
+    Collection: watchlists
+
+    Bài báo mới khớp nếu chứa một từ khoá (cụm từ, trong tiêu đề/tóm tắt) hoặc có
+    một tác giả trong danh sách; `categories` (nếu có) giới hạn thêm theo chuyên
+    mục, và chỉ có `categories` nghĩa là theo dõi mọi bài của các chuyên mục đó.
+    `author_keys` là tên tác giả đã chuẩn hoá (xem `normalize_author_name`).
+    """
+    user_id: str
+    name: str
+    keywords: List[str] = []
+    categories: List[str] = []
+    authors: List[str] = []
+    author_keys: List[str] = []
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "watchlists"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING)], name="user_created"),
+        ]
+
+class InboxItem(BaseModel):
+    """
+    Một bài báo mới khớp với (các) watchlist của người dùng.
+    """
+    paper_id: str
+    title: str
+    prime_category: str
+    published_date: datetime
+    watchlists: List[str] = []
+    reasons: List[str] = []
+    matched_at: datetime
+
+class Inbox(Document):
+    """
+    Hộp thư bài báo mới của một người dùng, do percolator ghi lúc ingest (xem `src.watchlists`).
+    Collection: inboxes
+
+    `id` là ID hồ sơ; `items` mới nhất đứng trước và giữ tối đa `INBOX_MAX_ITEMS`
+    phần tử, `unread` đếm số bài chưa xem kể từ `seen_at`.
+    """
+    id: str = Field(alias="_id")
+    items: List[InboxItem] = []
+    unread: int = 0
+    seen_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "inboxes"
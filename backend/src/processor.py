@@ -1,85 +1,179 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from typing import List
-from src.model import ArxivPaper
+from typing import List, Dict, Optional, Any
+from collections import defaultdict
+from datetime import datetime, timezone
+from src.model import ArxivPaper, SimilarPaper
 import asyncio
-from qdrant_client.models import PointStruct
-import hashlib
-import uuid
+from pymongo import UpdateOne
 import os
 
-from src.utils.log_config import get_logger
-from src.database import get_qdrant_client
+from src.utils.log_config import get_logger, LogSampler
+from src.utils.metrics import EMBEDDING_BATCH_SECONDS, EMBEDDED_TEXTS, QDRANT_UPSERT_SECONDS
+from src.database import get_vector_store
+from src.embeddings import get_embedding_provider
+from src.interfaces.interfaces import BaseEmbeddingProvider, VectorRecord
 
 logger = get_logger('VevtorProcessor')
+sampled_logger = LogSampler(logger, interval=1.0)
+
+SIMILAR_TOP_K = int(os.getenv('SIMILAR_TOP_K', 10))
 
 class VectorProcessor:
-    def __init__(self):
-        self.API_KEY = os.getenv('GOOGLE_API_KEY')
-        if not self.API_KEY:
-            logger.error('GOOGLE_API_KEY has not been configured yet!')
-            raise ValueError('GOOGLE_API_KEY missing')
-        
-        self.embedding_model = GoogleGenerativeAIEmbeddings(
-            model='models/text-embedding-004',
-            google_api_key=self.API_KEY,
-            task_type='SEMANTIC_SIMILARITY'
-        )
+    def __init__(
+            self,
+            provider: Optional[BaseEmbeddingProvider] = None,
+            batch_size: Optional[int] = None,
+            batch_pause: Optional[float] = None
+        ):
+        """
+        Args:
+            provider: Embedding backend. Defaults to the one selected by
+                `EMBEDDING_PROVIDER` (see `src.embeddings`).
+            batch_size: Texts per embedding call (default: the provider's).
+            batch_pause: Sleep between two batches in seconds, to stay under an API
+                quota (default: the provider's).
+        """
+        self.provider = provider or get_embedding_provider()
+        self.batch_size = batch_size or self.provider.batch_size
+        self.batch_pause = self.provider.batch_pause if batch_pause is None else batch_pause
 
-    async def process_and_index(self, papers: List[ArxivPaper]):
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embeds `texts` in provider-sized batches, pausing between batches if configured."""
+        all_embeddings = []
+        for i in range(0, len(texts), self.batch_size):
+            batch_texts = texts[i:i+self.batch_size]
+            sampled_logger.debug('embed.batch', 'Embedding batch %d --> %d', i, i + len(batch_texts))
+
+            with EMBEDDING_BATCH_SECONDS.time(provider=self.provider.name):
+                batch_embeddings = await self.provider.aembed_documents(batch_texts)
+            EMBEDDED_TEXTS.inc(len(batch_texts), provider=self.provider.name)
+            all_embeddings.extend(batch_embeddings)
+
+            if self.batch_pause and i + self.batch_size < len(texts):
+                await asyncio.sleep(self.batch_pause)
+        return all_embeddings
+
+    async def process_and_index(self, papers: List[ArxivPaper], strict: bool = False):
         """
-        Import the list of articles -> Embed -> Upload to Qdrant
+        Import the list of articles -> Embed -> Upload to the vector store
+
+        Failures are logged, not raised, unless `strict` is set (bulk jobs that
+        must not checkpoint past a batch that was not indexed).
         """
         if not papers:
             logger.info("No papers to process.")
             return
         
-        logger.info(f"🚀 Start vectorizing the {len(papers)} article with Gemini...")
-
-        texts_to_embed = [f'Title: {p.title}\nSummary: {p.summary}' for p in papers]
+        logger.info(f"🚀 Start vectorizing the {len(papers)} article with {self.provider.name}...")
 
         try:
-            all_embeddings = []
-
-            for i in range(0, len(texts_to_embed), 20):
-                batch_texts = texts_to_embed[i:i+20]
-                logger.debug(f'Embedding batch {i} --> {i+len(batch_texts)}')
-
-                batch_embeddings = await self.embedding_model.aembed_documents(batch_texts)
-                all_embeddings.extend(batch_embeddings)
-
-                await asyncio.sleep(.5)
+            all_embeddings = await self.embed_texts([paper_text(p) for p in papers])
 
-            points = []
             if all_embeddings:
                 vector_size = len(all_embeddings[0])
                 logger.info(f'Vector Dimension: {vector_size}')
 
-            for i, paper in enumerate(papers):
-                payload = {
-                    "paper_id": paper.id,
-                    "title": paper.title,
-                    "published_date": paper.published_date.isoformat(),
-                    "category": paper.prime_category,
-                    "arxiv_url": paper.arxiv_url
-                }
+            records = [
+                VectorRecord(id=paper.id, vector=all_embeddings[i], payload=paper_payload(paper))
+                for i, paper in enumerate(papers)
+            ]
 
-                points.append(PointStruct(
-                    id=self._generate_uuid_from_str(paper.id),
-                    vector=all_embeddings[i],
-                    payload=payload
-                ))
-
-            qdrant_client = get_qdrant_client()
-            await qdrant_client.upsert(
-                collection_name="arxiv_vectors",
-                points=points
-            )
+            with QDRANT_UPSERT_SECONDS.time():
+                await get_vector_store().upsert(records)
+            await mark_indexed([paper.id for paper in papers])
             
-            logger.info(f"✅ The {len(points)} vectors have been successfully indexed into Qdrant.")
+            logger.info(f"✅ The {len(records)} vectors have been successfully indexed into the vector store.")
             
         except Exception as e:
             logger.error(f"❌ Vectorization process error: {e}", exc_info=True)
+            if strict:
+                raise
+            return
+
+        try:
+            await self.refresh_similar(papers, all_embeddings)
+        except Exception as e:
+            logger.error(f"❌ Similar-papers refresh error: {e}", exc_info=True)
+            if strict:
+                raise
+
+    async def refresh_similar(self, papers: List[ArxivPaper], embeddings: List[List[float]]):
+        """
+        Precompute the top-k neighbour list of freshly indexed papers and merge them
+        into the lists of the papers they are close to.
+
+        The new papers get a full list from one batched ANN query. Existing neighbours
+        only receive an incremental update: stale entries for the same paper are pulled,
+        then the new candidates are pushed, re-sorted by score and truncated to k.
+        """
+        responses = await get_vector_store().search_batch(embeddings, SIMILAR_TOP_K + 1)
+
+        now = datetime.now(timezone.utc)
+        batch_ids = {p.id for p in papers}
+        own_updates = []
+        reverse: Dict[str, List[SimilarPaper]] = defaultdict(list)
+
+        for paper, hits in zip(papers, responses):
+            neighbours = [
+                SimilarPaper(paper_id=hit.id, title=hit.payload.get("title", ""), score=hit.score)
+                for hit in hits
+                if hit.id != paper.id
+            ][:SIMILAR_TOP_K]
+
+            paper.similar = neighbours
+            paper.similar_updated_at = now
+            own_updates.append(UpdateOne(
+                {"_id": paper.id},
+                {"$set": {"similar": [n.model_dump() for n in neighbours], "similar_updated_at": now}}
+            ))
+
+            for n in neighbours:
+                if n.paper_id not in batch_ids:
+                    reverse[n.paper_id].append(SimilarPaper(paper_id=paper.id, title=paper.title, score=n.score))
+
+        neighbour_updates = []
+        for paper_id, candidates in reverse.items():
+            neighbour_updates.append(UpdateOne(
+                {"_id": paper_id},
+                {"$pull": {"similar": {"paper_id": {"$in": [c.paper_id for c in candidates]}}}}
+            ))
+            neighbour_updates.append(UpdateOne(
+                {"_id": paper_id},
+                {
+                    "$push": {"similar": {
+                        "$each": [c.model_dump() for c in candidates],
+                        "$sort": {"score": -1},
+                        "$slice": SIMILAR_TOP_K
+                    }},
+                    "$set": {"similar_updated_at": now}
+                }
+            ))
+
+        collection = ArxivPaper.get_pymongo_collection()
+        await collection.bulk_write(own_updates + neighbour_updates, ordered=True)
+        logger.info(f"🔗 Similar lists: {len(own_updates)} computed, {len(reverse)} neighbours refreshed.")
+
+async def mark_indexed(paper_ids: List[str]) -> None:
+    """
+    Stamps `indexed_at` on papers whose vector or payload was just written. The
+    stamp is taken after the write, so `reindex_vectors` catches up on every
+    write that may have reached the old collection during a rebuild.
+    """
+    await ArxivPaper.get_pymongo_collection().update_many(
+        {"_id": {"$in": paper_ids}},
+        {"$set": {"indexed_at": datetime.now(timezone.utc)}}
+    )
+
+def paper_text(paper) -> str:
+    """Text embedded for a paper (`ArxivPaper` or a projection with title/summary)."""
+    return f'Title: {paper.title}\nSummary: {paper.summary}'
 
-    def _generate_uuid_from_str(self, text: str) -> str:
-        hash_value = hashlib.md5(text.encode()).hexdigest()
-        return str(uuid.UUID(hash_value))
\ No newline at end of file
+def paper_payload(paper) -> Dict[str, Any]:
+    """Payload stored with a paper's vector (used as-is by both vector backends)."""
+    return {
+        "paper_id": paper.id,
+        "version": paper.version,
+        "title": paper.title,
+        "published_date": paper.published_date.isoformat(),
+        "category": paper.prime_category,
+        "arxiv_url": paper.arxiv_url
+    }
\ No newline at end of file
@@ -0,0 +1,45 @@
+import re
+import uuid
+import hashlib
+from typing import Tuple
+
+_ABS_PREFIX = re.compile(r"^https?://(?:export\.)?arxiv\.org/(?:abs|pdf)/")
+_VERSION_SUFFIX = re.compile(r"^(?P<base>.+?)v(?P<version>\d+)$")
+
+def split_arxiv_id(raw_id: str) -> Tuple[str, int]:
+    """
+    Splits an arXiv identifier into its base ID and version number.
+
+    Accepts bare IDs (`2401.12345v2`), old-style IDs (`cs/0112017v1`) and full
+    entry URLs (`http://arxiv.org/abs/2401.12345v2`). IDs without an explicit
+    version suffix are treated as version 1.
+
+    Args:
+        raw_id (str): The identifier or entry URL returned by arXiv.
+
+    Returns:
+        Tuple[str, int]: The version-less base ID and the version number.
+    """
+    arxiv_id = _ABS_PREFIX.sub("", raw_id.strip())
+    if arxiv_id.endswith(".pdf"):
+        arxiv_id = arxiv_id[:-4]
+
+    match = _VERSION_SUFFIX.match(arxiv_id)
+    if not match:
+        return arxiv_id, 1
+    return match.group("base"), int(match.group("version"))
+
+def content_hash(title: str, summary: str) -> str:
+    """
+    Fingerprint of the text that is sent to the embedding model.
+
+    Whitespace is normalised so that re-wrapped abstracts of a new version do not
+    count as a content change.
+    """
+    normalized = " ".join(title.split()) + "\n" + " ".join(summary.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def paper_point_id(paper_id: str) -> str:
+    """Deterministic vector point ID for a paper (UUID built from the MD5 of its ID)."""
+    hash_value = hashlib.md5(paper_id.encode()).hexdigest()
+    return str(uuid.UUID(hash_value))
@@ -0,0 +1,60 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+_generation = 0
+
+def current_generation() -> int:
+    """
+    Returns the current crawl generation.
+
+    The generation is bumped every time an ingest changes the paper collection,
+    so anything derived from the corpus (aggregations, facet counts, ...) can be
+    cached until the next crawl instead of for an arbitrary TTL.
+    """
+    return _generation
+
+def bump_generation() -> int:
+    """Marks the corpus as changed and invalidates every `GenerationCache`."""
+    global _generation
+    _generation += 1
+    return _generation
+
+def set_generation(value: int) -> bool:
+    """
+    Adopts a generation published by another process (see `src.cluster`).
+    Returns True if it differs from the local one, i.e. caches were invalidated.
+    """
+    global _generation
+    if value == _generation:
+        return False
+    _generation = value
+    return True
+
+class GenerationCache:
+    """
+    Small LRU cache whose entries are only valid for the crawl generation in
+    which they were stored.
+
+    Args:
+        maxsize (int): Maximum number of entries kept; the least recently used
+            entry is evicted first.
+    """
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != current_generation():
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (current_generation(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -1,39 +1,133 @@
+import os
 import sys
+import json
+import time
+import queue
+import atexit
 import logging
+import threading
+import contextvars
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from contextlib import contextmanager
+from typing import Optional, Dict, Tuple
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+job_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("job_id", default=None)
+
+_listener: Optional[QueueListener] = None
+
+class CorrelationFilter(logging.Filter):
+    """
+    Stamps every record with the current request/job correlation IDs.
+
+    It is attached to the `QueueHandler`, i.e. it runs in the caller's context
+    before the record crosses the thread boundary, so the context variables are
+    still visible.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.job_id = job_id_var.get()
+        return True
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is.
+
+    The stock `prepare()` copies the record and renders the message on the calling
+    thread; within a single process the listener can do that itself, which moves
+    the formatting cost off the event loop as well.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "file": f"{record.filename}:{record.lineno}",
+        }
+        request_id = getattr(record, "request_id", None)
+        job_id = getattr(record, "job_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if job_id:
+            entry["job_id"] = job_id
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class _CorrelationTextFormatter(logging.Formatter):
+    """Text formatter that appends `[req=...]`/`[job=...]` only when they are set."""
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        tags = []
+        if getattr(record, "request_id", None):
+            tags.append(f"req={record.request_id}")
+        if getattr(record, "job_id", None):
+            tags.append(f"job={record.job_id}")
+        return f"{message} [{' '.join(tags)}]" if tags else message
+
+def _level(name: str, default: str) -> int:
+    return logging.getLevelName(os.getenv(name, default).upper())
 
 def setup_logging() -> None:
     """
     Initializes the logging system for the application.
 
     This function performs the following actions:
-    1. Creates the log directory if it does not exist.
-    2. Configures the root logger with a RotatingFileHandler (for detailed persistence) and a StreamHandler (for concise console output).
+    1. Creates the log directory (`LOG_DIR`, default `logs`) if it does not exist.
+    2. Routes every record through a `QueueHandler`; a `QueueListener` thread owns
+       the RotatingFileHandler (detailed persistence) and the StreamHandler
+       (concise console output), so no file or console I/O happens on the event loop.
+    3. Applies the configuration from the environment:
+        - `LOG_LEVEL` (default INFO): root/console level.
+        - `LOG_FILE_LEVEL` (default INFO): level of the rotating file.
+        - `LOG_FORMAT` (`text` or `json`, default text).
 
-    This should be called exactly once at the application startup entry point.
+    This should be called exactly once at the application startup entry point;
+    calling it again replaces the previous configuration.
     """
-    Path("logs").mkdir(parents=True, exist_ok=True)
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    log_dir = Path(os.getenv("LOG_DIR", "logs"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+    use_json = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    level = _level("LOG_LEVEL", "INFO")
+
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG) 
+    root_logger.setLevel(level)
     root_logger.handlers = []
 
     file_handler = RotatingFileHandler(
-        Path("logs") / "app.log", 
+        log_dir / "app.log",
         maxBytes=5_000_000,
-        backupCount=3, 
+        backupCount=3,
         encoding="utf-8"
     )
-    file_formatter = logging.Formatter("%(filename)s:%(lineno)d - %(asctime)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    file_formatter = JsonFormatter() if use_json else _CorrelationTextFormatter(
+        "%(filename)s:%(lineno)d - %(asctime)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    )
     file_handler.setFormatter(file_formatter)
-    file_handler.setLevel(logging.INFO)
+    file_handler.setLevel(_level("LOG_FILE_LEVEL", "INFO"))
     stream_handler = logging.StreamHandler(sys.stdout)
-    stream_formatter = logging.Formatter("%(levelname)s: [%(name)s] %(message)s")
+    stream_formatter = JsonFormatter() if use_json else _CorrelationTextFormatter("%(levelname)s: [%(name)s] %(message)s")
     stream_handler.setFormatter(stream_formatter)
-    stream_handler.setLevel(logging.DEBUG)
+    stream_handler.setLevel(level)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    root_logger.addHandler(queue_handler)
 
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(stream_handler)
+    _listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
 
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("pymongo").setLevel(logging.WARNING)
@@ -41,6 +135,15 @@ def setup_logging() -> None:
     logging.getLogger("httpcore").setLevel(logging.WARNING)
     logging.getLogger("qdrant_client").setLevel(logging.WARNING)
 
+def shutdown_logging() -> None:
+    """Flushes the queue and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
 def get_logger(module_name: str) -> logging.Logger:
     """
     Retrieves a logger instance identified by the given module name.
@@ -56,4 +159,55 @@ def get_logger(module_name: str) -> logging.Logger:
     Returns:
         logging.Logger: The configured logger instance.
     """
-    return logging.getLogger(module_name)
\ No newline at end of file
+    return logging.getLogger(module_name)
+
+@contextmanager
+def job_context(job_id: str):
+    """Tags every log record emitted inside the block with `job_id`."""
+    token = job_id_var.set(job_id)
+    try:
+        yield
+    finally:
+        job_id_var.reset(token)
+
+class LogSampler:
+    """
+    Rate-limited logging for hot loops.
+
+    Emits the first call of each key, then at most one record per `interval`
+    seconds, and reports how many records were suppressed in between. The level
+    check happens before anything else, so disabled debug calls cost almost
+    nothing; pass format arguments (`"%s"`) instead of f-strings to keep it so.
+
+    Args:
+        logger (logging.Logger): Target logger.
+        interval (float): Minimum seconds between two emitted records per key.
+    """
+    def __init__(self, logger: logging.Logger, interval: float = 1.0):
+        self.logger = logger
+        self.interval = interval
+        self._state: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def log(self, level: int, key: str, msg: str, *args, stacklevel: int = 2) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._state.get(key, (0.0, 0))
+            if last and now - last < self.interval:
+                self._state[key] = (last, suppressed + 1)
+                return
+            self._state[key] = (now, 0)
+        if suppressed:
+            msg = f"{msg} (+{suppressed} similar suppressed)"
+        self.logger.log(level, msg, *args, stacklevel=stacklevel)
+
+    def debug(self, key: str, msg: str, *args) -> None:
+        self.log(logging.DEBUG, key, msg, *args, stacklevel=3)
+
+    def info(self, key: str, msg: str, *args) -> None:
+        self.log(logging.INFO, key, msg, *args, stacklevel=3)
+
+    def warning(self, key: str, msg: str, *args) -> None:
+        self.log(logging.WARNING, key, msg, *args, stacklevel=3)
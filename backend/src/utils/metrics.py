@@ -0,0 +1,327 @@
+import os
+import time
+import bisect
+import asyncio
+import functools
+import threading
+from typing import Dict, Tuple, List, Sequence, Optional, Callable, Any
+
+_enabled = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+def set_metrics_enabled(enabled: bool) -> None:
+    """
+    Turns metric collection on or off at runtime.
+
+    When disabled, `inc`/`observe` return immediately and `Histogram.time()`
+    hands out a shared no-op context manager, so instrumented hot paths only pay
+    for one attribute lookup and one function call.
+    """
+    global _enabled
+    _enabled = enabled
+
+class _NoopTimer:
+    """Shared do-nothing timer returned while metrics are disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonic counter, e.g. `papers_saved_total{result="inserted"}`."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {v:g}" for k, v in items]
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. in-flight requests."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {v:g}" for k, v in items]
+
+class _HistogramTimer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram in the Prometheus exposition format.
+
+    Use `observe()` directly, `with HIST.time(...)` around a block, or the
+    `timed(HIST)` decorator on sync and async functions.
+    """
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+        ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not _enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        if not _enabled:
+            return _NOOP_TIMER
+        return _HistogramTimer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def total(self, **labels) -> float:
+        """Sum of all observed values for the given labels."""
+        series = self._series.get(self._key(labels))
+        return series[-1] if series else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', f'{bound:g}'))} {cumulative:g}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', '+Inf'))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative:g}")
+        return lines
+
+class _Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = _Registry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def render_metrics() -> str:
+    """Serialises every registered metric in the Prometheus text format."""
+    return REGISTRY.render()
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """
+    Decorator recording the wall time of each call into `histogram`.
+
+    Works on both plain and `async def` functions. If metrics are disabled when
+    the function is decorated, the function is returned unchanged.
+    """
+    def decorator(func: Callable) -> Callable:
+        if not _enabled:
+            return func
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ----------------------------------------------------------------------------
+# Pipeline metrics
+# ----------------------------------------------------------------------------
+ARXIV_FETCH_SECONDS = Histogram(
+    "arxiv_page_fetch_seconds", "Time to fetch and parse one arXiv API result page (incl. rate-limit wait)."
+)
+SAVE_TO_DB_SECONDS = Histogram(
+    "save_to_db_seconds", "Duration of one save_to_db call."
+)
+PAPERS_SAVED = Counter(
+    "papers_saved_total", "Papers processed by save_to_db, by outcome.", ["result"]
+)
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "embedding_batch_seconds", "Latency of one embedding batch call.", ["provider"]
+)
+EMBEDDED_TEXTS = Counter(
+    "embedded_texts_total", "Texts sent to the embedding model.", ["provider"]
+)
+QDRANT_UPSERT_SECONDS = Histogram(
+    "qdrant_upsert_seconds", "Latency of vector store upserts (Qdrant or embedded mmap store)."
+)
+PDF_STAGE_SECONDS = Histogram(
+    "pdf_stage_seconds", "PDF download and text extraction time.", ["stage"]
+)
+LLM_TTFT_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds", "Time from chat request to the first streamed answer token."
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_tokens_per_second", "Streaming throughput of chat answers.",
+    buckets=(1, 5, 10, 20, 40, 80, 160, 320, 640)
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "FastAPI request latency until the response starts.", ["method", "route", "status"]
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "Requests holding an admission slot.", ["endpoint"]
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "Requests waiting for an admission slot.", ["endpoint"]
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests turned away by admission control.", ["endpoint", "reason"]
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds", "Time admitted requests waited for a slot.", ["endpoint"]
+)
+PERCOLATE_SECONDS = Histogram(
+    "percolate_seconds", "Watchlist percolation time per ingest batch.", ["stage"]
+)
+WATCHLIST_MATCHES = Counter(
+    "watchlist_matches_total", "Inbox items written by the watchlist percolator."
+)
+PAPER_CONTEXT_CACHE = Counter(
+    "paper_context_cache_total", "Chat context lookups served from the per-paper cache (hit) or MongoDB (miss).", ["result"]
+)
+PAPER_PREPARE = Counter(
+    "paper_prepare_total", "Chat warm-up calls by analysis state: ready, running, started or busy.", ["analysis"]
+)
+DEEP_QUESTION_CACHE = Counter(
+    "deep_question_cache_total",
+    "read_full_paper calls by analysis state: warm (stored), in_flight (joined a running analysis) or cold.",
+    ["state"]
+)
+CHAT_TURNS = Counter(
+    "chat_turns_total", "Chat turns by outcome: completed, deadline (turn timeout), cancelled (client gone) or error.", ["outcome"]
+)
+TOOL_TIMEOUTS = Counter(
+    "tool_timeouts_total", "Agent tool calls that hit their deadline and returned a partial result.", ["tool"]
+)
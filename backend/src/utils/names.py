@@ -0,0 +1,24 @@
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+def normalize_author_name(name: str) -> str:
+    """
+    Normalises an author name into the key used by the author index.
+
+    Accents are stripped, case is folded and punctuation/hyphens become spaces,
+    so `"José-Luis  Pérez"`, `"jose luis perez"` and `"JOSE-LUIS PEREZ"` all map to
+    `"jose luis perez"`. Initials keep their letter (`"J. Smith"` -> `"j smith"`).
+    """
+    return " ".join(normalize_text(name).split())
+
+def normalize_text(text: str) -> str:
+    """
+    Accent-free, case-folded `text` with punctuation replaced by spaces (words
+    are not re-joined: split the result).
+    """
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.casefold().replace("_", " "))
@@ -0,0 +1,121 @@
+import os
+import json
+from pathlib import Path
+from typing import Dict, Any, Optional, Literal
+
+from pydantic import BaseModel
+from qdrant_client.models import (
+    VectorParams, Distance, HnswConfigDiff, OptimizersConfigDiff, SearchParams,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, QuantizationSearchParams
+)
+
+from src.utils.log_config import get_logger
+
+logger = get_logger("VectorProfiles")
+
+class CollectionProfile(BaseModel):
+    """
+    Declarative settings of a Qdrant collection.
+
+    HNSW and storage options are fixed at creation time (changing them means a
+    reindex, see `src.jobs.reindex_vectors`); the search options are applied to
+    every query against a collection created with the profile.
+    """
+    name: str = "default"
+    # HNSW graph
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    search_ef: Optional[int] = None
+    # Storage
+    on_disk: bool = False
+    on_disk_payload: bool = False
+    # Quantization
+    quantization: Optional[Literal["int8"]] = None
+    quantile: float = 0.99
+    quantization_always_ram: bool = True
+    rescore: bool = True
+    oversampling: Optional[float] = None
+    # Optimizer
+    indexing_threshold: int = 10_000
+    memmap_threshold: Optional[int] = None
+    default_segment_number: int = 0
+
+    def create_kwargs(self, vector_size: int, indexing: bool = True) -> Dict[str, Any]:
+        """
+        Keyword arguments for `create_collection`. With `indexing=False` the HNSW
+        build is deferred (bulk loading), see `optimizers_config`.
+        """
+        quantization = None
+        if self.quantization == "int8":
+            quantization = ScalarQuantization(scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=self.quantile,
+                always_ram=self.quantization_always_ram
+            ))
+        return {
+            "vectors_config": VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=self.on_disk),
+            "hnsw_config": HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk),
+            "optimizers_config": self.optimizers_config(indexing),
+            "quantization_config": quantization,
+            "on_disk_payload": self.on_disk_payload,
+            "metadata": {"profile": self.name},
+        }
+
+    def optimizers_config(self, indexing: bool = True) -> OptimizersConfigDiff:
+        return OptimizersConfigDiff(
+            indexing_threshold=self.indexing_threshold if indexing else 0,
+            memmap_threshold=self.memmap_threshold,
+            default_segment_number=self.default_segment_number or None
+        )
+
+    def search_params(self) -> Optional[SearchParams]:
+        quantization = None
+        if self.quantization:
+            quantization = QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        if self.search_ef is None and quantization is None:
+            return None
+        return SearchParams(hnsw_ef=self.search_ef, quantization=quantization)
+
+PROFILES: Dict[str, CollectionProfile] = {
+    # Qdrant defaults: float32 vectors and HNSW graph in RAM.
+    "default": CollectionProfile(name="default"),
+    # ~4x less RAM: float32 originals on disk, int8 copies in RAM, top candidates
+    # rescored with the originals.
+    "compact": CollectionProfile(
+        name="compact",
+        on_disk=True,
+        on_disk_payload=True,
+        quantization="int8",
+        oversampling=2.0,
+        memmap_threshold=20_000
+    ),
+    # Denser graph and wider search for better recall at higher latency.
+    "high_recall": CollectionProfile(
+        name="high_recall",
+        hnsw_m=32,
+        hnsw_ef_construct=256,
+        search_ef=256
+    ),
+}
+
+def load_profiles() -> Dict[str, CollectionProfile]:
+    """
+    Built-in profiles, extended or overridden by the JSON file at
+    `QDRANT_PROFILES_FILE` (`{"name": {field: value, ...}, ...}`).
+    """
+    profiles = dict(PROFILES)
+    path = os.getenv("QDRANT_PROFILES_FILE")
+    if path:
+        for name, fields in json.loads(Path(path).read_text()).items():
+            base = profiles.get(name, PROFILES["default"]).model_dump()
+            profiles[name] = CollectionProfile(**{**base, **fields, "name": name})
+    return profiles
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    """Profile by name, defaulting to `QDRANT_PROFILE` (`default`)."""
+    name = name or os.getenv("QDRANT_PROFILE", "default")
+    profiles = load_profiles()
+    if name not in profiles:
+        raise ValueError(f"Unknown Qdrant profile '{name}'. Available: {', '.join(profiles)}")
+    return profiles[name]
@@ -0,0 +1,433 @@
+"""
+User watchlists (keywords, categories, authors) and the percolator that matches
+every newly ingested paper against all of them at once.
+
+Instead of running each watchlist as a query, the watchlists are compiled into
+an in-memory inverted index (`WatchlistIndex`):
+
+- keyword phrases, tokenised like the paper text, keyed by their token tuple,
+  plus the phrase lengths starting with each token;
+- normalised author names;
+- the categories of the watchlists that only follow categories.
+
+Matching a paper walks the tokens of its title and abstract once (one lookup per
+token and phrase length), then its authors and categories, so the cost follows
+the size of the paper and the number of matches, not the number of watchlists.
+Categories given next to keywords or authors filter the matches.
+
+The index is rebuilt when the watchlists change: every write bumps a counter in
+`cluster_state`, read once per percolated batch, so edits made through any
+worker are seen by the one running the crawl.
+
+Matches are appended to per-user `inboxes` documents (newest first, capped to
+`INBOX_MAX_ITEMS`), with a single upsert per user and batch.
+
+Watchlists and inboxes belong to a `Profile`: `POST /profiles` hands out a
+random token that the user keeps and sends back (`X-Profile-Token`) from any
+session; only its hash is stored. Profiles unused for `PROFILE_MAX_IDLE_DAYS`
+are deleted with their watchlists and inbox by `prune_profiles` (a daily leader
+job), so the percolator stops matching for owners who never come back.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import secrets
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+from src.model import ArxivPaper, ClusterState, Inbox, InboxItem, Profile, Watchlist
+from src.authors import normalize_category
+from src.utils.names import normalize_author_name, normalize_text
+from src.utils.log_config import get_logger
+from src.utils.metrics import PERCOLATE_SECONDS, WATCHLIST_MATCHES
+
+logger = get_logger("Watchlists")
+
+WATCHLIST_GENERATION = "watchlist_generation"
+MAX_WATCHLISTS_PER_USER = int(os.getenv("WATCHLIST_MAX_PER_USER", 20))
+MAX_TERMS = int(os.getenv("WATCHLIST_MAX_TERMS", 50))
+MAX_PHRASE_WORDS = 6
+INBOX_MAX_ITEMS = int(os.getenv("INBOX_MAX_ITEMS", 500))
+WRITE_BATCH_SIZE = 1_000
+PROFILE_MAX_IDLE_DAYS = float(os.getenv("PROFILE_MAX_IDLE_DAYS", 180))
+# `last_seen_at` of a profile is refreshed at most this often.
+PROFILE_TOUCH_INTERVAL = timedelta(hours=1)
+
+# (index of the paper in the percolated batch, watchlist names, reasons)
+Match = Tuple[int, Tuple[str, ...], Tuple[str, ...]]
+
+def tokenize(text: str) -> List[str]:
+    """
+    Normalised words of `text`: accent-free, case-folded, with a plural `s`
+    folded (`transformers` -> `transformer`), identically for keywords and papers.
+    """
+    return [
+        t[:-1] if len(t) > 3 and t[-1] == "s" and t[-2] != "s" else t
+        for t in normalize_text(text).split()
+    ]
+
+def watchlist_fields(name: str, keywords: List[str], categories: List[str], authors: List[str]) -> Dict[str, Any]:
+    """
+    Cleans a watchlist definition (blank and duplicate terms dropped, short
+    category codes expanded, author keys computed).
+
+    Raises:
+        ValueError: If the watchlist is empty, too large or has an overlong phrase.
+    """
+    keywords = list(dict.fromkeys(k.strip() for k in keywords if tokenize(k)))
+    categories = list(dict.fromkeys(normalize_category(c) for c in categories if c.strip()))
+    authors = list(dict.fromkeys(a.strip() for a in authors if normalize_author_name(a)))
+    if not (keywords or categories or authors):
+        raise ValueError("A watchlist needs at least one keyword, category or author.")
+    if len(keywords) + len(categories) + len(authors) > MAX_TERMS:
+        raise ValueError(f"A watchlist holds at most {MAX_TERMS} terms.")
+    for keyword in keywords:
+        if len(tokenize(keyword)) > MAX_PHRASE_WORDS:
+            raise ValueError(f"Keyword {keyword!r} is longer than {MAX_PHRASE_WORDS} words.")
+    return {
+        "name": name.strip() or (keywords + authors + categories)[0],
+        "keywords": keywords,
+        "categories": categories,
+        "authors": authors,
+        "author_keys": list(dict.fromkeys(normalize_author_name(a) for a in authors)),
+    }
+
+class WatchlistIndex:
+    """
+    Inverted index of a set of watchlists, see the module docstring.
+
+    Posting lists are `array("i")` of watchlist positions and category filters
+    are interned: with hundreds of thousands of phrases, plain lists would be
+    walked by every full garbage collection during a percolation.
+    """
+    def __init__(self):
+        self.owners: List[Tuple[str, Tuple[str]]] = []
+        self.filter_ids = array("i")
+        self.filters: List[FrozenSet[str]] = []
+        self._filter_ids: Dict[FrozenSet[str], int] = {}
+        self.phrases: Dict[Tuple[str, ...], array] = {}
+        self.lengths: Dict[str, Tuple[int, ...]] = {}
+        self.authors: Dict[str, array] = {}
+        self.categories: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def add(self, user_id: str, name: str, keywords: List[str], categories: List[str], author_keys: List[str]) -> None:
+        position = len(self.owners)
+        self.owners.append((user_id, (name,)))
+        terms = bool(keywords or author_keys)
+        if categories and terms:
+            categories = frozenset(categories)
+            filter_id = self._filter_ids.get(categories)
+            if filter_id is None:
+                filter_id = self._filter_ids[categories] = len(self.filters)
+                self.filters.append(categories)
+            self.filter_ids.append(filter_id)
+        else:
+            self.filter_ids.append(-1)
+
+        for phrase in dict.fromkeys(tuple(tokenize(k)) for k in keywords):
+            if not phrase:
+                continue
+            self.phrases.setdefault(phrase, array("i")).append(position)
+            lengths = self.lengths.get(phrase[0], ())
+            if len(phrase) not in lengths:
+                self.lengths[phrase[0]] = tuple(sorted(lengths + (len(phrase),)))
+        for key in dict.fromkeys(author_keys):
+            self.authors.setdefault(key, array("i")).append(position)
+        if not terms:
+            for category in dict.fromkeys(categories):
+                self.categories.setdefault(category, array("i")).append(position)
+
+    def match(self, title: str, summary: str, author_keys: Sequence[str], categories: Sequence[str]) -> Dict[int, Tuple[str, ...]]:
+        """Positions of the watchlists matching a paper, with the reasons (`keyword:...`, `author:...`, `category:...`)."""
+        found = set()
+        lengths_of, phrases = self.lengths.get, self.phrases
+        for tokens in (tokenize(title), tokenize(summary)):
+            for i, token in enumerate(tokens):
+                lengths = lengths_of(token)
+                if lengths is None:
+                    continue
+                for n in lengths:
+                    phrase = tuple(tokens[i:i + n]) if n > 1 else (token,)
+                    if phrase in phrases:
+                        found.add(phrase)
+
+        # Reasons are tuples shared by every watchlist hit by the same source:
+        # a batch can produce millions of matches.
+        hits: Dict[int, Tuple[str, ...]] = {}
+        sources = [(f"keyword:{' '.join(phrase)}", phrases[phrase]) for phrase in found]
+        sources += [(f"author:{key}", self.authors[key]) for key in dict.fromkeys(author_keys) if key in self.authors]
+        sources += [(f"category:{c}", self.categories[c]) for c in dict.fromkeys(categories) if c in self.categories]
+        for reason, positions in sources:
+            single = (reason,)
+            for position in positions:
+                reasons = hits.get(position)
+                hits[position] = single if reasons is None else reasons + single
+
+        # Category filters: evaluated once per distinct filter, not per watchlist.
+        paper_categories = set(categories)
+        allowed = [not f.isdisjoint(paper_categories) for f in self.filters]
+        filter_ids = self.filter_ids
+        return {
+            position: reasons for position, reasons in hits.items()
+            if filter_ids[position] < 0 or allowed[filter_ids[position]]
+        }
+
+    def percolate(self, papers: Sequence[ArxivPaper]) -> Dict[str, List[Match]]:
+        """
+        Matches of a batch of papers per user, one per user and paper, as compact
+        `(paper index, watchlist names, reasons)` tuples (see `inbox_items`).
+        """
+        inboxes: Dict[str, List[Match]] = defaultdict(list)
+        owners = self.owners
+        for index, paper in enumerate(papers):
+            hits = self.match(paper.title, paper.summary, paper.author_keys, paper.categories)
+            users: Dict[str, Match] = {}
+            for position, reasons in hits.items():
+                user_id, names = owners[position]
+                seen = users.get(user_id)
+                if seen is None:
+                    users[user_id] = (index, names, reasons)
+                else:
+                    extra = tuple(r for r in reasons if r not in seen[2])
+                    users[user_id] = (index, seen[1] + names, seen[2] + extra)
+            for user_id, match in users.items():
+                inboxes[user_id].append(match)
+        return inboxes
+
+def inbox_items(papers: Sequence[ArxivPaper], matches: List[Match], matched_at: datetime) -> List[Dict[str, Any]]:
+    """`InboxItem` documents of one user's matches."""
+    return [
+        {
+            "paper_id": papers[index].id,
+            "title": papers[index].title,
+            "prime_category": papers[index].prime_category,
+            "published_date": papers[index].published_date,
+            "watchlists": list(names),
+            "reasons": list(reasons),
+            "matched_at": matched_at,
+        }
+        for index, names, reasons in matches
+    ]
+
+async def load_index() -> WatchlistIndex:
+    """Compiles every stored watchlist."""
+    index = WatchlistIndex()
+    projection = {"user_id": 1, "name": 1, "keywords": 1, "categories": 1, "author_keys": 1}
+    async for doc in Watchlist.get_pymongo_collection().find({}, projection):
+        index.add(doc["user_id"], doc["name"], doc.get("keywords", []), doc.get("categories", []), doc.get("author_keys", []))
+    return index
+
+_index: Optional[WatchlistIndex] = None
+_index_generation: Optional[int] = None
+_index_lock = asyncio.Lock()
+
+async def current_index() -> WatchlistIndex:
+    """The compiled index, rebuilt if a watchlist changed since it was built."""
+    global _index, _index_generation
+    state = await ClusterState.get_pymongo_collection().find_one({"_id": WATCHLIST_GENERATION})
+    generation = state["value"] if state else 0
+    async with _index_lock:
+        if _index is None or generation != _index_generation:
+            start = time.perf_counter()
+            _index = await load_index()
+            _index_generation = generation
+            elapsed = time.perf_counter() - start
+            PERCOLATE_SECONDS.observe(elapsed, stage="index")
+            logger.info(f"📇 Watchlist index rebuilt: {len(_index):,} watchlists, {len(_index.phrases):,} phrases in {elapsed:.2f}s")
+    return _index
+
+async def publish_watchlist_generation() -> None:
+    """Marks the watchlists as changed for every worker."""
+    await ClusterState.get_pymongo_collection().update_one(
+        {"_id": WATCHLIST_GENERATION},
+        {"$inc": {"value": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+async def write_inboxes(papers: Sequence[ArxivPaper], inboxes: Dict[str, List[Match]], matched_at: datetime) -> None:
+    """Prepends the matches to each user's inbox, in unordered bulk batches."""
+    collection = Inbox.get_pymongo_collection()
+    users = list(inboxes)
+    for start in range(0, len(users), WRITE_BATCH_SIZE):
+        ops = []
+        for user_id in users[start:start + WRITE_BATCH_SIZE]:
+            items = inbox_items(papers, inboxes[user_id], matched_at)
+            ops.append(UpdateOne(
+                {"_id": user_id},
+                {
+                    "$push": {"items": {
+                        "$each": items,
+                        "$sort": {"matched_at": -1, "published_date": -1},
+                        "$slice": INBOX_MAX_ITEMS,
+                    }},
+                    "$inc": {"unread": len(items)},
+                    "$set": {"updated_at": matched_at},
+                },
+                upsert=True
+            ))
+        await collection.bulk_write(ops, ordered=False)
+
+async def percolate(papers: Sequence[ArxivPaper]) -> Dict[str, int]:
+    """
+    Matches newly ingested papers against every watchlist and fills the inboxes.
+
+    Returns:
+        Dict[str, int]: papers, watchlists, matches (inbox items) and users.
+    """
+    stats = {"papers": len(papers), "watchlists": 0, "matches": 0, "users": 0}
+    if not papers:
+        return stats
+    index = await current_index()
+    stats["watchlists"] = len(index)
+    if not len(index):
+        return stats
+
+    # CPU-bound: run off the event loop so requests keep being served.
+    with PERCOLATE_SECONDS.time(stage="match"):
+        inboxes = await asyncio.to_thread(index.percolate, papers)
+    stats["users"] = len(inboxes)
+    stats["matches"] = sum(len(matches) for matches in inboxes.values())
+
+    with PERCOLATE_SECONDS.time(stage="write"):
+        await write_inboxes(papers, inboxes, datetime.now(timezone.utc))
+    WATCHLIST_MATCHES.inc(stats["matches"])
+    logger.info(
+        f"🔔 {len(papers)} papers percolated against {len(index):,} watchlists: "
+        f"{stats['matches']:,} matches for {stats['users']:,} users."
+    )
+    return stats
+
+def _object_id(watchlist_id: str) -> Optional[PydanticObjectId]:
+    try:
+        return PydanticObjectId(watchlist_id)
+    except (InvalidId, TypeError):
+        return None
+
+async def list_watchlists(user_id: str) -> List[Watchlist]:
+    return await Watchlist.find(Watchlist.user_id == user_id).sort("created_at").to_list()
+
+async def create_watchlist(user_id: str, fields: Dict[str, Any]) -> Watchlist:
+    """
+    Raises:
+        ValueError: If the user already has `MAX_WATCHLISTS_PER_USER` watchlists.
+    """
+    if await Watchlist.find(Watchlist.user_id == user_id).count() >= MAX_WATCHLISTS_PER_USER:
+        raise ValueError(f"At most {MAX_WATCHLISTS_PER_USER} watchlists per user.")
+    watchlist = Watchlist(user_id=user_id, **fields)
+    await watchlist.insert()
+    await publish_watchlist_generation()
+    return watchlist
+
+async def update_watchlist(user_id: str, watchlist_id: str, fields: Dict[str, Any]) -> Optional[Watchlist]:
+    """Replaces the definition of a watchlist of `user_id`; None if there is no such watchlist."""
+    object_id = _object_id(watchlist_id)
+    watchlist = await Watchlist.find_one(Watchlist.id == object_id, Watchlist.user_id == user_id) if object_id else None
+    if watchlist is None:
+        return None
+    await watchlist.set({**fields, "updated_at": datetime.now(timezone.utc)})
+    await publish_watchlist_generation()
+    return watchlist
+
+async def delete_watchlist(user_id: str, watchlist_id: str) -> bool:
+    object_id = _object_id(watchlist_id)
+    if object_id is None:
+        return False
+    result = await Watchlist.find_one(Watchlist.id == object_id, Watchlist.user_id == user_id).delete()
+    if not result or not result.deleted_count:
+        return False
+    await publish_watchlist_generation()
+    return True
+
+async def read_inbox(user_id: str, limit: int = 50, skip: int = 0) -> Dict[str, Any]:
+    """A page of the user's inbox (newest matches first) and the unread count."""
+    doc = await Inbox.get_pymongo_collection().find_one(
+        {"_id": user_id}, {"items": {"$slice": [skip, limit]}, "unread": 1, "seen_at": 1}
+    )
+    if doc is None:
+        return {"items": [], "unread": 0, "seen_at": None}
+    return {
+        "items": [InboxItem.model_validate(item) for item in doc.get("items", [])],
+        "unread": min(doc.get("unread", 0), INBOX_MAX_ITEMS),
+        "seen_at": doc.get("seen_at"),
+    }
+
+async def mark_inbox_read(user_id: str) -> None:
+    await Inbox.get_pymongo_collection().update_one(
+        {"_id": user_id}, {"$set": {"unread": 0, "seen_at": datetime.now(timezone.utc)}}
+    )
+
+def profile_id(token: str) -> str:
+    """Owner ID of a profile token (its SHA-256; the token itself is never stored)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+async def create_profile() -> str:
+    """Creates a profile and returns its token, the only credential for its watchlists and inbox."""
+    token = secrets.token_urlsafe(24)
+    await Profile(id=profile_id(token)).insert()
+    return token
+
+async def profile_owner(token: str) -> Optional[str]:
+    """Owner ID of the profile of `token`, refreshing its `last_seen_at`; None if there is no such profile."""
+    owner = profile_id(token)
+    collection = Profile.get_pymongo_collection()
+    doc = await collection.find_one({"_id": owner}, {"last_seen_at": 1})
+    if doc is None:
+        return None
+    now = datetime.now(timezone.utc)
+    last_seen = doc["last_seen_at"].replace(tzinfo=timezone.utc)
+    if now - last_seen > PROFILE_TOUCH_INTERVAL:
+        await collection.update_one({"_id": owner}, {"$set": {"last_seen_at": now}})
+    return owner
+
+async def _known_profiles(owners: List[str]) -> set:
+    docs = await Profile.get_pymongo_collection().find({"_id": {"$in": owners}}, {"_id": 1}).to_list(None)
+    return {doc["_id"] for doc in docs}
+
+async def prune_profiles(max_idle_days: float = PROFILE_MAX_IDLE_DAYS) -> Dict[str, int]:
+    """
+    Deletes the profiles unused for `max_idle_days` with their watchlists and
+    inboxes, and the watchlists and inboxes whose owner has no profile (e.g.
+    the per-session IDs used before profiles existed).
+
+    Returns:
+        Dict[str, int]: profiles, watchlists and inboxes deleted.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_idle_days)
+    profiles = Profile.get_pymongo_collection()
+    idle = [doc["_id"] for doc in await profiles.find({"last_seen_at": {"$lt": cutoff}}, {"_id": 1}).to_list(None)]
+
+    owners = await Watchlist.get_pymongo_collection().distinct("user_id")
+    stale = set(idle) | (set(owners) - await _known_profiles(owners))
+    inboxes = Inbox.get_pymongo_collection()
+    batch: List[str] = []
+    async for doc in inboxes.find({}, {"_id": 1}):
+        batch.append(doc["_id"])
+        if len(batch) >= WRITE_BATCH_SIZE:
+            stale.update(set(batch) - await _known_profiles(batch))
+            batch = []
+    if batch:
+        stale.update(set(batch) - await _known_profiles(batch))
+
+    stats = {"profiles": 0, "watchlists": 0, "inboxes": 0}
+    stale_ids = list(stale)
+    for start in range(0, len(stale_ids), WRITE_BATCH_SIZE):
+        chunk = stale_ids[start:start + WRITE_BATCH_SIZE]
+        stats["watchlists"] += (await Watchlist.get_pymongo_collection().delete_many({"user_id": {"$in": chunk}})).deleted_count
+        stats["inboxes"] += (await inboxes.delete_many({"_id": {"$in": chunk}})).deleted_count
+        stats["profiles"] += (await profiles.delete_many({"_id": {"$in": chunk}, "last_seen_at": {"$lt": cutoff}})).deleted_count
+    if stats["watchlists"]:
+        await publish_watchlist_generation()
+    logger.info(
+        f"🧹 Idle profiles pruned: {stats['profiles']} profiles, {stats['watchlists']} watchlists, {stats['inboxes']} inboxes."
+    )
+    return stats
@@ -0,0 +1,4 @@
+import os
+
+# The Gemini clients are constructed at import time of `src.main` but never called in tests.
+os.environ.setdefault("GOOGLE_API_KEY", "test")
@@ -0,0 +1,246 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import admission
+from src.admission import client_key
+
+HOST = "203.0.113.7"
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setattr(admission, "CLIENT_ID_SECRET", "s3cret")
+    monkeypatch.setattr(admission, "TRUSTED_PROXIES", frozenset({"10.0.0.2"}))
+
+def test_client_id_with_secret_is_the_key(secret):
+    assert client_key({"x-client-id": "abc", "x-client-secret": "s3cret"}, HOST) == "abc"
+
+@pytest.mark.parametrize("headers", [
+    {"x-client-id": "abc"},
+    {"x-client-id": "abc", "x-client-secret": "wrong"},
+    {"x-client-secret": "s3cret"},
+])
+def test_untrusted_client_id_falls_back_to_ip(secret, headers):
+    assert client_key(headers, HOST) == HOST
+
+def test_trusted_proxy_sets_client_id(secret):
+    assert client_key({"x-client-id": "abc"}, "10.0.0.2") == "abc"
+
+def test_no_secret_configured_ignores_header(monkeypatch):
+    monkeypatch.setattr(admission, "CLIENT_ID_SECRET", "")
+    assert client_key({"x-client-id": "abc", "x-client-secret": ""}, HOST) == HOST
+
+def test_watchlists_need_a_profile_token(secret):
+    from src.main import app
+
+    async def get(headers):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await client.get("/watchlists", headers=headers)
+
+    # A trusted client ID alone owns nothing.
+    response = asyncio.run(get({"X-Client-ID": "abc", "X-Client-Secret": "s3cret"}))
+    assert response.status_code == 401
+
+def test_client_secret_file_is_shared(monkeypatch, tmp_path):
+    monkeypatch.delenv("CLIENT_ID_SECRET", raising=False)
+    monkeypatch.setenv("CLIENT_ID_SECRET_FILE", str(tmp_path / "secrets" / "client_id_secret"))
+    first = admission.load_client_secret()
+    assert len(first) >= 32
+    assert admission.load_client_secret() == first
+    assert list((tmp_path / "secrets").iterdir()) == [tmp_path / "secrets" / "client_id_secret"]
+
+    monkeypatch.setenv("CLIENT_ID_SECRET", "from-env")
+    assert admission.load_client_secret() == "from-env"
+
+def test_try_admit_never_queues():
+    limiter = admission.Admission("speculative", concurrency=1, queue_size=4, queue_timeout=5)
+
+    async def scenario():
+        permit = limiter.try_admit()
+        assert permit is not None
+        assert limiter.try_admit() is None
+        waiter = asyncio.create_task(limiter.admit())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        # A queued request goes first, even once the slot is released.
+        permit.release()
+        assert limiter.try_admit() is None
+        (await waiter).release()
+        assert limiter.try_admit() is not None
+
+    asyncio.run(scenario())
+    assert limiter.rejected == {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+def test_waiters_are_admitted_in_fifo_order_up_to_queue_size():
+    limiter = admission.Admission("fifo", concurrency=1, queue_size=3, queue_timeout=5)
+    order = []
+
+    async def request(i):
+        async with await limiter.admit():
+            order.append(i)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        holder = await limiter.admit()
+        waiters = [asyncio.create_task(request(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.queued) == (1, 3)
+
+        with pytest.raises(admission.AdmissionRejected) as excinfo:
+            await limiter.admit()
+        assert (excinfo.value.status_code, excinfo.value.reason) == (503, "queue_full")
+
+        holder.release()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(scenario())
+    assert order == [0, 1, 2]
+    assert (limiter.in_flight, limiter.queued, limiter.admitted) == (0, 0, 4)
+    assert limiter.rejected["queue_full"] == 1
+
+def test_queue_timeout_rejects_with_503():
+    limiter = admission.Admission("slow", concurrency=1, queue_size=2, queue_timeout=0.05)
+
+    async def scenario():
+        holder = await limiter.admit()
+        with pytest.raises(admission.AdmissionRejected) as excinfo:
+            await limiter.admit()
+        assert (excinfo.value.status_code, excinfo.value.reason) == (503, "queue_timeout")
+        assert (limiter.in_flight, limiter.queued) == (1, 0)
+        holder.release()
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+    assert limiter.rejected == {"rate_limited": 0, "queue_full": 0, "queue_timeout": 1}
+
+def test_no_queue_rejects_as_soon_as_slots_are_busy():
+    limiter = admission.Admission("crawl", concurrency=1, queue_size=0, queue_timeout=0)
+
+    async def scenario():
+        async with await limiter.admit():
+            with pytest.raises(admission.AdmissionRejected) as excinfo:
+                await limiter.admit()
+            assert excinfo.value.reason == "queue_full"
+        (await limiter.admit()).release()
+
+    asyncio.run(scenario())
+
+def test_token_bucket_limits_each_client(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: clock[0])
+    limiter = admission.Admission("chat", concurrency=10, queue_size=0, queue_timeout=0, rate_per_minute=30, burst=2)
+
+    async def admit(client):
+        (await limiter.admit(client)).release()
+
+    async def scenario():
+        await admit("a")
+        await admit("a")
+        with pytest.raises(admission.AdmissionRejected) as excinfo:
+            await admit("a")
+        assert (excinfo.value.status_code, excinfo.value.reason) == (429, "rate_limited")
+        # One token every 2 s.
+        assert excinfo.value.retry_after == 2
+        # Other clients have their own bucket.
+        await admit("b")
+        clock[0] += 2
+        await admit("a")
+
+    asyncio.run(scenario())
+    assert limiter.rejected["rate_limited"] == 1
+    assert limiter.in_flight == 0
+
+def test_token_buckets_are_bounded():
+    limiter = admission.Admission("chat", concurrency=10, queue_size=0, queue_timeout=0, rate_per_minute=1, max_clients=2)
+
+    async def scenario():
+        for client in ("a", "b", "c"):
+            (await limiter.admit(client)).release()
+
+    asyncio.run(scenario())
+    assert list(limiter._buckets) == ["b", "c"]
+
+@pytest.mark.parametrize("estimate, expected", [(0, 1), (0.01, 1), (1.2, 2), (59.5, 60), (10_000, 60)])
+def test_retry_after_is_bounded(estimate, expected):
+    assert admission.AdmissionRejected("chat", 503, "queue_full", estimate).retry_after == expected
+
+def test_retry_after_follows_queue_depth_and_service_time():
+    limiter = admission.Admission("analysis", concurrency=2, queue_size=1, queue_timeout=5)
+    limiter._service_seconds = 30.0
+
+    async def scenario():
+        permits = [await limiter.admit(), await limiter.admit()]
+        waiter = asyncio.create_task(limiter.admit())
+        await asyncio.sleep(0)
+        with pytest.raises(admission.AdmissionRejected) as excinfo:
+            await limiter.admit()
+        # 30 s x (1 queued + 1) / 2 slots.
+        assert excinfo.value.retry_after == 30
+        limiter._service_seconds = 1_000.0
+        with pytest.raises(admission.AdmissionRejected) as excinfo:
+            await limiter.admit()
+        assert excinfo.value.retry_after == admission.MAX_RETRY_AFTER
+        for permit in permits:
+            permit.release()
+        (await waiter).release()
+
+    asyncio.run(scenario())
+
+def test_slot_handed_over_at_the_deadline_goes_to_the_next_waiter(monkeypatch):
+    limiter = admission.Admission("analysis", concurrency=1, queue_size=2, queue_timeout=5)
+    wait_for = asyncio.wait_for
+
+    async def scenario():
+        holder = await limiter.admit()
+        second_queued = asyncio.Event()
+
+        async def deadline_with_handoff(shielded, timeout):
+            monkeypatch.setattr(asyncio, "wait_for", wait_for)
+            await second_queued.wait()
+            # The holder hands its slot to this (oldest) waiter just as its deadline fires.
+            holder.release()
+            shielded.cancel()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", deadline_with_handoff)
+        first = asyncio.create_task(limiter.admit())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(limiter.admit())
+        await asyncio.sleep(0)
+        assert limiter.queued == 2
+        second_queued.set()
+
+        with pytest.raises(admission.AdmissionRejected) as excinfo:
+            await first
+        assert excinfo.value.reason == "queue_timeout"
+        # The slot was passed on to the next waiter, not lost or duplicated.
+        permit = await asyncio.wait_for(second, 1)
+        assert (limiter.in_flight, limiter.queued) == (1, 0)
+        assert limiter.try_admit() is None
+        permit.release()
+
+    asyncio.run(scenario())
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+def test_cancelled_waiter_leaves_the_queue_and_double_release_is_harmless():
+    limiter = admission.Admission("chat", concurrency=1, queue_size=2, queue_timeout=5)
+
+    async def scenario():
+        holder = await limiter.admit()
+        waiter = asyncio.create_task(limiter.admit())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert (limiter.in_flight, limiter.queued) == (1, 0)
+
+        holder.release()
+        holder.release()
+        assert limiter.in_flight == 0
+        stats = limiter.stats()
+        assert (stats["in_flight"], stats["queued"], stats["admitted"]) == (0, 0, 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,151 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils import metrics
+from src.utils.metrics import (
+    REGISTRY, PROMETHEUS_CONTENT_TYPE, Counter, Gauge, Histogram,
+    metrics_enabled, render_metrics, set_metrics_enabled, timed,
+)
+
+@pytest.fixture(autouse=True)
+def enabled():
+    """Metrics on for every test (METRICS_ENABLED may be off in the environment), restored afterwards."""
+    previous = metrics_enabled()
+    set_metrics_enabled(True)
+    yield
+    set_metrics_enabled(previous)
+
+@pytest.fixture
+def registered():
+    """Unregisters the metrics a test creates, so names can be reused."""
+    before = set(REGISTRY._metrics)
+    yield
+    for name in set(REGISTRY._metrics) - before:
+        del REGISTRY._metrics[name]
+
+def test_counter_exposition(registered):
+    counter = Counter("test_items_total", "Items.", ["result"])
+    counter.inc(result="ok")
+    counter.inc(2, result="ok")
+    counter.inc(result='bad "quote"')
+
+    assert counter.value(result="ok") == 3
+    assert counter.render() == [
+        'test_items_total{result="ok"} 3',
+        'test_items_total{result="bad \\"quote\\""} 1',
+    ]
+    text = render_metrics()
+    assert "# HELP test_items_total Items.\n# TYPE test_items_total counter\n" in text
+
+def test_gauge_set_inc_dec(registered):
+    gauge = Gauge("test_in_flight", "In flight.")
+    gauge.set(5)
+    gauge.inc()
+    gauge.dec(3)
+
+    assert gauge.value() == 3
+    assert gauge.render() == ["test_in_flight 3"]
+
+def test_histogram_buckets_are_cumulative(registered):
+    histogram = Histogram("test_seconds", "Durations.", ["op"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, op="read")
+
+    assert histogram.count(op="read") == 4
+    assert histogram.total(op="read") == pytest.approx(3.65)
+    assert histogram.render() == [
+        'test_seconds_bucket{op="read",le="0.1"} 2',
+        'test_seconds_bucket{op="read",le="1"} 3',
+        'test_seconds_bucket{op="read",le="+Inf"} 4',
+        'test_seconds_sum{op="read"} 3.65',
+        'test_seconds_count{op="read"} 4',
+    ]
+
+def test_duplicate_name_is_rejected(registered):
+    Counter("test_once_total", "Once.")
+    with pytest.raises(ValueError):
+        Counter("test_once_total", "Twice.")
+
+def test_timed_sync_and_async(registered):
+    histogram = Histogram("test_call_seconds", "Calls.", ["kind"])
+
+    @timed(histogram, kind="sync")
+    def add(a, b):
+        return a + b
+
+    @timed(histogram, kind="async")
+    async def wait(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    assert add(1, 2) == 3
+    assert asyncio.run(wait("x")) == "x"
+    assert add.__name__ == "add" and asyncio.iscoroutinefunction(wait)
+    assert histogram.count(kind="sync") == 1
+    assert histogram.count(kind="async") == 1
+    assert histogram.total(kind="async") >= 0.01
+
+def test_timed_records_failing_calls(registered):
+    histogram = Histogram("test_failing_seconds", "Failures.")
+
+    @timed(histogram)
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        fail()
+    assert histogram.count() == 1
+
+def test_disabled_is_a_no_op(registered):
+    counter = Counter("test_disabled_total", "Disabled.")
+    gauge = Gauge("test_disabled_gauge", "Disabled.")
+    histogram = Histogram("test_disabled_seconds", "Disabled.")
+    set_metrics_enabled(False)
+
+    counter.inc()
+    gauge.set(3)
+    histogram.observe(1.0)
+    with histogram.time():
+        pass
+    assert histogram.time() is metrics._NOOP_TIMER
+
+    # `timed` checks the switch when it decorates: functions decorated while
+    # metrics are off are returned unchanged and never record.
+    def plain():
+        return "plain"
+    assert timed(histogram)(plain) is plain
+
+    assert counter.value() == 0 and gauge.value() == 0 and histogram.count() == 0
+    assert counter.render() == gauge.render() == histogram.render() == []
+
+def test_timed_decorated_while_enabled_follows_the_switch(registered):
+    histogram = Histogram("test_switch_seconds", "Switch.")
+
+    @timed(histogram)
+    def work():
+        return 1
+
+    set_metrics_enabled(False)
+    work()
+    assert histogram.count() == 0
+
+    set_metrics_enabled(True)
+    work()
+    assert histogram.count() == 1
+
+def test_metrics_route():
+    from src.main import app
+
+    async def scrape():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            await client.get("/")
+            return await client.get("/metrics")
+
+    response = asyncio.run(scrape())
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    assert "# TYPE http_request_seconds histogram" in response.text
+    assert 'http_request_seconds_count{method="GET",route="/",status="200"}' in response.text
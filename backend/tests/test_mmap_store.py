@@ -0,0 +1,190 @@
+import json
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.mmap_store import MmapVectorStore, MANIFEST
+from src.interfaces.interfaces import VectorRecord, VectorFilter
+
+DIM = 8
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def _records(ids, seed=0, category="cs.AI"):
+    rng = np.random.default_rng(seed)
+    return [
+        VectorRecord(id=paper_id, vector=rng.standard_normal(DIM).tolist(), payload={
+            "title": f"title {paper_id}",
+            "category": category,
+            "published_date": (NOW - timedelta(days=i)).isoformat(),
+        })
+        for i, paper_id in enumerate(ids)
+    ]
+
+def _top(store, vector, limit=1, filter=None):
+    return asyncio.run(store.search_batch([vector], limit, filter))[0]
+
+def _manifest(path):
+    return json.loads((path / MANIFEST).read_text())
+
+@pytest.fixture
+def store(tmp_path):
+    store = MmapVectorStore(str(tmp_path), DIM)
+    yield store
+    store.close()
+
+def test_search_finds_each_vector_after_reopen(tmp_path, store):
+    records = _records([f"p{i}" for i in range(50)])
+    asyncio.run(store.upsert(records))
+    store.close()
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    try:
+        assert asyncio.run(reopened.count()) == 50
+        for record in records[::7]:
+            hit = _top(reopened, record.vector)[0]
+            assert hit.id == record.id
+            assert hit.score == pytest.approx(1.0, abs=1e-5)
+            assert hit.payload["title"] == record.payload["title"]
+    finally:
+        reopened.close()
+
+def test_prefilter_by_category_and_date(store):
+    asyncio.run(store.upsert(_records([f"ai{i}" for i in range(10)], seed=1, category="cs.AI")))
+    asyncio.run(store.upsert(_records([f"cl{i}" for i in range(10)], seed=2, category="cs.CL")))
+    query = _records(["q"], seed=3)[0].vector
+
+    hits = _top(store, query, limit=20, filter=VectorFilter(category="cs.CL", published_after=NOW - timedelta(days=4)))
+    assert sorted(h.id for h in hits) == [f"cl{i}" for i in range(5)]
+    assert _top(store, query, filter=VectorFilter(category="cs.XX")) == []
+
+def test_update_and_delete_tombstone_old_rows(store):
+    asyncio.run(store.upsert(_records(["a", "b"], seed=1)))
+    moved = _records(["a"], seed=9)[0]
+    asyncio.run(store.upsert([moved]))
+    asyncio.run(store.delete(["b"]))
+
+    assert asyncio.run(store.count()) == 1
+    assert store.dead_rows == 2
+    hits = _top(store, moved.vector, limit=5)
+    assert [h.id for h in hits] == ["a"]
+    assert hits[0].score == pytest.approx(1.0, abs=1e-5)
+
+def test_uncommitted_rows_are_dropped_on_open(tmp_path, store):
+    asyncio.run(store.upsert(_records(["a", "b"])))
+    # A crash after appending a batch but before the manifest swap.
+    store.arrays["vectors"][2] = 1.0
+    store.arrays["alive"][2] = 1
+    store._payload_file.write(b'{"id": "c", "title": "uncommitted"}\n')
+    store._payload_file.flush()
+    store.close()
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    try:
+        assert reopened.count_rows == 2
+        assert reopened.ids == ["a", "b"]
+        assert b"uncommitted" not in (tmp_path / "payload.0.jsonl").read_bytes()
+        assert asyncio.run(reopened.retrieve(["c"])) == {}
+    finally:
+        reopened.close()
+
+def test_truncated_payload_drops_the_partial_row(tmp_path, store):
+    asyncio.run(store.upsert(_records(["a", "b", "c"])))
+    store.close()
+    payload = tmp_path / "payload.0.jsonl"
+    payload.write_bytes(payload.read_bytes()[:-5])
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    try:
+        assert reopened.count_rows == 2
+        assert asyncio.run(reopened.count()) == 2
+        assert payload.read_bytes().endswith(b"\n")
+        # The next write lands on the freed row.
+        asyncio.run(reopened.upsert(_records(["d"], seed=4)))
+        assert reopened.ids == ["a", "b", "d"]
+    finally:
+        reopened.close()
+
+def test_crash_before_tombstone_keeps_the_newest_row(tmp_path, store):
+    asyncio.run(store.upsert(_records(["a"], seed=1)))
+    moved = _records(["a"], seed=2)[0]
+    moved.payload["title"] = "new"
+    asyncio.run(store.upsert([moved]))
+    # Undo the tombstone written after the manifest commit.
+    store.arrays["alive"][0] = 1
+    store.arrays["alive"].flush()
+    store.close()
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    try:
+        assert reopened.id_to_row == {"a": 1}
+        assert reopened.arrays["alive"][0] == 0
+        assert [h.payload["title"] for h in _top(reopened, moved.vector, limit=5)] == ["new"]
+    finally:
+        reopened.close()
+
+def test_compaction_rewrites_live_rows(tmp_path, store):
+    records = _records([f"p{i}" for i in range(200)])
+    asyncio.run(store.upsert(records))
+    asyncio.run(store.delete([f"p{i}" for i in range(0, 200, 2)]))
+    before = asyncio.run(store.retrieve([f"p{i}" for i in range(200)]))
+
+    asyncio.run(store.compact())
+    assert store.generation == 1
+    assert store.count_rows == 100 and store.dead_rows == 0
+    assert _manifest(tmp_path)["generation"] == 1
+    assert not any(".0." in f.name for f in tmp_path.iterdir())
+    assert asyncio.run(store.retrieve([f"p{i}" for i in range(200)])) == before
+    for record in records[1::14]:
+        hit = _top(store, record.vector)[0]
+        assert (hit.id, hit.payload["title"]) == (record.id, record.payload["title"])
+    assert all(h.id not in {f"p{i}" for i in range(0, 200, 2)} for h in _top(store, records[0].vector, limit=100))
+
+def test_compaction_runs_past_the_tombstone_ratio(tmp_path):
+    store = MmapVectorStore(str(tmp_path), DIM, compact_ratio=0.3)
+    try:
+        ids = [f"p{i}" for i in range(3 * store.INITIAL_CAPACITY)]
+        asyncio.run(store.upsert(_records(ids)))
+        asyncio.run(store.delete(ids[:store.INITIAL_CAPACITY + 1]))
+        assert store.generation == 1
+        assert asyncio.run(store.count()) == store.count_rows == len(ids) - store.INITIAL_CAPACITY - 1
+    finally:
+        store.close()
+
+def test_interrupted_compaction_leftovers_are_removed(tmp_path, store):
+    asyncio.run(store.upsert(_records(["a", "b"])))
+    store._allocate(1, store.capacity)
+    (tmp_path / "payload.1.jsonl").write_text('{"id": "a"}\n')
+    store.close()
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    try:
+        assert reopened.generation == 0
+        assert not any(".1." in f.name for f in tmp_path.iterdir())
+        assert asyncio.run(reopened.count()) == 2
+    finally:
+        reopened.close()
+
+def test_float16_store_is_converted_on_open(tmp_path, store):
+    records = _records([f"p{i}" for i in range(20)])
+    asyncio.run(store.upsert(records))
+    store.close()
+    # Rewrite as a format 1 store (float16 vectors).
+    f32 = np.fromfile(tmp_path / "vectors.0.f32", dtype=np.float32)
+    f32.astype(np.float16).tofile(tmp_path / "vectors.0.f16")
+    (tmp_path / "vectors.0.f32").unlink()
+    manifest = _manifest(tmp_path)
+    (tmp_path / MANIFEST).write_text(json.dumps({**manifest, "format": 1}))
+
+    reopened = MmapVectorStore(str(tmp_path), DIM)
+    try:
+        assert _manifest(tmp_path)["format"] == 2
+        assert reopened.generation == 1
+        assert sorted(f.name for f in tmp_path.iterdir()) == sorted(
+            ["manifest.json", "vectors.1.f32", "payload.1.jsonl", "category.1.u16", "published.1.i8", "alive.1.u1"]
+        )
+        for record in records[::5]:
+            assert _top(reopened, record.vector)[0].id == record.id
+    finally:
+        reopened.close()
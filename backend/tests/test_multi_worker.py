@@ -0,0 +1,29 @@
+"""
+Exactly-once scheduled crawl across worker processes on a real MongoDB: the
+process mode of `benchmarks/multi_worker.py` (lease contention between
+processes, leader killed with SIGKILL). Skipped without `MONGO_URI`; takes
+about half a minute.
+"""
+import os
+import asyncio
+
+import pytest
+
+from benchmarks.multi_worker import parse_args, run
+
+MONGO_URI = os.getenv("MONGO_URI")
+pytestmark = pytest.mark.skipif(not MONGO_URI, reason="needs MONGO_URI (a MongoDB the test can create databases on)")
+
+def test_one_done_run_per_slot_across_processes():
+    args = parse_args([
+        "--mongo-uri", MONGO_URI, "--workers", "4", "--duration", "20",
+        "--interval", "5", "--lease", "3", "--kill-after", "7",
+    ])
+    result = asyncio.run(run(args))
+
+    assert result["killed_leader"], "no leader held the lease when the kill was due"
+    assert result["slots_expected"] >= 2
+    assert result["done_per_slot"] == [1] * result["slots_expected"]
+    assert result["failover_s"] is not None and result["failover_s"] <= args.lease * 4 / 3 + 1.0
+    assert len(result["leaders"]) >= 2, "the killed leader was never replaced"
+    assert not result["failures"], "; ".join(result["failures"])
@@ -0,0 +1,49 @@
+import json
+import base64
+from datetime import date, datetime, timezone
+
+import pytest
+
+from src.utils.pagination import decode_cursor, encode_cursor, keyset_filter
+
+def _raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+@pytest.mark.parametrize("value, expected", [
+    ("cs.CL", "cs.CL"),
+    (3, 3),
+    (datetime(2024, 1, 2, 3, 4, tzinfo=timezone.utc), datetime(2024, 1, 2, 3, 4, tzinfo=timezone.utc)),
+    (date(2024, 1, 2), datetime(2024, 1, 2)),
+])
+def test_cursor_round_trip(value, expected):
+    assert decode_cursor(encode_cursor(value, "2401.00001")) == (expected, "2401.00001")
+
+@pytest.mark.parametrize("payload", [
+    [{"$ne": None}, "x"],
+    [{"$date": "2024-01-01", "$ne": None}, "x"],
+    [{"$date": {"$gt": ""}}, "x"],
+    [["a"], "x"],
+    [None, "x"],
+    [True, "x"],
+    [float("nan"), "x"],
+    ["cs.CL", {"$ne": None}],
+    ["cs.CL", 5],
+    ["cs.CL"],
+    {"value": "cs.CL"},
+])
+def test_crafted_cursor_is_rejected(payload):
+    with pytest.raises(ValueError):
+        keyset_filter("prime_category", False, _raw_cursor(payload))
+
+@pytest.mark.parametrize("cursor", ["not base64!", base64.urlsafe_b64encode(b"{").decode(), _raw_cursor([{"$date": "2024-13-01"}, "x"])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_keyset_filter_bounds_both_keys():
+    cursor = encode_cursor("cs.CL", "2401.00001")
+    assert keyset_filter("prime_category", False, cursor) == {
+        "prime_category": {"$gte": "cs.CL"},
+        "$or": [{"prime_category": {"$gt": "cs.CL"}}, {"_id": {"$gt": "2401.00001"}}],
+    }
+    assert keyset_filter("prime_category", True, None) == {}
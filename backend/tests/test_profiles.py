@@ -0,0 +1,62 @@
+"""
+Watchlist profiles: the owner identity survives sessions, and idle or orphaned
+owners are pruned with their watchlists and inboxes. Runs in a throw-away
+database of the MongoDB of `MONGO_URI` (skipped without it).
+"""
+import os
+import asyncio
+from datetime import datetime, timezone, timedelta
+from uuid import uuid4
+
+import pytest
+from beanie import init_beanie
+from pymongo import AsyncMongoClient
+
+from src.model import Inbox, Profile, Watchlist
+from src.database import DOCUMENT_MODELS
+from src.watchlists import create_profile, create_watchlist, profile_owner, prune_profiles, watchlist_fields
+
+MONGO_URI = os.getenv("MONGO_URI")
+pytestmark = pytest.mark.skipif(not MONGO_URI, reason="needs MONGO_URI (a MongoDB the test can create databases on)")
+
+def _run(scenario):
+    async def main():
+        client = AsyncMongoClient(MONGO_URI)
+        db = client[f"arxiv_profiles_{uuid4().hex[:8]}"]
+        try:
+            await init_beanie(database=db, document_models=DOCUMENT_MODELS)
+            await scenario()
+        finally:
+            await client.drop_database(db.name)
+            await client.close()
+    asyncio.run(main())
+
+async def profile_owner_exists(owner: str) -> bool:
+    return await Profile.get_pymongo_collection().count_documents({"_id": owner}) == 1
+
+def test_token_identifies_the_same_owner_every_time():
+    async def scenario():
+        token = await create_profile()
+        owner = await profile_owner(token)
+        assert owner is not None and owner != token
+        assert await profile_owner(token) == owner
+        assert await profile_owner("not-a-profile") is None
+        assert await Profile.get_pymongo_collection().count_documents({"_id": token}) == 0
+    _run(scenario)
+
+def test_prune_deletes_idle_and_orphaned_owners():
+    async def scenario():
+        active, idle = await profile_owner(await create_profile()), await profile_owner(await create_profile())
+        long_ago = datetime.now(timezone.utc) - timedelta(days=400)
+        await Profile.get_pymongo_collection().update_one({"_id": idle}, {"$set": {"last_seen_at": long_ago}})
+        for owner in (active, idle, "legacy-session-id"):
+            await create_watchlist(owner, watchlist_fields("nlp", ["transformer"], [], []))
+            await Inbox(id=owner).insert()
+
+        stats = await prune_profiles(max_idle_days=180)
+
+        assert stats == {"profiles": 1, "watchlists": 2, "inboxes": 2}
+        assert await Watchlist.get_pymongo_collection().distinct("user_id") == [active]
+        assert [doc["_id"] for doc in await Inbox.get_pymongo_collection().find({}).to_list(None)] == [active]
+        assert await profile_owner_exists(active) and not await profile_owner_exists(idle)
+    _run(scenario)
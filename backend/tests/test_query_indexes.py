@@ -0,0 +1,215 @@
+"""
+Every query the backend ships is served by an index.
+
+Runs against the MongoDB of `MONGO_URI` (skipped without it), in a throw-away
+database created and dropped by the module. A small corpus is seeded through
+the real ingest code (papers, author index, watchlists, inboxes, artifacts),
+then each scenario calls the real endpoint or job function with the database
+profiler on (level 2), so the checked shapes are the ones the code actually
+sends. Every profiled operation fails the scenario if its plan
+
+- contains a collection scan (`COLLSCAN`),
+- has a blocking in-memory sort (`hasSortStage`),
+- or, for finds, examines far more index keys or documents than it returns
+  (an index walk that is a full scan in disguise, e.g. a regex filter
+  evaluated along the sort index).
+
+Aggregations are only checked for the first two: their `$group` stages read
+their whole `$match` window by design.
+
+Scenarios that scan on purpose are listed in `SCANS` with the reason and
+reported as expected failures (`xpass` once one stops scanning).
+
+Usage (from backend/):
+    MONGO_URI=mongodb://localhost:27017 uv run pytest tests/test_query_indexes.py
+"""
+import os
+import random
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+from uuid import uuid4
+
+import pytest
+from fastapi import Response
+from beanie import init_beanie
+from pymongo import AsyncMongoClient
+
+from src.main import SearchRequest, search_papers, get_latest_news, get_similar_papers
+from src.model import ArxivPaper, SEARCH_SORT_FIELDS
+from src.database import DOCUMENT_MODELS
+from src.facets import paper_facets
+from src.authors import papers_by_author, top_authors, update_author_index
+from src.watchlists import (
+    create_profile, create_watchlist, list_watchlists, load_index, mark_inbox_read, percolate, profile_owner,
+    prune_profiles, read_inbox, watchlist_fields
+)
+from src.artifacts import FULL_TEXT, FULL_TEXT_EXTRACTOR, load_artifact, save_artifact
+from src.agent.context import paper_context
+from src.crawler.scraper import ArxivScraper
+from src.jobs.reindex_vectors import catch_up_query
+
+MONGO_URI = os.getenv("MONGO_URI")
+pytestmark = pytest.mark.skipif(not MONGO_URI, reason="needs MONGO_URI (a MongoDB the test can create databases on)")
+
+PAPERS = 2_000
+SEED = 7
+USER = "client-1"
+# Token of the profile created by `_seed`.
+PROFILE_TOKENS: List[str] = []
+KEYWORD = "transformer"
+# A find may examine this many keys/documents per returned document (plus slack)
+# before it counts as a scan.
+MAX_EXAMINED_PER_RETURNED = 4
+EXAMINED_SLACK = 20
+
+WORDS = (
+    "graph neural language model vision diffusion retrieval sparse attention robust "
+    "efficient learning benchmark agent reasoning multimodal contrastive token"
+).split()
+CATEGORIES = ["cs.CL", "cs.CV", "cs.LG", "cs.AI", "cs.IR", "cs.RO"]
+
+# Scenarios that scan on purpose: name -> reason.
+SCANS = {
+    "facets:all-time": "counts the whole corpus; cached per crawl generation",
+    "watchlists:percolator_index": "loads every watchlist to compile the percolator, only after a watchlist changed",
+    "profiles:prune": "walks every inbox ID to find orphaned owners, once a day",
+    **{
+        f"search:{field}:{order}:keyword": "substring match on the title, evaluated along the sort index until `limit` matches"
+        for field in SEARCH_SORT_FIELDS for order in ("desc", "asc")
+    },
+}
+
+def _papers(rng: random.Random) -> List[ArxivPaper]:
+    now = datetime.now(timezone.utc)
+    papers = []
+    for i in range(PAPERS):
+        title = " ".join(rng.choice(WORDS) for _ in range(8))
+        if rng.random() < 0.02:
+            title = f"{title} {KEYWORD}"
+        published = now - timedelta(days=rng.uniform(0, 730))
+        categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+        papers.append(ArxivPaper(
+            id=f"2401.{i:05d}",
+            title=title,
+            author=[f"Author {rng.randint(0, 299)}" for _ in range(rng.randint(1, 4))],
+            arxiv_url=f"http://arxiv.org/abs/2401.{i:05d}",
+            pdf_url=f"http://arxiv.org/pdf/2401.{i:05d}",
+            published_date=published,
+            updated_date=published,
+            summary=" ".join(rng.choice(WORDS) for _ in range(40)),
+            prime_category=categories[0],
+            categories=categories,
+        ))
+    return papers
+
+async def _seed(papers: List[ArxivPaper]) -> None:
+    await ArxivPaper.insert_many(papers)
+    await update_author_index(papers)
+    await create_watchlist(USER, watchlist_fields("nlp", [KEYWORD], [], []))
+    await create_watchlist(USER, watchlist_fields("cv", [], ["cs.CV"], []))
+    await percolate(papers[-100:])
+    for paper in papers[:20]:
+        await save_artifact(paper, FULL_TEXT, FULL_TEXT_EXTRACTOR, paper.summary)
+    PROFILE_TOKENS.append(await create_profile())
+
+async def _search_pages(field: str, order: str) -> None:
+    response = Response()
+    await search_papers(SearchRequest(sort_by=field, order=order, limit=20), response)
+    await search_papers(SearchRequest(sort_by=field, order=order, limit=20, cursor=response.headers["X-Next-Cursor"]), Response())
+
+def _scenarios() -> Dict[str, Callable[[], Awaitable[Any]]]:
+    paper_id, author = "2401.00007", "Author 7"
+    scenarios: Dict[str, Callable[[], Awaitable[Any]]] = {}
+    for field in SEARCH_SORT_FIELDS:
+        for order in ("desc", "asc"):
+            scenarios[f"search:{field}:{order}"] = lambda f=field, o=order: _search_pages(f, o)
+            scenarios[f"search:{field}:{order}:keyword"] = (
+                lambda f=field, o=order: search_papers(SearchRequest(keyword=KEYWORD, sort_by=f, order=o), Response())
+            )
+    scenarios.update({
+        "news:latest": get_latest_news,
+        "paper:similar": lambda: get_similar_papers(paper_id),
+        "chat:context": lambda: paper_context(paper_id),
+        "artifacts:load": lambda: _load_artifact(paper_id),
+        "facets:window": lambda: paper_facets(days=30),
+        "facets:window:category": lambda: paper_facets(days=30, category="cs.CL"),
+        "facets:all-time": lambda: paper_facets(days=0),
+        "top_authors:window": lambda: top_authors(days=7),
+        "top_authors:window:category": lambda: top_authors(category="cs.CL", days=7),
+        "top_authors:all-time": lambda: top_authors(days=0),
+        "top_authors:all-time:category": lambda: top_authors(category="cs.CL", days=0),
+        "author:papers": lambda: papers_by_author(author),
+        "ingest:existing_versions": lambda: ArxivScraper().save_to_db(_papers(random.Random(SEED))[40:45]),
+        "reindex:catch_up": lambda: ArxivPaper.find(catch_up_query(datetime.now(timezone.utc))).to_list(),
+        "watchlists:by_user": lambda: list_watchlists(USER),
+        "watchlists:percolator_index": load_index,
+        "inbox:read": lambda: read_inbox(USER),
+        "inbox:mark_read": lambda: mark_inbox_read(USER),
+        "profiles:owner": lambda: profile_owner(PROFILE_TOKENS[0]),
+        "profiles:prune": prune_profiles,
+    })
+    return scenarios
+
+async def _load_artifact(paper_id: str):
+    context = await paper_context(paper_id)
+    assert await load_artifact(context.paper, FULL_TEXT) is not None
+
+@pytest.fixture(scope="module")
+def mongo():
+    """Event loop and throw-away database shared by the module, with the corpus seeded."""
+    loop = asyncio.new_event_loop()
+    client = AsyncMongoClient(MONGO_URI)
+    db = client[f"arxiv_indexes_{uuid4().hex[:8]}"]
+    try:
+        loop.run_until_complete(init_beanie(database=db, document_models=DOCUMENT_MODELS))
+        loop.run_until_complete(_seed(_papers(random.Random(SEED))))
+        yield loop, db
+    finally:
+        loop.run_until_complete(db.command("profile", 0))
+        loop.run_until_complete(client.drop_database(db.name))
+        loop.run_until_complete(client.close())
+        loop.close()
+
+async def _profiled(db, run: Callable[[], Awaitable[Any]]) -> List[Dict[str, Any]]:
+    """Runs `run` with the profiler on a fresh `system.profile`; returns the operations that have a plan."""
+    await db.command("profile", 0)
+    await db.drop_collection("system.profile")
+    await db.create_collection("system.profile", capped=True, size=16 * 2**20)
+    await db.command("profile", 2)
+    try:
+        await run()
+    finally:
+        await db.command("profile", 0)
+    entries = await db["system.profile"].find({"ns": {"$regex": f"^{db.name}\\.(?!system\\.)"}}).to_list(None)
+    return [e for e in entries if "planSummary" in e]
+
+def _problem(entry: Dict[str, Any]) -> str:
+    plan = entry["planSummary"]
+    if "COLLSCAN" in plan:
+        return "collection scan"
+    if entry.get("hasSortStage"):
+        return "in-memory sort"
+    if entry["op"] in ("query", "getmore"):
+        examined = max(entry.get("keysExamined", 0), entry.get("docsExamined", 0))
+        returned = entry.get("nreturned", 0)
+        if examined > MAX_EXAMINED_PER_RETURNED * max(returned, 1) + EXAMINED_SLACK:
+            return f"examined {examined} keys/documents to return {returned}"
+    return ""
+
+def _params() -> list:
+    return [
+        pytest.param(name, marks=[pytest.mark.xfail(reason=SCANS[name])] if name in SCANS else [], id=name)
+        for name in _scenarios()
+    ]
+
+@pytest.mark.parametrize("name", _params())
+def test_query_is_index_covered(mongo, name):
+    loop, db = mongo
+    entries = loop.run_until_complete(_profiled(db, _scenarios()[name]))
+    assert entries, f"{name}: no query was profiled"
+    problems = [
+        f"{e['ns'].split('.', 1)[1]} {e['op']} {e['planSummary']}: {problem}"
+        for e in entries if (problem := _problem(e))
+    ]
+    assert not problems, f"{name}: " + "; ".join(problems)
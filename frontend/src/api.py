@@ -0,0 +1,203 @@
+"""
+Lớp truy cập Backend cho giao diện Streamlit.
+
+- Một `httpx.Client` dùng chung cho mọi phiên (giữ kết nối keep-alive thay vì
+  mở kết nối mới ở mỗi lần rerun).
+- Các trang kết quả được cache theo tham số truy vấn trong `PAPERS_CACHE_TTL`
+  giây và bị xoá sau mỗi lần cào dữ liệu (`invalidate_papers`).
+- `/papers/search` được phân trang bằng cursor của Backend (header
+  `X-Next-Cursor`), nên mỗi lần rerun chỉ tải và hiển thị một trang.
+- `/chat/stream` trả về NDJSON, mỗi dòng là một sự kiện có kiểu; khi mở một
+  phiên chat, `/papers/{id}/prepare` được gọi để Backend phân tích trước bài báo.
+- Mỗi phiên trình duyệt gửi kèm header `X-Client-ID` riêng để Backend giới hạn
+  tần suất theo người dùng (mọi yêu cầu đều đi qua cùng một server Streamlit),
+  cùng bí mật `CLIENT_ID_SECRET` để Backend tin header này;
+  khi Backend quá tải (429/503) sẽ trả về thông báo "thử lại sau".
+- Watchlist và hộp thư (`/watchlists`, `/inbox`) thuộc về một hồ sơ: Backend cấp
+  mã hồ sơ (`POST /profiles`), người dùng giữ mã để mở lại ở phiên sau; mã được
+  gửi qua header `X-Profile-Token` và chỉ nằm trong `st.session_state`, không
+  đưa lên URL (nơi nó bị lộ qua lịch sử trình duyệt, link chia sẻ hay log).
+- `X-Client-ID` chỉ là khoá phiên ẩn danh cho rate limit, KHÔNG phải xác thực.
+"""
+import os
+import json
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+import streamlit as st
+
+BACKEND_URL = os.getenv("BACKEND_API_URL", "http://backend:8000")
+PAPERS_CACHE_TTL = int(os.getenv("PAPERS_CACHE_TTL", 300))
+PAGE_SIZE = int(os.getenv("PAPERS_PAGE_SIZE", 20))
+# Bí mật dùng chung với Backend (biến môi trường, hoặc file Backend sinh ra trong
+# volume chung); thiếu nó, Backend bỏ qua `X-Client-ID`.
+CLIENT_ID_SECRET_FILE = os.getenv("CLIENT_ID_SECRET_FILE")
+
+
+@st.cache_resource
+def get_client() -> httpx.Client:
+    """Client HTTP dùng chung (connection pool) cho toàn bộ ứng dụng."""
+    return httpx.Client(
+        base_url=BACKEND_URL,
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+
+
+def client_secret() -> str:
+    """Bí mật dùng chung; đọc lại file cho tới khi Backend đã tạo nó."""
+    secret = os.getenv("CLIENT_ID_SECRET", "")
+    if secret or not CLIENT_ID_SECRET_FILE:
+        return secret
+    try:
+        with open(CLIENT_ID_SECRET_FILE, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def client_headers() -> Dict[str, str]:
+    """Header định danh phiên hiện tại cho rate limit của Backend; không phải xác thực."""
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    headers = {"X-Client-ID": st.session_state.client_id}
+    secret = client_secret()
+    if secret:
+        headers["X-Client-Secret"] = secret
+    return headers
+
+
+def profile_headers() -> Dict[str, str]:
+    """Header của các API watchlist/hộp thư: thêm mã hồ sơ của phiên."""
+    return {**client_headers(), "X-Profile-Token": st.session_state.get("profile_token", "")}
+
+
+def create_profile() -> Optional[str]:
+    """Tạo hồ sơ mới; trả về mã hồ sơ, hoặc None nếu Backend từ chối (quá tải)."""
+    resp = get_client().post("/profiles", headers=client_headers())
+    if busy_message(resp):
+        return None
+    resp.raise_for_status()
+    return resp.json()["token"]
+
+
+def busy_message(response: httpx.Response) -> Optional[str]:
+    """Thông báo cho người dùng khi Backend từ chối vì quá tải, ngược lại None."""
+    if response.status_code not in (429, 503):
+        return None
+    retry_after = response.headers.get("Retry-After", "vài")
+    if response.status_code == 429:
+        return f"Bạn gửi yêu cầu quá nhanh, vui lòng thử lại sau {retry_after} giây."
+    return f"Hệ thống đang quá tải, vui lòng thử lại sau {retry_after} giây."
+
+
+@st.cache_data(ttl=PAPERS_CACHE_TTL, show_spinner=False)
+def fetch_papers_page(
+    keyword: Optional[str] = None,
+    sort_by: str = "published_date",
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Lấy một trang bài báo.
+
+    Returns:
+        Tuple[List[Dict], Optional[str]]: Các bài báo của trang và cursor của
+        trang kế tiếp (None nếu đây là trang cuối).
+
+    Raises:
+        httpx.HTTPError: Lỗi kết nối hoặc mã lỗi HTTP (không được cache).
+    """
+    payload = {"sort_by": sort_by, "order": order, "limit": limit}
+    if keyword:
+        payload["keyword"] = keyword
+    if cursor:
+        payload["cursor"] = cursor
+
+    resp = get_client().post("/papers/search", json=payload)
+    resp.raise_for_status()
+    return resp.json(), resp.headers.get("X-Next-Cursor")
+
+
+def invalidate_papers() -> None:
+    """Xoá cache danh sách bài báo (gọi sau khi cào dữ liệu mới)."""
+    fetch_papers_page.clear()
+
+
+def trigger_crawl(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Gọi Backend để cào dữ liệu; xoá cache danh sách nếu thành công."""
+    resp = get_client().post("/crawler/trigger", json=payload, headers=client_headers(), timeout=120.0)
+    busy = busy_message(resp)
+    if busy:
+        return {"status": "error", "message": busy}
+    data = resp.json()
+    if data.get("status") == "success":
+        invalidate_papers()
+    return data
+
+
+def stream_chat(paper_id: str, message: str, history: List[Dict[str, str]]) -> Iterator[Dict[str, Any]]:
+    """
+    Gửi câu hỏi và trả về lần lượt các sự kiện của câu trả lời
+    (`token`, `tool_start`, `tool_end`, `error`, `done`).
+    """
+    with get_client().stream(
+        "POST",
+        "/chat/stream",
+        json={"paper_id": paper_id, "message": message, "history": history},
+        headers=client_headers(),
+        timeout=60.0,
+    ) as response:
+        busy = busy_message(response)
+        if busy:
+            yield {"type": "error", "message": busy}
+            return
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
+def prepare_chat(paper_id: str) -> None:
+    """
+    Báo Backend chuẩn bị trước phiên chat (tải PDF, phân tích sâu) trong lúc người
+    dùng gõ câu hỏi. Chỉ là tối ưu: mọi lỗi đều được bỏ qua.
+    """
+    try:
+        get_client().post(f"/papers/{paper_id}/prepare", headers=client_headers(), timeout=2.0)
+    except httpx.HTTPError:
+        pass
+
+
+def fetch_watchlists() -> List[Dict[str, Any]]:
+    resp = get_client().get("/watchlists", headers=profile_headers())
+    resp.raise_for_status()
+    return resp.json()
+
+
+def save_watchlist(payload: Dict[str, Any]) -> Optional[str]:
+    """Tạo watchlist; trả về thông báo lỗi (ví dụ watchlist rỗng) hoặc None."""
+    resp = get_client().post("/watchlists", json=payload, headers=profile_headers())
+    if resp.status_code == 400:
+        return resp.json().get("detail")
+    resp.raise_for_status()
+    return None
+
+
+def delete_watchlist(watchlist_id: str) -> None:
+    resp = get_client().delete(f"/watchlists/{watchlist_id}", headers=profile_headers())
+    if resp.status_code != 404:
+        resp.raise_for_status()
+
+
+def fetch_inbox(limit: int = PAGE_SIZE, skip: int = 0) -> Dict[str, Any]:
+    """Các bài báo mới khớp watchlist (mới nhất trước) và số bài chưa đọc."""
+    resp = get_client().get("/inbox", params={"limit": limit, "skip": skip}, headers=profile_headers())
+    resp.raise_for_status()
+    return resp.json()
+
+
+def mark_inbox_read() -> None:
+    get_client().post("/inbox/read", headers=profile_headers()).raise_for_status()
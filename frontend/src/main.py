@@ -1,10 +1,14 @@
+import time
 import streamlit as st
 import httpx
-import os
 from datetime import date, timedelta
 
+from api import (
+    fetch_papers_page, trigger_crawl, stream_chat, prepare_chat,
+    fetch_watchlists, save_watchlist, delete_watchlist, fetch_inbox, mark_inbox_read, create_profile
+)
+
 
-BACKEND_URL = os.getenv("BACKEND_API_URL", "http://backend:8000")
 st.set_page_config(page_title="Arxiv Research Hub", layout="wide", page_icon="🔬")
 
 
@@ -47,11 +51,23 @@ ARXIV_CATEGORIES = {
     "Systems and Control": "SY"
 }
 
+# Khoảng thời gian tối thiểu giữa hai lần vẽ lại câu trả lời đang stream (giây).
+CHAT_RENDER_INTERVAL = 0.1
+
+TOOL_LABELS = {
+    "web_search": "🔍 Đang tìm kiếm thông tin trên web...",
+    "read_full_paper": "📥 Đang tải và đọc toàn văn bài báo (Full PDF)...",
+}
+
 
 if "page" not in st.session_state:
     st.session_state.page = "home"
-if "papers_data" not in st.session_state:
-    st.session_state.papers_data = []
+if "papers_query" not in st.session_state:
+    st.session_state.papers_query = {"keyword": None, "sort_by": "published_date", "order": "desc"}
+if "page_cursors" not in st.session_state:
+    st.session_state.page_cursors = [None]
+if "page_index" not in st.session_state:
+    st.session_state.page_index = 0
 if "selected_paper" not in st.session_state:
     st.session_state.selected_paper = None
 if "messages" not in st.session_state:
@@ -71,12 +87,7 @@ def call_crawler(topics: list, keyword: str, days: int, start_date: str = None):
     st.write(f"Debug Payload: {payload}")
     try:
         with st.spinner(f"🚀 Đang quét arXiv cho chủ đề {topics}... (Vui lòng đợi 10-30s)"):
-            resp = httpx.post(
-                f"{BACKEND_URL}/crawler/trigger",
-                json=payload,
-                timeout=120.0
-            )
-            data = resp.json()
+            data = trigger_crawl(payload)
             if data['status'] == 'success':
                 st.success(data['message'])
                 return True
@@ -88,28 +99,12 @@ def call_crawler(topics: list, keyword: str, days: int, start_date: str = None):
         return False
 
 
-def fetch_papers(keyword: str = None, sort_by="published_date", order="desc"):
-    """Lấy dữ liệu từ DB để hiển thị"""
-    try:
-        payload = {
-            "sort_by": sort_by,
-            "order": order,
-            "limit": 100
-        }
-        if keyword:
-            payload["keyword"] = keyword
-
-        resp = httpx.post(
-            f"{BACKEND_URL}/papers/search",
-            json=payload,
-            timeout=10.0
-        )
-        if resp.status_code == 200:
-            return resp.json()
-        return []
-    except Exception as e:
-        st.error(f"Lỗi lấy dữ liệu: {e}")
-        return []
+def open_results(keyword: str = None, sort_by="published_date", order="desc"):
+    """Chuyển sang trang kết quả với truy vấn mới (bắt đầu lại từ trang đầu)"""
+    st.session_state.papers_query = {"keyword": keyword, "sort_by": sort_by, "order": order}
+    st.session_state.page_cursors = [None]
+    st.session_state.page_index = 0
+    st.session_state.page = "results"
 
 
 # ==========================================
@@ -118,7 +113,7 @@ def fetch_papers(keyword: str = None, sort_by="published_date", order="desc"):
 def render_home():
     st.title("🔬 Arxiv Research Assistant")
     st.markdown("### Bạn muốn bắt đầu nghiên cứu như thế nào?")
-    tab1, tab2, tab3 = st.tabs(["🔍 Nghiên cứu sâu", "📰 Tin tức mới", "💾 Kho Dữ liệu"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🔍 Nghiên cứu sâu", "📰 Tin tức mới", "💾 Kho Dữ liệu", "🔔 Theo dõi"])
 
      # ==================================================
     # TAB 1: RESEARCH MODE
@@ -159,9 +154,7 @@ def render_home():
                 
                 # Gọi API
                 if call_crawler(mapped_topics, query, days=None, start_date=date_str):
-                    st.session_state.papers_data = fetch_papers(keyword=query)
-                    st.session_state.current_query = query
-                    st.session_state.page = "results"
+                    open_results(keyword=query)
                     st.rerun()
     # ==================================================
     # TAB 2: NEWS MODE
@@ -183,8 +176,7 @@ def render_home():
             mapped_topics = [ARXIV_CATEGORIES[name] for name in selected_names]
             
             if call_crawler(mapped_topics, '', days=days_back_opt2):
-                st.session_state.papers_data = fetch_papers()
-                st.session_state.page = "results"
+                open_results()
                 st.rerun()
     # ==================================================
     # TAB 2: DEFAULT MODE
@@ -192,9 +184,100 @@ def render_home():
     with tab3:
         st.write("Xem lại các bài báo đã lưu trong Database mà không cần cào mới.")
         if st.button("📂 Mở Kho Dữ liệu"):
-            st.session_state.papers_data = fetch_papers()
-            st.session_state.page = "results"
+            open_results()
+            st.rerun()
+    # ==================================================
+    # TAB 4: WATCHLISTS & INBOX
+    # ==================================================
+    with tab4:
+        render_watchlists()
+
+def render_profile_picker():
+    """Chọn hồ sơ sở hữu watchlist: nhập mã đã lưu hoặc tạo hồ sơ mới."""
+    st.subheader("🔑 Hồ sơ watchlist")
+    st.write("Watchlist và hộp thư gắn với một mã hồ sơ. Nhập mã đã lưu để mở lại, hoặc tạo hồ sơ mới.")
+    with st.form("open_profile"):
+        token = st.text_input("Mã hồ sơ", type="password")
+        if st.form_submit_button("🔓 Mở hồ sơ") and token.strip():
+            st.session_state.profile_token = token.strip()
             st.rerun()
+    if st.button("✨ Tạo hồ sơ mới"):
+        try:
+            token = create_profile()
+        except httpx.HTTPError as e:
+            st.error(f"Không thể kết nối Backend: {e}")
+            return
+        if token is None:
+            st.warning("Hệ thống đang bận, vui lòng thử lại sau.")
+            return
+        st.session_state.profile_token = token
+        st.rerun()
+
+def render_watchlists():
+    """Watchlist của hồ sơ đang mở và hộp thư bài báo mới khớp (ghi lúc Backend cào dữ liệu)."""
+    if not st.session_state.get("profile_token"):
+        render_profile_picker()
+        return
+    try:
+        inbox = fetch_inbox()
+        watchlists = fetch_watchlists()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 401:
+            st.error(f"Lỗi Backend: {e}")
+            return
+        # Mã sai, hoặc hồ sơ đã bị xoá vì lâu không dùng.
+        del st.session_state["profile_token"]
+        st.warning("Không tìm thấy hồ sơ với mã này.")
+        render_profile_picker()
+        return
+    except httpx.HTTPError as e:
+        st.error(f"Không thể kết nối Backend: {e}")
+        return
+
+    col_inbox, col_lists = st.columns([3, 2])
+    with col_inbox:
+        st.subheader(f"📬 Hộp thư ({inbox['unread']} bài mới)")
+        if not inbox["items"]:
+            st.info("Chưa có bài báo nào khớp. Bài mới được đối chiếu với watchlist mỗi lần hệ thống cào dữ liệu.")
+        for item in inbox["items"]:
+            with st.container(border=True):
+                st.markdown(f"**[{item['prime_category']}] [{item['title']}](https://arxiv.org/abs/{item['paper_id']})**")
+                st.caption(f"📅 {item['published_date'][:10]} | 🔔 {', '.join(item['watchlists'])} | {', '.join(item['reasons'])}")
+        if inbox["unread"] and st.button("✔️ Đánh dấu đã đọc"):
+            mark_inbox_read()
+            st.rerun()
+
+    with col_lists:
+        st.subheader("🗂️ Watchlist")
+        st.caption("Lưu mã hồ sơ dưới đây để mở lại watchlist ở lần sau (ai có mã đều xem được hộp thư).")
+        st.code(st.session_state.profile_token, language=None)
+        if st.button("🔒 Đóng hồ sơ"):
+            del st.session_state["profile_token"]
+            st.rerun()
+        for watchlist in watchlists:
+            c_name, c_delete = st.columns([4, 1])
+            terms = watchlist["keywords"] + watchlist["authors"] + watchlist["categories"]
+            c_name.markdown(f"**{watchlist['name']}**: {', '.join(terms)}")
+            if c_delete.button("🗑️", key=f"delete_{watchlist['_id']}"):
+                delete_watchlist(watchlist["_id"])
+                st.rerun()
+
+        with st.form("new_watchlist", clear_on_submit=True):
+            name = st.text_input("Tên watchlist")
+            keywords = st.text_input("Từ khóa (cách nhau bởi dấu phẩy)", placeholder="large language models, diffusion")
+            authors = st.text_input("Tác giả (cách nhau bởi dấu phẩy)")
+            categories = st.multiselect("Chỉ trong các lĩnh vực", options=list(ARXIV_CATEGORIES.keys()))
+            if st.form_submit_button("➕ Thêm watchlist"):
+                error = save_watchlist({
+                    "name": name,
+                    "keywords": [k for k in keywords.split(",") if k.strip()],
+                    "authors": [a for a in authors.split(",") if a.strip()],
+                    "categories": [ARXIV_CATEGORIES[c] for c in categories],
+                })
+                if error:
+                    st.warning(error)
+                else:
+                    st.rerun()
 
 # ==========================================
 # PAGE 2: RESULT
@@ -208,31 +291,40 @@ def render_results():
             st.session_state.page = "home"
             st.rerun()
 
-    if "current_keyword" in st.session_state and st.session_state.current_keyword:
-        st.info(f"🔍 Đang hiển thị kết quả lọc theo từ khóa: **'{st.session_state.current_keyword}'**")
+    query = st.session_state.papers_query
+    if query["keyword"]:
+        st.info(f"🔍 Đang hiển thị kết quả lọc theo từ khóa: **'{query['keyword']}'**")
         if st.button("❌ Xóa lọc (Xem tất cả)"):
-            st.session_state.current_keyword = None
-            st.session_state.papers_data = fetch_papers() # Fetch all
+            open_results(sort_by=query["sort_by"], order=query["order"])
             st.rerun()
     else:
         st.caption("Đang hiển thị tất cả bài báo mới nhất.")
 
     with st.expander("⚙️ Bộ lọc & Sắp xếp", expanded=True):
         c1, c2, c3 = st.columns(3)
+        sort_options = ["published_date", "prime_category"]
+        order_options = ["desc", "asc"]
         with c1:
             sort_attr = st.selectbox("Sắp xếp theo:", 
-                                     ["published_date", "primary_category"], 
+                                     sort_options,
+                                     index=sort_options.index(query["sort_by"]) if query["sort_by"] in sort_options else 0,
                                      format_func=lambda x: "Ngày xuất bản" if x == "published_date" else "Chuyên mục")
         with c2:
-            order = st.selectbox("Thứ tự:", ["desc", "asc"], 
-                                 format_func=lambda x: "Mới nhất / A-Z" if x == "desc" else "Cũ nhất / Z-A")
+            order = st.selectbox("Thứ tự:", order_options,
+                                 index=order_options.index(query["order"]),
+                                 format_func=lambda x: "Mới nhất / Z-A" if x == "desc" else "Cũ nhất / A-Z")
         with c3:
             st.write("")
             if st.button("Áp dụng Sắp xếp"):
-                st.session_state.papers_data = fetch_papers(sort_attr, order)
+                open_results(keyword=query["keyword"], sort_by=sort_attr, order=order)
                 st.rerun()
 
-    papers = st.session_state.papers_data
+    page_index = st.session_state.page_index
+    try:
+        papers, next_cursor = fetch_papers_page(**query, cursor=st.session_state.page_cursors[page_index])
+    except httpx.HTTPError as e:
+        st.error(f"Lỗi lấy dữ liệu: {e}")
+        return
     
     if not papers:
         st.info("Không có dữ liệu. Hãy quay lại trang chủ để cào thêm.")
@@ -243,10 +335,11 @@ def render_results():
             c_title, c_action = st.columns([4, 1])
             with c_title:
                 st.subheader(f"[{paper['prime_category']}] {paper['title']}")
-                st.caption(f"📅 {paper['published_date'][:10]} | ✍️ {', '.join(paper.get('authors', []))[:60]}...")
+                st.caption(f"📅 {paper['published_date'][:10]} | ✍️ {', '.join(paper.get('author', []))[:60]}...")
             with c_action:
                 st.write("")
                 if st.button("💬 Chat", key=paper['_id']):
+                    prepare_chat(paper['_id'])
                     st.session_state.selected_paper = paper
                     st.session_state.messages = [{
                         "role": "assistant",
@@ -259,6 +352,20 @@ def render_results():
                 st.write(paper['summary'])
                 st.markdown(f"[Link gốc Arxiv]({paper['arxiv_url']}) | [Link PDF]({paper['pdf_url']})")
 
+    c_prev, c_page, c_next = st.columns([1, 2, 1])
+    with c_prev:
+        if st.button("⬅️ Trang trước", disabled=page_index == 0):
+            st.session_state.page_index -= 1
+            st.rerun()
+    with c_page:
+        st.caption(f"Trang {page_index + 1}")
+    with c_next:
+        if st.button("Trang sau ➡️", disabled=next_cursor is None):
+            del st.session_state.page_cursors[page_index + 1:]
+            st.session_state.page_cursors.append(next_cursor)
+            st.session_state.page_index += 1
+            st.rerun()
+
 # ==========================================
 # PAGE 3: CHAT (Deep Dive)
 # ==========================================
@@ -291,26 +398,29 @@ def render_chat():
         st.session_state.messages.append({"role": "user", "content": prompt})
 
         with st.chat_message("assistant"):
+            status_placeholder = st.empty()
             message_placeholder = st.empty()
             full_response = ""
+            last_render = 0.0
             try:
-                with httpx.stream(
-                    "POST", 
-                    f"{BACKEND_URL}/chat/stream", 
-                    json={
-                        "paper_id": paper['_id'],
-                        "message": prompt,
-                        "history": st.session_state.messages[:-1]
-                    },
-                    timeout=60.0
-                ) as response:
-                    for chunk in response.iter_text():
-                        if chunk:
-                            full_response += chunk
+                for event in stream_chat(paper['_id'], prompt, st.session_state.messages[:-1]):
+                    kind = event["type"]
+                    if kind == "token":
+                        full_response += event["text"]
+                        now = time.monotonic()
+                        if now - last_render >= CHAT_RENDER_INTERVAL:
                             message_placeholder.markdown(full_response + "▌")
+                            last_render = now
+                    elif kind == "tool_start":
+                        status_placeholder.caption(TOOL_LABELS.get(event["tool"], f"⚙️ {event['tool']}..."))
+                    elif kind == "tool_end":
+                        status_placeholder.empty()
+                    elif kind == "error":
+                        st.error(event["message"])
                 
                 message_placeholder.markdown(full_response)
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
+                if full_response:
+                    st.session_state.messages.append({"role": "assistant", "content": full_response})
             except Exception as e:
                 st.error(f"Lỗi kết nối AI: {e}")
 